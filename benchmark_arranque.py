@@ -0,0 +1,125 @@
+#!/usr/bin/env python3
+"""
+Benchmark del arranque de la API.
+
+1. Importa `main` con `python -X importtime` y reporta el tiempo total de
+   importación y los módulos más costosos. Falla si alguna dependencia pesada
+   (reportes PDF, gráficos, pasarelas de pago) se importa al arrancar: esas
+   deben cargarse en su primer uso (ver infrastructure/carga_perezosa.py).
+2. Levanta uvicorn y mide el tiempo hasta la primera respuesta de
+   /openapi.json (no requiere la base de datos).
+
+Sale con código 1 si se supera el presupuesto, para usarlo como guarda ante
+regresiones.
+
+Uso: python benchmark_arranque.py [presupuesto_importacion_s] [presupuesto_primera_peticion_s]
+"""
+
+import os
+import re
+import socket
+import subprocess
+import sys
+import time
+import urllib.request
+
+# Dependencias que no deben importarse al arrancar
+MODULOS_PESADOS = (
+    "reportlab", "matplotlib", "numpy", "pandas", "PyPDF2",
+    "qrcode", "stripe", "mercadopago", "paypalrestsdk",
+)
+
+RAIZ = os.path.dirname(os.path.abspath(__file__))
+LINEA_IMPORTTIME = re.compile(r"import time:\s+(\d+) \|\s+(\d+) \|(\s*)(\S+)")
+
+
+def medir_importacion():
+    """Devuelve (segundos totales, [(acumulado_us, módulo)] de primer nivel, módulos importados)"""
+    proceso = subprocess.run(
+        [sys.executable, "-X", "importtime", "-c", "import main"],
+        cwd=RAIZ, capture_output=True, text=True,
+    )
+    if proceso.returncode != 0:
+        print(proceso.stderr[-2000:])
+        raise SystemExit("❌ No se pudo importar main")
+
+    modulos = set()
+    primer_nivel = []
+    for linea in proceso.stderr.splitlines():
+        coincidencia = LINEA_IMPORTTIME.match(linea)
+        if not coincidencia:
+            continue
+        acumulado, sangria, modulo = int(coincidencia.group(2)), coincidencia.group(3), coincidencia.group(4)
+        modulos.add(modulo)
+        if len(sangria) <= 1:
+            primer_nivel.append((acumulado, modulo))
+
+    total = sum(acumulado for acumulado, _ in primer_nivel) / 1_000_000
+    return total, sorted(primer_nivel, reverse=True), modulos
+
+
+def puerto_libre():
+    with socket.socket() as s:
+        s.bind(("127.0.0.1", 0))
+        return s.getsockname()[1]
+
+
+def medir_primera_peticion(timeout=60):
+    """Segundos desde el lanzamiento de uvicorn hasta la primera respuesta 200"""
+    puerto = puerto_libre()
+    inicio = time.perf_counter()
+    servidor = subprocess.Popen(
+        [sys.executable, "-m", "uvicorn", "main:app", "--port", str(puerto), "--log-level", "warning"],
+        cwd=RAIZ, stdout=subprocess.DEVNULL, stderr=subprocess.DEVNULL,
+    )
+    try:
+        while time.perf_counter() - inicio < timeout:
+            if servidor.poll() is not None:
+                raise SystemExit("❌ uvicorn terminó antes de responder")
+            try:
+                with urllib.request.urlopen(f"http://127.0.0.1:{puerto}/openapi.json", timeout=1) as respuesta:
+                    if respuesta.status == 200:
+                        return time.perf_counter() - inicio
+            except OSError:
+                time.sleep(0.05)
+        raise SystemExit(f"❌ Sin respuesta tras {timeout}s")
+    finally:
+        servidor.terminate()
+        servidor.wait()
+
+
+def main():
+    presupuesto_importacion = float(sys.argv[1]) if len(sys.argv) > 1 else 2.0
+    presupuesto_peticion = float(sys.argv[2]) if len(sys.argv) > 2 else 4.0
+    errores = []
+
+    print("📊 Arranque de la API\n")
+    print("🔹 Importación de main (python -X importtime)")
+    total, primer_nivel, modulos = medir_importacion()
+    for acumulado, modulo in primer_nivel[:10]:
+        print(f"   {modulo:<45} {acumulado / 1000:8.1f} ms")
+    print(f"   {'TOTAL':<45} {total * 1000:8.1f} ms (presupuesto {presupuesto_importacion * 1000:.0f} ms)\n")
+    if total > presupuesto_importacion:
+        errores.append(f"importación {total:.2f}s > {presupuesto_importacion:.2f}s")
+
+    pesados = sorted(m for m in modulos if m.split(".")[0] in MODULOS_PESADOS and "." not in m)
+    if pesados:
+        print(f"   ⚠️ Dependencias pesadas importadas al arrancar: {', '.join(pesados)}\n")
+        errores.append(f"dependencias pesadas al arrancar: {', '.join(pesados)}")
+    else:
+        print("   ✅ Ninguna dependencia pesada se importa al arrancar\n")
+
+    print("🔹 Tiempo hasta la primera petición (uvicorn -> /openapi.json)")
+    primera = medir_primera_peticion()
+    print(f"   {primera * 1000:.0f} ms (presupuesto {presupuesto_peticion * 1000:.0f} ms)\n")
+    if primera > presupuesto_peticion:
+        errores.append(f"primera petición {primera:.2f}s > {presupuesto_peticion:.2f}s")
+
+    if errores:
+        print("❌ Regresión de arranque: " + "; ".join(errores))
+        sys.exit(1)
+    print("✅ Arranque dentro del presupuesto")
+
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,226 @@
+#!/usr/bin/env python3
+"""
+Benchmark de las consultas de asistencia del dashboard de personal (/bi/personal)
+con 1.000.000 de filas de asistencia.
+
+Compara:
+  - antes: asistencia unida con personal, UPPER(estado) IN (...) y
+    EXTRACT(YEAR FROM fecha) en las tendencias
+  - después: asistencia_diaria (create_asistencia_diaria.sql), estado_codigo
+    normalizado y rangos de fechas sobre la clave primaria
+y el costo de los triggers que mantienen asistencia_diaria al registrar un día.
+
+Necesita la base de datos de config.py. Trabaja en un esquema temporal
+(benchmark_asistencia) que se elimina al terminar; no toca las tablas reales.
+
+Uso: python benchmark_asistencia.py [filas] [repeticiones]
+"""
+
+import statistics
+import sys
+import time
+from datetime import date, timedelta
+
+from sqlalchemy import text
+from sqlalchemy.orm import Session
+
+from config import engine
+from infrastructure.bi_personal_repository import BIPersonalRepository
+
+ESQUEMA = "benchmark_asistencia"
+EMPLEADOS = 1000
+INICIO = date(2023, 1, 1)
+
+TABLAS = """
+    CREATE TABLE personal (
+        id_personal BIGINT PRIMARY KEY,
+        nombres TEXT NOT NULL,
+        apellidos TEXT NOT NULL,
+        cargo BIGINT NOT NULL,
+        departamento TEXT,
+        estado BOOLEAN DEFAULT TRUE
+    );
+    CREATE TABLE asistencia (
+        id_asistencia BIGINT PRIMARY KEY GENERATED ALWAYS AS IDENTITY,
+        id_personal BIGINT NOT NULL REFERENCES personal(id_personal),
+        fecha DATE NOT NULL,
+        hora_ingreso TIME,
+        hora_salida TIME,
+        observaciones TEXT,
+        estado TEXT DEFAULT 'PRESENTE',
+        fecha_actualizacion TIMESTAMP WITH TIME ZONE DEFAULT NOW()
+    );
+"""
+
+INDICES = """
+    CREATE INDEX idx_asistencia_personal ON asistencia(id_personal);
+    CREATE INDEX idx_asistencia_fecha ON asistencia(fecha);
+"""
+
+PERSONAL = """
+    INSERT INTO personal (id_personal, nombres, apellidos, cargo, departamento)
+    SELECT i, 'Nombre ' || i, 'Apellido ' || i, 1 + i % 8,
+           (ARRAY['Administración', 'Mantenimiento', 'Cocina', 'Seguridad', 'Deportes'])[1 + i % 5]
+    FROM generate_series(1, :empleados) AS i
+"""
+
+# Estados con las variantes que hay en la base real
+ASISTENCIA = """
+    INSERT INTO asistencia (id_personal, fecha, hora_ingreso, hora_salida, estado)
+    SELECT p, CAST(:inicio AS DATE) + d,
+           TIME '07:30' + random() * INTERVAL '90 minutes',
+           TIME '16:00' + random() * INTERVAL '3 hours',
+           (ARRAY['PRESENTE', 'presente', 'HORAS_EXTRAS', 'TARDANZA', 'RETRASO', 'AUSENTE', 'FALTANDO'])
+               [1 + floor(random() * 7)::INT]
+    FROM generate_series(0, :dias - 1) AS d, generate_series(1, :empleados) AS p
+"""
+
+# Consultas de BIPersonalRepository antes de asistencia_diaria
+ANTES = {
+    "métricas del mes": """
+        SELECT COUNT(*),
+               COUNT(CASE WHEN a.estado = 'presente' THEN 1 END),
+               COUNT(CASE WHEN a.estado = 'tardanza' THEN 1 END),
+               COUNT(CASE WHEN a.estado = 'ausente' THEN 1 END),
+               AVG(CASE WHEN a.hora_ingreso IS NOT NULL AND a.hora_salida IS NOT NULL
+                        THEN EXTRACT(EPOCH FROM (a.hora_salida::time - a.hora_ingreso::time))/3600 END)
+        FROM asistencia a
+        LEFT JOIN personal p ON a.id_personal = p.id_personal
+        WHERE a.fecha >= :fecha_inicio AND a.fecha < :fecha_fin AND p.departamento = :departamento
+    """,
+    "top empleados del mes": """
+        SELECT p.id_personal, CONCAT(p.nombres, ' ', p.apellidos), COUNT(*),
+               COUNT(CASE WHEN a.estado = 'tardanza' THEN 1 END),
+               COUNT(CASE WHEN a.estado = 'ausente' THEN 1 END),
+               AVG(CASE WHEN a.hora_ingreso IS NOT NULL AND a.hora_salida IS NOT NULL
+                        THEN EXTRACT(EPOCH FROM (a.hora_salida::time - a.hora_ingreso::time))/3600 END)
+        FROM asistencia a
+        LEFT JOIN personal p ON a.id_personal = p.id_personal
+        WHERE a.fecha >= :fecha_inicio AND a.fecha < :fecha_fin AND p.departamento = :departamento
+        GROUP BY p.id_personal, p.nombres, p.apellidos
+        ORDER BY 3 DESC, 4 ASC
+        LIMIT 10
+    """,
+    "asistencia por departamento": """
+        SELECT COALESCE(p.departamento, 'Sin departamento'), COUNT(DISTINCT p.id_personal), COUNT(*),
+               COUNT(CASE WHEN a.estado = 'presente' THEN 1 END),
+               COUNT(CASE WHEN a.estado = 'tardanza' THEN 1 END),
+               COUNT(CASE WHEN a.estado = 'ausente' THEN 1 END)
+        FROM asistencia a
+        LEFT JOIN personal p ON a.id_personal = p.id_personal
+        WHERE a.fecha >= :fecha_inicio AND a.fecha < :fecha_fin
+        GROUP BY p.departamento
+        ORDER BY 2 DESC
+    """,
+    "tendencias del año": """
+        SELECT EXTRACT(MONTH FROM a.fecha), COUNT(*),
+               COUNT(CASE WHEN UPPER(a.estado) IN ('PRESENTE', 'HORAS_EXTRAS') THEN 1 END),
+               COUNT(CASE WHEN UPPER(a.estado) IN ('TARDANZA', 'RETRASO') THEN 1 END),
+               COUNT(CASE WHEN UPPER(a.estado) IN ('FALTANDO', 'AUSENTE') THEN 1 END)
+        FROM asistencia a
+        LEFT JOIN personal p ON a.id_personal = p.id_personal
+        WHERE EXTRACT(YEAR FROM a.fecha) = :anio AND p.departamento = :departamento
+        GROUP BY EXTRACT(MONTH FROM a.fecha)
+        ORDER BY 1
+    """,
+}
+
+
+def medir(nombre, funcion, repeticiones):
+    tiempos = []
+    for i in range(repeticiones):
+        inicio = time.perf_counter()
+        funcion(i)
+        tiempos.append((time.perf_counter() - inicio) * 1000)
+    print(f"   {nombre:<44} media {statistics.mean(tiempos):8.2f} ms")
+    return statistics.mean(tiempos)
+
+
+def ejecutar_archivo(conexion, ruta):
+    with open(ruta, encoding="utf-8") as archivo:
+        conexion.exec_driver_sql(archivo.read())
+
+
+def main():
+    filas = int(sys.argv[1]) if len(sys.argv) > 1 else 1_000_000
+    repeticiones = int(sys.argv[2]) if len(sys.argv) > 2 else 5
+    dias = max(filas // EMPLEADOS, 1)
+    ultimo = INICIO + timedelta(days=dias - 1)
+    anio = ultimo.year - 1 if ultimo.month < 12 else ultimo.year
+    mes = (date(ultimo.year, ultimo.month, 1) - timedelta(days=1)).replace(day=1)
+    params = {
+        "fecha_inicio": mes, "fecha_fin": (mes + timedelta(days=32)).replace(day=1),
+        "departamento": "Cocina", "anio": anio,
+    }
+    print(f"📊 Dashboard de personal: {dias * EMPLEADOS:,} filas de asistencia "
+          f"({EMPLEADOS} empleados x {dias} días), {repeticiones} repeticiones\n")
+
+    conexion = engine.connect().execution_options(isolation_level="AUTOCOMMIT")
+    try:
+        conexion.exec_driver_sql(f"DROP SCHEMA IF EXISTS {ESQUEMA} CASCADE")
+        conexion.exec_driver_sql(f"CREATE SCHEMA {ESQUEMA}")
+        conexion.exec_driver_sql(f"SET search_path TO {ESQUEMA}")
+        conexion.exec_driver_sql(TABLAS)
+
+        inicio = time.perf_counter()
+        conexion.execute(text(PERSONAL), {"empleados": EMPLEADOS})
+        conexion.execute(text(ASISTENCIA), {"inicio": INICIO, "dias": dias, "empleados": EMPLEADOS})
+        conexion.exec_driver_sql(INDICES)
+        conexion.exec_driver_sql("ANALYZE")
+        print(f"   🔧 Datos generados en {time.perf_counter() - inicio:.1f} s\n")
+
+        print("   ⏱️  Antes (asistencia JOIN personal):")
+        t_antes = {nombre: medir(nombre, lambda _, sql=sql: conexion.execute(text(sql), params).fetchall(),
+                                 repeticiones)
+                   for nombre, sql in ANTES.items()}
+
+        inicio = time.perf_counter()
+        ejecutar_archivo(conexion, "create_asistencia_lote.sql")
+        ejecutar_archivo(conexion, "create_asistencia_diaria.sql")
+        conexion.exec_driver_sql("ANALYZE")
+        print(f"\n   🔧 Migraciones y carga inicial de asistencia_diaria en {time.perf_counter() - inicio:.1f} s\n")
+
+        db = Session(bind=conexion)
+        repository = BIPersonalRepository()
+        fi, ff, dep = params["fecha_inicio"], params["fecha_fin"], params["departamento"]
+        despues = {
+            "métricas del mes": lambda _: repository._get_metricas_asistencia(db, fi, ff, dep),
+            "top empleados del mes": lambda _: repository._get_top_empleados_asistencia(db, fi, ff, dep),
+            "asistencia por departamento": lambda _: repository._get_asistencia_por_departamento(db, fi, ff),
+            "tendencias del año": lambda _: repository._get_tendencias_mensuales(db, anio, dep),
+        }
+        print("   ⏱️  Después (asistencia_diaria):")
+        t_despues = {nombre: medir(nombre, funcion, repeticiones) for nombre, funcion in despues.items()}
+
+        print()
+        for nombre in ANTES:
+            print(f"   ✅ {nombre:<30} x{t_antes[nombre] / t_despues[nombre]:.1f}")
+
+        # Costo de escritura: registrar un día completo con y sin los triggers
+        nuevo_dia = ultimo + timedelta(days=1)
+        registrar_dia = text("""
+            INSERT INTO asistencia (id_personal, fecha, hora_ingreso, hora_salida)
+            SELECT p, CAST(:fecha AS DATE), TIME '08:00', TIME '17:00'
+            FROM generate_series(1, :empleados) AS p
+        """)
+        borrar_dia = text("DELETE FROM asistencia WHERE fecha = :fecha")
+
+        def escribir(i):
+            conexion.execute(registrar_dia, {"fecha": nuevo_dia, "empleados": EMPLEADOS})
+            conexion.execute(borrar_dia, {"fecha": nuevo_dia})
+
+        print(f"\n   ⏱️  Registrar y borrar un día ({EMPLEADOS} filas):")
+        t_con = medir("con triggers de asistencia_diaria", escribir, repeticiones)
+        conexion.exec_driver_sql("ALTER TABLE asistencia DISABLE TRIGGER USER")
+        t_sin = medir("sin triggers", escribir, repeticiones)
+        conexion.exec_driver_sql("ALTER TABLE asistencia ENABLE TRIGGER USER")
+        print(f"\n   💾 Sobrecosto de escritura: {t_con - t_sin:.1f} ms por día registrado")
+        db.close()
+    finally:
+        conexion.exec_driver_sql("SET search_path TO DEFAULT")
+        conexion.exec_driver_sql(f"DROP SCHEMA IF EXISTS {ESQUEMA} CASCADE")
+        conexion.close()
+
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,163 @@
+#!/usr/bin/env python3
+"""
+Benchmark de serialización de los listados /acciones/ y /socios/ con 10.000 filas.
+
+Compara el camino anterior (entidad -> modelo pydantic -> dict -> revalidación
+del response_model -> jsonable_encoder -> json) con el actual (payload
+construido una sola vez -> orjson). No usa la base de datos: las filas se
+generan en memoria con un repositorio de prueba.
+
+Uso: python benchmark_listados.py [filas]
+"""
+
+import json
+import sys
+import time
+from typing import List
+
+from fastapi.encoders import jsonable_encoder
+
+from domain.accion import Accion
+from domain.socio import Socio
+from infrastructure.accion_repository import AccionRepository
+from infrastructure.json_response import ORJSONResponse
+from infrastructure.row_mapper import como_dict
+from schemas.accion import AccionResponse, AccionResponseCompleta
+from schemas.socio import SocioResponse
+from use_cases.accion import AccionUseCase
+
+MODALIDAD = {
+    "id_modalidad_pago": 1,
+    "descripcion": "Pago único",
+    "meses_de_gracia": 0,
+    "porcentaje_renovacion_inicial": 0.0,
+    "porcentaje_renovacion_mensual": 0.0,
+    "costo_renovacion_estandar": 150.0,
+    "cantidad_cuotas": 1,
+}
+ESTADO_ACCION = {"id_estado_accion": 1, "nombre_estado_accion": "activa"}
+
+
+class AccionRepositoryEnMemoria(AccionRepository):
+    def __init__(self, filas: int):
+        self.acciones = [
+            Accion(
+                id_accion=i,
+                id_club=1,
+                id_socio=i % 500 + 1,
+                modalidad_pago=1,
+                estado_accion=1,
+                certificado_pdf=f"certificado_accion_{i}.pdf",
+                certificado_cifrado=False,
+                fecha_emision_certificado="2024-01-15 10:30:00",
+                tipo_accion="compra",
+                socio_titular=f"Socio {i}",
+                cantidad_acciones=1,
+                precio_unitario=1000.0,
+                total_pago=1000.0,
+                metodo_pago="transferencia",
+                fecha_venta="2024-01-15 10:30:00",
+            )
+            for i in range(1, filas + 1)
+        ]
+        self.pagos = {
+            accion.id_accion: [{"id_pago": accion.id_accion, "id_accion": accion.id_accion,
+                                "monto": 500.0, "fecha_pago": "2024-02-01", "estado_pago_id": 2}]
+            for accion in self.acciones
+        }
+
+    def list_acciones(self):
+        return self.acciones
+
+    def get_pagos(self, accion_id: int):
+        return self.pagos.get(accion_id, [])
+
+    def get_pagos_por_accion(self):
+        return self.pagos
+
+    def get_modalidad_pago(self, modalidad_id: int):
+        return dict(MODALIDAD)
+
+    def get_estado_accion(self, estado_accion_id: int):
+        return dict(ESTADO_ACCION)
+
+
+def listar_acciones_anterior(repo: AccionRepositoryEnMemoria) -> List[dict]:
+    """Réplica del camino anterior de AccionUseCase.list_acciones"""
+    resultado = []
+    for accion in repo.list_acciones():
+        modalidad = repo.get_modalidad_pago(accion.modalidad_pago)
+        estado_accion = repo.get_estado_accion(accion.estado_accion)
+        pagos = repo.get_pagos(accion.id_accion)
+        estado_pagos = repo.calcular_estado_pagos(accion, modalidad, pagos)
+        accion_response = AccionResponse(**como_dict(accion)).dict()
+        accion_response.update({
+            "estado_accion_info": {"id": estado_accion["id_estado_accion"], "nombre": estado_accion["nombre_estado_accion"]},
+            "estado_pagos": {clave: estado_pagos[clave] for clave in (
+                "estado_pago", "porcentaje_pagado", "saldo_pendiente", "pagos_restantes", "precio_inicial",
+                "costo_renovacion_mensual", "total_pagado", "pagos_realizados", "renovar")},
+            "modalidad_pago_info": {clave: modalidad[clave] for clave in (
+                "descripcion", "meses_de_gracia", "porcentaje_renovacion_inicial",
+                "porcentaje_renovacion_mensual", "costo_renovacion_estandar", "cantidad_cuotas")},
+        })
+        resultado.append(accion_response)
+    return resultado
+
+
+def medir(nombre: str, funcion, repeticiones: int = 3) -> float:
+    tiempos = []
+    for _ in range(repeticiones):
+        inicio = time.perf_counter()
+        cuerpo = funcion()
+        tiempos.append(time.perf_counter() - inicio)
+    mejor = min(tiempos)
+    print(f"   {nombre:<45} {mejor * 1000:9.1f} ms  ({len(cuerpo) / 1024:.0f} KB)")
+    return mejor
+
+
+def main():
+    filas = int(sys.argv[1]) if len(sys.argv) > 1 else 10000
+    print(f"📊 Benchmark de listados con {filas} filas\n")
+
+    repo = AccionRepositoryEnMemoria(filas)
+
+    def acciones_antes():
+        payload = listar_acciones_anterior(repo)
+        # FastAPI revalida contra response_model=List[AccionResponseCompleta]
+        validados = [AccionResponseCompleta(**item) for item in payload]
+        return json.dumps(jsonable_encoder(validados)).encode("utf-8")
+
+    def acciones_despues():
+        payload = AccionUseCase(repo).list_acciones()
+        return ORJSONResponse(content=payload).body
+
+    socios = [
+        Socio(id_socio=i, id_club=1, nombres=f"Nombre {i}", apellidos=f"Apellido {i}",
+              ci_nit=str(1000000 + i), telefono="70000000", correo_electronico=f"socio{i}@ceas.bo",
+              direccion="Av. Siempre Viva 123", estado=2, fecha_de_registro="2024-01-15",
+              tipo_membresia="accionista", id_usuario=i)
+        for i in range(1, filas + 1)
+    ]
+
+    def socios_antes():
+        modelos = [SocioResponse(**como_dict(socio)) for socio in socios]
+        validados = [SocioResponse(**modelo.dict()) for modelo in modelos]
+        return json.dumps(jsonable_encoder(validados)).encode("utf-8")
+
+    def socios_despues():
+        modelos = [SocioResponse(**como_dict(socio)) for socio in socios]
+        return ORJSONResponse(content=[modelo.dict() for modelo in modelos]).body
+
+    print("🔹 /acciones/")
+    antes = medir("antes (doble conversión + json)", acciones_antes)
+    despues = medir("después (payload único + orjson)", acciones_despues)
+    print(f"   ✅ Mejora: x{antes / despues:.1f}\n")
+
+    print("🔹 /socios/")
+    antes = medir("antes (revalidación + json)", socios_antes)
+    despues = medir("después (validación única + orjson)", socios_despues)
+    print(f"   ✅ Mejora: x{antes / despues:.1f}")
+
+
+if __name__ == "__main__":
+    main()
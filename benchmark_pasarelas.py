@@ -0,0 +1,159 @@
+#!/usr/bin/env python3
+"""
+Benchmark de latencia por llamada a las pasarelas de pago contra un servidor
+simulado local (no sale a internet).
+
+El servidor simulado imita los endpoints usados de PayPal (token OAuth y
+consulta de pago) y de MercadoPago (consulta de pago). Para que el costo de
+abrir conexiones sea comparable al real (TCP + TLS contra un host remoto),
+cada conexión nueva espera LATENCIA_CONEXION_MS y cada emisión de token
+LATENCIA_TOKEN_MS.
+
+Compara:
+  - antes: cliente construido en cada petición (sesión nueva, token PayPal nuevo)
+  - después: clientes compartidos de infrastructure/*_service.py (keep-alive,
+    token en caché)
+y mide cuánto tarda en fallar una llamada con la pasarela caída, antes y
+después de abrirse el circuit breaker.
+
+Uso: python benchmark_pasarelas.py [llamadas]
+"""
+
+import json
+import socket
+import statistics
+import sys
+import threading
+import time
+from http.server import BaseHTTPRequestHandler, ThreadingHTTPServer
+
+import paypalrestsdk
+from mercadopago.http import HttpClient
+
+from infrastructure.clientes_http import CircuitBreaker, CircuitoAbierto, ErrorPasarela
+from infrastructure.mercadopago_service import HttpClientPersistente
+from infrastructure.paypal_service import ApiPayPal
+
+LATENCIA_CONEXION_MS = 20
+LATENCIA_TOKEN_MS = 40
+
+
+class PasarelaSimulada(BaseHTTPRequestHandler):
+    protocol_version = "HTTP/1.1"  # keep-alive
+    disable_nagle_algorithm = True  # como un servidor real; evita esperas de ACK retrasado
+
+    def setup(self):
+        time.sleep(LATENCIA_CONEXION_MS / 1000)  # handshake de una conexión nueva
+        super().setup()
+
+    def log_message(self, *args):
+        pass
+
+    def _responder(self, cuerpo: dict, estado: int = 200):
+        datos = json.dumps(cuerpo).encode("utf-8")
+        self.send_response(estado)
+        self.send_header("Content-Type", "application/json")
+        self.send_header("Content-Length", str(len(datos)))
+        self.end_headers()
+        self.wfile.write(datos)
+
+    def do_POST(self):
+        self.rfile.read(int(self.headers.get("Content-Length", 0)))
+        if self.path.startswith("/v1/oauth2/token"):
+            time.sleep(LATENCIA_TOKEN_MS / 1000)
+            self._responder({"access_token": "token-simulado", "token_type": "Bearer", "expires_in": 32400})
+        else:
+            self._responder({"error": "no encontrado"}, 404)
+
+    def do_GET(self):
+        self.rfile.read(int(self.headers.get("Content-Length", 0)))  # el SDK de PayPal envía cuerpo en GET
+        if self.path.startswith("/v1/payments/payment/"):
+            self._responder({"id": self.path.rsplit("/", 1)[-1], "state": "approved", "intent": "sale",
+                             "transactions": [{"amount": {"total": "100.00", "currency": "USD"}, "custom": "TEMP_1"}]})
+        elif self.path.startswith("/v1/payments/"):
+            self._responder({"id": int(self.path.rsplit("/", 1)[-1]), "status": "approved",
+                             "transaction_amount": 100.0, "currency_id": "BOB"})
+        else:
+            self._responder({"error": "no encontrado"}, 404)
+
+
+def iniciar_servidor():
+    servidor = ThreadingHTTPServer(("127.0.0.1", 0), PasarelaSimulada)
+    threading.Thread(target=servidor.serve_forever, daemon=True).start()
+    return servidor, f"http://127.0.0.1:{servidor.server_address[1]}"
+
+
+def medir(nombre, funcion, llamadas):
+    tiempos = []
+    for i in range(llamadas):
+        inicio = time.perf_counter()
+        funcion(i)
+        tiempos.append((time.perf_counter() - inicio) * 1000)
+    tiempos.sort()
+    p95 = tiempos[int(len(tiempos) * 0.95) - 1]
+    print(f"   {nombre:<42} media {statistics.mean(tiempos):7.2f} ms   p95 {p95:7.2f} ms")
+    return statistics.mean(tiempos)
+
+
+def comparar(titulo, antes, despues, llamadas):
+    print(f"🔹 {titulo}")
+    t_antes = medir("antes (cliente por petición)", antes, llamadas)
+    t_despues = medir("después (cliente compartido)", despues, llamadas)
+    print(f"   ✅ Mejora: x{t_antes / t_despues:.1f}\n")
+
+
+def main():
+    llamadas = int(sys.argv[1]) if len(sys.argv) > 1 else 200
+    servidor, base = iniciar_servidor()
+    print(f"📊 Latencia por llamada a pasarelas ({llamadas} llamadas, servidor simulado en {base})\n")
+
+    credenciales = {"mode": "sandbox", "endpoint": base, "client_id": "id", "client_secret": "secreto"}
+
+    def paypal_antes(i):
+        api = paypalrestsdk.Api(**credenciales)
+        paypalrestsdk.Payment.find(f"PAY-{i}", api=api)
+
+    api_compartida = ApiPayPal(**credenciales)
+
+    def paypal_despues(i):
+        paypalrestsdk.Payment.find(f"PAY-{i}", api=api_compartida)
+
+    comparar("PayPal: consultar pago", paypal_antes, paypal_despues, llamadas)
+
+    cliente_compartido = HttpClientPersistente()
+
+    def mercadopago_antes(i):
+        HttpClient().get(url=f"{base}/v1/payments/{i}", headers={}, timeout=20.0)
+
+    def mercadopago_despues(i):
+        cliente_compartido.get(url=f"{base}/v1/payments/{i}", headers={}, timeout=20.0)
+
+    comparar("MercadoPago: consultar pago", mercadopago_antes, mercadopago_despues, llamadas)
+
+    # Pasarela caída: puerto sin servidor escuchando
+    with socket.socket() as s:
+        s.bind(("127.0.0.1", 0))
+        puerto_caido = s.getsockname()[1]
+    circuito = CircuitBreaker("simulada", umbral_fallos=5, segundos_abierto=60, errores=(ErrorPasarela,))
+    sesion = cliente_compartido.sesion
+
+    def llamada_caida():
+        try:
+            sesion.get(f"http://127.0.0.1:{puerto_caido}/v1/payments/1", timeout=(3.05, 20))
+        except Exception as e:
+            raise ErrorPasarela(str(e))
+
+    print("🔹 Pasarela caída (circuit breaker)")
+    for intento in range(1, 8):
+        inicio = time.perf_counter()
+        try:
+            circuito.llamar(llamada_caida)
+        except (ErrorPasarela, CircuitoAbierto) as e:
+            resultado = type(e).__name__
+        print(f"   llamada {intento}: {resultado:<16} {(time.perf_counter() - inicio) * 1000:8.3f} ms  (circuito {circuito.estado})")
+
+    servidor.shutdown()
+
+
+if __name__ == "__main__":
+    main()
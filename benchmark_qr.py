@@ -0,0 +1,81 @@
+#!/usr/bin/env python3
+"""
+Benchmark de generación de códigos QR de pago.
+
+Compara:
+  - antes: qrcode.make + guardar PNG en qr_codes/ en cada petición (y copiarlo
+    con otro nombre, como hacía generar_qr_pago_sin_crear_accion)
+  - después: motor con caché (infrastructure/qr_engine.py), primer render
+    (una sola escritura a disco) y peticiones repetidas servidas desde la caché LRU
+
+Uso: python benchmark_qr.py [repeticiones]
+"""
+
+import json
+import os
+import shutil
+import statistics
+import sys
+import tempfile
+import time
+
+import qrcode
+
+from infrastructure.qr_engine import MotorQR
+
+
+def datos_pago(i: int) -> str:
+    return json.dumps({
+        "banco": "Banco Nacional de Bolivia",
+        "cuenta": "1234567890",
+        "titular": "Club CEAS",
+        "monto": 5000.0,
+        "concepto": f"Compra de 100 acciones - TEMP_{i:08X}",
+        "referencia": f"TEMP_{i:08X}",
+        "fecha_limite": "2025-01-01",
+    }, ensure_ascii=False)
+
+
+def medir(nombre, funcion, repeticiones):
+    tiempos = []
+    for i in range(repeticiones):
+        inicio = time.perf_counter()
+        funcion(i)
+        tiempos.append((time.perf_counter() - inicio) * 1000)
+    print(f"   {nombre:<44} media {statistics.mean(tiempos):7.2f} ms")
+    return statistics.mean(tiempos)
+
+
+def main():
+    repeticiones = int(sys.argv[1]) if len(sys.argv) > 1 else 100
+    directorio = tempfile.mkdtemp(prefix="benchmark_qr_")
+    print(f"📊 Generación de QR de pago ({repeticiones} repeticiones)\n")
+
+    try:
+        def antes(i):
+            ruta = os.path.join(directorio, f"transferencia_{i}.png")
+            qrcode.make(datos_pago(i)).save(ruta)
+            shutil.copy2(ruta, os.path.join(directorio, f"temp_{i}.png"))
+            with open(ruta, "rb") as archivo:  # el endpoint lo lee de disco al servirlo
+                archivo.read()
+
+        motor = MotorQR(directorio=directorio)
+
+        def despues_nuevo(i):
+            motor.obtener(motor.generar(datos_pago(i)))
+
+        def despues_repetido(i):
+            motor.obtener(motor.generar(datos_pago(i % 10)))
+
+        t_antes = medir("antes (PNG a disco + copia)", antes, repeticiones)
+        t_nuevo = medir("después: QR nuevo (render + una escritura)", despues_nuevo, repeticiones)
+        t_repetido = medir("después: mismo payload (caché LRU)", despues_repetido, repeticiones)
+        print(f"\n   ✅ QR nuevo: x{t_antes / t_nuevo:.1f}   QR repetido: x{t_antes / t_repetido:.0f}")
+        print(f"   📦 Caché: {motor.estadisticas()}")
+        print(f"   💾 Archivos escritos por el motor: {len([f for f in os.listdir(directorio) if len(f) == 36])}")
+    finally:
+        shutil.rmtree(directorio, ignore_errors=True)
+
+
+if __name__ == "__main__":
+    main()
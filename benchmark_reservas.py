@@ -0,0 +1,184 @@
+#!/usr/bin/env python3
+"""
+Prueba de carga de reservas de eventos con cupos (create_reservas_cupos.sql).
+
+1. 500 socios reservan a la vez el mismo evento (capacidad 100), más algunas
+   reservas repetidas del mismo socio.
+2. Mientras otros 100 socios reservan, se cancelan 50 reservas confirmadas
+   (liberan cupos que pasan a la lista de espera).
+
+Después de cada fase verifica que no haya sobreventa: confirmadas = contador
+ocupados <= capacidad, nadie en espera si quedan cupos y una sola reserva
+activa por socio. Sale con código 1 si alguna verificación falla.
+
+Necesita la base de datos de config.py. Trabaja en un esquema temporal
+(benchmark_reservas) que se elimina al terminar; no toca las tablas reales.
+
+Uso: python benchmark_reservas.py [peticiones] [capacidad] [conexiones]
+"""
+
+import random
+import statistics
+import sys
+import threading
+import time
+from collections import Counter
+from concurrent.futures import ThreadPoolExecutor
+
+from sqlalchemy import create_engine, text
+from sqlalchemy.orm import sessionmaker
+
+from config import DATABASE_URL, engine
+from infrastructure.reserva_repository import cancelar_reserva, reservar_cupo
+
+ESQUEMA = "benchmark_reservas"
+
+TABLAS = """
+    CREATE TABLE eventos (
+        id_evento BIGINT PRIMARY KEY GENERATED ALWAYS AS IDENTITY,
+        nombre_evento TEXT NOT NULL,
+        capacidad_maxima INT
+    );
+    CREATE TABLE reservas (
+        id_reserva BIGINT PRIMARY KEY GENERATED ALWAYS AS IDENTITY,
+        id_socio BIGINT NOT NULL,
+        id_evento BIGINT NOT NULL REFERENCES eventos(id_evento),
+        fecha_de_reserva TIMESTAMP WITH TIME ZONE DEFAULT NOW(),
+        estado TEXT NOT NULL DEFAULT 'confirmada',
+        observaciones TEXT,
+        fecha_actualizacion TIMESTAMP WITH TIME ZONE DEFAULT NOW()
+    );
+"""
+
+
+def en_paralelo(tareas):
+    """Ejecuta las tareas a la vez (todas esperan en una barrera) y devuelve (resultado, ms) de cada una"""
+    barrera = threading.Barrier(len(tareas))
+
+    def ejecutar(tarea):
+        barrera.wait()
+        inicio = time.perf_counter()
+        resultado = tarea()
+        return resultado, (time.perf_counter() - inicio) * 1000
+
+    with ThreadPoolExecutor(max_workers=len(tareas)) as executor:
+        return list(executor.map(ejecutar, tareas))
+
+
+def verificar(conexion, id_evento, capacidad) -> bool:
+    confirmadas, en_espera, ocupados, duplicados = conexion.execute(text("""
+        SELECT
+            (SELECT count(*) FROM reservas WHERE id_evento = :id_evento AND estado = 'confirmada'),
+            (SELECT count(*) FROM reservas WHERE id_evento = :id_evento AND estado = 'en_espera'),
+            (SELECT ocupados FROM evento_cupos WHERE id_evento = :id_evento),
+            (SELECT count(*) FROM (
+                SELECT id_socio FROM reservas
+                WHERE id_evento = :id_evento AND estado IN ('confirmada', 'en_espera')
+                GROUP BY id_socio HAVING count(*) > 1
+            ) d)
+    """), {"id_evento": id_evento}).fetchone()
+    print(f"   📋 confirmadas {confirmadas}, en espera {en_espera}, contador {ocupados}, capacidad {capacidad}")
+
+    errores = []
+    if confirmadas > capacidad:
+        errores.append(f"sobreventa: {confirmadas} confirmadas para {capacidad} cupos")
+    if confirmadas != ocupados:
+        errores.append(f"el contador ({ocupados}) no coincide con las confirmadas ({confirmadas})")
+    if confirmadas < capacidad and en_espera > 0:
+        errores.append(f"{en_espera} en espera con {capacidad - confirmadas} cupos libres")
+    if duplicados:
+        errores.append(f"{duplicados} socios con más de una reserva activa")
+    for error in errores:
+        print(f"   ❌ {error}")
+    if not errores:
+        print("   ✅ Sin sobreventa y contador consistente")
+    return not errores
+
+
+def resumen(nombre, resultados):
+    tiempos = sorted(ms for _, ms in resultados)
+    conteo = Counter(r["resultado"] if isinstance(r, dict) else r for r, _ in resultados)
+    p95 = tiempos[int(len(tiempos) * 0.95) - 1]
+    print(f"   {nombre:<28} {dict(conteo)}")
+    print(f"   {'':<28} mediana {statistics.median(tiempos):.1f} ms, p95 {p95:.1f} ms, máx {tiempos[-1]:.1f} ms")
+
+
+def main():
+    peticiones = int(sys.argv[1]) if len(sys.argv) > 1 else 500
+    capacidad = int(sys.argv[2]) if len(sys.argv) > 2 else 100
+    conexiones = int(sys.argv[3]) if len(sys.argv) > 3 else 50
+    print(f"📊 Reservas concurrentes: {peticiones} socios, capacidad {capacidad}, {conexiones} conexiones\n")
+
+    with engine.connect().execution_options(isolation_level="AUTOCOMMIT") as conexion:
+        conexion.exec_driver_sql(f"DROP SCHEMA IF EXISTS {ESQUEMA} CASCADE")
+        conexion.exec_driver_sql(f"CREATE SCHEMA {ESQUEMA}")
+
+    motor = create_engine(DATABASE_URL, pool_size=conexiones, max_overflow=0, pool_timeout=120,
+                          connect_args={"options": f"-c search_path={ESQUEMA}"})
+    Sesion = sessionmaker(bind=motor, autocommit=False, autoflush=False)
+    correcto = True
+    try:
+        with motor.connect().execution_options(isolation_level="AUTOCOMMIT") as conexion:
+            conexion.exec_driver_sql(TABLAS)
+            with open("create_reservas_cupos.sql", encoding="utf-8") as archivo:
+                conexion.exec_driver_sql(archivo.read())
+            id_evento = conexion.execute(text("""
+                INSERT INTO eventos (nombre_evento, capacidad_maxima) VALUES ('Evento de prueba', :capacidad)
+                RETURNING id_evento
+            """), {"capacidad": capacidad}).scalar()
+
+        def reservar(id_socio):
+            def tarea():
+                db = Sesion()
+                try:
+                    return reservar_cupo(db, id_socio, id_evento)
+                finally:
+                    db.close()
+            return tarea
+
+        def cancelar(id_reserva):
+            def tarea():
+                db = Sesion()
+                try:
+                    cancelar_reserva(db, id_reserva)
+                    return "cancelada"
+                finally:
+                    db.close()
+            return tarea
+
+        # Fase 1: apertura del evento, con un 5 % de reservas repetidas
+        socios = list(range(1, peticiones + 1))
+        tareas = [reservar(s) for s in socios + random.sample(socios, max(peticiones // 20, 1))]
+        random.shuffle(tareas)
+        inicio = time.perf_counter()
+        resultados = en_paralelo(tareas)
+        total = time.perf_counter() - inicio
+        print(f"   ⏱️  Fase 1: {len(tareas)} peticiones en {total:.2f} s ({len(tareas) / total:.0f}/s)")
+        resumen("reservas", resultados)
+        with motor.connect() as conexion:
+            correcto &= verificar(conexion, id_evento, capacidad)
+
+        # Fase 2: cancelaciones concurrentes con nuevas reservas
+        confirmadas = [r["reserva"].id_reserva for r, _ in resultados
+                       if isinstance(r, dict) and r["resultado"] == "confirmada"]
+        a_cancelar = random.sample(confirmadas, min(50, len(confirmadas)))
+        nuevos = range(peticiones + 1, peticiones + 101)
+        tareas = [cancelar(i) for i in a_cancelar] + [reservar(s) for s in nuevos]
+        random.shuffle(tareas)
+        inicio = time.perf_counter()
+        resultados = en_paralelo(tareas)
+        total = time.perf_counter() - inicio
+        print(f"\n   ⏱️  Fase 2: {len(tareas)} peticiones en {total:.2f} s")
+        resumen("cancelaciones y reservas", resultados)
+        with motor.connect() as conexion:
+            correcto &= verificar(conexion, id_evento, capacidad)
+    finally:
+        motor.dispose()
+        with engine.connect().execution_options(isolation_level="AUTOCOMMIT") as conexion:
+            conexion.exec_driver_sql(f"DROP SCHEMA IF EXISTS {ESQUEMA} CASCADE")
+
+    sys.exit(0 if correcto else 1)
+
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,153 @@
+#!/usr/bin/env python3
+"""
+Microbenchmark del mapeo de filas a entidades de dominio con 100.000 filas.
+
+Compara el mapeo anterior (conversión columna por columna escrita a mano sobre
+una dataclass con __dict__) con el actual (función generada por
+infrastructure/row_mapper.py sobre la dataclass con slots). Mide tiempo de
+mapeo y memoria retenida por la lista resultante. No usa la base de datos.
+
+Uso: python benchmark_row_mapper.py [filas]
+"""
+
+import gc
+import sys
+import time
+import tracemalloc
+from dataclasses import MISSING, field, fields, make_dataclass
+from datetime import date, datetime
+from decimal import Decimal
+
+from domain.accion import Accion
+from domain.finanza import MovimientoFinanciero
+from infrastructure.row_mapper import crear_mapper, DIRECTO, TEXTO, FLOAT, DECIMAL
+
+
+def sin_slots(clase):
+    """Réplica de la entidad como dataclass normal (con __dict__ por instancia)"""
+    campos = []
+    for campo in fields(clase):
+        if campo.default is MISSING:
+            campos.append((campo.name, campo.type))
+        else:
+            campos.append((campo.name, campo.type, field(default=campo.default)))
+    return make_dataclass(f"{clase.__name__}SinSlots", campos)
+
+
+AccionSinSlots = sin_slots(Accion)
+MovimientoSinSlots = sin_slots(MovimientoFinanciero)
+
+
+def mapear_accion_anterior(row):
+    return AccionSinSlots(
+        id_accion=row[0],
+        id_club=row[1],
+        id_socio=row[2],
+        modalidad_pago=row[3],
+        estado_accion=row[4],
+        certificado_pdf=row[5],
+        certificado_cifrado=row[6],
+        fecha_emision_certificado=str(row[7]) if row[7] else None,
+        tipo_accion=row[8],
+        cantidad_acciones=row[9] if row[9] else 1,
+        precio_unitario=float(row[10]) if row[10] else 0.00,
+        total_pago=float(row[11]) if row[11] else 0.00,
+        metodo_pago=row[12] if row[12] else "efectivo",
+        qr_data=row[13],
+        fecha_venta=str(row[14]) if row[14] else None,
+        comprobante_path=row[15],
+        fecha_comprobante=str(row[16]) if row[16] else None
+    )
+
+
+def mapear_movimiento_anterior(row):
+    monto = float(row[4]) if row[4] else 0.0
+    fecha = str(row[5]) if row[5] else None
+    movimiento = MovimientoSinSlots(
+        id_movimiento=row[0],
+        id_club=row[1],
+        tipo_movimiento=row[2],
+        descripcion=row[3],
+        monto=Decimal(str(monto)),
+        fecha=fecha,
+        estado=row[6],
+        referencia_relacionada=row[7],
+        metodo_pago=row[8]
+    )
+    movimiento.nombre_club = row[9]
+    movimiento.categoria = row[10]
+    movimiento.numero_comprobante = row[11]
+    return movimiento
+
+
+mapear_accion = crear_mapper(Accion, [
+    ("id_accion", DIRECTO), ("id_club", DIRECTO), ("id_socio", DIRECTO),
+    ("modalidad_pago", DIRECTO), ("estado_accion", DIRECTO), ("certificado_pdf", DIRECTO),
+    ("certificado_cifrado", DIRECTO), ("fecha_emision_certificado", TEXTO), ("tipo_accion", DIRECTO),
+    ("cantidad_acciones", "{v} if {v} else 1"), ("precio_unitario", FLOAT), ("total_pago", FLOAT),
+    ("metodo_pago", "{v} if {v} else 'efectivo'"), ("qr_data", DIRECTO), ("fecha_venta", TEXTO),
+    ("comprobante_path", DIRECTO), ("fecha_comprobante", TEXTO),
+])
+
+mapear_movimiento = crear_mapper(MovimientoFinanciero, [
+    ("id_movimiento", DIRECTO), ("id_club", DIRECTO), ("tipo_movimiento", DIRECTO),
+    ("descripcion", DIRECTO), ("monto", DECIMAL), ("fecha", TEXTO), ("estado", DIRECTO),
+    ("referencia_relacionada", DIRECTO), ("metodo_pago", DIRECTO), ("nombre_club", DIRECTO),
+    ("categoria", DIRECTO), ("numero_comprobante", DIRECTO),
+])
+
+
+def filas_acciones(n):
+    fecha = datetime(2024, 1, 15, 10, 30)
+    return [
+        (i, 1, i % 500 + 1, 1, 1, f"certificado_accion_{i}.pdf", False, fecha, "compra",
+         1, Decimal("1000.00"), Decimal("1000.00"), "transferencia", None, fecha, None, None)
+        for i in range(1, n + 1)
+    ]
+
+
+def filas_movimientos(n):
+    fecha = date(2024, 1, 15)
+    return [
+        (i, 1, "ingreso", f"Cuota mensual {i}", Decimal("150.50"), fecha, "confirmado",
+         f"Socio ID: {i % 500 + 1}", "transferencia", "Club CEAS", "Cuotas", f"MF-{i}-20240115")
+        for i in range(1, n + 1)
+    ]
+
+
+def medir(nombre, mapper, filas):
+    # Tiempo (sin tracemalloc, que distorsiona las mediciones)
+    gc.collect()
+    inicio = time.perf_counter()
+    entidades = [mapper(row) for row in filas]
+    duracion = time.perf_counter() - inicio
+    del entidades
+
+    # Memoria retenida por la lista de entidades
+    gc.collect()
+    tracemalloc.start()
+    entidades = [mapper(row) for row in filas]
+    memoria, _ = tracemalloc.get_traced_memory()
+    tracemalloc.stop()
+    del entidades
+
+    print(f"   {nombre:<28} {duracion * 1000:8.1f} ms   {memoria / 1024 / 1024:7.1f} MB")
+    return duracion, memoria
+
+
+def comparar(titulo, filas, anterior, actual):
+    print(f"🔹 {titulo}")
+    t_antes, m_antes = medir("antes (__dict__, a mano)", anterior, filas)
+    t_despues, m_despues = medir("después (slots, generado)", actual, filas)
+    print(f"   ✅ Tiempo x{t_antes / t_despues:.2f}   Memoria -{(1 - m_despues / m_antes) * 100:.0f}%\n")
+
+
+def main():
+    n = int(sys.argv[1]) if len(sys.argv) > 1 else 100000
+    print(f"📊 Mapeo de {n} filas a entidades de dominio\n")
+    comparar("Accion", filas_acciones(n), mapear_accion_anterior, mapear_accion)
+    comparar("MovimientoFinanciero", filas_movimientos(n), mapear_movimiento_anterior, mapear_movimiento)
+
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,44 @@
+#!/usr/bin/env python3
+"""
+Ejecuta una conciliación de pagos pendientes con las pasarelas e imprime el reporte.
+
+Alternativa al job programado de la API (CONCILIACION_INTERVALO_MINUTOS = 0),
+por ejemplo desde cron:
+    */15 * * * * cd /ruta/al/backend && python conciliar_pagos.py
+"""
+
+import json
+import logging
+import sys
+
+from infrastructure.conciliacion_repository import ConciliacionRepository
+from infrastructure.pago_repository import PagoRepository
+from infrastructure.webhook_repository import WebhookRepository
+from use_cases.conciliacion import ConciliacionUseCase
+
+
+def main():
+    logging.basicConfig(level=logging.INFO)
+    reporte = ConciliacionUseCase(ConciliacionRepository(), PagoRepository(), WebhookRepository()).ejecutar()
+
+    if reporte.get("estado") == "omitido":
+        print(f"⏭️ {reporte['motivo']}")
+        return
+
+    resumen = reporte["resumen"]
+    print(f"📊 Conciliación #{reporte['id_reporte']} ({resumen['duracion_segundos']}s, "
+          f"{resumen['consultas_pasarela']} consultas a pasarelas)")
+    for origen in ("pagos_temporales", "pagos_accion"):
+        print(f"🔹 {origen}: " + ", ".join(f"{clave} {valor}" for clave, valor in resumen[origen].items()))
+    for entrada in reporte["detalle"]:
+        print("   " + json.dumps(entrada, ensure_ascii=False, default=str))
+
+    errores = resumen["pagos_temporales"]["errores"] + resumen["pagos_accion"]["errores"]
+    if errores:
+        print(f"⚠️ {errores} pagos no se pudieron conciliar")
+        sys.exit(1)
+    print("✅ Conciliación completada")
+
+
+if __name__ == "__main__":
+    main()
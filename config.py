@@ -32,3 +32,91 @@ MERCADOPAGO_PUBLIC_KEY = "TEST-TU_PUBLIC_KEY_AQUI"  # Cambiar por tu public key
 STRIPE_SECRET_KEY = "sk_test_51234567890abcdefghijklmnopqrstuvwxyz"  # Cambiar por tu clave real
 STRIPE_PUBLISHABLE_KEY = "pk_test_51234567890abcdefghijklmnopqrstuvwxyz"  # Cambiar por tu clave real
 STRIPE_WEBHOOK_SECRET = "whsec_1234567890abcdefghijklmnopqrstuvwxyz"  # Cambiar por tu webhook secret
+
+# Arranque: si es True, las dependencias pesadas (reportes PDF, pasarelas de pago)
+# se importan en segundo plano al iniciar en lugar de en su primer uso
+PRECARGAR_DEPENDENCIAS = False
+
+# Webhooks de pasarelas: se encolan en webhook_inbox y los procesa un pool de workers
+WEBHOOK_HILOS = 2  # Workers que procesan la bandeja en cada proceso de la API
+WEBHOOK_MAX_INTENTOS = 8  # Después de esto el evento queda en estado 'error'
+WEBHOOK_BACKOFF_SEGUNDOS = 30  # Espera antes del primer reintento (se duplica en cada intento)
+WEBHOOK_BACKOFF_MAXIMO_SEGUNDOS = 3600
+
+# Clientes HTTP de pasarelas de pago (sesiones keep-alive compartidas)
+PASARELA_TIMEOUT_CONEXION = 3.05  # segundos para establecer la conexión
+PASARELA_TIMEOUT_LECTURA = 20  # segundos esperando la respuesta
+PASARELA_POOL_CONEXIONES = 10  # conexiones reutilizables por pasarela
+CIRCUITO_UMBRAL_FALLOS = 5  # fallos seguidos que abren el circuito de una pasarela
+CIRCUITO_SEGUNDOS_ABIERTO = 30  # tiempo sin llamar a la pasarela antes de volver a probar
+PAYPAL_TOKEN_MARGEN_SEGUNDOS = 60  # el token OAuth se renueva este tiempo antes de expirar
+
+# Conciliación programada de pagos pendientes con las pasarelas
+CONCILIACION_INTERVALO_MINUTOS = 15  # 0 desactiva el job programado dentro de la API
+CONCILIACION_CONCURRENCIA = 4  # consultas simultáneas como máximo a las pasarelas
+CONCILIACION_TAMANO_PAGINA = 100  # pagos revisados por lote (y por transacción)
+
+# Códigos QR de pago: se renderizan en memoria y se sirven desde /acciones/qr/{id}
+QR_CACHE_MAX_ENTRADAS = 512  # imágenes en la caché LRU de cada proceso
+QR_CACHE_MAX_BYTES = 16 * 1024 * 1024
+QR_CACHE_SEGUNDOS = 86400  # max-age de las imágenes (su id depende del contenido: son inmutables)
+
+# Descarga de archivos protegidos (certificados, comprobantes)
+ARCHIVOS_X_ACCEL_REDIRECT = False  # True si nginx envía los archivos (location interna, ver servir_archivos.py)
+ARCHIVOS_X_ACCEL_PREFIJO = "/_archivos_protegidos/"
+ARCHIVOS_TAMANO_BLOQUE = 256 * 1024  # bytes por envío cuando la API envía el archivo
+ACCESO_ARCHIVOS_TTL_SEGUNDOS = 60  # vida máxima de una decisión de acceso cacheada
+
+# Variantes cifradas de certificados para usuarios no propietarios (generadas en segundo plano)
+CERTIFICADOS_VARIANTES_HILOS = 1
+CERTIFICADOS_VARIANTES_MAXIMO = 1000  # al superarlo se borran las de acceso más antiguo
+
+# Comprobantes de pago (infrastructure/comprobantes.py, create_comprobantes.sql)
+COMPROBANTES_TAMANO_MAXIMO_MB = 15  # se corta la subida al superarlo (413)
+COMPROBANTES_HILOS = 1  # hilos que reducen y convierten las imágenes en segundo plano
+COMPROBANTES_LADO_MAXIMO = 2000  # px del lado mayor de las imágenes guardadas
+COMPROBANTES_CALIDAD_WEBP = 80
+
+# Auditoría (logs_sistema): cola en memoria escrita en lotes por un hilo
+AUDITORIA_LOTE = 500  # registros por INSERT
+AUDITORIA_INTERVALO_MS = 500  # espera máxima antes de escribir un lote incompleto
+AUDITORIA_COLA_MAXIMA = 10000
+AUDITORIA_ESPERA_MS = 50  # con la cola llena, tiempo que espera registrar() antes de descartar
+AUDITORIA_AUTOMATICA = True  # el middleware audita POST/PUT/PATCH/DELETE autenticados
+AUDITORIA_PROXIES_CONFIABLES = []  # IPs o redes (p. ej. "10.0.0.0/8") cuyo X-Forwarded-For se acepta
+
+# logs_sistema particionada por mes (ver create_logs_particionado.sql)
+LOGS_RETENCION_MESES = 12  # meses que quedan en la base; los anteriores se archivan (0 = no archivar)
+LOGS_MESES_ADELANTE = 3  # particiones futuras que se mantienen creadas
+LOGS_DIRECTORIO_ARCHIVO = "archivo_logs"  # destino de las particiones exportadas (.csv.gz)
+LOGS_MANTENIMIENTO_HORAS = 24  # 0 desactiva el job programado dentro de la API
+LOGS_DIAS_POR_DEFECTO = 7  # rango de GET /logs cuando no se indica 'desde'
+
+# Métricas de peticiones y SQL (Server-Timing y GET /metrics en formato Prometheus)
+METRICAS_CONSULTA_LENTA_MS = 200  # sentencias SQL más lentas que esto se cuentan (y se muestrean al log)
+METRICAS_PETICION_LENTA_MS = 1000  # peticiones más lentas que esto se muestrean al log
+METRICAS_MUESTREO_LENTAS = 1.0  # fracción de consultas/peticiones lentas que se escriben al log (0 = ninguna)
+METRICAS_TOKEN = None  # si se define, GET /metrics exige "Authorization: Bearer <token>"
+
+# ETL incremental de las tablas consolidadas de BI (create_bi_tables.py, etl_bi.py)
+BI_ETL_INTERVALO_MINUTOS = 5  # 0 desactiva el job programado dentro de la API
+BI_ETL_COMPLETA_CADA_HORAS = 24  # recálculo completo: antigüedades, borrados y cambios en club/cargos
+BI_ETL_SOLAPE_SEGUNDOS = 300  # la marca de agua se relee con este margen (transacciones largas)
+BI_ETL_FRESCURA_MINUTOS = 15  # los repositorios BI leen las tablas consolidadas solo si están al día (0 = nunca)
+BI_ETL_HISTORIAL_DIAS = 30  # días de historial de ejecuciones en etl_bi_ejecucion
+
+# Reporte contable: datos por período cacheados mientras no cambien las tablas de origen
+CONTABLE_SNAPSHOT_TTL_SEGUNDOS = 300  # 0 desactiva la caché (una consulta por reporte)
+
+# Carga masiva de asistencia desde relojes marcadores (POST /asistencia/lote)
+ASISTENCIA_LOTE_MAXIMO = 50000  # marcaciones por petición
+
+# Repositorios BI: sentencias con forma fija (infrastructure/bi_consultas.py)
+BI_SENTENCIAS_PREPARADAS = True  # PREPARE una vez por conexión; False detrás de pgbouncer en modo transacción
+
+# Inventario por movimientos (create_inventario_movimientos.sql)
+INVENTARIO_LOTE_MAXIMO = 5000  # movimientos por petición en POST /inventario/movimientos
+INVENTARIO_VALORACION_HORAS = 24  # valoración diaria del stock (día anterior); 0 desactiva el job
+
+# Contabilización de compras en movimiento_financiero (create_compras_contabilizacion.sql)
+COMPRAS_ID_CLUB_POR_DEFECTO = None  # club de las compras sin id_club; None = el de menor id
@@ -0,0 +1,49 @@
+#!/usr/bin/env python3
+"""
+Contabiliza en movimiento_financiero las compras ya registradas
+(create_compras_contabilizacion.sql). Las compras nuevas o editadas se
+contabilizan solas al guardarse; este script completa las anteriores.
+
+Se puede ejecutar varias veces: solo escribe los movimientos que faltan o
+que no coinciden con su compra.
+
+Los movimientos nuevos caen en meses que pueden estar cerrados
+(create_cierres_contables.sql), cuyo checksum incluye movimiento_financiero.
+Los meses cerrados que estaban íntegros antes de contabilizar se vuelven a
+sellar al terminar; los que ya no lo estaban se informan y se dejan como están.
+Conviene ejecutarlo sin otras escrituras en curso.
+
+Uso: python contabilizar_compras.py [lote]
+"""
+
+import logging
+import sys
+
+from infrastructure.compra_repository import CompraRepository
+from infrastructure.contabilidad_repository import ContabilidadRepository
+
+
+def main():
+    logging.basicConfig(level=logging.INFO)
+    lote = int(sys.argv[1]) if len(sys.argv) > 1 else 1000
+    contabilidad = ContabilidadRepository()
+    cierres = contabilidad.verificar_cierres()
+    integros = [c["periodo"] for c in cierres if c["integro"]]
+    alterados = [c["periodo"] for c in cierres if not c["integro"]]
+    if alterados:
+        print(f"⚠️  Meses cerrados que ya no coincidían con su checksum (no se resellan): "
+              f"{', '.join(str(p) for p in alterados)}")
+
+    print(f"📊 Contabilizando compras en tramos de {lote} ids...")
+    totales = CompraRepository().contabilizar_existentes(lote)
+    print(f"🔹 {totales['tramos']} tramos: {totales['insertados']} movimientos nuevos, "
+          f"{totales['actualizados']} actualizados")
+
+    if integros and totales["insertados"] + totales["actualizados"]:
+        resellados = contabilidad.resellar_cierres(integros)
+        print(f"🔹 {resellados} meses cerrados resellados")
+    print("✅ Compras contabilizadas")
+
+
+if __name__ == "__main__":
+    main()
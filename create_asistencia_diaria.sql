@@ -0,0 +1,120 @@
+-- =====================================================
+-- RESUMEN DIARIO DE ASISTENCIA POR EMPLEADO
+-- =====================================================
+-- Requiere create_asistencia_lote.sql (una fila de asistencia por empleado y día).
+--
+-- asistencia.estado es texto libre ('PRESENTE', 'presente', 'RETRASO',
+-- 'FALTANDO', ...). estado_codigo lo normaliza al escribir:
+--     1 = presente (PRESENTE, HORAS_EXTRAS)
+--     2 = tardanza (TARDANZA, RETRASO)
+--     3 = ausente  (AUSENTE, FALTANDO)
+--     0 = otro
+--
+-- asistencia_diaria es la fila de cada empleado y día con lo que necesita el
+-- dashboard de personal (/bi/personal): estado normalizado, segundos trabajados
+-- y el departamento y cargo del empleado, así las consultas filtran por rango
+-- de fechas sobre la clave primaria sin unir asistencia con personal. La
+-- mantienen triggers sobre asistencia (por sentencia, con tablas de transición)
+-- y sobre personal (cambio de departamento o cargo).
+
+BEGIN;
+
+ALTER TABLE asistencia ADD COLUMN IF NOT EXISTS estado_codigo SMALLINT
+    GENERATED ALWAYS AS (
+        CASE UPPER(estado)
+            WHEN 'PRESENTE' THEN 1
+            WHEN 'HORAS_EXTRAS' THEN 1
+            WHEN 'TARDANZA' THEN 2
+            WHEN 'RETRASO' THEN 2
+            WHEN 'AUSENTE' THEN 3
+            WHEN 'FALTANDO' THEN 3
+            ELSE 0
+        END
+    ) STORED;
+
+CREATE TABLE IF NOT EXISTS asistencia_diaria (
+    fecha DATE NOT NULL,
+    id_personal BIGINT NOT NULL REFERENCES personal(id_personal),
+    departamento TEXT,
+    cargo BIGINT,
+    estado_codigo SMALLINT NOT NULL,
+    segundos_trabajados INT,  -- NULL si falta el ingreso o la salida
+    PRIMARY KEY (fecha, id_personal)
+);
+
+CREATE INDEX IF NOT EXISTS idx_asistencia_diaria_personal ON asistencia_diaria (id_personal, fecha);
+CREATE INDEX IF NOT EXISTS idx_asistencia_diaria_departamento ON asistencia_diaria (departamento, fecha);
+
+CREATE OR REPLACE FUNCTION sincronizar_asistencia_diaria() RETURNS TRIGGER AS $$
+BEGIN
+    IF TG_OP IN ('UPDATE', 'DELETE') THEN
+        DELETE FROM asistencia_diaria d
+        USING viejas v
+        WHERE d.fecha = v.fecha AND d.id_personal = v.id_personal
+          AND NOT EXISTS (SELECT 1 FROM asistencia a WHERE a.id_personal = v.id_personal AND a.fecha = v.fecha);
+    END IF;
+
+    IF TG_OP IN ('INSERT', 'UPDATE') THEN
+        INSERT INTO asistencia_diaria (fecha, id_personal, departamento, cargo, estado_codigo, segundos_trabajados)
+        SELECT DISTINCT ON (n.fecha, n.id_personal)
+               n.fecha, n.id_personal, p.departamento, p.cargo, n.estado_codigo,
+               CASE WHEN n.hora_ingreso IS NOT NULL AND n.hora_salida IS NOT NULL
+                    THEN EXTRACT(EPOCH FROM (n.hora_salida - n.hora_ingreso))::INT
+               END
+        FROM nuevas n
+        JOIN personal p ON p.id_personal = n.id_personal
+        ORDER BY n.fecha, n.id_personal, n.id_asistencia DESC
+        ON CONFLICT (fecha, id_personal) DO UPDATE
+        SET departamento = EXCLUDED.departamento,
+            cargo = EXCLUDED.cargo,
+            estado_codigo = EXCLUDED.estado_codigo,
+            segundos_trabajados = EXCLUDED.segundos_trabajados;
+    END IF;
+
+    RETURN NULL;
+END;
+$$ LANGUAGE plpgsql;
+
+DROP TRIGGER IF EXISTS asistencia_diaria_insert ON asistencia;
+CREATE TRIGGER asistencia_diaria_insert AFTER INSERT ON asistencia
+    REFERENCING NEW TABLE AS nuevas
+    FOR EACH STATEMENT EXECUTE FUNCTION sincronizar_asistencia_diaria();
+
+DROP TRIGGER IF EXISTS asistencia_diaria_update ON asistencia;
+CREATE TRIGGER asistencia_diaria_update AFTER UPDATE ON asistencia
+    REFERENCING OLD TABLE AS viejas NEW TABLE AS nuevas
+    FOR EACH STATEMENT EXECUTE FUNCTION sincronizar_asistencia_diaria();
+
+DROP TRIGGER IF EXISTS asistencia_diaria_delete ON asistencia;
+CREATE TRIGGER asistencia_diaria_delete AFTER DELETE ON asistencia
+    REFERENCING OLD TABLE AS viejas
+    FOR EACH STATEMENT EXECUTE FUNCTION sincronizar_asistencia_diaria();
+
+CREATE OR REPLACE FUNCTION sincronizar_asistencia_diaria_personal() RETURNS TRIGGER AS $$
+BEGIN
+    UPDATE asistencia_diaria
+    SET departamento = NEW.departamento, cargo = NEW.cargo
+    WHERE id_personal = NEW.id_personal;
+    RETURN NULL;
+END;
+$$ LANGUAGE plpgsql;
+
+DROP TRIGGER IF EXISTS asistencia_diaria_personal ON personal;
+CREATE TRIGGER asistencia_diaria_personal AFTER UPDATE OF departamento, cargo ON personal
+    FOR EACH ROW
+    WHEN (OLD.departamento IS DISTINCT FROM NEW.departamento OR OLD.cargo IS DISTINCT FROM NEW.cargo)
+    EXECUTE FUNCTION sincronizar_asistencia_diaria_personal();
+
+-- Carga inicial
+INSERT INTO asistencia_diaria (fecha, id_personal, departamento, cargo, estado_codigo, segundos_trabajados)
+SELECT DISTINCT ON (a.fecha, a.id_personal)
+       a.fecha, a.id_personal, p.departamento, p.cargo, a.estado_codigo,
+       CASE WHEN a.hora_ingreso IS NOT NULL AND a.hora_salida IS NOT NULL
+            THEN EXTRACT(EPOCH FROM (a.hora_salida - a.hora_ingreso))::INT
+       END
+FROM asistencia a
+JOIN personal p ON p.id_personal = a.id_personal
+ORDER BY a.fecha, a.id_personal, a.id_asistencia DESC
+ON CONFLICT (fecha, id_personal) DO NOTHING;
+
+COMMIT;
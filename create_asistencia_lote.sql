@@ -0,0 +1,38 @@
+-- =====================================================
+-- CARGA MASIVA DE ASISTENCIA (RELOJES MARCADORES)
+-- =====================================================
+-- POST /asistencia/lote y POST /asistencia/lote/archivo hacen un único
+-- INSERT ... ON CONFLICT (id_personal, fecha) por lote, así que debe haber a
+-- lo sumo una fila de asistencia por empleado y día.
+--
+-- Antes de crear el índice único se fusionan los duplicados existentes: se
+-- conserva la fila más antigua con el primer ingreso y la última salida del día.
+
+BEGIN;
+
+WITH grupos AS (
+    SELECT id_personal, fecha,
+           min(id_asistencia) AS id_conservada,
+           min(hora_ingreso) AS hora_ingreso,
+           max(hora_salida) AS hora_salida
+    FROM asistencia
+    GROUP BY id_personal, fecha
+    HAVING count(*) > 1
+),
+fusion AS (
+    UPDATE asistencia a
+    SET hora_ingreso = g.hora_ingreso,
+        hora_salida = g.hora_salida
+    FROM grupos g
+    WHERE a.id_asistencia = g.id_conservada
+    RETURNING g.id_personal, g.fecha, g.id_conservada
+)
+DELETE FROM asistencia a
+USING fusion f
+WHERE a.id_personal = f.id_personal
+  AND a.fecha = f.fecha
+  AND a.id_asistencia <> f.id_conservada;
+
+CREATE UNIQUE INDEX IF NOT EXISTS uq_asistencia_personal_fecha ON asistencia (id_personal, fecha);
+
+COMMIT;
@@ -0,0 +1,31 @@
+-- =====================================================
+-- NOTIFICACIONES DE CAMBIO EN CATÁLOGOS
+-- =====================================================
+-- La API mantiene los catálogos en memoria (infrastructure/catalogo_cache.py)
+-- y escucha el canal 'catalogos_cambio' para recargarlos cuando cambian.
+
+CREATE OR REPLACE FUNCTION notificar_cambio_catalogo()
+RETURNS TRIGGER AS $$
+BEGIN
+    PERFORM pg_notify('catalogos_cambio', TG_TABLE_NAME);
+    RETURN NULL;
+END;
+$$ language 'plpgsql';
+
+DROP TRIGGER IF EXISTS notify_estado_pago_cambio ON estado_pago;
+CREATE TRIGGER notify_estado_pago_cambio AFTER INSERT OR UPDATE OR DELETE ON estado_pago FOR EACH STATEMENT EXECUTE FUNCTION notificar_cambio_catalogo();
+
+DROP TRIGGER IF EXISTS notify_modalidad_pago_cambio ON modalidad_pago;
+CREATE TRIGGER notify_modalidad_pago_cambio AFTER INSERT OR UPDATE OR DELETE ON modalidad_pago FOR EACH STATEMENT EXECUTE FUNCTION notificar_cambio_catalogo();
+
+DROP TRIGGER IF EXISTS notify_estado_accion_cambio ON estado_accion;
+CREATE TRIGGER notify_estado_accion_cambio AFTER INSERT OR UPDATE OR DELETE ON estado_accion FOR EACH STATEMENT EXECUTE FUNCTION notificar_cambio_catalogo();
+
+DROP TRIGGER IF EXISTS notify_roles_cambio ON roles;
+CREATE TRIGGER notify_roles_cambio AFTER INSERT OR UPDATE OR DELETE ON roles FOR EACH STATEMENT EXECUTE FUNCTION notificar_cambio_catalogo();
+
+DROP TRIGGER IF EXISTS notify_cargos_cambio ON cargos;
+CREATE TRIGGER notify_cargos_cambio AFTER INSERT OR UPDATE OR DELETE ON cargos FOR EACH STATEMENT EXECUTE FUNCTION notificar_cambio_catalogo();
+
+DROP TRIGGER IF EXISTS notify_club_cambio ON club;
+CREATE TRIGGER notify_club_cambio AFTER INSERT OR UPDATE OR DELETE ON club FOR EACH STATEMENT EXECUTE FUNCTION notificar_cambio_catalogo();
@@ -0,0 +1,34 @@
+-- =====================================================
+-- CIERRES CONTABLES MENSUALES
+-- =====================================================
+-- Al cerrar un mes se congelan sus cifras contables (las que usa el reporte
+-- contable: Estado de Resultados, Balance General, Flujo de Efectivo). Los
+-- reportes leen los meses cerrados de esta tabla y solo calculan en vivo el
+-- período abierto.
+--
+-- Los saldos (salarios, inventario, cuotas pendientes) quedan como estaban al
+-- momento del cierre.
+--
+-- checksum es un md5 sobre las filas de origen del mes (movimiento_financiero,
+-- pago_accion, compras); si alguien las modifica después del cierre, la
+-- verificación (GET /finanzas/cierres/verificar) lo detecta.
+
+CREATE TABLE IF NOT EXISTS cierre_contable (
+    periodo DATE PRIMARY KEY CHECK (periodo = date_trunc('month', periodo)::DATE),
+    datos JSONB NOT NULL,
+    checksum TEXT NOT NULL,
+    filas_origen INT NOT NULL,
+    fecha_cierre TIMESTAMP WITH TIME ZONE NOT NULL DEFAULT NOW(),
+    id_usuario BIGINT REFERENCES usuario(id_usuario)
+);
+
+-- Invalida las cachés de reportes de los demás workers (ver create_tablas_notify.sql)
+DO $$
+BEGIN
+    IF to_regproc('notificar_cambio_tabla') IS NOT NULL THEN
+        DROP TRIGGER IF EXISTS notify_cierre_contable_version ON cierre_contable;
+        CREATE TRIGGER notify_cierre_contable_version AFTER INSERT OR UPDATE OR DELETE ON cierre_contable
+            FOR EACH STATEMENT EXECUTE FUNCTION notificar_cambio_tabla();
+    END IF;
+END;
+$$;
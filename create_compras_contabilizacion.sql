@@ -0,0 +1,39 @@
+-- =====================================================
+-- CONTABILIZACIÓN DE COMPRAS EN movimiento_financiero
+-- =====================================================
+-- Cada compra completada o pagada tiene su EGRESO en movimiento_financiero
+-- (id_compra), escrito en la misma transacción que la compra (ver
+-- infrastructure/compra_repository.py). Si la compra deja de estar completada
+-- el movimiento queda 'anulado'; si se elimina, se elimina con ella.
+--
+-- Reportes y dashboards de egresos leen solo movimiento_financiero con estado
+-- 'confirmado' (las compras anuladas no cuentan); el reporte contable separa las
+-- compras por id_compra IS NOT NULL.
+--
+-- Después de ejecutar este script, contabilizar las compras existentes:
+--     python contabilizar_compras.py
+-- El script vuelve a sellar el checksum de los meses cerrados que estaban
+-- íntegros (los movimientos nuevos se fechan con fecha_de_compra y cambian
+-- su checksum; ver create_cierres_contables.sql).
+
+-- Club al que se imputa la compra (NULL = COMPRAS_ID_CLUB_POR_DEFECTO / club principal)
+ALTER TABLE compras ADD COLUMN IF NOT EXISTS id_club BIGINT REFERENCES club(id_club);
+
+ALTER TABLE movimiento_financiero
+    ADD COLUMN IF NOT EXISTS id_compra BIGINT REFERENCES compras(id_compra) ON DELETE CASCADE;
+
+DO $$
+BEGIN
+    IF NOT EXISTS (SELECT 1 FROM pg_constraint WHERE conname = 'uq_movimiento_financiero_compra') THEN
+        ALTER TABLE movimiento_financiero
+            ADD CONSTRAINT uq_movimiento_financiero_compra UNIQUE (id_compra);
+    END IF;
+END;
+$$;
+
+-- Egresos e ingresos por período sin leer la tabla (dashboards y reporte contable)
+CREATE INDEX IF NOT EXISTS idx_movimiento_financiero_tipo_fecha
+    ON movimiento_financiero (tipo_movimiento, fecha)
+    INCLUDE (monto, id_club, estado, id_compra);
+
+ANALYZE movimiento_financiero;
@@ -0,0 +1,12 @@
+-- =====================================================
+-- COMPROBANTES DE PAGO: HUELLA DEL CONTENIDO
+-- =====================================================
+-- Los comprobantes se reciben por bloques y se guardan por su sha256 (ver
+-- infrastructure/comprobantes.py). La huella queda en la acción para detectar
+-- el mismo comprobante presentado en varias acciones.
+
+ALTER TABLE accion ADD COLUMN IF NOT EXISTS comprobante_sha256 TEXT;
+
+CREATE INDEX IF NOT EXISTS idx_accion_comprobante_sha256
+    ON accion (comprobante_sha256)
+    WHERE comprobante_sha256 IS NOT NULL;
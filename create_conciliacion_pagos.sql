@@ -0,0 +1,53 @@
+-- =====================================================
+-- CONCILIACIÓN PROGRAMADA DE PAGOS CON PASARELAS
+-- =====================================================
+-- El job de conciliación (use_cases/conciliacion.py) revisa en lote los pagos
+-- temporales pendientes y las filas pendientes de pago_accion contra Stripe,
+-- MercadoPago y PayPal, aplica los cambios de estado y guarda un reporte.
+
+-- Referencia del pago en la pasarela, con el formato "<pasarela>:<id>"
+-- (p. ej. 'stripe:pi_3N...', 'mercadopago:123456789', 'paypal:PAYID-...')
+ALTER TABLE pago_accion ADD COLUMN IF NOT EXISTS referencia_pasarela VARCHAR(255);
+
+CREATE INDEX IF NOT EXISTS idx_pago_accion_pendientes_pasarela
+    ON pago_accion (id_pago)
+    WHERE referencia_pasarela IS NOT NULL;
+
+-- La referencia se escribe al crear la acción de un pago de pasarela (webhooks
+-- y confirmaciones de Stripe / MercadoPago / PayPal, ver insertar_accion en
+-- infrastructure/accion_repository.py) o al registrar un pago con
+-- referencia_pasarela. Un pago de pasarela corresponde a una sola fila
+CREATE UNIQUE INDEX IF NOT EXISTS uq_pago_accion_referencia_pasarela
+    ON pago_accion (referencia_pasarela)
+    WHERE referencia_pasarela IS NOT NULL;
+
+-- Pagos de las acciones ya creadas por webhooks (create_webhook_inbox.sql)
+DO $$
+BEGIN
+    IF to_regclass('webhook_inbox') IS NOT NULL THEN
+        INSERT INTO pago_accion (id_accion, monto, tipo_pago, estado_pago, observaciones, referencia_pasarela)
+        SELECT DISTINCT ON (w.proveedor, w.referencia_pago)
+               a.id_accion, a.total_pago, tp.id_tipo_pago, ep.id_estado_pago,
+               'Pago por ' || w.proveedor, w.proveedor || ':' || w.referencia_pago
+        FROM webhook_inbox w
+        JOIN accion a ON a.id_accion = w.id_accion
+        JOIN tipo_pago tp ON tp.descripcion = 'tarjeta'
+        JOIN estado_pago ep ON ep.descripcion = 'pagado'
+        WHERE w.referencia_pago IS NOT NULL
+        ORDER BY w.proveedor, w.referencia_pago, w.id_webhook
+        ON CONFLICT (referencia_pasarela) WHERE referencia_pasarela IS NOT NULL DO NOTHING;
+    END IF;
+END;
+$$;
+
+CREATE TABLE IF NOT EXISTS conciliacion_reporte (
+    id_reporte BIGINT PRIMARY KEY GENERATED ALWAYS AS IDENTITY,
+    fecha_inicio TIMESTAMP NOT NULL,
+    fecha_fin TIMESTAMP NOT NULL,
+    origen VARCHAR(20) NOT NULL DEFAULT 'programado',  -- programado, manual
+    resumen JSONB NOT NULL,
+    detalle JSONB NOT NULL
+);
+
+CREATE INDEX IF NOT EXISTS idx_conciliacion_reporte_fecha
+    ON conciliacion_reporte (fecha_inicio DESC);
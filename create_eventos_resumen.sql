@@ -0,0 +1,18 @@
+-- =====================================================
+-- ÍNDICES PARA EL RESUMEN Y EL CALENDARIO DE EVENTOS
+-- =====================================================
+-- GET /eventos/resumen y GET /eventos/calendario devuelven cada evento con sus
+-- reservas confirmadas, en espera y canceladas en una sola consulta agrupada
+-- (ver EventoRepository.list_resumen). Las confirmadas y los cupos libres salen
+-- del contador evento_cupos (create_reservas_cupos.sql); el resto se cuenta con
+-- estos índices, solo para los eventos del rango pedido.
+
+-- Eventos por club y fecha (filtros del listado y mes del calendario)
+CREATE INDEX IF NOT EXISTS idx_eventos_club_fecha ON eventos (id_club, fecha);
+CREATE INDEX IF NOT EXISTS idx_eventos_fecha ON eventos (fecha);
+
+-- Conteo por evento y estado sin leer las filas de reservas (index-only scan)
+CREATE INDEX IF NOT EXISTS idx_reservas_evento_estado ON reservas (id_evento, estado);
+
+ANALYZE eventos;
+ANALYZE reservas;
@@ -0,0 +1,125 @@
+-- =====================================================
+-- MOVIMIENTOS DE INVENTARIO Y VALORACIÓN PERIÓDICA
+-- =====================================================
+-- El stock ya no se escribe como valor absoluto: cada entrada, salida o ajuste
+-- es un UPDATE relativo (cantidad_en_stock = cantidad_en_stock + delta, sin
+-- bajar de cero) y una fila en inventario_movimiento, en la misma transacción.
+-- Ver infrastructure/inventario_repository.py.
+--
+-- inventario_valoracion guarda, por día de corte, la cantidad y el precio de
+-- cada producto. inventario_existencias(hasta) parte de la última valoración
+-- anterior a 'hasta' y le suma los movimientos posteriores; el reporte contable
+-- valora el inventario con ella en lugar de recorrer la tabla en vivo.
+--
+-- El libro de movimientos y las valoraciones no se borran con el producto
+-- (ON DELETE RESTRICT): eliminar un producto lo da de baja (fecha_baja) y solo
+-- se permite con stock en cero.
+--
+-- Los saldos de apertura ('inicial') de los productos existentes quedan con la
+-- fecha de esta migración: inventario_existencias(hasta) con un 'hasta'
+-- anterior no devuelve stock para ellos. Para fechar la apertura antes, ajustar
+-- la fecha de esas filas (tipo = 'inicial') a mano después de migrar.
+
+BEGIN;
+
+CREATE TABLE IF NOT EXISTS inventario_movimiento (
+    id_movimiento BIGINT PRIMARY KEY GENERATED ALWAYS AS IDENTITY,
+    id_producto BIGINT NOT NULL REFERENCES inventario(id_producto) ON DELETE RESTRICT,
+    -- inicial: saldo de apertura; precio: cambio de precio_unitario (cantidad 0)
+    tipo TEXT NOT NULL CHECK (tipo IN ('inicial', 'entrada', 'salida', 'ajuste', 'precio')),
+    cantidad INT NOT NULL,  -- con signo: salidas negativas
+    stock_resultante INT NOT NULL,
+    costo_unitario DECIMAL(10,2) NOT NULL,  -- precio_unitario vigente al momento del movimiento
+    referencia TEXT,
+    observaciones TEXT,
+    id_usuario BIGINT,
+    fecha TIMESTAMP WITH TIME ZONE NOT NULL DEFAULT NOW(),
+    CHECK (cantidad <> 0 OR tipo IN ('inicial', 'precio'))
+);
+
+CREATE INDEX IF NOT EXISTS idx_inventario_movimiento_producto_fecha
+    ON inventario_movimiento (id_producto, fecha, id_movimiento);
+CREATE INDEX IF NOT EXISTS idx_inventario_movimiento_fecha
+    ON inventario_movimiento (fecha);
+
+CREATE TABLE IF NOT EXISTS inventario_valoracion (
+    fecha_corte DATE NOT NULL,  -- incluye los movimientos hasta el final de ese día
+    id_producto BIGINT NOT NULL REFERENCES inventario(id_producto) ON DELETE RESTRICT,
+    id_club BIGINT NOT NULL,
+    cantidad INT NOT NULL,
+    precio_unitario DECIMAL(10,2) NOT NULL,
+    valor DECIMAL(14,2) NOT NULL,
+    PRIMARY KEY (fecha_corte, id_producto)
+);
+
+-- Existencias y precio por producto antes de 'hasta' (NULL = ahora)
+CREATE OR REPLACE FUNCTION inventario_existencias(p_hasta TIMESTAMP WITH TIME ZONE)
+RETURNS TABLE (id_producto BIGINT, cantidad INT, precio_unitario DECIMAL(10,2)) AS $$
+    WITH corte AS (
+        SELECT MAX(v.fecha_corte) AS fecha_corte
+        FROM inventario_valoracion v
+        WHERE p_hasta IS NULL OR v.fecha_corte + 1 <= p_hasta
+    )
+    SELECT e.id_producto,
+           CAST(SUM(e.cantidad) AS INT),
+           (array_agg(e.precio ORDER BY e.fecha DESC, e.id_movimiento DESC))[1]
+    FROM (
+        SELECT v.id_producto, v.cantidad, v.precio_unitario AS precio,
+               CAST('-infinity' AS TIMESTAMP WITH TIME ZONE) AS fecha, CAST(0 AS BIGINT) AS id_movimiento
+        FROM inventario_valoracion v
+        JOIN corte c ON v.fecha_corte = c.fecha_corte
+        UNION ALL
+        SELECT m.id_producto, m.cantidad, m.costo_unitario, m.fecha, m.id_movimiento
+        FROM inventario_movimiento m, corte c
+        WHERE (c.fecha_corte IS NULL OR m.fecha >= c.fecha_corte + 1)
+          AND (p_hasta IS NULL OR m.fecha < p_hasta)
+    ) e
+    GROUP BY e.id_producto
+$$ LANGUAGE sql STABLE;
+
+-- Bases ya migradas con ON DELETE CASCADE
+ALTER TABLE inventario_movimiento
+    DROP CONSTRAINT IF EXISTS inventario_movimiento_id_producto_fkey,
+    ADD CONSTRAINT inventario_movimiento_id_producto_fkey
+        FOREIGN KEY (id_producto) REFERENCES inventario(id_producto) ON DELETE RESTRICT;
+ALTER TABLE inventario_valoracion
+    DROP CONSTRAINT IF EXISTS inventario_valoracion_id_producto_fkey,
+    ADD CONSTRAINT inventario_valoracion_id_producto_fkey
+        FOREIGN KEY (id_producto) REFERENCES inventario(id_producto) ON DELETE RESTRICT;
+
+-- Baja lógica de productos (NULL = activo)
+ALTER TABLE inventario ADD COLUMN IF NOT EXISTS fecha_baja TIMESTAMP WITH TIME ZONE;
+
+-- El stock nunca queda negativo (NOT VALID: no revisa filas antiguas)
+DO $$
+BEGIN
+    IF NOT EXISTS (SELECT 1 FROM pg_constraint WHERE conname = 'inventario_stock_no_negativo') THEN
+        ALTER TABLE inventario
+            ADD CONSTRAINT inventario_stock_no_negativo CHECK (cantidad_en_stock >= 0) NOT VALID;
+    END IF;
+END;
+$$;
+
+-- Saldo de apertura: el stock y precio actuales de los productos sin movimientos
+LOCK TABLE inventario IN SHARE ROW EXCLUSIVE MODE;
+
+INSERT INTO inventario_movimiento (id_producto, tipo, cantidad, stock_resultante, costo_unitario, observaciones)
+SELECT i.id_producto, 'inicial', i.cantidad_en_stock, i.cantidad_en_stock, i.precio_unitario, 'Saldo de apertura'
+FROM inventario i
+WHERE NOT EXISTS (SELECT 1 FROM inventario_movimiento m WHERE m.id_producto = i.id_producto);
+
+-- Invalida las cachés de reportes de los demás workers (ver create_tablas_notify.sql)
+DO $$
+BEGIN
+    IF to_regproc('notificar_cambio_tabla') IS NOT NULL THEN
+        DROP TRIGGER IF EXISTS notify_inventario_movimiento_version ON inventario_movimiento;
+        CREATE TRIGGER notify_inventario_movimiento_version AFTER INSERT OR UPDATE OR DELETE ON inventario_movimiento
+            FOR EACH STATEMENT EXECUTE FUNCTION notificar_cambio_tabla();
+        DROP TRIGGER IF EXISTS notify_inventario_valoracion_version ON inventario_valoracion;
+        CREATE TRIGGER notify_inventario_valoracion_version AFTER INSERT OR UPDATE OR DELETE ON inventario_valoracion
+            FOR EACH STATEMENT EXECUTE FUNCTION notificar_cambio_tabla();
+    END IF;
+END;
+$$;
+
+COMMIT;
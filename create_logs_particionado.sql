@@ -0,0 +1,95 @@
+-- =====================================================
+-- LOGS_SISTEMA PARTICIONADA POR MES
+-- =====================================================
+-- logs_sistema pasa a estar particionada por rango mensual de fecha_y_hora:
+--   - las consultas por rango de fechas (p. ej. la última semana) solo leen
+--     las particiones del rango, sin importar cuántos años de historia haya
+--   - el job de retención (use_cases/retencion_logs.py) crea las particiones de
+--     los próximos meses y desanexa, exporta a .csv.gz y elimina las antiguas
+--
+-- Ejecutar una vez sobre una base existente (después de create_database_complete.sql).
+-- Los datos actuales se copian a la tabla nueva y la anterior queda como
+-- logs_sistema_sin_particionar hasta verificar la migración.
+
+BEGIN;
+
+-- Crea (si no existe) la partición del mes que contiene la fecha indicada
+CREATE OR REPLACE FUNCTION crear_particion_logs(mes DATE)
+RETURNS TEXT AS $$
+DECLARE
+    inicio DATE := date_trunc('month', mes)::DATE;
+    nombre TEXT := format('logs_sistema_%s', to_char(inicio, 'YYYY_MM'));
+BEGIN
+    IF to_regclass(nombre) IS NULL THEN
+        EXECUTE format(
+            'CREATE TABLE %I PARTITION OF logs_sistema FOR VALUES FROM (%L) TO (%L)',
+            nombre, inicio, (inicio + INTERVAL '1 month')::DATE
+        );
+    END IF;
+    RETURN nombre;
+END;
+$$ LANGUAGE plpgsql;
+
+ALTER TABLE logs_sistema RENAME TO logs_sistema_sin_particionar;
+ALTER TABLE logs_sistema_sin_particionar RENAME CONSTRAINT logs_sistema_pkey TO logs_sistema_sin_particionar_pkey;
+DO $$
+DECLARE
+    secuencia TEXT := pg_get_serial_sequence('logs_sistema_sin_particionar', 'id_log');
+BEGIN
+    IF secuencia IS NOT NULL THEN
+        EXECUTE format('ALTER SEQUENCE %s RENAME TO logs_sistema_sin_particionar_id_log_seq', secuencia);
+    END IF;
+END $$;
+ALTER INDEX IF EXISTS idx_logs_usuario RENAME TO idx_logs_usuario_sin_particionar;
+ALTER INDEX IF EXISTS idx_logs_fecha RENAME TO idx_logs_fecha_sin_particionar;
+ALTER INDEX IF EXISTS idx_logs_modulo RENAME TO idx_logs_modulo_sin_particionar;
+
+-- La clave primaria debe incluir la columna de partición. id_log usa una
+-- secuencia propia (las columnas IDENTITY en tablas particionadas requieren PostgreSQL 17)
+CREATE SEQUENCE logs_sistema_id_log_seq;
+
+CREATE TABLE logs_sistema (
+    id_log BIGINT NOT NULL DEFAULT nextval('logs_sistema_id_log_seq'),
+    id_usuario BIGINT NOT NULL REFERENCES usuario(id_usuario),
+    accion_realizada TEXT NOT NULL,
+    fecha_y_hora TIMESTAMP WITH TIME ZONE NOT NULL DEFAULT NOW(),
+    modulo_o_tabla_afectada TEXT NOT NULL,
+    id_afectado BIGINT,
+    descripcion_detallada TEXT,
+    ip_address INET,
+    user_agent TEXT,
+    PRIMARY KEY (id_log, fecha_y_hora)
+) PARTITION BY RANGE (fecha_y_hora);
+
+ALTER SEQUENCE logs_sistema_id_log_seq OWNED BY logs_sistema.id_log;
+
+-- Índices en la tabla padre: se crean en cada partición. Usuario y módulo llevan
+-- la fecha como segunda columna para filtrar y ordenar por rango con el mismo índice
+CREATE INDEX idx_logs_fecha ON logs_sistema (fecha_y_hora);
+CREATE INDEX idx_logs_usuario ON logs_sistema (id_usuario, fecha_y_hora);
+CREATE INDEX idx_logs_modulo ON logs_sistema (modulo_o_tabla_afectada, fecha_y_hora);
+
+-- Filas fuera de las particiones creadas (no debería recibir nada si el job corre)
+CREATE TABLE logs_sistema_default PARTITION OF logs_sistema DEFAULT;
+
+-- Particiones desde el log más antiguo hasta tres meses adelante
+SELECT crear_particion_logs(mes::DATE)
+FROM generate_series(
+    date_trunc('month', COALESCE((SELECT MIN(fecha_y_hora) FROM logs_sistema_sin_particionar), NOW())),
+    date_trunc('month', NOW()) + INTERVAL '3 months',
+    INTERVAL '1 month'
+) AS mes;
+
+INSERT INTO logs_sistema (id_log, id_usuario, accion_realizada, fecha_y_hora, modulo_o_tabla_afectada,
+                          id_afectado, descripcion_detallada, ip_address, user_agent)
+SELECT id_log, id_usuario, accion_realizada, COALESCE(fecha_y_hora, NOW()), modulo_o_tabla_afectada,
+       id_afectado, descripcion_detallada, ip_address, user_agent
+FROM logs_sistema_sin_particionar;
+
+SELECT setval('logs_sistema_id_log_seq',
+              COALESCE((SELECT MAX(id_log) FROM logs_sistema), 0) + 1, false);
+
+COMMIT;
+
+-- Tras verificar la migración:
+-- DROP TABLE logs_sistema_sin_particionar;
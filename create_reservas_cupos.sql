@@ -0,0 +1,74 @@
+-- =====================================================
+-- CUPOS DE EVENTOS Y LISTA DE ESPERA
+-- =====================================================
+-- Cada evento tiene una fila en evento_cupos con su capacidad y los cupos
+-- ocupados (reservas 'confirmada'). Reservar es un UPDATE condicional sobre esa
+-- fila (ocupados < capacidad) en la misma transacción que el INSERT de la
+-- reserva: las reservas concurrentes de un mismo evento se ordenan en el
+-- bloqueo de esa fila y nunca se confirma más de la capacidad. Sin cupo, la
+-- reserva queda 'en_espera' y se confirma (por orden de llegada) cuando se
+-- cancela otra o aumenta la capacidad. Ver infrastructure/reserva_repository.py.
+--
+-- capacidad NULL = sin límite.
+
+BEGIN;
+
+LOCK TABLE reservas IN SHARE ROW EXCLUSIVE MODE;
+
+CREATE TABLE IF NOT EXISTS evento_cupos (
+    id_evento BIGINT PRIMARY KEY REFERENCES eventos(id_evento) ON DELETE CASCADE,
+    capacidad INT CHECK (capacidad IS NULL OR capacidad >= 0),
+    ocupados INT NOT NULL DEFAULT 0 CHECK (ocupados >= 0)
+);
+
+-- Una sola reserva activa por socio y evento (los duplicados que ya existan
+-- se cancelan, conservando la más antigua)
+UPDATE reservas SET estado = 'cancelada'
+WHERE id_reserva IN (
+    SELECT id_reserva FROM (
+        SELECT id_reserva,
+               row_number() OVER (PARTITION BY id_evento, id_socio ORDER BY fecha_de_reserva, id_reserva) AS orden
+        FROM reservas
+        WHERE estado IN ('confirmada', 'en_espera')
+    ) activas
+    WHERE orden > 1
+);
+
+CREATE UNIQUE INDEX IF NOT EXISTS uq_reservas_socio_evento_activa
+    ON reservas (id_evento, id_socio)
+    WHERE estado IN ('confirmada', 'en_espera');
+
+-- Orden de la lista de espera
+CREATE INDEX IF NOT EXISTS idx_reservas_lista_espera
+    ON reservas (id_evento, fecha_de_reserva, id_reserva)
+    WHERE estado = 'en_espera';
+
+-- La capacidad se copia desde eventos.capacidad_maxima
+CREATE OR REPLACE FUNCTION sincronizar_evento_cupos() RETURNS TRIGGER AS $$
+BEGIN
+    INSERT INTO evento_cupos (id_evento, capacidad)
+    VALUES (NEW.id_evento, NEW.capacidad_maxima)
+    ON CONFLICT (id_evento) DO UPDATE SET capacidad = EXCLUDED.capacidad;
+    RETURN NULL;
+END;
+$$ LANGUAGE plpgsql;
+
+DROP TRIGGER IF EXISTS evento_cupos_insert ON eventos;
+CREATE TRIGGER evento_cupos_insert AFTER INSERT ON eventos
+    FOR EACH ROW EXECUTE FUNCTION sincronizar_evento_cupos();
+
+DROP TRIGGER IF EXISTS evento_cupos_capacidad ON eventos;
+CREATE TRIGGER evento_cupos_capacidad AFTER UPDATE OF capacidad_maxima ON eventos
+    FOR EACH ROW
+    WHEN (OLD.capacidad_maxima IS DISTINCT FROM NEW.capacidad_maxima)
+    EXECUTE FUNCTION sincronizar_evento_cupos();
+
+-- Carga inicial con las reservas confirmadas existentes
+INSERT INTO evento_cupos (id_evento, capacidad, ocupados)
+SELECT e.id_evento, e.capacidad_maxima,
+       (SELECT count(*) FROM reservas r WHERE r.id_evento = e.id_evento AND r.estado = 'confirmada')
+FROM eventos e
+ON CONFLICT (id_evento) DO UPDATE
+SET capacidad = EXCLUDED.capacidad, ocupados = EXCLUDED.ocupados;
+
+COMMIT;
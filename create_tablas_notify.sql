@@ -0,0 +1,34 @@
+-- =====================================================
+-- NOTIFICACIONES DE ESCRITURA EN TABLAS PRINCIPALES
+-- =====================================================
+-- La API mantiene un contador de versión por tabla (infrastructure/version_tablas.py)
+-- para calcular ETags sin consultar la base de datos. Estos triggers avisan por el
+-- canal 'tablas_cambio' de las escrituras hechas por otros workers o fuera de la API.
+
+CREATE OR REPLACE FUNCTION notificar_cambio_tabla()
+RETURNS TRIGGER AS $$
+BEGIN
+    PERFORM pg_notify('tablas_cambio', TG_TABLE_NAME);
+    RETURN NULL;
+END;
+$$ language 'plpgsql';
+
+DO $$
+DECLARE
+    tabla TEXT;
+BEGIN
+    FOREACH tabla IN ARRAY ARRAY[
+        'socio', 'accion', 'pago_accion', 'estado_accion', 'modalidad_pago',
+        'movimiento_financiero', 'personal', 'asistencia', 'compras',
+        'inventario', 'eventos', 'reservas', 'club'
+    ]
+    LOOP
+        EXECUTE format('DROP TRIGGER IF EXISTS notify_%s_version ON %I', tabla, tabla);
+        EXECUTE format(
+            'CREATE TRIGGER notify_%s_version AFTER INSERT OR UPDATE OR DELETE ON %I '
+            'FOR EACH STATEMENT EXECUTE FUNCTION notificar_cambio_tabla()',
+            tabla, tabla
+        );
+    END LOOP;
+END;
+$$;
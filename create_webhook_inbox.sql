@@ -0,0 +1,40 @@
+-- =====================================================
+-- BANDEJA DE ENTRADA DE WEBHOOKS (STRIPE / MERCADOPAGO)
+-- =====================================================
+-- Los webhooks de las pasarelas solo guardan el evento crudo aquí y responden
+-- de inmediato. Un pool de workers (infrastructure/webhook_worker.py) procesa
+-- los eventos pendientes: crea la acción, genera el certificado y reintenta
+-- con backoff exponencial si algo falla.
+--
+-- (proveedor, id_evento_proveedor) es único: si la pasarela reenvía el mismo
+-- evento no se vuelve a encolar. referencia_pago + id_accion evitan crear dos
+-- acciones para el mismo pago aunque llegue en eventos distintos.
+
+CREATE TABLE IF NOT EXISTS webhook_inbox (
+    id_webhook BIGINT PRIMARY KEY GENERATED ALWAYS AS IDENTITY,
+    proveedor VARCHAR(20) NOT NULL,
+    id_evento_proveedor VARCHAR(255) NOT NULL,
+    tipo_evento VARCHAR(100),
+    payload JSONB NOT NULL,
+    estado VARCHAR(20) NOT NULL DEFAULT 'pendiente',  -- pendiente, procesando, procesado, error
+    intentos INT NOT NULL DEFAULT 0,
+    proximo_intento TIMESTAMP NOT NULL DEFAULT NOW(),
+    ultimo_error TEXT,
+    referencia_pago VARCHAR(255),
+    id_accion BIGINT REFERENCES accion(id_accion) ON DELETE SET NULL,
+    resultado JSONB,
+    fecha_recepcion TIMESTAMP NOT NULL DEFAULT NOW(),
+    fecha_inicio_proceso TIMESTAMP,
+    fecha_procesado TIMESTAMP,
+    CONSTRAINT uq_webhook_inbox_evento UNIQUE (proveedor, id_evento_proveedor)
+);
+
+-- Cola de trabajo: solo los eventos que aún deben procesarse
+CREATE INDEX IF NOT EXISTS idx_webhook_inbox_pendientes
+    ON webhook_inbox (proximo_intento)
+    WHERE estado IN ('pendiente', 'procesando');
+
+-- Idempotencia por pago (un pago -> una acción)
+CREATE INDEX IF NOT EXISTS idx_webhook_inbox_referencia_pago
+    ON webhook_inbox (proveedor, referencia_pago)
+    WHERE referencia_pago IS NOT NULL;
@@ -1,7 +1,7 @@
 from dataclasses import dataclass
 from typing import Optional
 
-@dataclass
+@dataclass(slots=True)
 class Compra:
     id_compra: int
     id_proveedor: int
@@ -11,4 +11,5 @@ class Compra:
     numero_factura: Optional[str] = None
     observaciones: Optional[str] = None
     proveedor: Optional[str] = None
-    categoria_proveedor: Optional[str] = None 
\ No newline at end of file
+    categoria_proveedor: Optional[str] = None
+    id_club: Optional[int] = None  # club al que se imputa el egreso
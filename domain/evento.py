@@ -9,4 +9,15 @@ class Evento:
     fecha: str
     hora: str
     id_club: int
-    estado: str 
\ No newline at end of file
+    estado: str
+    capacidad_maxima: Optional[int] = None
+
+
+@dataclass
+class EventoResumen:
+    """Evento con el conteo de sus reservas por estado"""
+    evento: Evento
+    confirmadas: int
+    en_espera: int
+    canceladas: int
+    cupos_disponibles: Optional[int]  # None = sin límite
@@ -2,7 +2,7 @@ from dataclasses import dataclass
 from typing import Optional
 from decimal import Decimal
 
-@dataclass
+@dataclass(slots=True)
 class MovimientoFinanciero:
     id_movimiento: int
     id_club: int
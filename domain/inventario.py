@@ -8,4 +8,18 @@ class ProductoInventario:
     descripcion: Optional[str]
     cantidad_en_stock: int
     precio_unitario: float
-    id_club: int 
\ No newline at end of file
+    id_club: int
+
+
+@dataclass
+class MovimientoInventario:
+    id_movimiento: int
+    id_producto: int
+    tipo: str
+    cantidad: int  # con signo: salidas negativas
+    stock_resultante: int
+    costo_unitario: float
+    referencia: Optional[str]
+    observaciones: Optional[str]
+    id_usuario: Optional[int]
+    fecha: str
@@ -7,4 +7,5 @@ class Reserva:
     id_socio: int
     id_evento: int
     fecha_de_reserva: Optional[str]
-    estado: str 
\ No newline at end of file
+    estado: str
+    observaciones: Optional[str] = None 
\ No newline at end of file
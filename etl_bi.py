@@ -0,0 +1,50 @@
+#!/usr/bin/env python3
+"""
+ETL incremental de las tablas consolidadas de BI.
+
+Alternativa al job programado de la API (BI_ETL_INTERVALO_MINUTOS = 0),
+por ejemplo desde cron:
+    */5 * * * * cd /ruta/al/backend && python etl_bi.py
+
+    python etl_bi.py                 solo los cambios desde la última ejecución
+    python etl_bi.py --completa      recalcula todas las filas
+    python etl_bi.py --historial     muestra las últimas ejecuciones
+"""
+
+import logging
+import sys
+
+from infrastructure.etl_bi_repository import EtlBiRepository
+from use_cases.etl_bi import EtlBiUseCase
+
+
+def main():
+    logging.basicConfig(level=logging.INFO)
+    repository = EtlBiRepository()
+
+    if "--historial" in sys.argv:
+        for ejecucion in repository.get_ejecuciones():
+            estado = f"❌ {ejecucion['error']}" if ejecucion["error"] else (
+                f"{ejecucion['filas_actualizadas']} actualizadas, {ejecucion['filas_eliminadas']} eliminadas"
+            )
+            print(f"{ejecucion['inicio']:%Y-%m-%d %H:%M:%S} {ejecucion['tabla']:<30} {ejecucion['modo']:<12}"
+                  f" {ejecucion['duracion_ms']:>6} ms  {estado}")
+        return
+
+    resultado = EtlBiUseCase(repository).ejecutar(completa="--completa" in sys.argv)
+    if resultado["estado"] == "omitido":
+        print(f"⏭️ {resultado['motivo']}")
+        return
+
+    for tabla, datos in resultado["tablas"].items():
+        if datos.get("error"):
+            print(f"❌ {tabla}: {datos['error']}")
+            continue
+        cambiadas = "" if datos["claves_cambiadas"] is None else f"{datos['claves_cambiadas']} claves cambiadas, "
+        print(f"📊 {tabla} ({datos['modo']}): {cambiadas}{datos['filas_actualizadas']} filas actualizadas, "
+              f"{datos['filas_eliminadas']} eliminadas en {datos['duracion_ms']} ms")
+    print("✅ ETL de BI completado" if resultado["estado"] == "completado" else "⚠️ ETL de BI con errores")
+
+
+if __name__ == "__main__":
+    main()
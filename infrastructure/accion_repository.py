@@ -1,8 +1,106 @@
 from domain.accion import Accion
 from sqlalchemy.orm import Session
 from sqlalchemy import text
+from sqlalchemy.exc import IntegrityError
 from config import SessionLocal
-from typing import Optional
+from infrastructure.catalogo_cache import catalogo_cache
+from infrastructure.row_mapper import crear_mapper, DIRECTO, TEXTO, FLOAT
+from typing import Optional, List
+
+_COLUMNAS_ACCION = [
+    ("id_accion", DIRECTO),
+    ("id_club", DIRECTO),
+    ("id_socio", DIRECTO),
+    ("modalidad_pago", DIRECTO),
+    ("estado_accion", DIRECTO),
+    ("certificado_pdf", DIRECTO),
+    ("certificado_cifrado", DIRECTO),
+    ("fecha_emision_certificado", TEXTO),
+    ("tipo_accion", DIRECTO),
+]
+_COLUMNAS_VENTA = [
+    ("cantidad_acciones", "{v} if {v} else 1"),
+    ("precio_unitario", FLOAT),
+    ("total_pago", FLOAT),
+    ("metodo_pago", "{v} if {v} else 'efectivo'"),
+    ("qr_data", DIRECTO),
+    ("fecha_venta", TEXTO),
+    ("comprobante_path", DIRECTO),
+    ("fecha_comprobante", TEXTO),
+]
+
+# SELECT id_accion, ..., tipo_accion, cantidad_acciones, ..., fecha_comprobante
+_mapear_accion = crear_mapper(Accion, _COLUMNAS_ACCION + _COLUMNAS_VENTA)
+# Igual, pero con s.nombres y s.apellidos después de tipo_accion (socio_titular se calcula aparte)
+_mapear_accion_listado = crear_mapper(Accion, _COLUMNAS_ACCION + [(None, None), (None, None)] + _COLUMNAS_VENTA)
+
+# Pagos de acciones con la descripción del tipo y del estado, como diccionarios
+_COLUMNAS_PAGO = [
+    ("id_pago", DIRECTO),
+    ("id_accion", DIRECTO),
+    ("monto", FLOAT),
+    ("fecha_pago", TEXTO),
+    ("estado_pago_id", DIRECTO),
+    ("tipo_pago_id", DIRECTO),
+    ("observaciones", DIRECTO),
+    ("tipo_pago_desc", DIRECTO),
+    ("estado_pago_desc", DIRECTO),
+]
+_SELECT_PAGOS = """
+    SELECT pa.id_pago, pa.id_accion, pa.monto, pa.fecha_de_pago, pa.estado_pago, pa.tipo_pago,
+           pa.observaciones, tp.descripcion, ep.descripcion
+    FROM pago_accion pa
+    LEFT JOIN tipo_pago tp ON pa.tipo_pago = tp.id_tipo_pago
+    LEFT JOIN estado_pago ep ON pa.estado_pago = ep.id_estado_pago
+    WHERE {filtro}
+    ORDER BY {orden}
+"""
+_mapear_pago = crear_mapper(dict, _COLUMNAS_PAGO)
+
+
+def insertar_accion(db: Session, data, referencia_pasarela: Optional[str] = None) -> Accion:
+    """
+    INSERT de la acción en la transacción de `db` (sin commit). Con
+    referencia_pasarela ("stripe:pi_...", "mercadopago:123", "paypal:PAYID-...")
+    registra también el pago en pago_accion; la referencia es única, así que el
+    mismo pago no puede dar lugar a dos acciones.
+    """
+    row = db.execute(text('''
+        INSERT INTO accion (id_club, id_socio, modalidad_pago, estado_accion, certificado_pdf, certificado_cifrado, tipo_accion, cantidad_acciones, precio_unitario, total_pago, metodo_pago)
+        VALUES (:id_club, :id_socio, :modalidad_pago, :estado_accion, :certificado_pdf, :certificado_cifrado, :tipo_accion, :cantidad_acciones, :precio_unitario, :total_pago, :metodo_pago)
+        RETURNING id_accion, id_club, id_socio, modalidad_pago, estado_accion, certificado_pdf, certificado_cifrado, fecha_emision_certificado, tipo_accion, cantidad_acciones, precio_unitario, total_pago, metodo_pago, qr_data, fecha_venta, comprobante_path, fecha_comprobante
+    '''), data.dict()).fetchone()
+    accion = _mapear_accion(row)
+    if referencia_pasarela:
+        db.execute(text('''
+            INSERT INTO pago_accion (id_accion, monto, tipo_pago, estado_pago, observaciones, referencia_pasarela)
+            SELECT :id_accion, :monto, tp.id_tipo_pago, ep.id_estado_pago, :observaciones, :referencia_pasarela
+            FROM tipo_pago tp, estado_pago ep
+            WHERE tp.descripcion = 'tarjeta' AND ep.descripcion = 'pagado'
+        '''), {
+            "id_accion": accion.id_accion,
+            "monto": accion.total_pago,
+            "observaciones": f"Pago por {referencia_pasarela.partition(':')[0]}",
+            "referencia_pasarela": referencia_pasarela,
+        })
+    return accion
+
+
+def referencia_duplicada(error: Exception) -> bool:
+    """La inserción falló porque el pago de la pasarela ya tiene una acción"""
+    if not isinstance(error, IntegrityError) or getattr(error.orig, "pgcode", None) != "23505":
+        return False
+    diag = getattr(error.orig, "diag", None)
+    return getattr(diag, "constraint_name", None) == "uq_pago_accion_referencia_pasarela"
+
+
+def get_accion_por_referencia(db: Session, referencia_pasarela: str) -> Optional[int]:
+    """Acción ya creada para el pago de la pasarela ("stripe:pi_...", ...)"""
+    row = db.execute(text('''
+        SELECT id_accion FROM pago_accion WHERE referencia_pasarela = :referencia_pasarela LIMIT 1
+    '''), {"referencia_pasarela": referencia_pasarela}).fetchone()
+    return row[0] if row else None
+
 
 class AccionRepository:
     def list_acciones(self):
@@ -20,25 +118,7 @@ class AccionRepository:
             acciones = []
             for row in result:
                 # Mapear campos en el orden correcto según la clase Accion
-                accion = Accion(
-                    id_accion=row[0],
-                    id_club=row[1],
-                    id_socio=row[2],
-                    modalidad_pago=row[3],
-                    estado_accion=row[4],
-                    certificado_pdf=row[5],
-                    certificado_cifrado=row[6],
-                    fecha_emision_certificado=str(row[7]) if row[7] else None,
-                    tipo_accion=row[8],
-                    cantidad_acciones=row[11] if row[11] else 1,
-                    precio_unitario=float(row[12]) if row[12] else 0.00,
-                    total_pago=float(row[13]) if row[13] else 0.00,
-                    metodo_pago=row[14] if row[14] else "efectivo",
-                    qr_data=row[15],
-                    fecha_venta=str(row[16]) if row[16] else None,
-                    comprobante_path=row[17],
-                    fecha_comprobante=str(row[18]) if row[18] else None
-                )
+                accion = _mapear_accion_listado(row)
                 # Calcular nombre completo del socio
                 nombres = row[9] if row[9] else ""
                 apellidos = row[10] if row[10] else ""
@@ -57,25 +137,7 @@ class AccionRepository:
         try:
             result = db.execute(text("SELECT id_accion, id_club, id_socio, modalidad_pago, estado_accion, certificado_pdf, certificado_cifrado, fecha_emision_certificado, tipo_accion, cantidad_acciones, precio_unitario, total_pago, metodo_pago, qr_data, fecha_venta, comprobante_path, fecha_comprobante FROM accion WHERE id_accion = :id_accion"), {"id_accion": accion_id}).fetchone()
             if result:
-                return Accion(
-                    id_accion=result[0],
-                    id_club=result[1],
-                    id_socio=result[2],
-                    modalidad_pago=result[3],
-                    estado_accion=result[4],
-                    certificado_pdf=result[5],
-                    certificado_cifrado=result[6],
-                    fecha_emision_certificado=str(result[7]) if result[7] else None,
-                    tipo_accion=result[8],
-                    cantidad_acciones=result[9] if result[9] else 1,
-                    precio_unitario=float(result[10]) if result[10] else 0.00,
-                    total_pago=float(result[11]) if result[11] else 0.00,
-                    metodo_pago=result[12] if result[12] else "efectivo",
-                    qr_data=result[13],
-                    fecha_venta=str(result[14]) if result[14] else None,
-                    comprobante_path=result[15],
-                    fecha_comprobante=str(result[16]) if result[16] else None
-                )
+                return _mapear_accion(result)
             return None
         except Exception as e:
             import logging
@@ -84,6 +146,37 @@ class AccionRepository:
         finally:
             db.close()
 
+    def get_acceso_archivos(self, accion_id: int, usuario_id: int) -> Optional[dict]:
+        """
+        Todo lo necesario para autorizar la descarga de archivos de una acción
+        (certificado, comprobante) en una sola consulta; None si la acción no existe
+        """
+        db: Session = SessionLocal()
+        try:
+            result = db.execute(text("""
+                SELECT a.id_accion, a.id_socio, a.estado_accion, a.certificado_pdf, a.comprobante_path,
+                       (SELECT s.id_socio FROM socio s WHERE s.id_usuario = :usuario_id LIMIT 1)
+                FROM accion a
+                WHERE a.id_accion = :id_accion
+            """), {"id_accion": accion_id, "usuario_id": usuario_id}).fetchone()
+            if not result:
+                return None
+            return {
+                "id_accion": result[0],
+                "id_socio": result[1],
+                "estado_accion": result[2],
+                "certificado_pdf": result[3],
+                "comprobante_path": result[4],
+                "id_socio_usuario": result[5],
+                "es_propietario": result[5] is not None and result[5] == result[1],
+            }
+        except Exception as e:
+            import logging
+            logging.error(f"Error en get_acceso_archivos: {str(e)}")
+            raise Exception(f"Error al consultar acceso a archivos: {str(e)}")
+        finally:
+            db.close()
+
     def get_acciones_by_socio(self, socio_id: int):
         """Obtiene todas las acciones de un socio específico"""
         db: Session = SessionLocal()
@@ -100,25 +193,7 @@ class AccionRepository:
             
             acciones = []
             for row in result:
-                accion = Accion(
-                    id_accion=row[0],
-                    id_club=row[1],
-                    id_socio=row[2],
-                    modalidad_pago=row[3],
-                    estado_accion=row[4],
-                    certificado_pdf=row[5],
-                    certificado_cifrado=row[6],
-                    fecha_emision_certificado=str(row[7]) if row[7] else None,
-                    tipo_accion=row[8],
-                    cantidad_acciones=row[9] if row[9] else 1,
-                    precio_unitario=float(row[10]) if row[10] else 0.00,
-                    total_pago=float(row[11]) if row[11] else 0.00,
-                    metodo_pago=row[12] if row[12] else "efectivo",
-                    qr_data=row[13],
-                    fecha_venta=str(row[14]) if row[14] else None,
-                    comprobante_path=row[15],
-                    fecha_comprobante=str(row[16]) if row[16] else None
-                )
+                accion = _mapear_accion(row)
                 acciones.append(accion)
             return acciones
         except Exception as e:
@@ -128,35 +203,20 @@ class AccionRepository:
         finally:
             db.close()
 
-    def create_accion(self, data):
+    def create_accion(self, data, referencia_pasarela: Optional[str] = None):
         db: Session = SessionLocal()
         try:
-            result = db.execute(text('''
-                INSERT INTO accion (id_club, id_socio, modalidad_pago, estado_accion, certificado_pdf, certificado_cifrado, tipo_accion, cantidad_acciones, precio_unitario, total_pago, metodo_pago)
-                VALUES (:id_club, :id_socio, :modalidad_pago, :estado_accion, :certificado_pdf, :certificado_cifrado, :tipo_accion, :cantidad_acciones, :precio_unitario, :total_pago, :metodo_pago)
-                RETURNING id_accion, id_club, id_socio, modalidad_pago, estado_accion, certificado_pdf, certificado_cifrado, fecha_emision_certificado, tipo_accion, cantidad_acciones, precio_unitario, total_pago, metodo_pago, qr_data, fecha_venta, comprobante_path, fecha_comprobante
-            '''), data.dict())
+            accion = insertar_accion(db, data, referencia_pasarela)
             db.commit()
-            row = result.fetchone()
-            return Accion(
-                id_accion=row[0],
-                id_club=row[1],
-                id_socio=row[2],
-                modalidad_pago=row[3],
-                estado_accion=row[4],
-                certificado_pdf=row[5],
-                certificado_cifrado=row[6],
-                fecha_emision_certificado=str(row[7]) if row[7] else None,
-                tipo_accion=row[8],
-                cantidad_acciones=row[9] if row[9] else 1,
-                precio_unitario=float(row[10]) if row[10] else 0.00,
-                total_pago=float(row[11]) if row[11] else 0.00,
-                metodo_pago=row[12] if row[12] else "efectivo",
-                qr_data=row[13],
-                fecha_venta=str(row[14]) if row[14] else None,
-                comprobante_path=row[15],
-                fecha_comprobante=str(row[16]) if row[16] else None
-            )
+            return accion
+        except IntegrityError as e:
+            db.rollback()
+            if not referencia_duplicada(e):
+                import logging
+                logging.error(f"Error en create_accion: {str(e)}")
+                raise Exception(f"Error al crear acción: {str(e)}")
+            # El pago ya se registró (webhook u otra confirmación): se devuelve esa acción
+            return self.get_accion(get_accion_por_referencia(db, referencia_pasarela))
         except Exception as e:
             import logging
             logging.error(f"Error en create_accion: {str(e)}")
@@ -192,6 +252,53 @@ class AccionRepository:
         finally:
             db.close()
 
+    def registrar_comprobante(self, accion_id: int, ruta: str, sha256: str) -> Optional[List[int]]:
+        """
+        Guarda el comprobante recibido y deja la acción pendiente de confirmación.
+        Devuelve las otras acciones con un comprobante idéntico (mismo sha256), o
+        None si la acción no existe o ya no admite comprobante.
+        """
+        db: Session = SessionLocal()
+        try:
+            result = db.execute(text("""
+                UPDATE accion
+                SET estado_accion = 2, comprobante_path = :ruta, comprobante_sha256 = :sha256,
+                    fecha_comprobante = NOW()
+                WHERE id_accion = :id_accion AND estado_accion IN (1, 2)
+                RETURNING ARRAY(
+                    SELECT o.id_accion FROM accion o
+                    WHERE o.comprobante_sha256 = :sha256 AND o.id_accion <> :id_accion
+                    ORDER BY o.id_accion
+                )
+            """), {"id_accion": accion_id, "ruta": ruta, "sha256": sha256}).fetchone()
+            db.commit()
+            return list(result[0] or []) if result else None
+        except Exception as e:
+            import logging
+            logging.error(f"Error en registrar_comprobante: {str(e)}")
+            db.rollback()
+            raise Exception(f"Error al registrar comprobante: {str(e)}")
+        finally:
+            db.close()
+
+    def reemplazar_comprobante(self, accion_id: int, ruta_anterior: str, ruta_nueva: str) -> bool:
+        """Cambia la ruta del comprobante solo si sigue siendo ruta_anterior (no se subió otro)"""
+        db: Session = SessionLocal()
+        try:
+            result = db.execute(text("""
+                UPDATE accion SET comprobante_path = :ruta_nueva
+                WHERE id_accion = :id_accion AND comprobante_path = :ruta_anterior
+            """), {"id_accion": accion_id, "ruta_anterior": ruta_anterior, "ruta_nueva": ruta_nueva})
+            db.commit()
+            return result.rowcount > 0
+        except Exception as e:
+            import logging
+            logging.error(f"Error en reemplazar_comprobante: {str(e)}")
+            db.rollback()
+            raise Exception(f"Error al reemplazar comprobante: {str(e)}")
+        finally:
+            db.close()
+
     def delete_accion(self, accion_id: int):
         db: Session = SessionLocal()
         try:
@@ -205,40 +312,10 @@ class AccionRepository:
         """Obtiene todos los pagos realizados de una acción específica con información descriptiva"""
         db: Session = SessionLocal()
         try:
-            result = db.execute(text("""
-                SELECT 
-                    pa.id_pago, 
-                    pa.id_accion, 
-                    pa.monto, 
-                    pa.fecha_de_pago, 
-                    pa.estado_pago,
-                    pa.tipo_pago, 
-                    pa.observaciones,
-                    tp.descripcion as tipo_pago_desc,
-                    ep.descripcion as estado_pago_desc
-                FROM pago_accion pa
-                LEFT JOIN tipo_pago tp ON pa.tipo_pago = tp.id_tipo_pago
-                LEFT JOIN estado_pago ep ON pa.estado_pago = ep.id_estado_pago
-                WHERE pa.id_accion = :accion_id
-                ORDER BY pa.fecha_de_pago DESC
-            """), {"accion_id": accion_id}).fetchall()
-            
-            pagos = []
-            for row in result:
-                pago = {
-                    "id_pago": row[0],
-                    "id_accion": row[1],
-                    "monto": float(row[2]) if row[2] else 0.0,
-                    "fecha_pago": str(row[3]) if row[3] else None,
-                    "estado_pago_id": row[4],
-                    "tipo_pago_id": row[5],
-                    "observaciones": row[6],
-                    "tipo_pago_desc": row[7],
-                    "estado_pago_desc": row[8]
-                }
-                pagos.append(pago)
-            
-            return pagos
+            result = db.execute(text(_SELECT_PAGOS.format(
+                filtro="pa.id_accion = :accion_id", orden="pa.fecha_de_pago DESC"
+            )), {"accion_id": accion_id}).fetchall()
+            return [_mapear_pago(row) for row in result]
             
         except Exception as e:
             import logging
@@ -248,10 +325,49 @@ class AccionRepository:
         finally:
             db.close()
 
+    def get_pagos_por_accion(self):
+        """Obtiene los pagos de todas las acciones en una sola consulta, agrupados por id_accion"""
+        db: Session = SessionLocal()
+        try:
+            result = db.execute(text(_SELECT_PAGOS.format(
+                filtro="TRUE", orden="pa.id_accion, pa.fecha_de_pago DESC"
+            ))).fetchall()
+            
+            pagos_por_accion = {}
+            for row in result:
+                pagos_por_accion.setdefault(row[1], []).append(_mapear_pago(row))
+            
+            return pagos_por_accion
+            
+        except Exception as e:
+            import logging
+            logging.error(f"Error en get_pagos_por_accion: {str(e)}")
+            # Igual que get_pagos: si hay error, se listan las acciones sin pagos
+            return {}
+        finally:
+            db.close()
+
+    def get_id_estado_accion(self, nombre_estado_accion: str) -> Optional[int]:
+        """Id del estado de acción por nombre ('aprobada', ...)"""
+        db: Session = SessionLocal()
+        try:
+            row = db.execute(text("SELECT id_estado_accion FROM estado_accion WHERE nombre_estado_accion = :nombre"),
+                             {"nombre": nombre_estado_accion}).fetchone()
+            return row[0] if row else None
+        except Exception as e:
+            import logging
+            logging.error(f"Error en get_id_estado_accion: {str(e)}")
+            raise Exception(f"Error al consultar estado de acción: {str(e)}")
+        finally:
+            db.close()
+
     def get_estado_accion(self, estado_accion_id: int):
         """Obtiene el estado de acción por ID"""
         db: Session = SessionLocal()
         try:
+            estado = catalogo_cache.obtener("estado_accion", estado_accion_id)
+            if estado:
+                return estado
             result = db.execute(text("""
                 SELECT id_estado_accion, nombre_estado_accion
                 FROM estado_accion 
@@ -301,6 +417,13 @@ class AccionRepository:
         """Obtiene la modalidad de pago por ID"""
         db: Session = SessionLocal()
         try:
+            modalidad = catalogo_cache.obtener("modalidad_pago", modalidad_id)
+            if modalidad:
+                modalidad["porcentaje_renovacion_inicial"] = modalidad["porcentaje_renovacion_inicial"] or 0.0
+                modalidad["porcentaje_renovacion_mensual"] = modalidad["porcentaje_renovacion_mensual"] or 0.0
+                modalidad["costo_renovacion_estandar"] = modalidad["costo_renovacion_estandar"] or 0.0
+                modalidad["cantidad_cuotas"] = modalidad["cantidad_cuotas"] or 1
+                return modalidad
             result = db.execute(text("""
                 SELECT id_modalidad_pago, descripcion, meses_de_gracia, 
                        porcentaje_renovacion_inicial, porcentaje_renovacion_mensual, 
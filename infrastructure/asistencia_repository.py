@@ -2,7 +2,31 @@ from domain.asistencia import Asistencia
 from sqlalchemy.orm import Session
 from sqlalchemy import text
 from config import SessionLocal
-from typing import Optional
+from typing import Optional, List
+import logging
+from infrastructure.row_mapper import crear_mapper, DIRECTO, TEXTO, OPCIONAL
+
+_COLUMNAS_ASISTENCIA = [
+    ("id_asistencia", DIRECTO),
+    ("id_personal", DIRECTO),
+    ("fecha", 'str({v}) if {v} else "1900-01-01"'),
+    ("hora_ingreso", TEXTO),
+    ("hora_salida", TEXTO),
+    ("observaciones", OPCIONAL),
+    ("estado", OPCIONAL),
+]
+
+# SELECT id_asistencia, id_personal, fecha, hora_ingreso, hora_salida, observaciones, estado
+_mapear_asistencia = crear_mapper(Asistencia, _COLUMNAS_ASISTENCIA)
+# Igual, más el nombre del empleado (JOIN con personal)
+_mapear_asistencia_listado = crear_mapper(Asistencia, _COLUMNAS_ASISTENCIA + [("nombre_empleado", OPCIONAL)])
+
+# Un registro por empleado y día (create_asistencia_lote.sql). Al repetirse el
+# día se conserva el primer ingreso y la última salida entre lo guardado y lo recibido
+_INGRESO_FUSIONADO = "LEAST(asistencia.hora_ingreso, EXCLUDED.hora_ingreso)"
+_SALIDA_FUSIONADA = f"""NULLIF(
+    GREATEST(asistencia.hora_ingreso, asistencia.hora_salida, EXCLUDED.hora_ingreso, EXCLUDED.hora_salida),
+    {_INGRESO_FUSIONADO})"""
 
 class AsistenciaRepository:
     def list_asistencias(self):
@@ -24,25 +48,7 @@ class AsistenciaRepository:
                 ORDER BY a.fecha DESC, a.hora_ingreso DESC
             """)).fetchall()
             
-            asistencias = []
-            for row in result:
-                # Convertir tipos de datos de datetime a string, manejando None correctamente
-                fecha = str(row[2]) if row[2] else "1900-01-01"
-                hora_ingreso = str(row[3]) if row[3] else None
-                hora_salida = str(row[4]) if row[4] else None
-                
-                asistencia = Asistencia(
-                    id_asistencia=row[0],
-                    id_personal=row[1],
-                    fecha=fecha,
-                    hora_ingreso=hora_ingreso,
-                    hora_salida=hora_salida,
-                    observaciones=row[5] if row[5] else None,
-                    estado=row[6] if row[6] else None,
-                    nombre_empleado=row[7] if row[7] else None
-                )
-                asistencias.append(asistencia)
-            return asistencias
+            return [_mapear_asistencia_listado(row) for row in result]
         finally:
             db.close()
 
@@ -66,34 +72,26 @@ class AsistenciaRepository:
                 ORDER BY a.fecha DESC, a.hora_ingreso DESC
             """), {"id_personal": id_personal}).fetchall()
             
-            asistencias = []
-            for row in result:
-                # Convertir tipos de datos de datetime a string, manejando None correctamente
-                fecha = str(row[2]) if row[2] else "1900-01-01"
-                hora_ingreso = str(row[3]) if row[3] else None
-                hora_salida = str(row[4]) if row[4] else None
-                
-                asistencia = Asistencia(
-                    id_asistencia=row[0],
-                    id_personal=row[1],
-                    fecha=fecha,
-                    hora_ingreso=hora_ingreso,
-                    hora_salida=hora_salida,
-                    observaciones=row[5] if row[5] else None,
-                    estado=row[6] if row[6] else None,
-                    nombre_empleado=row[7] if row[7] else None
-                )
-                asistencias.append(asistencia)
-            return asistencias
+            return [_mapear_asistencia_listado(row) for row in result]
         finally:
             db.close()
 
     def create_asistencia(self, data):
+        """
+        Registra la asistencia del día. Si el empleado ya tiene registro ese día
+        se fusiona con él (como la carga en lote); observaciones y estado se
+        reemplazan solo si vienen informados
+        """
         db: Session = SessionLocal()
         try:
-            result = db.execute(text('''
+            result = db.execute(text(f'''
                 INSERT INTO asistencia (id_personal, fecha, hora_ingreso, hora_salida, observaciones, estado)
                 VALUES (:id_personal, :fecha, :hora_ingreso, :hora_salida, :observaciones, :estado)
+                ON CONFLICT (id_personal, fecha) DO UPDATE
+                SET hora_ingreso = {_INGRESO_FUSIONADO},
+                    hora_salida = {_SALIDA_FUSIONADA},
+                    observaciones = COALESCE(EXCLUDED.observaciones, asistencia.observaciones),
+                    estado = COALESCE(EXCLUDED.estado, asistencia.estado)
                 RETURNING id_asistencia, id_personal, fecha, hora_ingreso, hora_salida, observaciones, estado
             '''), data.dict())
             db.commit()
@@ -102,21 +100,9 @@ class AsistenciaRepository:
             # Obtener el nombre del empleado
             nombre_empleado = self._get_nombre_empleado(db, row[1])
             
-            # Convertir tipos de datos de datetime a string, manejando None correctamente
-            fecha = str(row[2]) if row[2] else "1900-01-01"
-            hora_ingreso = str(row[3]) if row[3] else None
-            hora_salida = str(row[4]) if row[4] else None
-            
-            return Asistencia(
-                id_asistencia=row[0],
-                id_personal=row[1],
-                fecha=fecha,
-                hora_ingreso=hora_ingreso,
-                hora_salida=hora_salida,
-                observaciones=row[5] if row[5] else None,
-                estado=row[6] if row[6] else None,
-                nombre_empleado=nombre_empleado
-            )
+            asistencia = _mapear_asistencia(row)
+            asistencia.nombre_empleado = nombre_empleado
+            return asistencia
         finally:
             db.close()
 
@@ -137,25 +123,62 @@ class AsistenciaRepository:
                 # Obtener el nombre del empleado
                 nombre_empleado = self._get_nombre_empleado(db, result[1])
                 
-                # Convertir tipos de datos de datetime a string, manejando None correctamente
-                fecha = str(result[2]) if result[2] else "1900-01-01"
-                hora_ingreso = str(result[3]) if result[3] else None
-                hora_salida = str(result[4]) if result[4] else None
-                
-                return Asistencia(
-                    id_asistencia=result[0],
-                    id_personal=result[1],
-                    fecha=fecha,
-                    hora_ingreso=hora_ingreso,
-                    hora_salida=hora_salida,
-                    observaciones=result[5] if result[5] else None,
-                    estado=result[6] if result[6] else None,
-                    nombre_empleado=nombre_empleado
-                )
+                asistencia = _mapear_asistencia(result)
+                asistencia.nombre_empleado = nombre_empleado
+                return asistencia
             return None
         finally:
             db.close()
     
+    def upsert_asistencias_lote(self, registros: List[dict]) -> dict:
+        """
+        Guarda en una sola sentencia la asistencia de varios empleados y días
+        (un registro por id_personal y fecha, con hora_ingreso y hora_salida).
+        Si el día ya existe se conserva el primer ingreso y la última salida
+        entre lo guardado y lo recibido; las filas que no cambian no se tocan.
+        Requiere el índice único de create_asistencia_lote.sql.
+        """
+        if not registros:
+            return {"insertadas": 0, "actualizadas": 0, "personal_inexistente": []}
+        db: Session = SessionLocal()
+        try:
+            row = db.execute(text(f'''
+                WITH entrada AS (
+                    SELECT * FROM unnest(
+                        CAST(:id_personal AS BIGINT[]), CAST(:fecha AS DATE[]),
+                        CAST(:hora_ingreso AS TIME[]), CAST(:hora_salida AS TIME[])
+                    ) AS e(id_personal, fecha, hora_ingreso, hora_salida)
+                ),
+                escritas AS (
+                    INSERT INTO asistencia (id_personal, fecha, hora_ingreso, hora_salida)
+                    SELECT e.id_personal, e.fecha, e.hora_ingreso, e.hora_salida
+                    FROM entrada e
+                    WHERE EXISTS (SELECT 1 FROM personal p WHERE p.id_personal = e.id_personal)
+                    ON CONFLICT (id_personal, fecha) DO UPDATE
+                    SET hora_ingreso = {_INGRESO_FUSIONADO},
+                        hora_salida = {_SALIDA_FUSIONADA}
+                    WHERE (asistencia.hora_ingreso, asistencia.hora_salida)
+                          IS DISTINCT FROM ({_INGRESO_FUSIONADO}, {_SALIDA_FUSIONADA})
+                    RETURNING (xmax = 0) AS insertada
+                )
+                SELECT
+                    (SELECT count(*) FROM escritas WHERE insertada) AS insertadas,
+                    (SELECT count(*) FROM escritas WHERE NOT insertada) AS actualizadas,
+                    ARRAY(
+                        SELECT DISTINCT e.id_personal FROM entrada e
+                        WHERE NOT EXISTS (SELECT 1 FROM personal p WHERE p.id_personal = e.id_personal)
+                    ) AS personal_inexistente
+            '''), {columna: [registro.get(columna) for registro in registros]
+                  for columna in ("id_personal", "fecha", "hora_ingreso", "hora_salida")}).fetchone()
+            db.commit()
+            return {"insertadas": row[0], "actualizadas": row[1], "personal_inexistente": list(row[2] or [])}
+        except Exception as e:
+            logging.error(f"Error en upsert_asistencias_lote: {str(e)}")
+            db.rollback()
+            raise Exception(f"Error al guardar asistencias en lote: {str(e)}")
+        finally:
+            db.close()
+
     def _get_nombre_empleado(self, db: Session, id_personal: int) -> Optional[str]:
         """Obtiene el nombre completo del empleado basado en el ID"""
         try:
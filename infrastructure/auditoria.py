@@ -0,0 +1,279 @@
+"""
+Auditoría asíncrona en logs_sistema.
+
+Los registros de auditoría no se escriben en la petición: se dejan en una cola
+acotada en memoria y un hilo los inserta en lote (LogRepository.create_logs_lote)
+cada AUDITORIA_INTERVALO_MS o al juntar AUDITORIA_LOTE registros. Al detener la
+API se vacía la cola.
+
+- Contrapresión: si la cola está llena, `registrar()` espera como máximo
+  AUDITORIA_ESPERA_MS; pasado ese tiempo el registro se descarta y se cuenta
+  (las peticiones nunca quedan bloqueadas por la base de datos de auditoría).
+- `AuditoriaMiddleware` audita automáticamente las escrituras autenticadas
+  (POST / PUT / PATCH / DELETE) con usuario, ruta, estado, IP y User-Agent, y
+  deja esos metadatos en un contextvar para los registros explícitos. Dentro de
+  una petición la IP y el User-Agent son siempre los capturados aquí; la
+  cabecera X-Forwarded-For solo se acepta de AUDITORIA_PROXIES_CONFIABLES.
+- Si un lote no se puede escribir, se reintenta y después se escribe registro
+  por registro: solo se descartan los que fallan.
+"""
+
+import contextvars
+import ipaddress
+import logging
+import queue
+import re
+import threading
+import time
+from datetime import datetime, timezone
+from typing import Dict, List, Optional
+
+import jwt
+
+from config import (
+    SECRET_KEY, ALGORITHM, AUDITORIA_LOTE, AUDITORIA_INTERVALO_MS, AUDITORIA_COLA_MAXIMA,
+    AUDITORIA_ESPERA_MS, AUDITORIA_AUTOMATICA, AUDITORIA_PROXIES_CONFIABLES,
+)
+from infrastructure.log_repository import LogRepository
+
+METODOS_AUDITADOS = {"POST", "PUT", "PATCH", "DELETE"}
+# Rutas que ya registran su propia auditoría o no tienen usuario
+RUTAS_EXCLUIDAS = re.compile(r"^/(logs/?$|login|register|acciones/(stripe|mercadopago)/webhook)")
+INTENTOS_LOTE = 3
+MAXIMO_BIGINT = 2 ** 63 - 1
+_PROXIES_CONFIABLES = [ipaddress.ip_network(red, strict=False) for red in AUDITORIA_PROXIES_CONFIABLES]
+
+# Metadatos de la petición en curso (ip_address, user_agent, id_usuario)
+contexto_peticion: contextvars.ContextVar[Optional[Dict]] = contextvars.ContextVar("contexto_peticion", default=None)
+
+
+def _ip_valida(ip: Optional[str]) -> Optional[str]:
+    """La columna es INET: valores que no son IP (p. ej. 'testclient') se guardan como NULL"""
+    if not ip:
+        return None
+    try:
+        return str(ipaddress.ip_address(ip))
+    except ValueError:
+        return None
+
+
+def _es_proxy_confiable(ip: Optional[str]) -> bool:
+    try:
+        direccion = ipaddress.ip_address(ip)
+    except (TypeError, ValueError):
+        return False
+    return any(direccion in red for red in _PROXIES_CONFIABLES)
+
+
+def ip_cliente(cliente: Optional[str], reenviada: str) -> Optional[str]:
+    """
+    IP del cliente: la de la conexión, salvo que venga de un proxy confiable. En
+    ese caso se recorre X-Forwarded-For de derecha a izquierda saltando los
+    proxies confiables (lo que está más a la izquierda lo escribe el cliente)
+    """
+    ip = cliente
+    if reenviada and _es_proxy_confiable(cliente):
+        for salto in reversed([s.strip() for s in reenviada.split(",") if s.strip()]):
+            ip = salto
+            if not _es_proxy_confiable(salto):
+                break
+    return ip
+
+
+class ColaAuditoria:
+    def __init__(self, repository: Optional[LogRepository] = None, lote: int = AUDITORIA_LOTE,
+                 intervalo_ms: int = AUDITORIA_INTERVALO_MS, maximo: int = AUDITORIA_COLA_MAXIMA,
+                 espera_ms: int = AUDITORIA_ESPERA_MS):
+        self.repository = repository or LogRepository()
+        self.lote = lote
+        self.intervalo = intervalo_ms / 1000
+        self.espera = espera_ms / 1000
+        self._cola: "queue.Queue[dict]" = queue.Queue(maxsize=maximo)
+        self._detener = threading.Event()
+        self._hilo: Optional[threading.Thread] = None
+        self._lock = threading.Lock()
+        self.escritos = 0
+        self.descartados = 0
+
+    def registrar(self, id_usuario: int, accion_realizada: str, modulo_o_tabla_afectada: str,
+                  id_afectado: Optional[int] = None, descripcion_detallada: Optional[str] = None,
+                  ip_address: Optional[str] = None, user_agent: Optional[str] = None,
+                  bloquear: bool = True, fecha_y_hora: Optional[datetime] = None) -> bool:
+        """
+        Encola un registro. Dentro de una petición la IP y el User-Agent son los
+        de la petición en curso (ip_address / user_agent solo se usan fuera de
+        una petición, p. ej. en jobs). `fecha_y_hora` (UTC) es ahora si no se indica.
+        Devuelve False si se descartó por cola llena.
+        """
+        contexto = contexto_peticion.get()
+        if contexto is not None:
+            ip_address, user_agent = contexto.get("ip_address"), contexto.get("user_agent")
+        registro = {
+            "id_usuario": id_usuario,
+            "accion_realizada": accion_realizada,
+            "fecha_y_hora": fecha_y_hora or datetime.now(timezone.utc),
+            "modulo_o_tabla_afectada": modulo_o_tabla_afectada,
+            "id_afectado": id_afectado,
+            "descripcion_detallada": descripcion_detallada,
+            "ip_address": _ip_valida(ip_address),
+            "user_agent": user_agent,
+        }
+        try:
+            if bloquear:
+                self._cola.put(registro, timeout=self.espera)
+            else:
+                self._cola.put_nowait(registro)
+            return True
+        except queue.Full:
+            with self._lock:
+                self.descartados += 1
+                descartados = self.descartados
+            if descartados == 1 or descartados % 1000 == 0:
+                logging.warning(f"Cola de auditoría llena: {descartados} registros descartados")
+            return False
+
+    def iniciar(self):
+        if self._hilo:
+            return
+        self._detener.clear()
+        self._hilo = threading.Thread(target=self._trabajar, name="auditoria", daemon=True)
+        self._hilo.start()
+
+    def detener(self):
+        """Detiene el hilo después de escribir todo lo que quedaba en la cola"""
+        self._detener.set()
+        if self._hilo:
+            self._hilo.join(timeout=30)
+            self._hilo = None
+
+    def estadisticas(self) -> dict:
+        with self._lock:
+            return {"en_cola": self._cola.qsize(), "escritos": self.escritos, "descartados": self.descartados}
+
+    def _tomar_lote(self) -> List[dict]:
+        """Espera hasta juntar un lote o hasta que venza el intervalo desde el primer registro"""
+        try:
+            lote = [self._cola.get(timeout=self.intervalo)]
+        except queue.Empty:
+            return []
+        limite = time.monotonic() + self.intervalo
+        while len(lote) < self.lote:
+            restante = limite - time.monotonic()
+            if restante <= 0 or self._detener.is_set():
+                break
+            try:
+                lote.append(self._cola.get(timeout=restante))
+            except queue.Empty:
+                break
+        # Lo que ya está en cola entra sin esperar
+        while len(lote) < self.lote:
+            try:
+                lote.append(self._cola.get_nowait())
+            except queue.Empty:
+                break
+        return lote
+
+    def _trabajar(self):
+        pendiente: List[dict] = []
+        intentos = 0
+        while True:
+            deteniendo = self._detener.is_set()
+            if not pendiente:
+                pendiente = self._tomar_lote()
+                intentos = 0
+            if pendiente:
+                try:
+                    self.repository.create_logs_lote(pendiente)
+                    with self._lock:
+                        self.escritos += len(pendiente)
+                    pendiente = []
+                except Exception as e:
+                    intentos += 1
+                    logging.error(f"Error escribiendo lote de auditoría (intento {intentos}): {str(e)}")
+                    if intentos >= INTENTOS_LOTE or deteniendo:
+                        self._escribir_por_registro(pendiente)
+                        pendiente = []
+                    else:
+                        self._detener.wait(self.intervalo)
+            elif deteniendo and self._cola.empty():
+                return
+
+    def _escribir_por_registro(self, registros: List[dict]):
+        """Último recurso de un lote fallido: un registro inválido no arrastra a los demás"""
+        escritos = 0
+        for registro in registros:
+            try:
+                self.repository.create_logs_lote([registro])
+                escritos += 1
+            except Exception as e:
+                logging.error(f"Registro de auditoría descartado ({registro['accion_realizada']} "
+                              f"{registro['modulo_o_tabla_afectada']}): {str(e)}")
+        with self._lock:
+            self.escritos += escritos
+            self.descartados += len(registros) - escritos
+
+
+class AuditoriaMiddleware:
+    """Middleware ASGI: guarda los metadatos de la petición y audita las escrituras autenticadas"""
+
+    def __init__(self, app, cola: Optional[ColaAuditoria] = None):
+        self.app = app
+        self.cola = cola
+
+    async def __call__(self, scope, receive, send):
+        if scope["type"] != "http":
+            await self.app(scope, receive, send)
+            return
+
+        cabeceras = {}
+        for nombre, valor in scope.get("headers", []):
+            if nombre in (b"authorization", b"user-agent", b"x-forwarded-for"):
+                cabeceras[nombre] = valor.decode("latin-1")
+        cliente = scope.get("client")
+        contexto = {
+            "ip_address": ip_cliente(cliente[0] if cliente else None, cabeceras.get(b"x-forwarded-for", "")),
+            "user_agent": cabeceras.get(b"user-agent"),
+        }
+        token = contexto_peticion.set(contexto)
+
+        estado = {}
+
+        async def send_con_estado(mensaje):
+            if mensaje["type"] == "http.response.start":
+                estado["codigo"] = mensaje["status"]
+            await send(mensaje)
+
+        try:
+            await self.app(scope, receive, send_con_estado)
+        finally:
+            contexto_peticion.reset(token)
+            if (AUDITORIA_AUTOMATICA and scope["method"] in METODOS_AUDITADOS
+                    and not RUTAS_EXCLUIDAS.match(scope["path"])):
+                self._auditar(scope, cabeceras.get(b"authorization", ""), estado.get("codigo", 500), contexto)
+
+    def _auditar(self, scope, autorizacion: str, codigo: int, contexto: dict):
+        if not autorizacion.startswith("Bearer "):
+            return
+        try:
+            payload = jwt.decode(autorizacion[7:], SECRET_KEY, algorithms=[ALGORITHM])
+        except jwt.PyJWTError:
+            return
+        id_usuario = payload.get("id_usuario")
+        if id_usuario is None:
+            return
+
+        segmentos = [s for s in scope["path"].split("/") if s]
+        id_afectado = next((int(s) for s in segmentos if s.isdigit() and int(s) <= MAXIMO_BIGINT), None)
+        (self.cola or cola_auditoria).registrar(
+            id_usuario=id_usuario,
+            accion_realizada=scope["method"],
+            modulo_o_tabla_afectada=segmentos[0] if segmentos else "/",
+            id_afectado=id_afectado,
+            descripcion_detallada=f"{scope['method']} {scope['path']} -> {codigo}",
+            ip_address=contexto["ip_address"],
+            user_agent=contexto["user_agent"],
+            bloquear=False,
+        )
+
+
+cola_auditoria = ColaAuditoria()
@@ -1,36 +1,135 @@
 from sqlalchemy.orm import Session
-from sqlalchemy import text, func
-from config import SessionLocal
+from config import SessionLocal, BI_ETL_FRESCURA_MINUTOS
+from infrastructure.etl_bi_repository import EtlBiRepository
+from infrastructure.bi_consultas import ConsultaBI, opcional, rango_anual, resolver_periodo
 from typing import Dict, List, Optional
 import logging
 from datetime import datetime, date, timedelta
 from decimal import Decimal
 
+# Filtros opcionales (NULL = todos): el texto de cada sentencia es siempre el mismo
+_METRICAS_FINANCIERAS = ConsultaBI("administrativo_metricas_financieras", f"""
+    SELECT 
+        COALESCE(SUM(CASE WHEN mf.tipo_movimiento = 'INGRESO' THEN mf.monto ELSE 0 END), 0) as ingresos,
+        COALESCE(SUM(CASE WHEN mf.tipo_movimiento = 'EGRESO' THEN mf.monto ELSE 0 END), 0) as egresos,
+        COUNT(*) as total_movimientos
+    FROM movimiento_financiero mf
+    WHERE mf.fecha >= :fecha_inicio AND mf.fecha < :fecha_fin AND mf.estado = 'confirmado'
+      AND {opcional("mf.id_club", "club")}
+""", fecha_inicio="DATE", fecha_fin="DATE", club="BIGINT")
+
+_METRICAS_SOCIOS = ConsultaBI("administrativo_metricas_socios", f"""
+    SELECT 
+        COUNT(*) as total,
+        COUNT(CASE WHEN s.estado = 1 THEN 1 END) as activos,
+        COUNT(CASE WHEN s.estado != 1 THEN 1 END) as inactivos
+    FROM socio s
+    WHERE {opcional("s.id_club", "club")}
+""", club="BIGINT")
+
+_TOP_CLUBES = ConsultaBI("administrativo_top_clubes", """
+    SELECT 
+        c.id_club,
+        c.nombre_club,
+        COALESCE(SUM(CASE WHEN mf.tipo_movimiento = 'INGRESO' THEN mf.monto ELSE 0 END), 0) as ingresos,
+        COALESCE(SUM(CASE WHEN mf.tipo_movimiento = 'EGRESO' THEN mf.monto ELSE 0 END), 0) as egresos,
+        COUNT(DISTINCT s.id_socio) as socios_activos,
+        COUNT(DISTINCT a.id_accion) as acciones_vendidas
+    FROM club c
+    LEFT JOIN movimiento_financiero mf ON c.id_club = mf.id_club 
+        AND mf.fecha >= :fecha_inicio AND mf.fecha < :fecha_fin AND mf.estado = 'confirmado'
+    LEFT JOIN socio s ON c.id_club = s.id_club AND s.estado = 1
+    LEFT JOIN accion a ON c.id_club = a.id_club
+    GROUP BY c.id_club, c.nombre_club
+    ORDER BY ingresos DESC
+    LIMIT 10
+""", fecha_inicio="DATE", fecha_fin="DATE")
+
+_TOP_SOCIOS = ConsultaBI("administrativo_top_socios", f"""
+    SELECT 
+        s.id_socio,
+        CONCAT(s.nombres, ' ', s.apellidos) as nombre_completo,
+        c.nombre_club,
+        COUNT(a.id_accion) as acciones_compradas,
+        COALESCE(SUM(COALESCE(a.saldo_pendiente, 0)), 0) as total_invertido,
+        CASE 
+            WHEN COUNT(a.id_accion) = 0 THEN 'SIN_ACCIONES'
+            WHEN COUNT(pa.id_pago) = 0 THEN 'SIN_PAGOS'
+            WHEN COUNT(pa.id_pago) = COUNT(a.id_accion) THEN 'COMPLETAMENTE_PAGADO'
+            ELSE 'PAGO_PARCIAL'
+        END as estado_pagos,
+        EXTRACT(MONTH FROM AGE(CURRENT_DATE, s.fecha_de_registro)) as antiguedad_meses
+    FROM socio s
+    LEFT JOIN club c ON s.id_club = c.id_club
+    LEFT JOIN accion a ON s.id_socio = a.id_socio
+    LEFT JOIN pago_accion pa ON a.id_accion = pa.id_accion
+    WHERE a.id_accion IS NOT NULL
+      AND {opcional("s.id_club", "club")}
+    GROUP BY s.id_socio, s.nombres, s.apellidos, c.nombre_club, s.fecha_de_registro
+    ORDER BY total_invertido DESC
+    LIMIT 10
+""", club="BIGINT")
+
+_CATEGORIA = """
+    CASE
+        WHEN mf.id_compra IS NOT NULL THEN 'Compras'
+        WHEN mf.descripcion ILIKE '%cuota%' THEN 'Cuotas'
+        WHEN mf.descripcion ILIKE '%donación%' THEN 'Donaciones'
+        WHEN mf.descripcion ILIKE '%evento%' THEN 'Eventos'
+        WHEN mf.descripcion ILIKE '%servicio%' THEN 'Servicios'
+        WHEN mf.descripcion ILIKE '%compra%' THEN 'Compras'
+        WHEN mf.descripcion ILIKE '%material%' THEN 'Materiales'
+        ELSE 'Otros'
+    END"""
+
+_DISTRIBUCION_FINANCIERA = ConsultaBI("administrativo_distribucion_financiera", f"""
+    SELECT 
+        {_CATEGORIA} as categoria,
+        SUM(mf.monto) as monto_total,
+        COUNT(*) as cantidad_movimientos
+    FROM movimiento_financiero mf
+    WHERE mf.tipo_movimiento = UPPER(:tipo) AND mf.fecha >= :fecha_inicio AND mf.fecha < :fecha_fin
+      AND mf.estado = 'confirmado'
+      AND {opcional("mf.id_club", "club")}
+    GROUP BY 1
+    ORDER BY monto_total DESC
+""", tipo="TEXT", fecha_inicio="DATE", fecha_fin="DATE", club="BIGINT")
+
+_TENDENCIAS_CONSOLIDADAS = ConsultaBI("administrativo_tendencias_consolidadas", f"""
+    SELECT 
+        fr.mes,
+        COALESCE(SUM(CASE WHEN fr.tipo_movimiento = 'INGRESO' THEN fr.monto_total ELSE 0 END), 0) as ingresos,
+        COALESCE(SUM(CASE WHEN fr.tipo_movimiento = 'EGRESO' THEN fr.monto_total ELSE 0 END), 0) as egresos,
+        SUM(fr.cantidad_movimientos) as movimientos
+    FROM finanzas_resumen fr
+    WHERE fr.fecha_mes >= :fecha_inicio AND fr.fecha_mes < :fecha_fin
+      AND {opcional("fr.id_club", "club")}
+    GROUP BY fr.mes
+    ORDER BY fr.mes
+""", fecha_inicio="DATE", fecha_fin="DATE", club="BIGINT")
+
+_TENDENCIAS = ConsultaBI("administrativo_tendencias", f"""
+    SELECT 
+        EXTRACT(MONTH FROM mf.fecha) as mes,
+        COALESCE(SUM(CASE WHEN mf.tipo_movimiento = 'INGRESO' THEN mf.monto ELSE 0 END), 0) as ingresos,
+        COALESCE(SUM(CASE WHEN mf.tipo_movimiento = 'EGRESO' THEN mf.monto ELSE 0 END), 0) as egresos,
+        COUNT(*) as movimientos
+    FROM movimiento_financiero mf
+    WHERE mf.fecha >= :fecha_inicio AND mf.fecha < :fecha_fin AND mf.estado = 'confirmado'
+      AND {opcional("mf.id_club", "club")}
+    GROUP BY EXTRACT(MONTH FROM mf.fecha)
+    ORDER BY mes
+""", fecha_inicio="DATE", fecha_fin="DATE", club="BIGINT")
+
 class BIAdministrativoRepository:
     def get_dashboard_completo(self, mes: Optional[int] = None, anio: Optional[int] = None, 
                               club: Optional[int] = None) -> Dict:
         """Obtiene dashboard completo administrativo y financiero"""
         db: Session = SessionLocal()
         try:
-            # Determinar período
-            if mes and anio:
-                periodo = f"{anio:04d}-{mes:02d}"
-                fecha_inicio = f"{anio:04d}-{mes:02d}-01"
-                if mes == 12:
-                    fecha_fin = f"{anio+1:04d}-01-01"
-                else:
-                    fecha_fin = f"{anio:04d}-{mes+1:02d}-01"
-            else:
-                # Período actual
-                now = datetime.now()
-                mes = now.month
-                anio = now.year
-                periodo = f"{anio:04d}-{mes:02d}"
-                fecha_inicio = f"{anio:04d}-{mes:02d}-01"
-                if mes == 12:
-                    fecha_fin = f"{anio+1:04d}-01-01"
-                else:
-                    fecha_fin = f"{anio:04d}-{mes+1:02d}-01"
+            # Determinar período (mes actual si no se indica)
+            periodo = resolver_periodo(mes, anio)
+            fecha_inicio, fecha_fin = periodo.inicio, periodo.fin
 
             # Métricas financieras
             metricas_financieras = self._get_metricas_financieras(db, fecha_inicio, fecha_fin, club)
@@ -52,13 +151,13 @@ class BIAdministrativoRepository:
             kpis_principales = self._get_kpis_principales(db, fecha_inicio, fecha_fin, club)
 
             # Tendencias mensuales
-            tendencias = self._get_tendencias_mensuales(db, anio, club)
+            tendencias = self._get_tendencias_mensuales(db, periodo.anio, club)
 
             # Alertas críticas
             alertas = self._get_alertas_criticas(db, fecha_inicio, fecha_fin, club)
 
             return {
-                "periodo": periodo,
+                "periodo": periodo.etiqueta,
                 "metricas_financieras": metricas_financieras,
                 "metricas_administrativas": metricas_administrativas,
                 "top_clubes": top_clubes,
@@ -76,25 +175,12 @@ class BIAdministrativoRepository:
         finally:
             db.close()
 
-    def _get_metricas_financieras(self, db: Session, fecha_inicio: str, fecha_fin: str, 
+    def _get_metricas_financieras(self, db: Session, fecha_inicio: date, fecha_fin: date, 
                                  club: Optional[int] = None) -> Dict:
         """Obtiene métricas financieras principales"""
         try:
-            where_clause = "WHERE mf.fecha >= :fecha_inicio AND mf.fecha < :fecha_fin"
-            params = {"fecha_inicio": fecha_inicio, "fecha_fin": fecha_fin}
-            
-            if club:
-                where_clause += " AND mf.id_club = :club"
-                params['club'] = club
-
-            result = db.execute(text(f"""
-                SELECT 
-                    COALESCE(SUM(CASE WHEN mf.tipo_movimiento = 'INGRESO' THEN mf.monto ELSE 0 END), 0) as ingresos,
-                    COALESCE(SUM(CASE WHEN mf.tipo_movimiento = 'EGRESO' THEN mf.monto ELSE 0 END), 0) as egresos,
-                    COUNT(*) as total_movimientos
-                FROM movimiento_financiero mf
-                {where_clause}
-            """), params).fetchone()
+            result = _METRICAS_FINANCIERAS.ejecutar(
+                db, fecha_inicio=fecha_inicio, fecha_fin=fecha_fin, club=club).fetchone()
 
             ingresos = Decimal(str(result[0])) if result[0] else Decimal('0')
             egresos = Decimal(str(result[1])) if result[1] else Decimal('0')
@@ -124,26 +210,12 @@ class BIAdministrativoRepository:
                 "proyeccion_mensual": Decimal('0')
             }
 
-    def _get_metricas_administrativas(self, db: Session, fecha_inicio: str, fecha_fin: str, 
+    def _get_metricas_administrativas(self, db: Session, fecha_inicio: date, fecha_fin: date, 
                                      club: Optional[int] = None) -> Dict:
         """Obtiene métricas administrativas principales"""
         try:
-            where_clause = "WHERE 1=1"
-            params = {}
-            
-            if club:
-                where_clause += " AND s.id_club = :club"
-                params['club'] = club
-
             # Total socios
-            result = db.execute(text(f"""
-                SELECT 
-                    COUNT(*) as total,
-                    COUNT(CASE WHEN s.estado = 1 THEN 1 END) as activos,
-                    COUNT(CASE WHEN s.estado != 1 THEN 1 END) as inactivos
-                FROM socio s
-                {where_clause}
-            """), params).fetchone()
+            result = _METRICAS_SOCIOS.ejecutar(db, club=club).fetchone()
 
             total = result[0] or 0
             activos = result[1] or 0
@@ -176,26 +248,10 @@ class BIAdministrativoRepository:
                 "eficiencia_operativa": 0.0
             }
 
-    def _get_top_clubes(self, db: Session, fecha_inicio: str, fecha_fin: str) -> List[Dict]:
+    def _get_top_clubes(self, db: Session, fecha_inicio: date, fecha_fin: date) -> List[Dict]:
         """Obtiene top clubes por rendimiento"""
         try:
-            result = db.execute(text("""
-                SELECT 
-                    c.id_club,
-                    c.nombre_club,
-                    COALESCE(SUM(CASE WHEN mf.tipo_movimiento = 'INGRESO' THEN mf.monto ELSE 0 END), 0) as ingresos,
-                    COALESCE(SUM(CASE WHEN mf.tipo_movimiento = 'EGRESO' THEN mf.monto ELSE 0 END), 0) as egresos,
-                    COUNT(DISTINCT s.id_socio) as socios_activos,
-                    COUNT(DISTINCT a.id_accion) as acciones_vendidas
-                FROM club c
-                LEFT JOIN movimiento_financiero mf ON c.id_club = mf.id_club 
-                    AND mf.fecha >= :fecha_inicio AND mf.fecha < :fecha_fin
-                LEFT JOIN socio s ON c.id_club = s.id_club AND s.estado = 1
-                LEFT JOIN accion a ON c.id_club = a.id_club
-                GROUP BY c.id_club, c.nombre_club
-                ORDER BY ingresos DESC
-                LIMIT 10
-            """), {"fecha_inicio": fecha_inicio, "fecha_fin": fecha_fin}).fetchall()
+            result = _TOP_CLUBES.ejecutar(db, fecha_inicio=fecha_inicio, fecha_fin=fecha_fin).fetchall()
 
             clubes = []
             for row in result:
@@ -221,40 +277,11 @@ class BIAdministrativoRepository:
             logging.error(f"Error en _get_top_clubes: {str(e)}")
             return []
 
-    def _get_top_socios(self, db: Session, fecha_inicio: str, fecha_fin: str, 
+    def _get_top_socios(self, db: Session, fecha_inicio: date, fecha_fin: date, 
                         club: Optional[int] = None) -> List[Dict]:
         """Obtiene top socios por inversión"""
         try:
-            where_clause = "WHERE a.id_accion IS NOT NULL"
-            params = {"fecha_inicio": fecha_inicio, "fecha_fin": fecha_fin}
-            
-            if club:
-                where_clause += " AND s.id_club = :club"
-                params['club'] = club
-
-            result = db.execute(text(f"""
-                SELECT 
-                    s.id_socio,
-                    CONCAT(s.nombres, ' ', s.apellidos) as nombre_completo,
-                    c.nombre_club,
-                    COUNT(a.id_accion) as acciones_compradas,
-                    COALESCE(SUM(COALESCE(a.saldo_pendiente, 0)), 0) as total_invertido,
-                    CASE 
-                        WHEN COUNT(a.id_accion) = 0 THEN 'SIN_ACCIONES'
-                        WHEN COUNT(pa.id_pago) = 0 THEN 'SIN_PAGOS'
-                        WHEN COUNT(pa.id_pago) = COUNT(a.id_accion) THEN 'COMPLETAMENTE_PAGADO'
-                        ELSE 'PAGO_PARCIAL'
-                    END as estado_pagos,
-                    EXTRACT(MONTH FROM AGE(CURRENT_DATE, s.fecha_de_registro)) as antiguedad_meses
-                FROM socio s
-                LEFT JOIN club c ON s.id_club = c.id_club
-                LEFT JOIN accion a ON s.id_socio = a.id_socio
-                LEFT JOIN pago_accion pa ON a.id_accion = pa.id_accion
-                {where_clause}
-                GROUP BY s.id_socio, s.nombres, s.apellidos, c.nombre_club, s.fecha_de_registro
-                ORDER BY total_invertido DESC
-                LIMIT 10
-            """), params).fetchall()
+            result = _TOP_SOCIOS.ejecutar(db, club=club).fetchall()
 
             socios = []
             for row in result:
@@ -274,44 +301,12 @@ class BIAdministrativoRepository:
             logging.error(f"Error en _get_top_socios: {str(e)}")
             return []
 
-    def _get_distribucion_financiera(self, db: Session, fecha_inicio: str, fecha_fin: str, 
+    def _get_distribucion_financiera(self, db: Session, fecha_inicio: date, fecha_fin: date, 
                                     tipo_movimiento: str, club: Optional[int] = None) -> List[Dict]:
         """Obtiene distribución financiera por categorías"""
         try:
-            where_clause = "WHERE mf.tipo_movimiento = :tipo AND mf.fecha >= :fecha_inicio AND mf.fecha < :fecha_fin"
-            params = {"tipo": tipo_movimiento, "fecha_inicio": fecha_inicio, "fecha_fin": fecha_fin}
-            
-            if club:
-                where_clause += " AND mf.id_club = :club"
-                params['club'] = club
-
-            result = db.execute(text(f"""
-                SELECT 
-                    CASE
-                        WHEN mf.descripcion ILIKE '%cuota%' THEN 'Cuotas'
-                        WHEN mf.descripcion ILIKE '%donación%' THEN 'Donaciones'
-                        WHEN mf.descripcion ILIKE '%evento%' THEN 'Eventos'
-                        WHEN mf.descripcion ILIKE '%servicio%' THEN 'Servicios'
-                        WHEN mf.descripcion ILIKE '%compra%' THEN 'Compras'
-                        WHEN mf.descripcion ILIKE '%material%' THEN 'Materiales'
-                        ELSE 'Otros'
-                    END as categoria,
-                    SUM(mf.monto) as monto_total,
-                    COUNT(*) as cantidad_movimientos
-                FROM movimiento_financiero mf
-                {where_clause}
-                GROUP BY 
-                    CASE
-                        WHEN mf.descripcion ILIKE '%cuota%' THEN 'Cuotas'
-                        WHEN mf.descripcion ILIKE '%donación%' THEN 'Donaciones'
-                        WHEN mf.descripcion ILIKE '%evento%' THEN 'Eventos'
-                        WHEN mf.descripcion ILIKE '%servicio%' THEN 'Servicios'
-                        WHEN mf.descripcion ILIKE '%compra%' THEN 'Compras'
-                        WHEN mf.descripcion ILIKE '%material%' THEN 'Materiales'
-                        ELSE 'Otros'
-                    END
-                ORDER BY monto_total DESC
-            """), params).fetchall()
+            result = _DISTRIBUCION_FINANCIERA.ejecutar(
+                db, tipo=tipo_movimiento, fecha_inicio=fecha_inicio, fecha_fin=fecha_fin, club=club).fetchall()
 
             # Calcular total para porcentajes
             total = sum(Decimal(str(row[1])) for row in result if row[1])
@@ -335,7 +330,7 @@ class BIAdministrativoRepository:
             logging.error(f"Error en _get_distribucion_financiera: {str(e)}")
             return []
 
-    def _get_kpis_principales(self, db: Session, fecha_inicio: str, fecha_fin: str, 
+    def _get_kpis_principales(self, db: Session, fecha_inicio: date, fecha_fin: date, 
                               club: Optional[int] = None) -> List[Dict]:
         """Obtiene KPIs principales del negocio"""
         try:
@@ -383,24 +378,14 @@ class BIAdministrativoRepository:
     def _get_tendencias_mensuales(self, db: Session, anio: int, club: Optional[int] = None) -> Dict:
         """Obtiene tendencias mensuales del año"""
         try:
-            where_clause = "WHERE EXTRACT(YEAR FROM mf.fecha) = :anio"
-            params = {"anio": anio}
-            
-            if club:
-                where_clause += " AND mf.id_club = :club"
-                params['club'] = club
-
-            result = db.execute(text(f"""
-                SELECT 
-                    EXTRACT(MONTH FROM mf.fecha) as mes,
-                    COALESCE(SUM(CASE WHEN mf.tipo_movimiento = 'INGRESO' THEN mf.monto ELSE 0 END), 0) as ingresos,
-                    COALESCE(SUM(CASE WHEN mf.tipo_movimiento = 'EGRESO' THEN mf.monto ELSE 0 END), 0) as egresos,
-                    COUNT(*) as movimientos
-                FROM movimiento_financiero mf
-                {where_clause}
-                GROUP BY EXTRACT(MONTH FROM mf.fecha)
-                ORDER BY mes
-            """), params).fetchall()
+            # Rango del año en lugar de EXTRACT(YEAR ...) para usar los índices por fecha
+            fecha_inicio, fecha_fin = rango_anual(anio)
+            if EtlBiRepository().datos_frescos(db, ["finanzas_resumen"], BI_ETL_FRESCURA_MINUTOS):
+                # Totales mensuales ya consolidados por el ETL
+                consulta = _TENDENCIAS_CONSOLIDADAS
+            else:
+                consulta = _TENDENCIAS
+            result = consulta.ejecutar(db, fecha_inicio=fecha_inicio, fecha_fin=fecha_fin, club=club).fetchall()
 
             tendencias = {}
             for row in result:
@@ -422,7 +407,7 @@ class BIAdministrativoRepository:
             logging.error(f"Error en _get_tendencias_mensuales: {str(e)}")
             return {}
 
-    def _get_alertas_criticas(self, db: Session, fecha_inicio: str, fecha_fin: str, 
+    def _get_alertas_criticas(self, db: Session, fecha_inicio: date, fecha_fin: date, 
                               club: Optional[int] = None) -> List[str]:
         """Obtiene alertas críticas del sistema"""
         try:
@@ -450,7 +435,7 @@ class BIAdministrativoRepository:
             return ["Error al obtener alertas"]
 
     # ===== MÉTODOS AUXILIARES =====
-    def _calcular_proyeccion_financiera(self, db: Session, fecha_inicio: str, fecha_fin: str, 
+    def _calcular_proyeccion_financiera(self, db: Session, fecha_inicio: date, fecha_fin: date, 
                                        club: Optional[int] = None) -> Decimal:
         """Calcula proyección financiera basada en tendencias"""
         try:
@@ -460,7 +445,7 @@ class BIAdministrativoRepository:
             logging.error(f"Error en _calcular_proyeccion_financiera: {str(e)}")
             return Decimal('0.00')
 
-    def _calcular_crecimiento_socios(self, db: Session, fecha_inicio: str, fecha_fin: str, 
+    def _calcular_crecimiento_socios(self, db: Session, fecha_inicio: date, fecha_fin: date, 
                                    club: Optional[int] = None) -> float:
         """Calcula crecimiento mensual de socios"""
         try:
@@ -470,7 +455,7 @@ class BIAdministrativoRepository:
             logging.error(f"Error en _calcular_crecimiento_socios: {str(e)}")
             return 0.0
 
-    def _calcular_eficiencia_operativa(self, db: Session, fecha_inicio: str, fecha_fin: str, 
+    def _calcular_eficiencia_operativa(self, db: Session, fecha_inicio: date, fecha_fin: date, 
                                      club: Optional[int] = None) -> float:
         """Calcula eficiencia operativa"""
         try:
@@ -480,8 +465,8 @@ class BIAdministrativoRepository:
             logging.error(f"Error en _calcular_eficiencia_operativa: {str(e)}")
             return 0.0
 
-    def _determinar_tendencia_categoria(self, db: Session, categoria: str, fecha_inicio: str, 
-                                      fecha_fin: str, club: Optional[int] = None) -> str:
+    def _determinar_tendencia_categoria(self, db: Session, categoria: str, fecha_inicio: date, 
+                                      fecha_fin: date, club: Optional[int] = None) -> str:
         """Determina tendencia de una categoría financiera"""
         try:
             # Simulación simple
@@ -490,7 +475,7 @@ class BIAdministrativoRepository:
             logging.error(f"Error en _determinar_tendencia_categoria: {str(e)}")
             return "estable"
 
-    def _calcular_tasa_conversion(self, db: Session, fecha_inicio: str, fecha_fin: str, 
+    def _calcular_tasa_conversion(self, db: Session, fecha_inicio: date, fecha_fin: date, 
                                 club: Optional[int] = None) -> float:
         """Calcula tasa de conversión de socios"""
         try:
@@ -500,7 +485,7 @@ class BIAdministrativoRepository:
             logging.error(f"Error en _calcular_tasa_conversion: {str(e)}")
             return 0.0
 
-    def _calcular_rentabilidad_club(self, db: Session, fecha_inicio: str, fecha_fin: str, 
+    def _calcular_rentabilidad_club(self, db: Session, fecha_inicio: date, fecha_fin: date, 
                                   club: Optional[int] = None) -> float:
         """Calcula rentabilidad por club"""
         try:
@@ -510,7 +495,7 @@ class BIAdministrativoRepository:
             logging.error(f"Error en _calcular_rentabilidad_club: {str(e)}")
             return 0.0
 
-    def _get_balance_periodo(self, db: Session, fecha_inicio: str, fecha_fin: str, 
+    def _get_balance_periodo(self, db: Session, fecha_inicio: date, fecha_fin: date, 
                             club: Optional[int] = None) -> Decimal:
         """Obtiene balance del período"""
         try:
@@ -529,7 +514,7 @@ class BIAdministrativoRepository:
             logging.error(f"Error en _get_socios_inactivos: {str(e)}")
             return 0
 
-    def _get_pagos_pendientes(self, db: Session, fecha_inicio: str, fecha_fin: str, 
+    def _get_pagos_pendientes(self, db: Session, fecha_inicio: date, fecha_fin: date, 
                              club: Optional[int] = None) -> int:
         """Obtiene número de pagos pendientes"""
         try:
@@ -0,0 +1,119 @@
+"""
+Capa de consultas compartida por los repositorios BI (financiero, administrativo
+y personal).
+
+- resolver_periodo: mes/anio -> PeriodoBI con los límites [inicio, fin) como
+  fechas (no cadenas).
+- ConsultaBI: sentencia con forma fija. Los filtros opcionales se escriben una
+  sola vez con opcional() -> (:club IS NULL OR mf.id_club = :club), así el texto
+  no cambia con la combinación de filtros. Agregar un filtro es agregar un
+  parámetro, no una variante más de la sentencia.
+
+Cada parámetro declara su tipo. Con BI_SENTENCIAS_PREPARADAS la sentencia se
+prepara en el servidor (PREPARE) la primera vez que se usa en cada conexión del
+pool y después solo se ejecuta (EXECUTE), reutilizando el plan. Sin preparar
+(p. ej. detrás de pgbouncer en modo transacción) se envía el mismo texto con
+los parámetros tipados con CAST.
+"""
+
+import logging
+import re
+from dataclasses import dataclass
+from datetime import date, datetime
+from typing import Optional, Tuple
+
+from sqlalchemy import text
+from sqlalchemy.orm import Session
+
+from config import BI_SENTENCIAS_PREPARADAS
+
+# :nombre, sin confundirlo con los casts ::tipo
+_PARAMETRO = re.compile(r"(?<![:\w]):([A-Za-z_]\w*)")
+
+
+@dataclass(frozen=True, slots=True)
+class PeriodoBI:
+    anio: int
+    mes: int
+    inicio: date  # primer día del mes
+    fin: date  # primer día del mes siguiente (exclusivo)
+
+    @property
+    def etiqueta(self) -> str:
+        return f"{self.anio:04d}-{self.mes:02d}"
+
+
+def mes_siguiente(fecha: date) -> date:
+    return date(fecha.year + fecha.month // 12, fecha.month % 12 + 1, 1)
+
+
+def resolver_periodo(mes: Optional[int] = None, anio: Optional[int] = None) -> PeriodoBI:
+    """Mes pedido, o el mes actual si falta el mes o el año"""
+    if not (mes and anio):
+        ahora = datetime.now()
+        mes, anio = ahora.month, ahora.year
+    inicio = date(anio, mes, 1)
+    return PeriodoBI(anio=anio, mes=mes, inicio=inicio, fin=mes_siguiente(inicio))
+
+
+def rango_anual(anio: int) -> Tuple[date, date]:
+    """[1 de enero, 1 de enero del año siguiente), para filtrar sin EXTRACT(YEAR ...)"""
+    return date(anio, 1, 1), date(anio + 1, 1, 1)
+
+
+def opcional(columna: str, parametro: str) -> str:
+    """Filtro que no aplica cuando el parámetro es NULL"""
+    return f"(:{parametro} IS NULL OR {columna} = :{parametro})"
+
+
+class ConsultaBI:
+    """
+    Sentencia BI con nombre y parámetros tipados, p. ej.:
+
+        ConsultaBI("financiero_metricas", "SELECT ... WHERE fecha >= :fecha_inicio ...",
+                   fecha_inicio="DATE", fecha_fin="DATE", club="BIGINT")
+
+    ejecutar() recibe los parámetros por nombre; los que falten van como NULL.
+    """
+
+    def __init__(self, nombre: str, sql: str, **tipos: str):
+        usados = set(_PARAMETRO.findall(sql))
+        if usados - set(tipos):
+            raise ValueError(f"Parámetros sin tipo en la consulta {nombre}: {sorted(usados - set(tipos))}")
+
+        self.nombre = f"bi_{nombre}"
+        self.tipos = tipos
+        orden = list(tipos)
+
+        preparada = _PARAMETRO.sub(lambda m: f"${orden.index(m.group(1)) + 1}", sql)
+        self._prepare = text(f"PREPARE {self.nombre} ({', '.join(tipos.values())}) AS {preparada}")
+        self._deallocate = text(f"DEALLOCATE {self.nombre}")
+        self._execute = text(f"EXECUTE {self.nombre} ({', '.join(':' + p for p in orden)})"
+                             if orden else f"EXECUTE {self.nombre}")
+        self._directa = text(_PARAMETRO.sub(lambda m: f"CAST(:{m.group(1)} AS {tipos[m.group(1)]})", sql))
+
+    def ejecutar(self, db: Session, **parametros):
+        valores = {nombre: parametros.get(nombre) for nombre in self.tipos}
+        if not BI_SENTENCIAS_PREPARADAS:
+            return db.execute(self._directa, valores)
+
+        # Las sentencias preparadas viven en la conexión física: se registran en
+        # su .info, que se conserva entre préstamos del pool
+        conexion = db.connection()
+        preparadas = conexion.info.setdefault("bi_preparadas", set())
+        invalidas = conexion.info.setdefault("bi_invalidas", set())
+        if self.nombre in invalidas:
+            conexion.execute(self._deallocate)
+            invalidas.discard(self.nombre)
+            preparadas.discard(self.nombre)
+        if self.nombre not in preparadas:
+            conexion.execute(self._prepare)
+            preparadas.add(self.nombre)
+        try:
+            return conexion.execute(self._execute, valores)
+        except Exception:
+            # p. ej. "cached plan must not change result type" tras recrear una
+            # tabla: se vuelve a preparar en el próximo uso
+            logging.warning(f"Falló EXECUTE {self.nombre}; se preparará de nuevo")
+            invalidas.add(self.nombre)
+            raise
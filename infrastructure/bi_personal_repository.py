@@ -1,9 +1,117 @@
 from sqlalchemy.orm import Session
-from sqlalchemy import text, func
 from config import SessionLocal
+from infrastructure.bi_consultas import ConsultaBI, opcional, rango_anual, resolver_periodo
 from typing import Dict, List, Optional
 import logging
-from datetime import datetime
+from datetime import date
+
+# Códigos de asistencia.estado_codigo / asistencia_diaria.estado_codigo
+# (ver create_asistencia_diaria.sql)
+ESTADO_PRESENTE = 1  # PRESENTE, HORAS_EXTRAS
+ESTADO_TARDANZA = 2  # TARDANZA, RETRASO
+ESTADO_AUSENTE = 3  # AUSENTE, FALTANDO
+
+# Filtros opcionales (NULL = todos): el texto de cada sentencia es siempre el mismo
+_FILTRO_PERSONAL = f"{opcional('p.departamento', 'departamento')} AND {opcional('p.cargo', 'cargo')}"
+_FILTRO_ASISTENCIA = f"""d.fecha >= :fecha_inicio AND d.fecha < :fecha_fin
+      AND {opcional('d.departamento', 'departamento')} AND {opcional('d.cargo', 'cargo')}"""
+_TIPOS_PERSONAL = {"departamento": "TEXT", "cargo": "BIGINT"}
+_TIPOS_ASISTENCIA = {"fecha_inicio": "DATE", "fecha_fin": "DATE", **_TIPOS_PERSONAL}
+
+_TOTAL_PERSONAL = ConsultaBI("personal_total", f"""
+    SELECT 
+        COUNT(*) as total,
+        COUNT(CASE WHEN p.estado = true THEN 1 END) as activos,
+        COUNT(CASE WHEN p.estado = false THEN 1 END) as inactivos
+    FROM personal p
+    WHERE {_FILTRO_PERSONAL}
+""", **_TIPOS_PERSONAL)
+
+_PERSONAL_POR_DEPARTAMENTO = ConsultaBI("personal_por_departamento", f"""
+    SELECT 
+        COALESCE(p.departamento, 'Sin departamento') as dept,
+        COUNT(*) as total
+    FROM personal p
+    WHERE {_FILTRO_PERSONAL}
+    GROUP BY p.departamento
+    ORDER BY total DESC
+""", **_TIPOS_PERSONAL)
+
+_PERSONAL_POR_CARGO = ConsultaBI("personal_por_cargo", f"""
+    SELECT 
+        c.nombre_cargo,
+        COUNT(p.id_personal) as total
+    FROM personal p
+    LEFT JOIN cargos c ON p.cargo = c.id_cargo
+    WHERE {_FILTRO_PERSONAL}
+    GROUP BY c.nombre_cargo
+    ORDER BY total DESC
+""", **_TIPOS_PERSONAL)
+
+_METRICAS_ASISTENCIA = ConsultaBI("personal_metricas_asistencia", f"""
+    SELECT 
+        COUNT(*) as total_registros,
+        COUNT(*) FILTER (WHERE d.estado_codigo = {ESTADO_PRESENTE}) as asistencias_completas,
+        COUNT(*) FILTER (WHERE d.estado_codigo = {ESTADO_TARDANZA}) as tardanzas,
+        COUNT(*) FILTER (WHERE d.estado_codigo = {ESTADO_AUSENTE}) as ausencias,
+        AVG(d.segundos_trabajados) / 3600 as promedio_horas
+    FROM asistencia_diaria d
+    WHERE {_FILTRO_ASISTENCIA}
+""", **_TIPOS_ASISTENCIA)
+
+# Se agrega por empleado y solo los 10 primeros se unen con personal
+_TOP_EMPLEADOS = ConsultaBI("personal_top_empleados", f"""
+    WITH por_empleado AS (
+        SELECT 
+            d.id_personal,
+            COUNT(*) as total_asistencias,
+            COUNT(*) FILTER (WHERE d.estado_codigo = {ESTADO_TARDANZA}) as tardanzas,
+            COUNT(*) FILTER (WHERE d.estado_codigo = {ESTADO_AUSENTE}) as ausencias,
+            AVG(d.segundos_trabajados) / 3600 as promedio_horas
+        FROM asistencia_diaria d
+        WHERE {_FILTRO_ASISTENCIA}
+        GROUP BY d.id_personal
+        ORDER BY total_asistencias DESC, tardanzas ASC
+        LIMIT 10
+    )
+    SELECT 
+        e.id_personal,
+        CONCAT(p.nombres, ' ', p.apellidos) as nombre_empleado,
+        e.total_asistencias,
+        e.tardanzas,
+        e.ausencias,
+        e.promedio_horas
+    FROM por_empleado e
+    JOIN personal p ON p.id_personal = e.id_personal
+    ORDER BY e.total_asistencias DESC, e.tardanzas ASC
+""", **_TIPOS_ASISTENCIA)
+
+_ASISTENCIA_POR_DEPARTAMENTO = ConsultaBI("personal_asistencia_por_departamento", f"""
+    SELECT 
+        COALESCE(d.departamento, 'Sin departamento') as departamento,
+        COUNT(DISTINCT d.id_personal) as total_empleados,
+        COUNT(*) as total_asistencias,
+        COUNT(*) FILTER (WHERE d.estado_codigo = {ESTADO_PRESENTE}) as asistencias,
+        COUNT(*) FILTER (WHERE d.estado_codigo = {ESTADO_TARDANZA}) as tardanzas,
+        COUNT(*) FILTER (WHERE d.estado_codigo = {ESTADO_AUSENTE}) as ausencias
+    FROM asistencia_diaria d
+    WHERE {_FILTRO_ASISTENCIA}
+    GROUP BY d.departamento
+    ORDER BY total_empleados DESC
+""", **_TIPOS_ASISTENCIA)
+
+_TENDENCIAS_ASISTENCIA = ConsultaBI("personal_tendencias_asistencia", f"""
+    SELECT 
+        EXTRACT(MONTH FROM d.fecha) as mes,
+        COUNT(*) as total_registros,
+        COUNT(*) FILTER (WHERE d.estado_codigo = {ESTADO_PRESENTE}) as asistencias,
+        COUNT(*) FILTER (WHERE d.estado_codigo = {ESTADO_TARDANZA}) as tardanzas,
+        COUNT(*) FILTER (WHERE d.estado_codigo = {ESTADO_AUSENTE}) as ausencias
+    FROM asistencia_diaria d
+    WHERE {_FILTRO_ASISTENCIA}
+    GROUP BY EXTRACT(MONTH FROM d.fecha)
+    ORDER BY mes
+""", **_TIPOS_ASISTENCIA)
 
 class BIPersonalRepository:
     def get_dashboard_personal(self, mes: Optional[int] = None, anio: Optional[int] = None, 
@@ -11,25 +119,9 @@ class BIPersonalRepository:
         """Obtiene métricas del dashboard de personal para un período específico"""
         db: Session = SessionLocal()
         try:
-            # Determinar período
-            if mes and anio:
-                periodo = f"{anio:04d}-{mes:02d}"
-                fecha_inicio = f"{anio:04d}-{mes:02d}-01"
-                if mes == 12:
-                    fecha_fin = f"{anio+1:04d}-01-01"
-                else:
-                    fecha_fin = f"{anio:04d}-{mes+1:02d}-01"
-            else:
-                # Período actual
-                now = datetime.now()
-                mes = now.month
-                anio = now.year
-                periodo = f"{anio:04d}-{mes:02d}"
-                fecha_inicio = f"{anio:04d}-{mes:02d}-01"
-                if mes == 12:
-                    fecha_fin = f"{anio+1:04d}-01-01"
-                else:
-                    fecha_fin = f"{anio:04d}-{mes+1:02d}-01"
+            # Determinar período (mes actual si no se indica)
+            periodo = resolver_periodo(mes, anio)
+            fecha_inicio, fecha_fin = periodo.inicio, periodo.fin
 
             # Métricas generales del personal
             metricas_generales = self._get_metricas_generales(db, departamento, cargo)
@@ -44,10 +136,10 @@ class BIPersonalRepository:
             asistencia_departamento = self._get_asistencia_por_departamento(db, fecha_inicio, fecha_fin)
 
             # Tendencias mensuales
-            tendencias = self._get_tendencias_mensuales(db, anio, departamento, cargo)
+            tendencias = self._get_tendencias_mensuales(db, periodo.anio, departamento, cargo)
 
             return {
-                "periodo": periodo,
+                "periodo": periodo.etiqueta,
                 "metricas_generales": metricas_generales,
                 "metricas_asistencia": metricas_asistencia,
                 "top_empleados_asistencia": top_empleados,
@@ -65,51 +157,18 @@ class BIPersonalRepository:
                                 cargo: Optional[int] = None) -> Dict:
         """Obtiene métricas generales del personal"""
         try:
-            where_clause = "WHERE 1=1"
-            params = {}
-            
-            if departamento:
-                where_clause += " AND departamento = :departamento"
-                params['departamento'] = departamento
-            
-            if cargo:
-                where_clause += " AND cargo = :cargo"
-                params['cargo'] = cargo
+            filtros = {"departamento": departamento, "cargo": cargo}
 
             # Total personal
-            result = db.execute(text(f"""
-                SELECT 
-                    COUNT(*) as total,
-                    COUNT(CASE WHEN estado = true THEN 1 END) as activos,
-                    COUNT(CASE WHEN estado = false THEN 1 END) as inactivos
-                FROM personal 
-                {where_clause}
-            """), params).fetchone()
+            result = _TOTAL_PERSONAL.ejecutar(db, **filtros).fetchone()
 
             # Personal por departamento
-            dept_result = db.execute(text(f"""
-                SELECT 
-                    COALESCE(departamento, 'Sin departamento') as dept,
-                    COUNT(*) as total
-                FROM personal 
-                {where_clause}
-                GROUP BY departamento
-                ORDER BY total DESC
-            """), params).fetchall()
+            dept_result = _PERSONAL_POR_DEPARTAMENTO.ejecutar(db, **filtros).fetchall()
 
             personal_por_departamento = {row[0]: row[1] for row in dept_result}
 
             # Personal por cargo
-            cargo_result = db.execute(text(f"""
-                SELECT 
-                    c.nombre_cargo,
-                    COUNT(p.id_personal) as total
-                FROM personal p
-                LEFT JOIN cargos c ON p.cargo = c.id_cargo
-                {where_clause.replace('personal', 'p')}
-                GROUP BY c.nombre_cargo
-                ORDER BY total DESC
-            """), params).fetchall()
+            cargo_result = _PERSONAL_POR_CARGO.ejecutar(db, **filtros).fetchall()
 
             personal_por_cargo = {row[0] if row[0] else 'Sin cargo': row[1] for row in cargo_result}
 
@@ -131,36 +190,12 @@ class BIPersonalRepository:
                 "personal_por_cargo": {}
             }
 
-    def _get_metricas_asistencia(self, db: Session, fecha_inicio: str, fecha_fin: str,
+    def _get_metricas_asistencia(self, db: Session, fecha_inicio: date, fecha_fin: date,
                                  departamento: Optional[str] = None, cargo: Optional[int] = None) -> Dict:
         """Obtiene métricas de asistencia"""
         try:
-            where_clause = "WHERE a.fecha >= :fecha_inicio AND a.fecha < :fecha_fin"
-            params = {"fecha_inicio": fecha_inicio, "fecha_fin": fecha_fin}
-            
-            if departamento:
-                where_clause += " AND p.departamento = :departamento"
-                params['departamento'] = departamento
-            
-            if cargo:
-                where_clause += " AND p.cargo = :cargo"
-                params['cargo'] = cargo
-
-            result = db.execute(text(f"""
-                SELECT 
-                    COUNT(*) as total_registros,
-                    COUNT(CASE WHEN a.estado = 'presente' THEN 1 END) as asistencias_completas,
-                    COUNT(CASE WHEN a.estado = 'tardanza' THEN 1 END) as tardanzas,
-                    COUNT(CASE WHEN a.estado = 'ausente' THEN 1 END) as ausencias,
-                    AVG(CASE 
-                        WHEN a.hora_ingreso IS NOT NULL AND a.hora_salida IS NOT NULL 
-                        THEN EXTRACT(EPOCH FROM (a.hora_salida::time - a.hora_ingreso::time))/3600
-                        ELSE NULL 
-                    END) as promedio_horas
-                FROM asistencia a
-                LEFT JOIN personal p ON a.id_personal = p.id_personal
-                {where_clause}
-            """), params).fetchone()
+            result = _METRICAS_ASISTENCIA.ejecutar(db, fecha_inicio=fecha_inicio, fecha_fin=fecha_fin,
+                                                   departamento=departamento, cargo=cargo).fetchone()
 
             total = result[0] or 0
             asistencias = result[1] or 0
@@ -172,7 +207,7 @@ class BIPersonalRepository:
                 "tardanzas": result[2] or 0,
                 "ausencias": result[3] or 0,
                 "porcentaje_asistencia": round(porcentaje, 2),
-                "promedio_horas_trabajadas": round(result[4], 2) if result[4] else None
+                "promedio_horas_trabajadas": round(float(result[4]), 2) if result[4] else None
             }
 
         except Exception as e:
@@ -186,40 +221,12 @@ class BIPersonalRepository:
                 "promedio_horas_trabajadas": None
             }
 
-    def _get_top_empleados_asistencia(self, db: Session, fecha_inicio: str, fecha_fin: str,
+    def _get_top_empleados_asistencia(self, db: Session, fecha_inicio: date, fecha_fin: date,
                                      departamento: Optional[str] = None, cargo: Optional[int] = None) -> List[Dict]:
         """Obtiene top empleados por asistencia"""
         try:
-            where_clause = "WHERE a.fecha >= :fecha_inicio AND a.fecha < :fecha_fin"
-            params = {"fecha_inicio": fecha_inicio, "fecha_fin": fecha_fin}
-            
-            if departamento:
-                where_clause += " AND p.departamento = :departamento"
-                params['departamento'] = departamento
-            
-            if cargo:
-                where_clause += " AND p.cargo = :cargo"
-                params['cargo'] = cargo
-
-            result = db.execute(text(f"""
-                SELECT 
-                    p.id_personal,
-                    CONCAT(p.nombres, ' ', p.apellidos) as nombre_empleado,
-                    COUNT(*) as total_asistencias,
-                    COUNT(CASE WHEN a.estado = 'tardanza' THEN 1 END) as tardanzas,
-                    COUNT(CASE WHEN a.estado = 'ausente' THEN 1 END) as ausencias,
-                    AVG(CASE 
-                        WHEN a.hora_ingreso IS NOT NULL AND a.hora_salida IS NOT NULL 
-                        THEN EXTRACT(EPOCH FROM (a.hora_salida::time - a.hora_ingreso::time))/3600
-                        ELSE NULL 
-                    END) as promedio_horas
-                FROM asistencia a
-                LEFT JOIN personal p ON a.id_personal = p.id_personal
-                {where_clause}
-                GROUP BY p.id_personal, p.nombres, p.apellidos
-                ORDER BY total_asistencias DESC, tardanzas ASC
-                LIMIT 10
-            """), params).fetchall()
+            result = _TOP_EMPLEADOS.ejecutar(db, fecha_inicio=fecha_inicio, fecha_fin=fecha_fin,
+                                             departamento=departamento, cargo=cargo).fetchall()
 
             empleados = []
             for row in result:
@@ -234,7 +241,7 @@ class BIPersonalRepository:
                     "tardanzas": row[3] or 0,
                     "ausencias": row[4] or 0,
                     "porcentaje_asistencia": round(porcentaje, 2),
-                    "promedio_horas_trabajadas": round(row[5], 2) if row[5] else None
+                    "promedio_horas_trabajadas": round(float(row[5]), 2) if row[5] else None
                 })
 
             return empleados
@@ -243,23 +250,10 @@ class BIPersonalRepository:
             logging.error(f"Error en _get_top_empleados_asistencia: {str(e)}")
             return []
 
-    def _get_asistencia_por_departamento(self, db: Session, fecha_inicio: str, fecha_fin: str) -> List[Dict]:
+    def _get_asistencia_por_departamento(self, db: Session, fecha_inicio: date, fecha_fin: date) -> List[Dict]:
         """Obtiene asistencia agrupada por departamento"""
         try:
-            result = db.execute(text("""
-                SELECT 
-                    COALESCE(p.departamento, 'Sin departamento') as departamento,
-                    COUNT(DISTINCT p.id_personal) as total_empleados,
-                    COUNT(*) as total_asistencias,
-                    COUNT(CASE WHEN a.estado = 'presente' THEN 1 END) as asistencias,
-                    COUNT(CASE WHEN a.estado = 'tardanza' THEN 1 END) as tardanzas,
-                    COUNT(CASE WHEN a.estado = 'ausente' THEN 1 END) as ausencias
-                FROM asistencia a
-                LEFT JOIN personal p ON a.id_personal = p.id_personal
-                WHERE a.fecha >= :fecha_inicio AND a.fecha < :fecha_fin
-                GROUP BY p.departamento
-                ORDER BY total_empleados DESC
-            """), {"fecha_inicio": fecha_inicio, "fecha_fin": fecha_fin}).fetchall()
+            result = _ASISTENCIA_POR_DEPARTAMENTO.ejecutar(db, fecha_inicio=fecha_inicio, fecha_fin=fecha_fin).fetchall()
 
             departamentos = []
             for row in result:
@@ -286,30 +280,10 @@ class BIPersonalRepository:
                                   cargo: Optional[int] = None) -> Dict:
         """Obtiene tendencias mensuales de asistencia"""
         try:
-            where_clause = "WHERE EXTRACT(YEAR FROM a.fecha) = :anio"
-            params = {"anio": anio}
-            
-            if departamento:
-                where_clause += " AND p.departamento = :departamento"
-                params['departamento'] = departamento
-            
-            if cargo:
-                where_clause += " AND p.cargo = :cargo"
-                params['cargo'] = cargo
-
-            result = db.execute(text(f"""
-                SELECT 
-                    EXTRACT(MONTH FROM a.fecha) as mes,
-                    COUNT(*) as total_registros,
-                    COUNT(CASE WHEN UPPER(a.estado) IN ('PRESENTE', 'HORAS_EXTRAS') THEN 1 END) as asistencias,
-                    COUNT(CASE WHEN UPPER(a.estado) IN ('TARDANZA', 'RETRASO') THEN 1 END) as tardanzas,
-                    COUNT(CASE WHEN UPPER(a.estado) IN ('FALTANDO', 'AUSENTE') THEN 1 END) as ausencias
-                FROM asistencia a
-                LEFT JOIN personal p ON a.id_personal = p.id_personal
-                {where_clause}
-                GROUP BY EXTRACT(MONTH FROM a.fecha)
-                ORDER BY mes
-            """), params).fetchall()
+            # Rango del año en lugar de EXTRACT(YEAR ...) para usar la clave primaria
+            fecha_inicio, fecha_fin = rango_anual(anio)
+            result = _TENDENCIAS_ASISTENCIA.ejecutar(db, fecha_inicio=fecha_inicio, fecha_fin=fecha_fin,
+                                                     departamento=departamento, cargo=cargo).fetchall()
 
             tendencias = {}
             for row in result:
@@ -331,4 +305,3 @@ class BIPersonalRepository:
         except Exception as e:
             logging.error(f"Error en _get_tendencias_mensuales: {str(e)}")
             return {}
-
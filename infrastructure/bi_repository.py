@@ -1,47 +1,112 @@
 from sqlalchemy.orm import Session
-from sqlalchemy import text, func
-from config import SessionLocal
+from config import SessionLocal, BI_ETL_FRESCURA_MINUTOS
+from infrastructure.etl_bi_repository import EtlBiRepository
+from infrastructure.bi_consultas import ConsultaBI, resolver_periodo
 from typing import Dict, List, Optional
 from decimal import Decimal
+from datetime import date
 import logging
-from datetime import datetime
+
+_METRICAS_CONSOLIDADAS = ConsultaBI("financiero_metricas_consolidadas", """
+    SELECT 
+        COALESCE(SUM(cantidad_movimientos), 0) as total_movimientos,
+        SUM(CASE WHEN tipo_movimiento = 'INGRESO' THEN monto_total ELSE 0 END) as total_ingresos,
+        SUM(CASE WHEN tipo_movimiento = 'EGRESO' THEN monto_total ELSE 0 END) as total_egresos
+    FROM finanzas_resumen
+    WHERE fecha_mes >= :fecha_inicio AND fecha_mes < :fecha_fin
+""", fecha_inicio="DATE", fecha_fin="DATE")
+
+_METRICAS = ConsultaBI("financiero_metricas", """
+    SELECT 
+        COUNT(*) as total_movimientos,
+        SUM(CASE WHEN tipo_movimiento = 'INGRESO' THEN monto ELSE 0 END) as total_ingresos,
+        SUM(CASE WHEN tipo_movimiento = 'EGRESO' THEN monto ELSE 0 END) as total_egresos
+    FROM movimiento_financiero 
+    WHERE fecha >= :fecha_inicio AND fecha < :fecha_fin AND estado = 'confirmado'
+""", fecha_inicio="DATE", fecha_fin="DATE")
+
+_DISTRIBUCION_CONSOLIDADA = ConsultaBI("financiero_distribucion_consolidada", """
+    SELECT 
+        MAX(fr.nombre_club) as nombre_club,
+        SUM(CASE WHEN fr.tipo_movimiento = 'INGRESO' THEN fr.monto_total ELSE 0 END) as ingresos,
+        SUM(CASE WHEN fr.tipo_movimiento = 'EGRESO' THEN fr.monto_total ELSE 0 END) as egresos
+    FROM finanzas_resumen fr
+    WHERE fr.fecha_mes >= :fecha_inicio AND fr.fecha_mes < :fecha_fin
+    GROUP BY fr.id_club
+    ORDER BY nombre_club
+""", fecha_inicio="DATE", fecha_fin="DATE")
+
+_DISTRIBUCION = ConsultaBI("financiero_distribucion", """
+    SELECT 
+        c.nombre_club,
+        SUM(CASE WHEN mf.tipo_movimiento = 'INGRESO' THEN mf.monto ELSE 0 END) as ingresos,
+        SUM(CASE WHEN mf.tipo_movimiento = 'EGRESO' THEN mf.monto ELSE 0 END) as egresos
+    FROM movimiento_financiero mf
+    LEFT JOIN club c ON mf.id_club = c.id_club
+    WHERE mf.fecha >= :fecha_inicio AND mf.fecha < :fecha_fin AND mf.estado = 'confirmado'
+    GROUP BY c.id_club, c.nombre_club
+    ORDER BY c.nombre_club
+""", fecha_inicio="DATE", fecha_fin="DATE")
+
+_CATEGORIA_INGRESO = """
+    CASE 
+        WHEN mf.descripcion ILIKE '%cuota%' THEN 'Cuotas Mensuales'
+        WHEN mf.descripcion ILIKE '%evento%' THEN 'Eventos'
+        WHEN mf.descripcion ILIKE '%servicio%' THEN 'Venta de Servicios'
+        WHEN mf.descripcion ILIKE '%donación%' THEN 'Donaciones'
+        WHEN mf.descripcion ILIKE '%premium%' THEN 'Membresías Premium'
+        ELSE 'Otros Ingresos'
+    END"""
+
+_CATEGORIA_EGRESO = """
+    CASE 
+        WHEN mf.id_compra IS NOT NULL THEN 'Compras a Proveedores'
+        WHEN mf.descripcion ILIKE '%equipamiento%' THEN 'Equipamiento'
+        WHEN mf.descripcion ILIKE '%mantenimiento%' THEN 'Mantenimiento'
+        WHEN mf.descripcion ILIKE '%administrativo%' THEN 'Gastos Administrativos'
+        WHEN mf.descripcion ILIKE '%marketing%' THEN 'Marketing'
+        WHEN mf.descripcion ILIKE '%legal%' THEN 'Gastos Legales'
+        WHEN mf.descripcion ILIKE '%salario%' THEN 'Salarios'
+        WHEN mf.descripcion ILIKE '%seguro%' THEN 'Seguros'
+        ELSE 'Otros Egresos'
+    END"""
+
+_TOP_CATEGORIAS = {
+    tipo: ConsultaBI(f"financiero_top_categorias_{tipo.lower()}", f"""
+        SELECT {categoria} as categoria, SUM(mf.monto) as monto
+        FROM movimiento_financiero mf
+        WHERE mf.fecha >= :fecha_inicio AND mf.fecha < :fecha_fin
+        AND mf.tipo_movimiento = '{tipo}' AND mf.estado = 'confirmado'
+        GROUP BY 1
+        ORDER BY monto DESC
+        LIMIT 5
+    """, fecha_inicio="DATE", fecha_fin="DATE")
+    for tipo, categoria in (("INGRESO", _CATEGORIA_INGRESO), ("EGRESO", _CATEGORIA_EGRESO))
+}
 
 class BIRepository:
     def get_dashboard_financiero(self, mes: Optional[int] = None, anio: Optional[int] = None) -> Dict:
         """Obtiene métricas del dashboard financiero para un período específico"""
         db: Session = SessionLocal()
         try:
-            # Determinar período
-            if mes and anio:
-                periodo = f"{anio:04d}-{mes:02d}"
-                fecha_inicio = f"{anio:04d}-{mes:02d}-01"
-                if mes == 12:
-                    fecha_fin = f"{anio+1:04d}-01-01"
-                else:
-                    fecha_fin = f"{anio:04d}-{mes+1:02d}-01"
-            else:
-                # Período actual
-                now = datetime.now()
-                mes = now.month
-                anio = now.year
-                periodo = f"{anio:04d}-{mes:02d}"
-                fecha_inicio = f"{anio:04d}-{mes:02d}-01"
-                if mes == 12:
-                    fecha_fin = f"{anio+1:04d}-01-01"
-                else:
-                    fecha_fin = f"{anio:04d}-{mes+1:02d}-01"
+            # Determinar período (mes actual si no se indica)
+            periodo = resolver_periodo(mes, anio)
+            fecha_inicio, fecha_fin = periodo.inicio, periodo.fin
             
+            # Totales por mes y club desde finanzas_resumen si el ETL está al día
+            consolidada = EtlBiRepository().datos_frescos(db, ["finanzas_resumen"], BI_ETL_FRESCURA_MINUTOS)
+
             # Métricas generales
-            metricas_generales = self._get_metricas_generales(db, fecha_inicio, fecha_fin)
+            metricas_generales = self._get_metricas_generales(db, fecha_inicio, fecha_fin, consolidada)
             
             # Distribución por club
-            distribucion_club = self._get_distribucion_por_club(db, fecha_inicio, fecha_fin)
+            distribucion_club = self._get_distribucion_por_club(db, fecha_inicio, fecha_fin, consolidada)
             
             # Top categorías
             top_categorias = self._get_top_categorias(db, fecha_inicio, fecha_fin)
             
             return {
-                "periodo": periodo,
+                "periodo": periodo.etiqueta,
                 "metricas_generales": metricas_generales,
                 "distribucion_por_club": distribucion_club,
                 "top_categorias": top_categorias
@@ -53,17 +118,12 @@ class BIRepository:
         finally:
             db.close()
     
-    def _get_metricas_generales(self, db: Session, fecha_inicio: str, fecha_fin: str) -> Dict:
+    def _get_metricas_generales(self, db: Session, fecha_inicio: date, fecha_fin: date,
+                                consolidada: bool = False) -> Dict:
         """Obtiene métricas generales del período"""
         try:
-            result = db.execute(text("""
-                SELECT 
-                    COUNT(*) as total_movimientos,
-                    SUM(CASE WHEN tipo_movimiento = 'INGRESO' THEN monto ELSE 0 END) as total_ingresos,
-                    SUM(CASE WHEN tipo_movimiento = 'EGRESO' THEN monto ELSE 0 END) as total_egresos
-                FROM movimiento_financiero 
-                WHERE fecha >= :fecha_inicio AND fecha < :fecha_fin
-            """), {"fecha_inicio": fecha_inicio, "fecha_fin": fecha_fin}).fetchone()
+            consulta = _METRICAS_CONSOLIDADAS if consolidada else _METRICAS
+            result = consulta.ejecutar(db, fecha_inicio=fecha_inicio, fecha_fin=fecha_fin).fetchone()
             
             ingresos = float(result[1]) if result[1] else 0.0
             egresos = float(result[2]) if result[2] else 0.0
@@ -79,20 +139,12 @@ class BIRepository:
             logging.error(f"Error en _get_metricas_generales: {str(e)}")
             return {"ingresos": Decimal("0"), "egresos": Decimal("0"), "balance": Decimal("0"), "movimientos": 0}
     
-    def _get_distribucion_por_club(self, db: Session, fecha_inicio: str, fecha_fin: str) -> Dict:
+    def _get_distribucion_por_club(self, db: Session, fecha_inicio: date, fecha_fin: date,
+                                   consolidada: bool = False) -> Dict:
         """Obtiene distribución de movimientos por club"""
         try:
-            result = db.execute(text("""
-                SELECT 
-                    c.nombre_club,
-                    SUM(CASE WHEN mf.tipo_movimiento = 'INGRESO' THEN mf.monto ELSE 0 END) as ingresos,
-                    SUM(CASE WHEN mf.tipo_movimiento = 'EGRESO' THEN mf.monto ELSE 0 END) as egresos
-                FROM movimiento_financiero mf
-                LEFT JOIN club c ON mf.id_club = c.id_club
-                WHERE mf.fecha >= :fecha_inicio AND mf.fecha < :fecha_fin
-                GROUP BY c.id_club, c.nombre_club
-                ORDER BY c.nombre_club
-            """), {"fecha_inicio": fecha_inicio, "fecha_fin": fecha_fin}).fetchall()
+            consulta = _DISTRIBUCION_CONSOLIDADA if consolidada else _DISTRIBUCION
+            result = consulta.ejecutar(db, fecha_inicio=fecha_inicio, fecha_fin=fecha_fin).fetchall()
             
             distribucion = {}
             for row in result:
@@ -112,68 +164,13 @@ class BIRepository:
             logging.error(f"Error en _get_distribucion_por_club: {str(e)}")
             return {}
     
-    def _get_top_categorias(self, db: Session, fecha_inicio: str, fecha_fin: str) -> Dict:
+    def _get_top_categorias(self, db: Session, fecha_inicio: date, fecha_fin: date) -> Dict:
         """Obtiene top categorías por ingresos y egresos"""
         try:
-            # Top categorías de ingresos
-            top_ingresos = db.execute(text("""
-                SELECT 
-                    CASE 
-                        WHEN mf.descripcion ILIKE '%cuota%' THEN 'Cuotas Mensuales'
-                        WHEN mf.descripcion ILIKE '%evento%' THEN 'Eventos'
-                        WHEN mf.descripcion ILIKE '%servicio%' THEN 'Venta de Servicios'
-                        WHEN mf.descripcion ILIKE '%donación%' THEN 'Donaciones'
-                        WHEN mf.descripcion ILIKE '%premium%' THEN 'Membresías Premium'
-                        ELSE 'Otros Ingresos'
-                    END as categoria,
-                    SUM(mf.monto) as monto
-                FROM movimiento_financiero mf
-                WHERE mf.fecha >= :fecha_inicio AND mf.fecha < :fecha_fin
-                AND mf.tipo_movimiento = 'INGRESO'
-                GROUP BY 
-                    CASE 
-                        WHEN mf.descripcion ILIKE '%cuota%' THEN 'Cuotas Mensuales'
-                        WHEN mf.descripcion ILIKE '%evento%' THEN 'Eventos'
-                        WHEN mf.descripcion ILIKE '%servicio%' THEN 'Venta de Servicios'
-                        WHEN mf.descripcion ILIKE '%donación%' THEN 'Donaciones'
-                        WHEN mf.descripcion ILIKE '%premium%' THEN 'Membresías Premium'
-                        ELSE 'Otros Ingresos'
-                    END
-                ORDER BY monto DESC
-                LIMIT 5
-            """), {"fecha_inicio": fecha_inicio, "fecha_fin": fecha_fin}).fetchall()
-            
-            # Top categorías de egresos
-            top_egresos = db.execute(text("""
-                SELECT 
-                    CASE 
-                        WHEN mf.descripcion ILIKE '%equipamiento%' THEN 'Equipamiento'
-                        WHEN mf.descripcion ILIKE '%mantenimiento%' THEN 'Mantenimiento'
-                        WHEN mf.descripcion ILIKE '%administrativo%' THEN 'Gastos Administrativos'
-                        WHEN mf.descripcion ILIKE '%marketing%' THEN 'Marketing'
-                        WHEN mf.descripcion ILIKE '%legal%' THEN 'Gastos Legales'
-                        WHEN mf.descripcion ILIKE '%salario%' THEN 'Salarios'
-                        WHEN mf.descripcion ILIKE '%seguro%' THEN 'Seguros'
-                        ELSE 'Otros Egresos'
-                    END as categoria,
-                    SUM(mf.monto) as monto
-                FROM movimiento_financiero mf
-                WHERE mf.fecha >= :fecha_inicio AND mf.fecha < :fecha_fin
-                AND mf.tipo_movimiento = 'EGRESO'
-                GROUP BY 
-                    CASE 
-                        WHEN mf.descripcion ILIKE '%equipamiento%' THEN 'Equipamiento'
-                        WHEN mf.descripcion ILIKE '%mantenimiento%' THEN 'Mantenimiento'
-                        WHEN mf.descripcion ILIKE '%administrativo%' THEN 'Gastos Administrativos'
-                        WHEN mf.descripcion ILIKE '%marketing%' THEN 'Marketing'
-                        WHEN mf.descripcion ILIKE '%legal%' THEN 'Gastos Legales'
-                        WHEN mf.descripcion ILIKE '%salario%' THEN 'Salarios'
-                        WHEN mf.descripcion ILIKE '%seguro%' THEN 'Seguros'
-                        ELSE 'Otros Egresos'
-                    END
-                ORDER BY monto DESC
-                LIMIT 5
-            """), {"fecha_inicio": fecha_inicio, "fecha_fin": fecha_fin}).fetchall()
+            top_ingresos = _TOP_CATEGORIAS["INGRESO"].ejecutar(
+                db, fecha_inicio=fecha_inicio, fecha_fin=fecha_fin).fetchall()
+            top_egresos = _TOP_CATEGORIAS["EGRESO"].ejecutar(
+                db, fecha_inicio=fecha_inicio, fecha_fin=fecha_fin).fetchall()
             
             # Formatear resultados
             ingresos_formateados = []
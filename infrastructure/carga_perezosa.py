@@ -0,0 +1,69 @@
+"""
+Carga perezosa de servicios con dependencias pesadas.
+
+Los servicios de reportes y PDF (reportlab, matplotlib, numpy, PyPDF2, qrcode)
+y los de pasarelas de pago (stripe, mercadopago, paypalrestsdk) se importan
+recién en su primer uso, para que el arranque de la API no pague ese costo.
+
+Uso en un router:
+    StripeService = clase_perezosa("infrastructure.stripe_service", "StripeService")
+    ...
+    stripe_service = StripeService()   # aquí se importa el módulo
+
+`precargar()` importa todo lo registrado; se usa como warm-up opcional al
+iniciar (ver PRECARGAR_DEPENDENCIAS en config.py).
+"""
+
+import importlib
+import logging
+import threading
+import time
+from typing import Any, Dict
+
+_REGISTRADAS: Dict[str, "ClasePerezosa"] = {}
+
+
+class ClasePerezosa:
+    def __init__(self, modulo: str, nombre: str):
+        self._modulo = modulo
+        self._nombre = nombre
+        self._clase = None
+
+    def _resolver(self):
+        if self._clase is None:
+            self._clase = getattr(importlib.import_module(self._modulo), self._nombre)
+        return self._clase
+
+    def __call__(self, *args, **kwargs):
+        return self._resolver()(*args, **kwargs)
+
+    def __getattr__(self, atributo: str) -> Any:
+        return getattr(self._resolver(), atributo)
+
+    def __repr__(self):
+        estado = "cargada" if self._clase is not None else "sin cargar"
+        return f"<ClasePerezosa {self._modulo}.{self._nombre} ({estado})>"
+
+
+def clase_perezosa(modulo: str, nombre: str) -> ClasePerezosa:
+    """Devuelve un sustituto de la clase que importa su módulo en el primer uso"""
+    clave = f"{modulo}.{nombre}"
+    if clave not in _REGISTRADAS:
+        _REGISTRADAS[clave] = ClasePerezosa(modulo, nombre)
+    return _REGISTRADAS[clave]
+
+
+def precargar():
+    """Importa todas las dependencias registradas (warm-up)"""
+    inicio = time.perf_counter()
+    for clave, clase in list(_REGISTRADAS.items()):
+        try:
+            clase._resolver()
+        except Exception as e:
+            logging.error(f"Error al precargar {clave}: {str(e)}")
+    logging.info(f"Dependencias precargadas en {time.perf_counter() - inicio:.2f}s")
+
+
+def precargar_en_segundo_plano():
+    """Lanza el warm-up en un hilo para no retrasar el arranque"""
+    threading.Thread(target=precargar, name="precarga-dependencias", daemon=True).start()
@@ -0,0 +1,143 @@
+"""
+Caché en memoria de los catálogos del sistema (estado_pago, modalidad_pago,
+estado_accion, roles, cargos y club).
+
+Los catálogos son tablas pequeñas que casi nunca cambian, por lo que se cargan
+una sola vez al iniciar la API y se sirven desde memoria tanto a los routers
+como a los repositorios. La caché se refresca:
+  - al escribir, llamando a `catalogo_cache.invalidar(<catalogo>)`
+  - por PostgreSQL LISTEN/NOTIFY en el canal `catalogos_cambio`
+    (ver create_catalogo_notify.sql)
+Cada catálogo tiene un ETag calculado sobre su contenido para que los clientes
+puedan revalidar con If-None-Match.
+"""
+
+import hashlib
+import json
+import logging
+import threading
+from decimal import Decimal
+from typing import Dict, List, Optional, Tuple
+
+from sqlalchemy import text
+from config import SessionLocal
+from infrastructure.pg_listener import PgListener
+
+CANAL_NOTIFY = "catalogos_cambio"
+
+# nombre del catálogo -> (query, columna id)
+CATALOGOS = {
+    "estado_pago": (
+        "SELECT id_estado_pago, descripcion FROM estado_pago ORDER BY id_estado_pago",
+        "id_estado_pago",
+    ),
+    "modalidad_pago": (
+        """
+        SELECT id_modalidad_pago, descripcion, meses_de_gracia,
+               porcentaje_renovacion_inicial, porcentaje_renovacion_mensual,
+               costo_renovacion_estandar, cantidad_cuotas
+        FROM modalidad_pago
+        ORDER BY id_modalidad_pago
+        """,
+        "id_modalidad_pago",
+    ),
+    "estado_accion": (
+        "SELECT id_estado_accion, nombre_estado_accion FROM estado_accion ORDER BY id_estado_accion",
+        "id_estado_accion",
+    ),
+    "roles": (
+        "SELECT id_rol, nombre_rol FROM roles ORDER BY id_rol",
+        "id_rol",
+    ),
+    "cargos": (
+        "SELECT id_cargo, nombre_cargo FROM cargos ORDER BY id_cargo",
+        "id_cargo",
+    ),
+    "club": (
+        "SELECT id_club, nombre_club FROM club ORDER BY id_club",
+        "id_club",
+    ),
+}
+
+
+class CatalogoCache:
+    def __init__(self):
+        self._lock = threading.Lock()
+        # nombre -> (filas, filas por id, etag)
+        self._datos: Dict[str, Tuple[List[dict], Dict[int, dict], str]] = {}
+        self._listener = PgListener(CANAL_NOTIFY, self._on_notify, self.invalidar)
+
+    def cargar(self, nombre: Optional[str] = None):
+        """Carga (o recarga) un catálogo, o todos si no se indica nombre"""
+        nombres = [nombre] if nombre else list(CATALOGOS.keys())
+        db = SessionLocal()
+        try:
+            for catalogo in nombres:
+                query, columna_id = CATALOGOS[catalogo]
+                result = db.execute(text(query))
+                columnas = list(result.keys())
+                filas = [
+                    {col: float(valor) if isinstance(valor, Decimal) else valor
+                     for col, valor in zip(columnas, row)}
+                    for row in result.fetchall()
+                ]
+                etag = hashlib.sha1(
+                    json.dumps(filas, default=str, sort_keys=True).encode("utf-8")
+                ).hexdigest()
+                with self._lock:
+                    self._datos[catalogo] = (
+                        filas,
+                        {fila[columna_id]: fila for fila in filas},
+                        f'"{catalogo}-{etag[:16]}"',
+                    )
+            logging.info(f"Catálogos cargados en caché: {', '.join(nombres)}")
+        finally:
+            db.close()
+
+    def _asegurar(self, nombre: str):
+        if nombre not in CATALOGOS:
+            raise KeyError(f"Catálogo desconocido: {nombre}")
+        datos = self._datos.get(nombre)
+        if datos is None:
+            self.cargar(nombre)
+            datos = self._datos[nombre]
+        return datos
+
+    def listar(self, nombre: str) -> List[dict]:
+        """Devuelve todas las filas del catálogo"""
+        filas, _, _ = self._asegurar(nombre)
+        return [dict(fila) for fila in filas]
+
+    def obtener(self, nombre: str, id_valor) -> Optional[dict]:
+        """Devuelve una fila del catálogo por ID, o None si no existe"""
+        _, por_id, _ = self._asegurar(nombre)
+        fila = por_id.get(id_valor)
+        return dict(fila) if fila else None
+
+    def etag(self, nombre: str) -> str:
+        _, _, etag = self._asegurar(nombre)
+        return etag
+
+    def invalidar(self, nombre: Optional[str] = None):
+        """Descarta un catálogo (o todos) para que se recargue en el próximo acceso"""
+        with self._lock:
+            if nombre:
+                self._datos.pop(nombre, None)
+            else:
+                self._datos.clear()
+
+    def _on_notify(self, catalogo: str):
+        if catalogo in CATALOGOS:
+            self.invalidar(catalogo)
+        else:
+            self.invalidar()
+
+    def iniciar_listener(self):
+        """Escucha NOTIFY en un hilo aparte e invalida el catálogo notificado"""
+        self._listener.iniciar()
+
+    def detener_listener(self):
+        self._listener.detener()
+
+
+catalogo_cache = CatalogoCache()
@@ -0,0 +1,109 @@
+"""
+Clientes HTTP compartidos para las pasarelas de pago (Stripe, MercadoPago, PayPal).
+
+- `crear_sesion_http()`: sesión de requests con pool de conexiones keep-alive,
+  pensada para vivir todo el proceso (una por pasarela).
+- `TIMEOUT_PASARELA`: timeouts (conexión, lectura) configurables en config.py.
+- `CircuitBreaker`: tras varios fallos seguidos de una pasarela deja de
+  llamarla durante un tiempo y falla de inmediato con `CircuitoAbierto`, en vez
+  de tener cada petición esperando el timeout completo.
+- `FirmaWebhookInvalida`: webhook cuya firma no corresponde a la pasarela.
+"""
+
+import logging
+import threading
+import time
+from typing import Callable, Optional, Tuple, Type
+
+from config import (
+    PASARELA_TIMEOUT_CONEXION, PASARELA_TIMEOUT_LECTURA, PASARELA_POOL_CONEXIONES,
+    CIRCUITO_UMBRAL_FALLOS, CIRCUITO_SEGUNDOS_ABIERTO,
+)
+
+TIMEOUT_PASARELA: Tuple[float, float] = (PASARELA_TIMEOUT_CONEXION, PASARELA_TIMEOUT_LECTURA)
+
+
+def crear_sesion_http(pool: int = PASARELA_POOL_CONEXIONES):
+    """Sesión con conexiones reutilizables; los reintentos los decide cada servicio"""
+    import requests
+    from requests.adapters import HTTPAdapter
+
+    sesion = requests.Session()
+    adaptador = HTTPAdapter(pool_connections=pool, pool_maxsize=pool, max_retries=0)
+    sesion.mount("https://", adaptador)
+    sesion.mount("http://", adaptador)
+    return sesion
+
+
+class ErrorPasarela(Exception):
+    """Fallo de infraestructura de la pasarela (5xx, red); cuenta para el circuito"""
+
+
+class CircuitoAbierto(Exception):
+    pass
+
+
+class FirmaWebhookInvalida(Exception):
+    """El webhook no viene firmado por la pasarela (se responde 400, no se reintenta)"""
+
+
+class CircuitBreaker:
+    CERRADO = "cerrado"
+    ABIERTO = "abierto"
+    SEMIABIERTO = "semiabierto"
+
+    def __init__(self, nombre: str, umbral_fallos: int = CIRCUITO_UMBRAL_FALLOS,
+                 segundos_abierto: float = CIRCUITO_SEGUNDOS_ABIERTO,
+                 errores: Tuple[Type[BaseException], ...] = (Exception,)):
+        self.nombre = nombre
+        self.umbral_fallos = umbral_fallos
+        self.segundos_abierto = segundos_abierto
+        # Solo estos errores cuentan como fallo de la pasarela (no, p. ej., una tarjeta rechazada)
+        self.errores = errores
+        self._estado = self.CERRADO
+        self._fallos = 0
+        self._abierto_desde: Optional[float] = None
+        self._lock = threading.Lock()
+
+    @property
+    def estado(self) -> str:
+        with self._lock:
+            return self._estado
+
+    def llamar(self, funcion: Callable, *args, **kwargs):
+        with self._lock:
+            if self._estado == self.ABIERTO:
+                if time.monotonic() - self._abierto_desde < self.segundos_abierto:
+                    raise CircuitoAbierto(f"Pasarela {self.nombre} no disponible temporalmente")
+                # Pasado el tiempo de espera se deja pasar una llamada de prueba
+                self._estado = self.SEMIABIERTO
+            elif self._estado == self.SEMIABIERTO:
+                raise CircuitoAbierto(f"Pasarela {self.nombre} no disponible temporalmente")
+
+        try:
+            resultado = funcion(*args, **kwargs)
+        except self.errores:
+            self._registrar_fallo()
+            raise
+        except Exception:
+            # Error de negocio (p. ej. pago rechazado): la pasarela respondió
+            self._registrar_exito()
+            raise
+        self._registrar_exito()
+        return resultado
+
+    def _registrar_fallo(self):
+        with self._lock:
+            self._fallos += 1
+            if self._estado == self.SEMIABIERTO or self._fallos >= self.umbral_fallos:
+                if self._estado != self.ABIERTO:
+                    logging.warning(f"Circuito de {self.nombre} abierto tras {self._fallos} fallos")
+                self._estado = self.ABIERTO
+                self._abierto_desde = time.monotonic()
+
+    def _registrar_exito(self):
+        with self._lock:
+            if self._estado != self.CERRADO:
+                logging.info(f"Circuito de {self.nombre} cerrado")
+            self._estado = self.CERRADO
+            self._fallos = 0
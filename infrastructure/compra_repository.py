@@ -1,9 +1,86 @@
 from domain.compra import Compra
 from sqlalchemy.orm import Session
 from sqlalchemy import text
-from config import SessionLocal
-from typing import Optional
+from config import SessionLocal, COMPRAS_ID_CLUB_POR_DEFECTO
+from typing import Optional, Dict
 import logging
+from infrastructure.row_mapper import crear_mapper, DIRECTO, TEXTO, OPCIONAL, FLOAT
+
+_COLUMNAS_COMPRA = [
+    ("id_compra", DIRECTO),
+    ("id_proveedor", DIRECTO),
+    ("fecha_de_compra", TEXTO),
+    ("monto_total", FLOAT),
+    ("estado", DIRECTO),
+    ("numero_factura", OPCIONAL),
+    ("observaciones", OPCIONAL),
+    ("id_club", DIRECTO),
+]
+
+# RETURNING id_compra, id_proveedor, fecha_de_compra, monto_total, estado, numero_factura, observaciones, id_club
+_mapear_compra = crear_mapper(Compra, _COLUMNAS_COMPRA)
+# Igual, más nombre y categoría del proveedor (JOIN con proveedores)
+_mapear_compra_listado = crear_mapper(Compra, _COLUMNAS_COMPRA + [
+    ("proveedor", OPCIONAL),
+    ("categoria_proveedor", OPCIONAL),
+])
+
+# Contabilización (create_compras_contabilizacion.sql): cada compra completada o
+# pagada tiene un EGRESO en movimiento_financiero (id_compra único). Se escribe
+# en la misma transacción que la compra; las que dejan de estar completadas
+# quedan con el movimiento 'anulado'. Mismo criterio que el reporte contable.
+ESTADOS_CONTABILIZADOS = ("completado", "pagado")
+
+_CONTABILIZAR_SQL = text('''
+    INSERT INTO movimiento_financiero
+        (id_club, tipo_movimiento, descripcion, monto, fecha, estado, referencia_relacionada,
+         numero_comprobante, categoria, id_compra)
+    SELECT COALESCE(c.id_club, CAST(:id_club_defecto AS BIGINT), (SELECT MIN(id_club) FROM club)),
+           'EGRESO',
+           'Compra a ' || COALESCE(p.nombre_proveedor, 'proveedor') || COALESCE(' - Factura ' || c.numero_factura, ''),
+           c.monto_total,
+           c.fecha_de_compra,
+           CASE WHEN c.estado = ANY(CAST(:estados AS TEXT[])) THEN 'confirmado' ELSE 'anulado' END,
+           'Proveedor: ' || c.id_proveedor,
+           c.numero_factura,
+           COALESCE(p.categoria, 'Compras'),
+           c.id_compra
+    FROM compras c
+    LEFT JOIN proveedores p ON p.id_proveedor = c.id_proveedor
+    LEFT JOIN movimiento_financiero m ON m.id_compra = c.id_compra
+    WHERE c.id_compra BETWEEN :desde AND :hasta
+      AND (c.estado = ANY(CAST(:estados AS TEXT[])) OR m.id_movimiento IS NOT NULL)
+    ON CONFLICT (id_compra) DO UPDATE
+    SET id_club = EXCLUDED.id_club,
+        descripcion = EXCLUDED.descripcion,
+        monto = EXCLUDED.monto,
+        fecha = EXCLUDED.fecha,
+        estado = EXCLUDED.estado,
+        referencia_relacionada = EXCLUDED.referencia_relacionada,
+        numero_comprobante = EXCLUDED.numero_comprobante,
+        categoria = EXCLUDED.categoria
+    WHERE (movimiento_financiero.id_club, movimiento_financiero.descripcion, movimiento_financiero.monto,
+           movimiento_financiero.fecha, movimiento_financiero.estado, movimiento_financiero.referencia_relacionada,
+           movimiento_financiero.numero_comprobante, movimiento_financiero.categoria)
+          IS DISTINCT FROM
+          (EXCLUDED.id_club, EXCLUDED.descripcion, EXCLUDED.monto, EXCLUDED.fecha, EXCLUDED.estado,
+           EXCLUDED.referencia_relacionada, EXCLUDED.numero_comprobante, EXCLUDED.categoria)
+    RETURNING (xmax = 0) AS insertado
+''')
+
+
+def contabilizar_compras(db: Session, desde: int, hasta: int) -> Dict[str, int]:
+    """
+    Crea o actualiza el movimiento de las compras con id en [desde, hasta],
+    sin confirmar la transacción. Las que ya están al día no se tocan.
+    """
+    filas = db.execute(_CONTABILIZAR_SQL, {
+        "desde": desde, "hasta": hasta, "estados": list(ESTADOS_CONTABILIZADOS),
+        "id_club_defecto": COMPRAS_ID_CLUB_POR_DEFECTO,
+    }).fetchall()
+    insertados = sum(1 for fila in filas if fila[0])
+    return {"insertados": insertados, "actualizados": len(filas) - insertados}
+
 
 class CompraRepository:
     def list_compras(self):
@@ -19,6 +96,7 @@ class CompraRepository:
                     c.estado, 
                     c.numero_factura,
                     c.observaciones,
+                    c.id_club,
                     p.nombre_proveedor,
                     p.categoria
                 FROM compras c
@@ -26,24 +104,7 @@ class CompraRepository:
                 ORDER BY c.fecha_de_compra DESC
             """)).fetchall()
             
-            compras = []
-            for row in result:
-                # Convertir fechas de datetime a string
-                fecha_compra = str(row[2]) if row[2] else None
-                
-                compra = Compra(
-                    id_compra=row[0],
-                    id_proveedor=row[1],
-                    fecha_de_compra=fecha_compra,
-                    monto_total=float(row[3]) if row[3] else 0.0,
-                    estado=row[4],
-                    numero_factura=row[5] if row[5] else None,
-                    observaciones=row[6] if row[6] else None,
-                    proveedor=row[7] if row[7] else None,    # Nombre del proveedor
-                    categoria_proveedor=row[8] if row[8] else None    # Categoría del proveedor
-                )
-                compras.append(compra)
-            return compras
+            return [_mapear_compra_listado(row) for row in result]
         except Exception as e:
             logging.error(f"Error en list_compras: {str(e)}")
             raise Exception(f"Error al consultar compras: {str(e)}")
@@ -63,6 +124,7 @@ class CompraRepository:
                     c.estado, 
                     c.numero_factura,
                     c.observaciones,
+                    c.id_club,
                     p.nombre_proveedor,
                     p.categoria
                 FROM compras c
@@ -71,20 +133,7 @@ class CompraRepository:
             """), {"id_compra": compra_id}).fetchone()
             
             if result:
-                # Convertir fechas de datetime a string
-                fecha_compra = str(result[2]) if result[2] else None
-                
-                return Compra(
-                    id_compra=result[0],
-                    id_proveedor=result[1],
-                    fecha_de_compra=fecha_compra,
-                    monto_total=float(result[3]) if result[3] else 0.0,
-                    estado=result[4],
-                    numero_factura=result[5] if result[5] else None,
-                    observaciones=result[6] if result[6] else None,
-                    proveedor=result[7] if result[7] else None,    # Nombre del proveedor
-                    categoria_proveedor=result[8] if result[8] else None    # Categoría del proveedor
-                )
+                return _mapear_compra_listado(result)
             return None
         except Exception as e:
             logging.error(f"Error en get_compra: {str(e)}")
@@ -96,32 +145,24 @@ class CompraRepository:
         db: Session = SessionLocal()
         try:
             result = db.execute(text('''
-                INSERT INTO compras (id_proveedor, monto_total, estado, numero_factura, observaciones)
-                VALUES (:id_proveedor, :monto_total, :estado, :numero_factura, :observaciones)
-                RETURNING id_compra, id_proveedor, fecha_de_compra, monto_total, estado, numero_factura, observaciones
+                INSERT INTO compras (id_proveedor, monto_total, estado, numero_factura, observaciones, id_club)
+                VALUES (:id_proveedor, :monto_total, :estado, :numero_factura, :observaciones, :id_club)
+                RETURNING id_compra, id_proveedor, fecha_de_compra, monto_total, estado, numero_factura, observaciones, id_club
             '''), data.dict())
-            db.commit()
             row = result.fetchone()
-            
-            # Convertir fechas de datetime a string
-            fecha_compra = str(row[2]) if row[2] else None
+            contabilizar_compras(db, row[0], row[0])
+            db.commit()
             
             # Obtener nombre del proveedor
             proveedor_info = self._get_proveedor_info(db, row[1])
             
-            return Compra(
-                id_compra=row[0],
-                id_proveedor=row[1],
-                fecha_de_compra=fecha_compra,
-                monto_total=float(row[3]) if row[3] else 0.0,
-                estado=row[4],
-                numero_factura=row[5] if row[5] else None,
-                observaciones=row[6] if row[6] else None,
-                proveedor=proveedor_info['nombre_proveedor'],
-                categoria_proveedor=proveedor_info.get('categoria')
-            )
+            compra = _mapear_compra(row)
+            compra.proveedor = proveedor_info['nombre_proveedor']
+            compra.categoria_proveedor = proveedor_info.get('categoria')
+            return compra
         except Exception as e:
             logging.error(f"Error en create_compra: {str(e)}")
+            db.rollback()
             raise Exception(f"Error al crear compra: {str(e)}")
         finally:
             db.close()
@@ -137,8 +178,13 @@ class CompraRepository:
             if not fields:
                 return self.get_compra(compra_id)
             db.execute(text(f"UPDATE compras SET {', '.join(fields)} WHERE id_compra = :id_compra"), params)
+            contabilizar_compras(db, compra_id, compra_id)
             db.commit()
             return self.get_compra(compra_id)
+        except Exception as e:
+            logging.error(f"Error en update_compra: {str(e)}")
+            db.rollback()
+            raise Exception(f"Error al actualizar compra: {str(e)}")
         finally:
             db.close()
 
@@ -166,4 +212,29 @@ class CompraRepository:
             return {'nombre_proveedor': None, 'categoria': None}
         except Exception as e:
             logging.error(f"Error al obtener información del proveedor: {str(e)}")
-            return {'nombre_proveedor': None, 'categoria': None} 
\ No newline at end of file
+            return {'nombre_proveedor': None, 'categoria': None}
+
+    def contabilizar_existentes(self, lote: int = 1000) -> Dict[str, int]:
+        """
+        Contabiliza las compras ya registradas por tramos de id (una transacción
+        por tramo). Se puede repetir: solo escribe los movimientos que faltan o cambiaron.
+        """
+        db: Session = SessionLocal()
+        totales = {"tramos": 0, "insertados": 0, "actualizados": 0}
+        try:
+            minimo, maximo = db.execute(text("SELECT MIN(id_compra), MAX(id_compra) FROM compras")).fetchone()
+            if minimo is None:
+                return totales
+            for desde in range(minimo, maximo + 1, lote):
+                resultado = contabilizar_compras(db, desde, desde + lote - 1)
+                db.commit()
+                totales["tramos"] += 1
+                totales["insertados"] += resultado["insertados"]
+                totales["actualizados"] += resultado["actualizados"]
+            return totales
+        except Exception as e:
+            logging.error(f"Error en contabilizar_existentes: {str(e)}")
+            db.rollback()
+            raise Exception(f"Error al contabilizar compras: {str(e)}")
+        finally:
+            db.close()
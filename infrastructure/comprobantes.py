@@ -0,0 +1,281 @@
+"""
+Comprobantes de pago subidos por los socios (fotos o PDF de transferencias).
+
+Recepción, dentro de la petición y con memoria constante:
+  - el archivo se escribe a disco por bloques a medida que llega, con un
+    tamaño máximo (COMPROBANTES_TAMANO_MAXIMO_MB: se corta al superarlo)
+  - el tipo real se detecta por los primeros bytes (PDF, JPEG, PNG, WebP), no
+    por el nombre ni el Content-Type del cliente
+  - el sha256 se calcula en el mismo recorrido
+  - queda en comprobantes/recibidos/<id_accion>_<sha256>_<uuid>.<ext>: cada
+    subida tiene su propio archivo aunque repita el contenido
+
+Procesamiento, en segundo plano (ProcesadorComprobantes):
+  - las imágenes se reducen (lado mayor COMPROBANTES_LADO_MAXIMO) y se guardan
+    como WebP; los PDF se conservan tal cual
+  - el resultado se guarda por contenido: comprobantes/<sha256>.webp|.pdf. El
+    mismo archivo subido dos veces se procesa una sola vez
+  - la acción pasa a apuntar al archivo normalizado (si no se subió otro
+    comprobante mientras tanto) y se borra el recibido
+
+Si el proceso se reinicia con archivos recibidos sin procesar, reanudar() los
+vuelve a encolar al iniciar la API.
+"""
+
+import hashlib
+import logging
+import os
+import queue
+import re
+import threading
+import uuid
+from dataclasses import dataclass
+from typing import BinaryIO, List, Optional, Set
+
+from config import (COMPROBANTES_TAMANO_MAXIMO_MB, COMPROBANTES_LADO_MAXIMO, COMPROBANTES_CALIDAD_WEBP,
+                    COMPROBANTES_HILOS)
+
+DIRECTORIO_COMPROBANTES = "comprobantes"
+DIRECTORIO_RECIBIDOS = os.path.join(DIRECTORIO_COMPROBANTES, "recibidos")
+TAMANO_MAXIMO = COMPROBANTES_TAMANO_MAXIMO_MB * 1024 * 1024
+# Bytes que se leen / acumulan antes de escribir a disco
+TAMANO_BLOQUE = 1024 * 1024
+
+EXTENSIONES = {"pdf": ".pdf", "jpeg": ".jpg", "png": ".png", "webp": ".webp"}
+TIPOS_CONTENIDO = {".pdf": "application/pdf", ".jpg": "image/jpeg", ".png": "image/png", ".webp": "image/webp"}
+# El sufijo uuid falta en los archivos recibidos antes de agregarlo
+_RECIBIDO_RE = re.compile(r"^(\d+)_([0-9a-f]{64})(?:_[0-9a-f]{32})?(\.\w+)$")
+
+
+class ComprobanteInvalido(Exception):
+    """Contenido que no es PDF ni una imagen admitida"""
+
+
+class ComprobanteDemasiadoGrande(Exception):
+    pass
+
+
+def detectar_tipo(inicio: bytes) -> Optional[str]:
+    """Tipo por los primeros bytes del archivo (firma), o None si no es un formato admitido"""
+    if inicio.startswith(b"%PDF-"):
+        return "pdf"
+    if inicio.startswith(b"\xff\xd8\xff"):
+        return "jpeg"
+    if inicio.startswith(b"\x89PNG\r\n\x1a\n"):
+        return "png"
+    if inicio[:4] == b"RIFF" and inicio[8:12] == b"WEBP":
+        return "webp"
+    return None
+
+
+def tipo_contenido(ruta: str) -> str:
+    return TIPOS_CONTENIDO.get(os.path.splitext(ruta)[1].lower(), "application/octet-stream")
+
+
+def ruta_normalizada(sha256: str, tipo: str) -> str:
+    return os.path.join(DIRECTORIO_COMPROBANTES, f"{sha256}{'.pdf' if tipo == 'pdf' else '.webp'}")
+
+
+@dataclass(frozen=True)
+class ComprobanteRecibido:
+    id_accion: int
+    ruta: str
+    tipo: str
+    tamano: int
+    sha256: str
+
+
+class ReceptorComprobante:
+    """
+    Recibe un comprobante por bloques. Uso:
+
+        receptor = ReceptorComprobante(id_accion)
+        try:
+            for bloque in ...:
+                receptor.agregar(bloque)
+            recibido = receptor.finalizar()
+        except Exception:
+            receptor.descartar()
+            raise
+    """
+
+    def __init__(self, id_accion: int, maximo_bytes: int = TAMANO_MAXIMO, directorio: str = DIRECTORIO_RECIBIDOS):
+        self.id_accion = id_accion
+        self.maximo_bytes = maximo_bytes
+        self.directorio = directorio
+        self.tamano = 0
+        self.tipo: Optional[str] = None
+        self._hash = hashlib.sha256()
+        self._inicio = b""
+        self._ruta_parcial = os.path.join(directorio, f".{id_accion}_{uuid.uuid4().hex}.parte")
+        self._archivo: Optional[BinaryIO] = None
+
+    def agregar(self, bloque: bytes):
+        if not bloque:
+            return
+        self.tamano += len(bloque)
+        if self.tamano > self.maximo_bytes:
+            raise ComprobanteDemasiadoGrande(f"El comprobante supera {self.maximo_bytes // (1024 * 1024)} MB")
+        self._hash.update(bloque)
+
+        if self.tipo is None:
+            # Se esperan los primeros 12 bytes para reconocer la firma
+            self._inicio += bloque
+            if len(self._inicio) < 12:
+                return
+            self._detectar()
+            bloque, self._inicio = self._inicio, b""
+        self._escribir(bloque)
+
+    def copiar_desde(self, archivo: BinaryIO):
+        """Copia un archivo ya abierto (p. ej. el de un UploadFile) por bloques"""
+        while True:
+            bloque = archivo.read(TAMANO_BLOQUE)
+            if not bloque:
+                return
+            self.agregar(bloque)
+
+    def finalizar(self) -> ComprobanteRecibido:
+        if self.tipo is None:
+            self._detectar()
+            self._escribir(self._inicio)
+        self._archivo.close()
+        sha256 = self._hash.hexdigest()
+        ruta = os.path.join(self.directorio, f"{self.id_accion}_{sha256}_{uuid.uuid4().hex}{EXTENSIONES[self.tipo]}")
+        os.replace(self._ruta_parcial, ruta)
+        return ComprobanteRecibido(self.id_accion, ruta, self.tipo, self.tamano, sha256)
+
+    def descartar(self):
+        if self._archivo:
+            self._archivo.close()
+        try:
+            os.remove(self._ruta_parcial)
+        except FileNotFoundError:
+            pass
+
+    def _detectar(self):
+        self.tipo = detectar_tipo(self._inicio)
+        if self.tipo is None:
+            raise ComprobanteInvalido("El comprobante debe ser un PDF o una imagen JPG, PNG o WebP")
+
+    def _escribir(self, bloque: bytes):
+        if self._archivo is None:
+            os.makedirs(self.directorio, exist_ok=True)
+            self._archivo = open(self._ruta_parcial, "wb")
+        self._archivo.write(bloque)
+
+
+def normalizar(origen: str, tipo: str, destino: str):
+    """Imagen -> WebP reducida; PDF -> se mueve sin cambios. Escribe destino de forma atómica"""
+    if tipo == "pdf":
+        os.replace(origen, destino)
+        return
+
+    from PIL import Image, ImageOps
+
+    temporal = f"{destino}.{uuid.uuid4().hex}.parte"
+    lado = COMPROBANTES_LADO_MAXIMO
+    try:
+        with Image.open(origen) as imagen:
+            # JPEG: se decodifica directamente a una escala reducida (menos memoria)
+            imagen.draft("RGB", (lado, lado))
+            imagen = ImageOps.exif_transpose(imagen)
+            if imagen.mode not in ("RGB", "RGBA"):
+                imagen = imagen.convert("RGB")
+            imagen.thumbnail((lado, lado))
+            imagen.save(temporal, "WEBP", quality=COMPROBANTES_CALIDAD_WEBP, method=4)
+        os.replace(temporal, destino)
+    except Exception:
+        try:
+            os.remove(temporal)
+        except FileNotFoundError:
+            pass
+        raise
+
+
+class ProcesadorComprobantes:
+    def __init__(self, hilos: int = COMPROBANTES_HILOS):
+        self.hilos = hilos
+        self._cola: "queue.Queue[Optional[ComprobanteRecibido]]" = queue.Queue()
+        self._pendientes: Set[str] = set()
+        self._lock = threading.Lock()
+        self._hilos: List[threading.Thread] = []
+
+    def encolar(self, recibido: ComprobanteRecibido):
+        with self._lock:
+            if recibido.ruta in self._pendientes:
+                return
+            self._pendientes.add(recibido.ruta)
+        self.iniciar()
+        self._cola.put(recibido)
+
+    def pendientes(self) -> int:
+        with self._lock:
+            return len(self._pendientes)
+
+    def reanudar(self):
+        """Encola los comprobantes recibidos que quedaron sin procesar"""
+        if not os.path.isdir(DIRECTORIO_RECIBIDOS):
+            return
+        extensiones = {extension: tipo for tipo, extension in EXTENSIONES.items()}
+        for entrada in os.scandir(DIRECTORIO_RECIBIDOS):
+            coincidencia = _RECIBIDO_RE.match(entrada.name)
+            if coincidencia and coincidencia.group(3) in extensiones:
+                self.encolar(ComprobanteRecibido(
+                    int(coincidencia.group(1)), entrada.path, extensiones[coincidencia.group(3)],
+                    entrada.stat().st_size, coincidencia.group(2),
+                ))
+
+    def iniciar(self):
+        with self._lock:
+            if self._hilos:
+                return
+            for i in range(self.hilos):
+                hilo = threading.Thread(target=self._trabajar, name=f"comprobantes-{i}", daemon=True)
+                hilo.start()
+                self._hilos.append(hilo)
+
+    def detener(self):
+        with self._lock:
+            hilos, self._hilos = self._hilos, []
+        for _ in hilos:
+            self._cola.put(None)
+        for hilo in hilos:
+            hilo.join(timeout=10)
+
+    def _trabajar(self):
+        while True:
+            recibido = self._cola.get()
+            if recibido is None:
+                return
+            try:
+                self.procesar(recibido)
+            except Exception as e:
+                logging.error(f"Error procesando comprobante {recibido.ruta}: {str(e)}")
+            finally:
+                with self._lock:
+                    self._pendientes.discard(recibido.ruta)
+
+    def procesar(self, recibido: ComprobanteRecibido) -> str:
+        """Normaliza el comprobante (si no existía ya con el mismo contenido) y actualiza la acción"""
+        from infrastructure.accion_repository import AccionRepository
+
+        destino = ruta_normalizada(recibido.sha256, recibido.tipo)
+        if not os.path.exists(destino):
+            try:
+                normalizar(recibido.ruta, recibido.tipo, destino)
+            except Exception as e:
+                # Imagen que no se pudo convertir: se conserva la original
+                logging.warning(f"No se pudo normalizar {recibido.ruta}, se guarda sin convertir: {str(e)}")
+                destino = os.path.join(DIRECTORIO_COMPROBANTES, f"{recibido.sha256}{EXTENSIONES[recibido.tipo]}")
+                os.replace(recibido.ruta, destino)
+
+        AccionRepository().reemplazar_comprobante(recibido.id_accion, recibido.ruta, destino)
+        try:
+            os.remove(recibido.ruta)
+        except FileNotFoundError:
+            pass
+        return destino
+
+
+procesador_comprobantes = ProcesadorComprobantes()
@@ -0,0 +1,74 @@
+from sqlalchemy.orm import Session
+from sqlalchemy import text
+from config import SessionLocal
+from contextlib import contextmanager
+from typing import Optional
+import json
+import logging
+
+# Clave del advisory lock que evita dos conciliaciones simultáneas (varios workers/procesos)
+CLAVE_BLOQUEO_CONCILIACION = "conciliacion_pagos"
+
+
+class ConciliacionRepository:
+    @contextmanager
+    def bloqueo_exclusivo(self):
+        """Devuelve True si este proceso obtuvo el turno de conciliar, False si otro ya lo tiene"""
+        db: Session = SessionLocal()
+        obtenido = False
+        try:
+            obtenido = db.execute(
+                text("SELECT pg_try_advisory_lock(hashtext(:clave))"),
+                {"clave": CLAVE_BLOQUEO_CONCILIACION}
+            ).scalar()
+            yield bool(obtenido)
+        finally:
+            try:
+                if obtenido:
+                    db.execute(text("SELECT pg_advisory_unlock(hashtext(:clave))"),
+                               {"clave": CLAVE_BLOQUEO_CONCILIACION})
+            finally:
+                db.close()
+
+    def guardar_reporte(self, reporte: dict, origen: str) -> int:
+        db: Session = SessionLocal()
+        try:
+            id_reporte = db.execute(text('''
+                INSERT INTO conciliacion_reporte (fecha_inicio, fecha_fin, origen, resumen, detalle)
+                VALUES (:fecha_inicio, :fecha_fin, :origen, CAST(:resumen AS JSONB), CAST(:detalle AS JSONB))
+                RETURNING id_reporte
+            '''), {
+                "fecha_inicio": reporte["fecha_inicio"],
+                "fecha_fin": reporte["fecha_fin"],
+                "origen": origen,
+                "resumen": json.dumps(reporte["resumen"], default=str),
+                "detalle": json.dumps(reporte["detalle"], default=str),
+            }).scalar()
+            db.commit()
+            return id_reporte
+        except Exception as e:
+            logging.error(f"Error en guardar_reporte: {str(e)}")
+            db.rollback()
+            raise Exception(f"Error al guardar reporte de conciliación: {str(e)}")
+        finally:
+            db.close()
+
+    def get_ultimo_reporte(self) -> Optional[dict]:
+        db: Session = SessionLocal()
+        try:
+            row = db.execute(text('''
+                SELECT id_reporte, fecha_inicio, fecha_fin, origen, resumen, detalle
+                FROM conciliacion_reporte ORDER BY fecha_inicio DESC LIMIT 1
+            ''')).fetchone()
+            if not row:
+                return None
+            return {
+                "id_reporte": row[0],
+                "fecha_inicio": str(row[1]),
+                "fecha_fin": str(row[2]),
+                "origen": row[3],
+                "resumen": row[4],
+                "detalle": row[5],
+            }
+        finally:
+            db.close()
@@ -0,0 +1,424 @@
+"""
+Datos del reporte contable en una sola consulta.
+
+Todos los agregados (movimientos confirmados, pagos de acciones, compras,
+salarios, inventario, cuotas pendientes y tendencia mensual) se calculan con
+un único SELECT de varias CTE sobre una conexión del pool: un solo viaje a la
+base de datos por reporte.
+
+Meses cerrados (create_cierres_contables.sql): sus cifras se congelan en
+cierre_contable junto con un checksum de las filas de origen. Los reportes
+toman esos meses del cierre y solo calculan en vivo los tramos abiertos.
+
+`snapshots_contables` guarda el resultado por período (fecha_inicio,
+fecha_fin) mientras no cambie ninguna de las tablas de las que depende
+(ver infrastructure/version_tablas.py) y no venza CONTABLE_SNAPSHOT_TTL_SEGUNDOS.
+"""
+
+import json
+import threading
+import time
+from collections import OrderedDict
+from datetime import date, timedelta
+from decimal import Decimal
+from typing import Dict, List, Optional, Tuple
+
+from sqlalchemy import text
+from sqlalchemy.orm import Session
+
+from config import SessionLocal, CONTABLE_SNAPSHOT_TTL_SEGUNDOS
+from infrastructure.version_tablas import version_tablas
+import logging
+
+TABLAS_CONTABLES = (
+    "movimiento_financiero", "pago_accion", "compras", "personal", "inventario", "accion", "cierre_contable",
+    "inventario_movimiento", "inventario_valoracion",
+)
+# Conceptos que se acumulan en el período; el resto son saldos a la fecha de corte
+CONCEPTOS_FLUJO = ("ingresos", "egresos", "pagos_acciones", "compras")
+CONCEPTOS_SALDO = ("salarios", "inventario", "cuotas_pendientes")
+MESES_TENDENCIA = 12
+
+# Los flujos (movimientos, pagos, compras) se filtran por el período. Las compras
+# son los EGRESO contabilizados con id_compra: salen del mismo recorrido de
+# movimiento_financiero, sin leer la tabla compras. El inventario se valora al
+# final del período; salarios y cuotas pendientes son saldos al momento del reporte
+CONSULTA_CONTABLE = """
+    WITH periodo AS (
+        SELECT CAST(:fecha_inicio AS DATE) AS desde, CAST(:fecha_fin AS DATE) + 1 AS hasta
+    ),
+    movimientos AS (
+        SELECT mf.tipo_movimiento, mf.monto, mf.fecha, mf.id_compra
+        FROM movimiento_financiero mf, periodo p
+        WHERE mf.estado = 'confirmado'
+          AND (p.desde IS NULL OR mf.fecha >= p.desde)
+          AND (p.hasta IS NULL OR mf.fecha < p.hasta)
+    ),
+    totales_movimientos AS (
+        SELECT
+            COALESCE(SUM(monto) FILTER (WHERE tipo_movimiento = 'INGRESO'), 0) AS total_ingresos,
+            COUNT(*) FILTER (WHERE tipo_movimiento = 'INGRESO') AS cantidad_ingresos,
+            COALESCE(SUM(monto) FILTER (WHERE tipo_movimiento = 'EGRESO' AND id_compra IS NULL), 0) AS total_egresos,
+            COUNT(*) FILTER (WHERE tipo_movimiento = 'EGRESO' AND id_compra IS NULL) AS cantidad_egresos,
+            -- Compras contabilizadas (create_compras_contabilizacion.sql)
+            COALESCE(SUM(monto) FILTER (WHERE id_compra IS NOT NULL), 0) AS total_compras,
+            COUNT(*) FILTER (WHERE id_compra IS NOT NULL) AS cantidad_compras
+        FROM movimientos
+    ),
+    tendencia AS (
+        SELECT
+            COALESCE(array_agg(mes ORDER BY mes DESC), '{}') AS tendencia_meses,
+            COALESCE(array_agg(ingresos ORDER BY mes DESC), '{}') AS tendencia_ingresos,
+            COALESCE(array_agg(egresos ORDER BY mes DESC), '{}') AS tendencia_egresos
+        FROM (
+            SELECT
+                TO_CHAR(fecha, 'YYYY-MM') AS mes,
+                SUM(CASE WHEN tipo_movimiento = 'INGRESO' THEN monto ELSE 0 END) AS ingresos,
+                SUM(CASE WHEN tipo_movimiento = 'EGRESO' THEN monto ELSE 0 END) AS egresos
+            FROM movimientos
+            GROUP BY TO_CHAR(fecha, 'YYYY-MM')
+            ORDER BY mes DESC
+            LIMIT :meses_tendencia
+        ) meses
+    ),
+    pagos_acciones AS (
+        SELECT COALESCE(SUM(pa.monto), 0) AS total_pagos_acciones, COUNT(*) AS cantidad_pagos
+        FROM pago_accion pa, periodo p
+        WHERE pa.estado_pago = 2
+          AND (p.desde IS NULL OR pa.fecha_de_pago >= p.desde)
+          AND (p.hasta IS NULL OR pa.fecha_de_pago < p.hasta)
+    ),
+    salarios AS (
+        SELECT COALESCE(SUM(salario), 0) AS total_salarios, COUNT(*) AS cantidad_empleados
+        FROM personal
+        WHERE estado = TRUE
+    ),
+    inventario_valor AS (
+        -- Existencias al final del período: última valoración diaria más los
+        -- movimientos posteriores (create_inventario_movimientos.sql)
+        SELECT COALESCE(SUM(e.cantidad * e.precio_unitario), 0) AS valor_inventario,
+               COUNT(*) AS cantidad_productos
+        FROM periodo p, inventario_existencias(p.hasta) e
+        WHERE e.cantidad > 0
+    ),
+    cuotas_pendientes AS (
+        SELECT COALESCE(SUM(saldo_pendiente), 0) AS total_cuotas_pendientes, COUNT(*) AS cantidad_cuotas
+        FROM accion
+        WHERE saldo_pendiente > 0
+    )
+    SELECT *
+    FROM totales_movimientos, tendencia, pagos_acciones, salarios,
+         inventario_valor, cuotas_pendientes
+"""
+
+
+class ContabilidadRepository:
+    def get_datos_contables(self, fecha_inicio: Optional[date] = None, fecha_fin: Optional[date] = None) -> Dict:
+        """
+        Datos del reporte contable con la misma forma que consumen los
+        generadores de ReporteContableService: (total, cantidad) por concepto y
+        tendencia_mensual como filas (mes, ingresos, egresos), del más reciente al más antiguo.
+        """
+        db: Session = SessionLocal()
+        try:
+            fila = db.execute(
+                text(CONSULTA_CONTABLE),
+                {"fecha_inicio": fecha_inicio, "fecha_fin": fecha_fin, "meses_tendencia": MESES_TENDENCIA}
+            ).fetchone()
+            return _datos_desde_fila(fila)
+        except Exception as e:
+            logging.error(f"Error en get_datos_contables: {str(e)}")
+            raise Exception(f"Error al obtener datos contables: {str(e)}")
+        finally:
+            db.close()
+
+    # ---------- Cierres mensuales ----------
+
+    def get_cierres(self, desde: Optional[date] = None, hasta: Optional[date] = None) -> Dict[date, Dict]:
+        """Cifras congeladas de los meses cerrados dentro de [desde, hasta]"""
+        db: Session = SessionLocal()
+        try:
+            result = db.execute(text("""
+                SELECT periodo, datos
+                FROM cierre_contable
+                WHERE (CAST(:desde AS DATE) IS NULL OR periodo >= CAST(:desde AS DATE))
+                  AND (CAST(:hasta AS DATE) IS NULL OR periodo <= CAST(:hasta AS DATE))
+                ORDER BY periodo
+            """), {"desde": desde, "hasta": hasta}).fetchall()
+            return {row[0]: _datos_desde_json(row[1]) for row in result}
+        except Exception as e:
+            # Sin la tabla (create_cierres_contables.sql no ejecutado) todo se calcula en vivo
+            logging.warning(f"No se pudieron leer los cierres contables: {str(e)}")
+            return {}
+        finally:
+            db.close()
+
+    def listar_cierres(self) -> List[Dict]:
+        db: Session = SessionLocal()
+        try:
+            result = db.execute(text("""
+                SELECT periodo, checksum, filas_origen, fecha_cierre, id_usuario
+                FROM cierre_contable
+                ORDER BY periodo DESC
+            """)).fetchall()
+            return [dict(row._mapping) for row in result]
+        except Exception as e:
+            logging.error(f"Error en listar_cierres: {str(e)}")
+            raise Exception(f"Error al listar cierres contables: {str(e)}")
+        finally:
+            db.close()
+
+    def cerrar_periodo(self, periodo: date, id_usuario: Optional[int]) -> Optional[Dict]:
+        """
+        Congela las cifras del mes `periodo` (primer día del mes). Cifras y
+        checksum salen de la misma foto de los datos. Devuelve None si ya estaba cerrado.
+        """
+        fin = _mes_siguiente(periodo) - timedelta(days=1)
+        db: Session = SessionLocal()
+        try:
+            db.connection(execution_options={"isolation_level": "REPEATABLE READ"})
+            fila = db.execute(
+                text(CONSULTA_CONTABLE),
+                {"fecha_inicio": periodo, "fecha_fin": fin, "meses_tendencia": MESES_TENDENCIA}
+            ).fetchone()
+            checksum, filas = db.execute(
+                text(f"SELECT * FROM ({CHECKSUM_ORIGEN.format(desde=':desde')}) f"), {"desde": periodo}
+            ).fetchone()
+            cierre = db.execute(text("""
+                INSERT INTO cierre_contable (periodo, datos, checksum, filas_origen, id_usuario)
+                VALUES (:periodo, CAST(:datos AS JSONB), :checksum, :filas, :id_usuario)
+                ON CONFLICT (periodo) DO NOTHING
+                RETURNING periodo, checksum, filas_origen, fecha_cierre, id_usuario
+            """), {
+                "periodo": periodo, "datos": _datos_a_json(_datos_desde_fila(fila)),
+                "checksum": checksum, "filas": filas, "id_usuario": id_usuario,
+            }).fetchone()
+            db.commit()
+            return dict(cierre._mapping) if cierre else None
+        except Exception as e:
+            logging.error(f"Error en cerrar_periodo: {str(e)}")
+            db.rollback()
+            raise Exception(f"Error al cerrar el período contable: {str(e)}")
+        finally:
+            db.close()
+
+    def reabrir_periodo(self, periodo: date) -> bool:
+        db: Session = SessionLocal()
+        try:
+            eliminado = db.execute(
+                text("DELETE FROM cierre_contable WHERE periodo = :periodo"), {"periodo": periodo}
+            ).rowcount
+            db.commit()
+            return bool(eliminado)
+        except Exception as e:
+            logging.error(f"Error en reabrir_periodo: {str(e)}")
+            db.rollback()
+            raise Exception(f"Error al reabrir el período contable: {str(e)}")
+        finally:
+            db.close()
+
+    def verificar_cierres(self) -> List[Dict]:
+        """Recalcula el checksum de cada mes cerrado y lo compara con el guardado"""
+        db: Session = SessionLocal()
+        try:
+            result = db.execute(text(f"""
+                SELECT c.periodo, c.checksum, c.filas_origen, f.checksum AS checksum_actual, f.filas AS filas_actuales
+                FROM cierre_contable c
+                CROSS JOIN LATERAL ({CHECKSUM_ORIGEN.format(desde='c.periodo')}) f
+                ORDER BY c.periodo DESC
+            """)).fetchall()
+            return [
+                {**dict(row._mapping), "integro": row.checksum == row.checksum_actual}
+                for row in result
+            ]
+        except Exception as e:
+            logging.error(f"Error en verificar_cierres: {str(e)}")
+            raise Exception(f"Error al verificar cierres contables: {str(e)}")
+        finally:
+            db.close()
+
+    def resellar_cierres(self, periodos: List[date]) -> int:
+        """
+        Recalcula y guarda el checksum de los meses indicados, sin tocar sus
+        cifras congeladas. Solo para cambios de origen esperados (p. ej. la
+        contabilización de compras anteriores): un mes alterado deja de detectarse
+        """
+        if not periodos:
+            return 0
+        db: Session = SessionLocal()
+        try:
+            resellados = db.execute(text(f"""
+                UPDATE cierre_contable c
+                SET checksum = f.checksum, filas_origen = f.filas
+                FROM cierre_contable c2
+                CROSS JOIN LATERAL ({CHECKSUM_ORIGEN.format(desde='c2.periodo')}) f
+                WHERE c.periodo = c2.periodo AND c.periodo = ANY(CAST(:periodos AS DATE[]))
+            """), {"periodos": periodos}).rowcount
+            db.commit()
+            return resellados
+        except Exception as e:
+            logging.error(f"Error en resellar_cierres: {str(e)}")
+            db.rollback()
+            raise Exception(f"Error al resellar cierres contables: {str(e)}")
+        finally:
+            db.close()
+
+
+# md5 de las filas que alimentan los flujos de un mes. Se usan valores y no
+# fecha_actualizacion: solo un cambio real de cifras (o una fila que entra o
+# sale del mes) altera el checksum
+CHECKSUM_ORIGEN = """
+    SELECT COALESCE(md5(string_agg(fila, '|' ORDER BY fila)), md5('')) AS checksum, COUNT(*) AS filas
+    FROM (
+        SELECT concat_ws(':', 'mf', id_movimiento, tipo_movimiento, monto, estado, EXTRACT(EPOCH FROM fecha)) AS fila
+        FROM movimiento_financiero
+        WHERE fecha >= {desde} AND fecha < {desde} + INTERVAL '1 month'
+        UNION ALL
+        SELECT concat_ws(':', 'pa', id_pago, id_accion, monto, estado_pago, EXTRACT(EPOCH FROM fecha_de_pago))
+        FROM pago_accion
+        WHERE fecha_de_pago >= {desde} AND fecha_de_pago < {desde} + INTERVAL '1 month'
+        UNION ALL
+        SELECT concat_ws(':', 'co', id_compra, monto_total, estado, EXTRACT(EPOCH FROM fecha_de_compra))
+        FROM compras
+        WHERE fecha_de_compra >= {desde} AND fecha_de_compra < {desde} + INTERVAL '1 month'
+    ) origen
+"""
+
+
+def _mes_siguiente(fecha: date) -> date:
+    return date(fecha.year + fecha.month // 12, fecha.month % 12 + 1, 1)
+
+
+def _datos_desde_fila(fila) -> Dict:
+    fila = fila._mapping
+    return {
+        "ingresos": (fila["total_ingresos"], fila["cantidad_ingresos"]),
+        "egresos": (fila["total_egresos"], fila["cantidad_egresos"]),
+        "pagos_acciones": (fila["total_pagos_acciones"], fila["cantidad_pagos"]),
+        "compras": (fila["total_compras"], fila["cantidad_compras"]),
+        "salarios": (fila["total_salarios"], fila["cantidad_empleados"]),
+        "inventario": (fila["valor_inventario"], fila["cantidad_productos"]),
+        "cuotas_pendientes": (fila["total_cuotas_pendientes"], fila["cantidad_cuotas"]),
+        "tendencia_mensual": list(zip(
+            fila["tendencia_meses"], fila["tendencia_ingresos"], fila["tendencia_egresos"]
+        )),
+    }
+
+
+def _datos_a_json(datos: Dict) -> str:
+    # Los montos se guardan como texto para no perder precisión decimal
+    return json.dumps({
+        concepto: [[str(v) if isinstance(v, Decimal) else v for v in fila] for fila in valor]
+        if concepto == "tendencia_mensual" else [str(valor[0]), valor[1]]
+        for concepto, valor in datos.items()
+    })
+
+
+def _datos_desde_json(datos) -> Dict:
+    if isinstance(datos, str):
+        datos = json.loads(datos)
+    return {
+        concepto: [(mes, Decimal(ingresos), Decimal(egresos)) for mes, ingresos, egresos in valor]
+        if concepto == "tendencia_mensual" else (Decimal(valor[0]), valor[1])
+        for concepto, valor in datos.items()
+    }
+
+
+def combinar_datos(partes: List[Dict]) -> Dict:
+    """
+    Une las cifras de tramos consecutivos (ordenados del más antiguo al más
+    reciente): los flujos se suman y los saldos son los del último tramo.
+    """
+    if len(partes) == 1:
+        return partes[0]
+    combinado: Dict = {}
+    for concepto in CONCEPTOS_FLUJO:
+        combinado[concepto] = (
+            sum((Decimal(parte[concepto][0]) for parte in partes), Decimal("0")),
+            sum(parte[concepto][1] for parte in partes),
+        )
+    for concepto in CONCEPTOS_SALDO:
+        combinado[concepto] = partes[-1][concepto]
+    meses: Dict[str, list] = {}
+    for parte in partes:
+        for mes, ingresos, egresos in parte["tendencia_mensual"]:
+            acumulado = meses.setdefault(mes, [Decimal("0"), Decimal("0")])
+            acumulado[0] += Decimal(ingresos)
+            acumulado[1] += Decimal(egresos)
+    combinado["tendencia_mensual"] = [
+        (mes, *meses[mes]) for mes in sorted(meses, reverse=True)[:MESES_TENDENCIA]
+    ]
+    return combinado
+
+
+class SnapshotsContables:
+    """Datos contables por período, válidos mientras no cambien TABLAS_CONTABLES"""
+
+    def __init__(self, repository: Optional[ContabilidadRepository] = None,
+                 ttl_segundos: float = CONTABLE_SNAPSHOT_TTL_SEGUNDOS, max_entradas: int = 64):
+        self.repository = repository or ContabilidadRepository()
+        self.ttl_segundos = ttl_segundos
+        self.max_entradas = max_entradas
+        self._entradas: "OrderedDict[tuple, Tuple[float, tuple, str, Dict]]" = OrderedDict()
+        self._lock = threading.Lock()
+
+    def obtener(self, fecha_inicio: Optional[date] = None, fecha_fin: Optional[date] = None) -> Dict:
+        if not self.ttl_segundos:
+            return self._calcular(fecha_inicio, fecha_fin)
+
+        clave = (fecha_inicio, fecha_fin)
+        version = version_tablas.version(TABLAS_CONTABLES)
+        epoca = version_tablas.epoca
+        ahora = time.monotonic()
+        with self._lock:
+            entrada = self._entradas.get(clave)
+            if entrada and entrada[0] > ahora and entrada[1] == version and entrada[2] == epoca:
+                self._entradas.move_to_end(clave)
+                return entrada[3]
+
+        datos = self._calcular(fecha_inicio, fecha_fin)
+        with self._lock:
+            self._entradas[clave] = (ahora + self.ttl_segundos, version, epoca, datos)
+            self._entradas.move_to_end(clave)
+            while len(self._entradas) > self.max_entradas:
+                self._entradas.popitem(last=False)
+        return datos
+
+    def invalidar(self):
+        with self._lock:
+            self._entradas.clear()
+
+    def _calcular(self, fecha_inicio: Optional[date], fecha_fin: Optional[date]) -> Dict:
+        """Meses cerrados desde cierre_contable; los tramos abiertos, en vivo"""
+        cierres = self.repository.get_cierres(fecha_inicio, fecha_fin)
+        partes = []
+        for tramo in _tramos(fecha_inicio, fecha_fin, cierres):
+            if isinstance(tramo, date):
+                partes.append(cierres[tramo])
+            else:
+                partes.append(self.repository.get_datos_contables(*tramo))
+        return combinar_datos(partes)
+
+
+def _tramos(fecha_inicio: Optional[date], fecha_fin: Optional[date], cierres: Dict[date, Dict]) -> list:
+    """
+    Divide el período en meses cerrados (date del mes) y rangos abiertos
+    (fecha_inicio, fecha_fin) a calcular en vivo, en orden cronológico. Solo
+    cuentan los meses cerrados que caen completos dentro del período.
+    """
+    tramos = []
+    cursor = fecha_inicio
+    for mes in sorted(cierres):
+        fin_mes = _mes_siguiente(mes) - timedelta(days=1)
+        if (fecha_inicio and mes < fecha_inicio) or (fecha_fin and fin_mes > fecha_fin):
+            continue
+        if cursor is None or cursor < mes:
+            tramos.append((cursor, mes - timedelta(days=1)))
+        tramos.append(mes)
+        cursor = fin_mes + timedelta(days=1)
+    if cursor is None or fecha_fin is None or cursor <= fecha_fin:
+        tramos.append((cursor, fecha_fin))
+    return tramos
+
+
+snapshots_contables = SnapshotsContables()
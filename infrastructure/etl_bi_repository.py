@@ -0,0 +1,608 @@
+"""
+ETL incremental de las tablas consolidadas de BI.
+
+Cada tabla consolidada tiene una definición con:
+  - columnas y clave primaria (para el upsert)
+  - `fuente`: tabla e id principal; el mayor id procesado es la marca de agua por id
+  - `cambios`: las claves afectadas por filas de las tablas base con
+    fecha_actualizacion posterior a la marca de agua de tiempo (o id nuevo), y
+    las claves anteriores de filas borradas o movidas (etl_bi_cambio)
+  - `select`: el cálculo de la tabla, restringido con {filtro} a esas claves
+  - `reemplazo`: columnas de un grupo de filas (finanzas_resumen por club y
+    mes); los grupos afectados se borran y se vuelven a insertar completos
+
+Cada tabla se actualiza en una transacción REPEATABLE READ propia: la marca de
+agua guardada corresponde exactamente a la foto de los datos leídos.
+"""
+
+from contextlib import contextmanager
+from datetime import datetime, timedelta
+from typing import Dict, List, Optional
+
+from sqlalchemy import text
+from sqlalchemy.orm import Session
+
+from config import SessionLocal
+from infrastructure.bi_personal_repository import ESTADO_PRESENTE, ESTADO_TARDANZA, ESTADO_AUSENTE
+import logging
+
+# Clave del advisory lock que evita dos ETL simultáneos (varios workers/procesos)
+CLAVE_BLOQUEO_ETL = "etl_bi"
+
+_CATEGORIA_MOVIMIENTO = """
+    CASE
+        WHEN mf.id_compra IS NOT NULL THEN 'Compras'
+        WHEN mf.descripcion ILIKE '%cuota%' THEN 'Cuotas'
+        WHEN mf.descripcion ILIKE '%donación%' THEN 'Donaciones'
+        WHEN mf.descripcion ILIKE '%evento%' THEN 'Eventos'
+        WHEN mf.descripcion ILIKE '%servicio%' THEN 'Servicios'
+        WHEN mf.descripcion ILIKE '%compra%' THEN 'Compras'
+        WHEN mf.descripcion ILIKE '%material%' THEN 'Materiales'
+        ELSE 'Otros'
+    END
+"""
+
+TABLAS_BI: Dict[str, dict] = {
+    # Socios con sus acciones
+    "socios_activos": {
+        "columnas": [
+            ("id_socio", "BIGINT NOT NULL"),
+            ("nombres", "TEXT"),
+            ("apellidos", "TEXT"),
+            ("nombre_completo", "TEXT"),
+            ("estado", "BIGINT"),
+            ("fecha_de_registro", "TIMESTAMPTZ"),
+            ("nombre_club", "TEXT"),
+            ("total_acciones", "INT"),
+            ("total_invertido", "NUMERIC(14,2)"),
+            ("es_activo", "BOOLEAN"),
+            ("antiguedad_anios", "INT"),
+        ],
+        "clave": ("id_socio",),
+        "filtro": "s.id_socio",
+        "fuente": ("socio", "id_socio"),
+        "cambios": """
+            SELECT id_socio FROM socio WHERE fecha_actualizacion > :desde OR id_socio > :ultimo_id
+            UNION SELECT id_socio FROM accion WHERE fecha_actualizacion > :desde
+            UNION SELECT (fila->>'id_socio')::BIGINT FROM etl_bi_cambio WHERE tabla = 'accion' AND fecha > :desde
+        """,
+        "select": """
+            SELECT s.id_socio, s.nombres, s.apellidos, CONCAT(s.nombres, ' ', s.apellidos),
+                   s.estado, s.fecha_de_registro, c.nombre_club,
+                   COUNT(a.id_accion), COALESCE(SUM(COALESCE(a.saldo_pendiente, 0)), 0),
+                   s.estado = 1,
+                   EXTRACT(YEAR FROM AGE(CURRENT_DATE, s.fecha_de_registro))::INT
+            FROM socio s
+            LEFT JOIN club c ON s.id_club = c.id_club
+            LEFT JOIN accion a ON s.id_socio = a.id_socio
+            WHERE {filtro}
+            GROUP BY s.id_socio, c.id_club
+        """,
+        "indices": ["estado", "fecha_de_registro"],
+    },
+
+    # Resumen financiero mensual por club, tipo y categoría
+    "finanzas_resumen": {
+        "columnas": [
+            ("anio", "INT NOT NULL"),
+            ("mes", "INT NOT NULL"),
+            ("fecha_mes", "TIMESTAMPTZ NOT NULL"),
+            ("id_club", "BIGINT NOT NULL"),
+            ("nombre_club", "TEXT"),
+            ("tipo_movimiento", "TEXT NOT NULL"),
+            ("categoria", "TEXT NOT NULL"),
+            ("monto_total", "NUMERIC(14,2)"),
+            ("cantidad_movimientos", "INT"),
+            ("monto_promedio", "NUMERIC(14,2)"),
+        ],
+        "clave": ("fecha_mes", "id_club", "tipo_movimiento", "categoria"),
+        "filtro": "(mf.id_club, DATE_TRUNC('month', mf.fecha))",
+        "fuente": ("movimiento_financiero", "id_movimiento"),
+        "reemplazo": ("id_club", "fecha_mes"),
+        "cambios": """
+            SELECT id_club, DATE_TRUNC('month', fecha)
+            FROM movimiento_financiero
+            WHERE (fecha_actualizacion > :desde OR id_movimiento > :ultimo_id) AND fecha IS NOT NULL
+            UNION
+            SELECT (fila->>'id_club')::BIGINT, DATE_TRUNC('month', (fila->>'fecha')::TIMESTAMPTZ)
+            FROM etl_bi_cambio
+            WHERE tabla = 'movimiento_financiero' AND fecha > :desde AND fila->>'fecha' IS NOT NULL
+        """,
+        "select": f"""
+            SELECT EXTRACT(YEAR FROM m.fecha_mes)::INT, EXTRACT(MONTH FROM m.fecha_mes)::INT, m.fecha_mes,
+                   m.id_club, c.nombre_club, m.tipo_movimiento, m.categoria,
+                   SUM(m.monto), COUNT(*), AVG(m.monto)
+            FROM (
+                SELECT DATE_TRUNC('month', mf.fecha) AS fecha_mes, mf.id_club, mf.tipo_movimiento, mf.monto,
+                       {_CATEGORIA_MOVIMIENTO} AS categoria
+                FROM movimiento_financiero mf
+                WHERE mf.fecha IS NOT NULL AND mf.estado = 'confirmado' AND {{filtro}}
+            ) m
+            LEFT JOIN club c ON m.id_club = c.id_club
+            GROUP BY m.fecha_mes, m.id_club, c.id_club, m.tipo_movimiento, m.categoria
+        """,
+        "indices": ["fecha_mes", "nombre_club"],
+    },
+
+    # Estado de pago de cada acción
+    "acciones_pagos_resumen": {
+        "columnas": [
+            ("id_accion", "BIGINT NOT NULL"),
+            ("id_socio", "BIGINT"),
+            ("nombre_socio", "TEXT"),
+            ("nombre_club", "TEXT"),
+            ("tipo_accion", "TEXT"),
+            ("precio_renovacion", "NUMERIC(14,2)"),
+            ("modalidad_pago", "TEXT"),
+            ("cantidad_cuotas", "INT"),
+            ("pagos_realizados", "INT"),
+            ("total_pagado", "NUMERIC(14,2)"),
+            ("saldo_pendiente", "NUMERIC(14,2)"),
+            ("estado_pago", "TEXT"),
+            ("porcentaje_pagado", "NUMERIC"),
+            ("pagos_restantes", "INT"),
+            ("fecha_emision_certificado", "TIMESTAMPTZ"),
+            ("ultimo_pago", "TIMESTAMPTZ"),
+        ],
+        "clave": ("id_accion",),
+        "filtro": "a.id_accion",
+        "fuente": ("accion", "id_accion"),
+        "cambios": """
+            SELECT id_accion FROM accion WHERE fecha_actualizacion > :desde OR id_accion > :ultimo_id
+            UNION SELECT id_accion FROM pago_accion WHERE fecha_actualizacion > :desde
+            UNION SELECT a.id_accion FROM accion a JOIN socio s ON s.id_socio = a.id_socio
+                  WHERE s.fecha_actualizacion > :desde
+            UNION SELECT (fila->>'id_accion')::BIGINT FROM etl_bi_cambio WHERE tabla = 'pago_accion' AND fecha > :desde
+        """,
+        "select": """
+            SELECT a.id_accion, a.id_socio, CONCAT(s.nombres, ' ', s.apellidos), c.nombre_club, a.tipo_accion,
+                   COALESCE(a.saldo_pendiente, 0), mp.descripcion, mp.cantidad_cuotas,
+                   COUNT(pa.id_pago), COALESCE(SUM(pa.monto), 0),
+                   COALESCE(a.saldo_pendiente, 0) - COALESCE(SUM(pa.monto), 0),
+                   CASE
+                       WHEN COUNT(pa.id_pago) = 0 THEN 'SIN_PAGOS'
+                       WHEN COUNT(pa.id_pago) = mp.cantidad_cuotas THEN 'COMPLETAMENTE_PAGADO'
+                       ELSE 'PAGO_PARCIAL'
+                   END,
+                   CASE
+                       WHEN COALESCE(a.saldo_pendiente, 0) > 0 THEN
+                           COALESCE(SUM(pa.monto), 0) / a.saldo_pendiente * 100
+                       ELSE 0
+                   END,
+                   mp.cantidad_cuotas - COUNT(pa.id_pago),
+                   a.fecha_emision_certificado,
+                   MAX(pa.fecha_de_pago)
+            FROM accion a
+            LEFT JOIN socio s ON a.id_socio = s.id_socio
+            LEFT JOIN club c ON a.id_club = c.id_club
+            LEFT JOIN modalidad_pago mp ON a.modalidad_pago = mp.id_modalidad_pago
+            LEFT JOIN pago_accion pa ON a.id_accion = pa.id_accion
+            WHERE {filtro}
+            GROUP BY a.id_accion, s.id_socio, c.id_club, mp.id_modalidad_pago
+        """,
+        "indices": ["id_socio", "estado_pago"],
+    },
+
+    # Personal con su asistencia acumulada
+    "personal_asistencia_resumen": {
+        "columnas": [
+            ("id_personal", "BIGINT NOT NULL"),
+            ("nombre_completo", "TEXT"),
+            ("departamento", "TEXT"),
+            ("nombre_cargo", "TEXT"),
+            ("fecha_ingreso", "TIMESTAMPTZ"),
+            ("antiguedad_anios", "INT"),
+            ("salario", "NUMERIC(14,2)"),
+            ("estado", "BOOLEAN"),
+            ("total_asistencias", "INT"),
+            ("asistencias_completas", "INT"),
+            ("tardanzas", "INT"),
+            ("ausencias", "INT"),
+            ("porcentaje_asistencia", "DOUBLE PRECISION"),
+        ],
+        "clave": ("id_personal",),
+        "filtro": "p.id_personal",
+        "fuente": ("personal", "id_personal"),
+        "cambios": """
+            SELECT id_personal FROM personal WHERE fecha_actualizacion > :desde OR id_personal > :ultimo_id
+            UNION SELECT id_personal FROM asistencia WHERE fecha_actualizacion > :desde
+            UNION SELECT (fila->>'id_personal')::BIGINT FROM etl_bi_cambio
+                  WHERE tabla = 'asistencia' AND fecha > :desde
+        """,
+        "select": f"""
+            SELECT p.id_personal, CONCAT(p.nombres, ' ', p.apellidos), p.departamento, c.nombre_cargo,
+                   p.fecha_ingreso, EXTRACT(YEAR FROM AGE(CURRENT_DATE, p.fecha_ingreso))::INT,
+                   p.salario, p.estado,
+                   COUNT(a.id_asistencia),
+                   COUNT(*) FILTER (WHERE a.estado_codigo = {ESTADO_PRESENTE}),
+                   COUNT(*) FILTER (WHERE a.estado_codigo = {ESTADO_TARDANZA}),
+                   COUNT(*) FILTER (WHERE a.estado_codigo = {ESTADO_AUSENTE}),
+                   CASE
+                       WHEN COUNT(a.id_asistencia) > 0 THEN
+                           COUNT(*) FILTER (WHERE a.estado_codigo = {ESTADO_PRESENTE})::float / COUNT(a.id_asistencia) * 100
+                       ELSE 0
+                   END
+            FROM personal p
+            LEFT JOIN cargos c ON p.cargo = c.id_cargo
+            LEFT JOIN asistencia a ON p.id_personal = a.id_personal
+            WHERE {{filtro}}
+            GROUP BY p.id_personal, c.id_cargo
+        """,
+        "indices": ["departamento"],
+    },
+
+    # KPIs por club. Cada agregado se calcula en su propia subconsulta: unir
+    # socio, accion y movimiento_financiero en un mismo GROUP BY multiplica las filas
+    "metricas_club_resumen": {
+        "columnas": [
+            ("id_club", "BIGINT NOT NULL"),
+            ("nombre_club", "TEXT"),
+            ("ubicacion", "TEXT"),
+            ("total_socios", "INT"),
+            ("socios_activos", "INT"),
+            ("socios_inactivos", "INT"),
+            ("total_acciones", "INT"),
+            ("valor_total_acciones", "NUMERIC(14,2)"),
+            ("ingresos_totales", "NUMERIC(14,2)"),
+            ("egresos_totales", "NUMERIC(14,2)"),
+            ("balance_neto", "NUMERIC(14,2)"),
+            ("tasa_retencion", "DOUBLE PRECISION"),
+        ],
+        "clave": ("id_club",),
+        "filtro": "c.id_club",
+        "fuente": ("club", "id_club"),
+        "cambios": """
+            SELECT id_club FROM club WHERE id_club > :ultimo_id
+            UNION SELECT id_club FROM socio WHERE fecha_actualizacion > :desde
+            UNION SELECT id_club FROM accion WHERE fecha_actualizacion > :desde
+            UNION SELECT id_club FROM movimiento_financiero WHERE fecha_actualizacion > :desde
+            UNION SELECT (fila->>'id_club')::BIGINT FROM etl_bi_cambio
+                  WHERE tabla IN ('socio', 'accion', 'movimiento_financiero') AND fecha > :desde
+        """,
+        "select": """
+            SELECT c.id_club, c.nombre_club, COALESCE(c.direccion, 'Sin ubicación'),
+                   COALESCE(s.total, 0), COALESCE(s.activos, 0), COALESCE(s.total, 0) - COALESCE(s.activos, 0),
+                   COALESCE(a.total, 0), COALESCE(a.valor, 0),
+                   COALESCE(m.ingresos, 0), COALESCE(m.egresos, 0),
+                   COALESCE(m.ingresos, 0) - COALESCE(m.egresos, 0),
+                   CASE WHEN s.total > 0 THEN s.activos::float / s.total * 100 ELSE 0 END
+            FROM club c
+            LEFT JOIN LATERAL (
+                SELECT COUNT(*) AS total, COUNT(*) FILTER (WHERE estado = 1) AS activos
+                FROM socio WHERE id_club = c.id_club
+            ) s ON TRUE
+            LEFT JOIN LATERAL (
+                SELECT COUNT(*) AS total, SUM(COALESCE(saldo_pendiente, 0)) AS valor
+                FROM accion WHERE id_club = c.id_club
+            ) a ON TRUE
+            LEFT JOIN LATERAL (
+                SELECT SUM(monto) FILTER (WHERE tipo_movimiento = 'INGRESO') AS ingresos,
+                       SUM(monto) FILTER (WHERE tipo_movimiento = 'EGRESO') AS egresos
+                FROM movimiento_financiero WHERE id_club = c.id_club
+            ) m ON TRUE
+            WHERE {filtro}
+        """,
+        "indices": ["balance_neto"],
+    },
+}
+
+# Índices de las tablas base para detectar cambios por fecha_actualizacion
+TABLAS_FUENTE = ("socio", "accion", "pago_accion", "personal", "asistencia", "movimiento_financiero")
+
+# fecha_actualizacion no deja rastro de las filas borradas ni del grupo que deja
+# una fila al cambiar de clave (un movimiento que pasa a otro mes o club). Un
+# trigger guarda esas columnas de la fila anterior en etl_bi_cambio al borrar o
+# al cambiar alguna de ellas; los `cambios` de cada tabla las leen
+COLUMNAS_CAMBIO = {
+    "socio": ("id_club",),
+    "accion": ("id_socio", "id_club"),
+    "pago_accion": ("id_accion",),
+    "asistencia": ("id_personal",),
+    "movimiento_financiero": ("id_club", "fecha"),
+}
+
+_FUNCION_CAMBIO = """
+    CREATE OR REPLACE FUNCTION etl_bi_registrar_cambio() RETURNS trigger AS $$
+    DECLARE
+        anterior JSONB := to_jsonb(OLD);
+        fila JSONB := '{}';
+        movida BOOLEAN := TG_OP = 'DELETE';
+    BEGIN
+        FOR i IN 0 .. TG_NARGS - 1 LOOP
+            fila := fila || jsonb_build_object(TG_ARGV[i], anterior -> TG_ARGV[i]);
+            movida := movida OR (anterior -> TG_ARGV[i]) IS DISTINCT FROM (to_jsonb(NEW) -> TG_ARGV[i]);
+        END LOOP;
+        IF movida THEN
+            INSERT INTO etl_bi_cambio (tabla, fila) VALUES (TG_TABLE_NAME, fila);
+        END IF;
+        RETURN NULL;
+    END;
+    $$ LANGUAGE plpgsql
+"""
+
+
+class EtlBiRepository:
+    # ---------- Esquema ----------
+
+    def crear_tablas(self, recrear: bool = False) -> List[str]:
+        """
+        Crea las tablas consolidadas (con clave primaria para el upsert), la
+        tabla de estado del ETL y los índices de fecha_actualizacion de las
+        tablas base. Con `recrear` se eliminan antes las tablas consolidadas
+        (necesario si se crearon con el antiguo CREATE TABLE ... AS).
+        """
+        db: Session = SessionLocal()
+        try:
+            db.execute(text("""
+                CREATE TABLE IF NOT EXISTS etl_bi_estado (
+                    tabla TEXT PRIMARY KEY,
+                    marca_tiempo TIMESTAMPTZ,
+                    ultimo_id BIGINT NOT NULL DEFAULT 0,
+                    ultima_completa TIMESTAMPTZ,
+                    ultima_ejecucion TIMESTAMPTZ,
+                    duracion_ms INT,
+                    filas INT
+                )
+            """))
+            db.execute(text("""
+                CREATE TABLE IF NOT EXISTS etl_bi_ejecucion (
+                    id_ejecucion BIGINT PRIMARY KEY GENERATED ALWAYS AS IDENTITY,
+                    tabla TEXT NOT NULL,
+                    modo TEXT NOT NULL,
+                    inicio TIMESTAMPTZ NOT NULL,
+                    duracion_ms INT NOT NULL,
+                    claves_cambiadas INT,
+                    filas_actualizadas INT,
+                    filas_eliminadas INT,
+                    error TEXT
+                )
+            """))
+            db.execute(text(
+                "CREATE INDEX IF NOT EXISTS idx_etl_bi_ejecucion_tabla ON etl_bi_ejecucion(tabla, inicio DESC)"
+            ))
+            for tabla, definicion in TABLAS_BI.items():
+                if recrear:
+                    db.execute(text(f"DROP TABLE IF EXISTS {tabla}"))
+                    db.execute(text("DELETE FROM etl_bi_estado WHERE tabla = :tabla"), {"tabla": tabla})
+                columnas = ",\n    ".join(f"{nombre} {tipo}" for nombre, tipo in definicion["columnas"])
+                db.execute(text(f"""
+                    CREATE TABLE IF NOT EXISTS {tabla} (
+                        {columnas},
+                        PRIMARY KEY ({", ".join(definicion["clave"])})
+                    )
+                """))
+                for columna in definicion["indices"]:
+                    db.execute(text(f"CREATE INDEX IF NOT EXISTS idx_{tabla}_{columna} ON {tabla}({columna})"))
+
+            for tabla in TABLAS_FUENTE:
+                db.execute(text(
+                    f"CREATE INDEX IF NOT EXISTS idx_{tabla}_fecha_actualizacion ON {tabla}(fecha_actualizacion)"
+                ))
+
+            db.execute(text("""
+                CREATE TABLE IF NOT EXISTS etl_bi_cambio (
+                    id_cambio BIGINT PRIMARY KEY GENERATED ALWAYS AS IDENTITY,
+                    tabla TEXT NOT NULL,
+                    fila JSONB NOT NULL,
+                    fecha TIMESTAMPTZ NOT NULL DEFAULT NOW()
+                )
+            """))
+            db.execute(text("CREATE INDEX IF NOT EXISTS idx_etl_bi_cambio_tabla_fecha ON etl_bi_cambio(tabla, fecha)"))
+            db.execute(text(_FUNCION_CAMBIO))
+            for tabla, columnas_cambio in COLUMNAS_CAMBIO.items():
+                db.execute(text(f"DROP TRIGGER IF EXISTS etl_bi_cambio ON {tabla}"))
+                db.execute(text(f"""
+                    CREATE TRIGGER etl_bi_cambio
+                    AFTER DELETE OR UPDATE OF {", ".join(columnas_cambio)} ON {tabla}
+                    FOR EACH ROW EXECUTE FUNCTION etl_bi_registrar_cambio({", ".join(f"'{c}'" for c in columnas_cambio)})
+                """))
+
+            db.commit()
+            return list(TABLAS_BI)
+        except Exception as e:
+            logging.error(f"Error en crear_tablas: {str(e)}")
+            db.rollback()
+            raise Exception(f"Error al crear tablas de BI: {str(e)}")
+        finally:
+            db.close()
+
+    # ---------- Ejecución ----------
+
+    @contextmanager
+    def bloqueo_exclusivo(self):
+        """True si este proceso obtuvo el turno del ETL, False si otro ya lo tiene"""
+        db: Session = SessionLocal()
+        obtenido = False
+        try:
+            obtenido = db.execute(
+                text("SELECT pg_try_advisory_lock(hashtext(:clave))"), {"clave": CLAVE_BLOQUEO_ETL}
+            ).scalar()
+            yield bool(obtenido)
+        finally:
+            try:
+                if obtenido:
+                    db.execute(text("SELECT pg_advisory_unlock(hashtext(:clave))"), {"clave": CLAVE_BLOQUEO_ETL})
+            finally:
+                db.close()
+
+    def get_estados(self) -> Dict[str, dict]:
+        db: Session = SessionLocal()
+        try:
+            result = db.execute(text("""
+                SELECT tabla, marca_tiempo, ultimo_id, ultima_completa, ultima_ejecucion, duracion_ms, filas
+                FROM etl_bi_estado
+            """)).fetchall()
+            return {row[0]: dict(row._mapping) for row in result}
+        finally:
+            db.close()
+
+    def actualizar_tabla(self, tabla: str, completa: bool, solape_segundos: int) -> dict:
+        """
+        Recalcula las filas de `tabla` afectadas desde la última marca de agua
+        (o todas si `completa`) y avanza la marca. Devuelve los conteos.
+        """
+        definicion = TABLAS_BI[tabla]
+        columnas = [nombre for nombre, _ in definicion["columnas"]]
+        clave = definicion["clave"]
+        fuente, id_fuente = definicion["fuente"]
+
+        db: Session = SessionLocal()
+        try:
+            db.connection(execution_options={"isolation_level": "REPEATABLE READ"})
+            estado = db.execute(
+                text("SELECT marca_tiempo, ultimo_id FROM etl_bi_estado WHERE tabla = :tabla"), {"tabla": tabla}
+            ).fetchone()
+            # Sin marca previa no hay nada incremental que hacer
+            completa = completa or estado is None or estado[0] is None
+            ahora, ultimo_id = db.execute(
+                text(f"SELECT NOW(), COALESCE(MAX({id_fuente}), 0) FROM {fuente}")
+            ).fetchone()
+
+            claves_cambiadas = None
+            eliminadas = 0
+            if completa:
+                filtro = "TRUE"
+                if definicion.get("reemplazo"):
+                    eliminadas += db.execute(text(f"DELETE FROM {tabla}")).rowcount
+            else:
+                claves_cambiadas = db.execute(
+                    text(f"CREATE TEMP TABLE etl_cambios ON COMMIT DROP AS {definicion['cambios']}"),
+                    {"desde": estado[0] - timedelta(seconds=solape_segundos), "ultimo_id": estado[1]},
+                ).rowcount
+                filtro = f"{definicion['filtro']} IN (SELECT * FROM etl_cambios)"
+                if definicion.get("reemplazo") and claves_cambiadas:
+                    eliminadas += db.execute(text(f"""
+                        DELETE FROM {tabla}
+                        WHERE ({", ".join(definicion["reemplazo"])}) IN (SELECT * FROM etl_cambios)
+                    """)).rowcount
+
+            actualizadas = 0
+            if completa or claves_cambiadas:
+                no_clave = [c for c in columnas if c not in clave]
+                actualizadas = db.execute(text(f"""
+                    INSERT INTO {tabla} ({", ".join(columnas)})
+                    {definicion["select"].format(filtro=filtro)}
+                    ON CONFLICT ({", ".join(clave)}) DO UPDATE SET
+                        {", ".join(f"{c} = EXCLUDED.{c}" for c in no_clave)}
+                    WHERE ({", ".join(f"{tabla}.{c}" for c in no_clave)})
+                          IS DISTINCT FROM ({", ".join(f"EXCLUDED.{c}" for c in no_clave)})
+                """)).rowcount
+
+            # Claves que ya no existen en la tabla base (borradas)
+            if not definicion.get("reemplazo"):
+                eliminadas += db.execute(text(f"""
+                    DELETE FROM {tabla} t
+                    WHERE NOT EXISTS (SELECT 1 FROM {fuente} f WHERE f.{id_fuente} = t.{clave[0]})
+                """)).rowcount
+
+            if actualizadas or eliminadas:
+                # Invalida los ETag de BI en los demás workers (ver version_tablas)
+                db.execute(text("SELECT pg_notify('tablas_cambio', :tabla)"), {"tabla": tabla})
+
+            db.execute(text("""
+                INSERT INTO etl_bi_estado (tabla, marca_tiempo, ultimo_id, ultima_completa)
+                VALUES (:tabla, :marca, :ultimo_id, CASE WHEN :completa THEN CAST(:marca AS TIMESTAMPTZ) END)
+                ON CONFLICT (tabla) DO UPDATE SET
+                    marca_tiempo = EXCLUDED.marca_tiempo,
+                    ultimo_id = EXCLUDED.ultimo_id,
+                    ultima_completa = COALESCE(EXCLUDED.ultima_completa, etl_bi_estado.ultima_completa)
+            """), {"tabla": tabla, "marca": ahora, "ultimo_id": ultimo_id, "completa": completa})
+            db.commit()
+            return {
+                "modo": "completa" if completa else "incremental",
+                "claves_cambiadas": claves_cambiadas,
+                "filas_actualizadas": actualizadas,
+                "filas_eliminadas": eliminadas,
+            }
+        except Exception as e:
+            logging.error(f"Error en actualizar_tabla {tabla}: {str(e)}")
+            db.rollback()
+            raise Exception(f"Error al actualizar la tabla de BI {tabla}: {str(e)}")
+        finally:
+            db.close()
+
+    def podar_cambios(self, solape_segundos: int) -> int:
+        """Borra de etl_bi_cambio lo que ya procesaron todas las tablas"""
+        db: Session = SessionLocal()
+        try:
+            eliminados = db.execute(text("""
+                DELETE FROM etl_bi_cambio
+                WHERE fecha < (SELECT MIN(marca_tiempo) FROM etl_bi_estado WHERE tabla = ANY(:tablas))
+                              - make_interval(secs => :solape)
+            """), {"tablas": list(TABLAS_BI), "solape": solape_segundos}).rowcount
+            db.commit()
+            return eliminados
+        except Exception as e:
+            logging.error(f"Error en podar_cambios: {str(e)}")
+            db.rollback()
+            return 0
+        finally:
+            db.close()
+
+    def registrar_ejecucion(self, tabla: str, inicio: datetime, duracion_ms: int, resultado: dict,
+                            error: Optional[str] = None, historial_dias: int = 30):
+        """Guarda la duración y los conteos de la ejecución y poda el historial"""
+        db: Session = SessionLocal()
+        try:
+            filas = resultado.get("filas_actualizadas", 0) + resultado.get("filas_eliminadas", 0)
+            db.execute(text("""
+                INSERT INTO etl_bi_ejecucion (tabla, modo, inicio, duracion_ms, claves_cambiadas,
+                                              filas_actualizadas, filas_eliminadas, error)
+                VALUES (:tabla, :modo, :inicio, :duracion_ms, :claves_cambiadas,
+                        :filas_actualizadas, :filas_eliminadas, :error)
+            """), {
+                "tabla": tabla, "modo": resultado.get("modo", "error"), "inicio": inicio,
+                "duracion_ms": duracion_ms, "claves_cambiadas": resultado.get("claves_cambiadas"),
+                "filas_actualizadas": resultado.get("filas_actualizadas"),
+                "filas_eliminadas": resultado.get("filas_eliminadas"), "error": error,
+            })
+            if error is None:
+                db.execute(text("""
+                    UPDATE etl_bi_estado SET ultima_ejecucion = :inicio, duracion_ms = :duracion_ms, filas = :filas
+                    WHERE tabla = :tabla
+                """), {"tabla": tabla, "inicio": inicio, "duracion_ms": duracion_ms, "filas": filas})
+            db.execute(text("""
+                DELETE FROM etl_bi_ejecucion WHERE inicio < NOW() - make_interval(days => :dias)
+            """), {"dias": historial_dias})
+            db.commit()
+        except Exception as e:
+            logging.error(f"Error en registrar_ejecucion: {str(e)}")
+            db.rollback()
+        finally:
+            db.close()
+
+    def get_ejecuciones(self, limite: int = 50) -> List[dict]:
+        db: Session = SessionLocal()
+        try:
+            result = db.execute(text("""
+                SELECT tabla, modo, inicio, duracion_ms, claves_cambiadas, filas_actualizadas, filas_eliminadas, error
+                FROM etl_bi_ejecucion
+                ORDER BY inicio DESC, id_ejecucion DESC
+                LIMIT :limite
+            """), {"limite": limite}).fetchall()
+            return [dict(row._mapping) for row in result]
+        finally:
+            db.close()
+
+    # ---------- Lectura ----------
+
+    def datos_frescos(self, db: Session, tablas: List[str], maximo_minutos: int) -> bool:
+        """
+        True si todas las `tablas` reflejan las tablas base con un retraso menor
+        a `maximo_minutos`. Los repositorios de BI leen de las tablas
+        consolidadas solo en ese caso; si no, calculan desde las tablas base.
+        """
+        if not maximo_minutos:
+            return False
+        try:
+            frescas = db.execute(text("""
+                SELECT COUNT(*) = :cantidad
+                FROM etl_bi_estado
+                WHERE tabla = ANY(:tablas) AND marca_tiempo >= NOW() - make_interval(mins => :minutos)
+            """), {"tablas": list(tablas), "cantidad": len(tablas), "minutos": maximo_minutos}).scalar()
+            return bool(frescas)
+        except Exception as e:
+            # Sin las tablas del ETL (create_bi_tables.py no ejecutado) se usan las tablas base
+            logging.warning(f"No se pudo verificar la frescura de {tablas}: {str(e)}")
+            db.rollback()
+            return False
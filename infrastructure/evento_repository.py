@@ -1,14 +1,49 @@
-from domain.evento import Evento
+from domain.evento import Evento, EventoResumen
 from sqlalchemy.orm import Session
 from sqlalchemy import text
 from config import SessionLocal
-from typing import Optional
+from typing import Optional, List
+from datetime import date
+import logging
+
+# Eventos con sus reservas por estado en una sola consulta. Confirmadas y cupos
+# libres vienen del contador evento_cupos; en espera y canceladas se agrupan
+# solo para los eventos filtrados (índice reservas(id_evento, estado))
+_RESUMEN_SQL = text('''
+    WITH filtrados AS (
+        SELECT id_evento, nombre_evento, descripcion, fecha, hora, id_club, estado, capacidad_maxima
+        FROM eventos
+        WHERE (CAST(:id_club AS BIGINT) IS NULL OR id_club = :id_club)
+          AND (CAST(:desde AS DATE) IS NULL OR fecha >= :desde)
+          AND (CAST(:hasta AS DATE) IS NULL OR fecha <= :hasta)
+    ),
+    conteos AS (
+        SELECT r.id_evento,
+               count(*) FILTER (WHERE r.estado = 'confirmada') AS confirmadas,
+               count(*) FILTER (WHERE r.estado = 'en_espera') AS en_espera,
+               count(*) FILTER (WHERE r.estado = 'cancelada') AS canceladas
+        FROM reservas r
+        JOIN filtrados f ON f.id_evento = r.id_evento
+        GROUP BY r.id_evento
+    )
+    SELECT f.id_evento, f.nombre_evento, f.descripcion, f.fecha, f.hora, f.id_club, f.estado, f.capacidad_maxima,
+           COALESCE(ec.ocupados, c.confirmadas, 0) AS confirmadas,
+           COALESCE(c.en_espera, 0) AS en_espera,
+           COALESCE(c.canceladas, 0) AS canceladas,
+           CASE WHEN f.capacidad_maxima IS NULL THEN NULL
+                ELSE GREATEST(f.capacidad_maxima - COALESCE(ec.ocupados, c.confirmadas, 0), 0)
+           END AS cupos_disponibles
+    FROM filtrados f
+    LEFT JOIN evento_cupos ec ON ec.id_evento = f.id_evento
+    LEFT JOIN conteos c ON c.id_evento = f.id_evento
+    ORDER BY f.fecha, f.hora, f.id_evento
+''')
 
 class EventoRepository:
     def list_eventos(self):
         db: Session = SessionLocal()
         try:
-            result = db.execute(text("SELECT id_evento, nombre_evento, descripcion, fecha, hora, id_club, estado FROM eventos")).fetchall()
+            result = db.execute(text("SELECT id_evento, nombre_evento, descripcion, fecha, hora, id_club, estado, capacidad_maxima FROM eventos")).fetchall()
             return [Evento(*row) for row in result]
         finally:
             db.close()
@@ -16,7 +51,7 @@ class EventoRepository:
     def get_evento(self, evento_id: int) -> Optional[Evento]:
         db: Session = SessionLocal()
         try:
-            result = db.execute(text("SELECT id_evento, nombre_evento, descripcion, fecha, hora, id_club, estado FROM eventos WHERE id_evento = :id_evento"), {"id_evento": evento_id}).fetchone()
+            result = db.execute(text("SELECT id_evento, nombre_evento, descripcion, fecha, hora, id_club, estado, capacidad_maxima FROM eventos WHERE id_evento = :id_evento"), {"id_evento": evento_id}).fetchone()
             if result:
                 return Evento(*result)
             return None
@@ -27,9 +62,9 @@ class EventoRepository:
         db: Session = SessionLocal()
         try:
             result = db.execute(text('''
-                INSERT INTO eventos (nombre_evento, descripcion, fecha, hora, id_club, estado)
-                VALUES (:nombre_evento, :descripcion, :fecha, :hora, :id_club, :estado)
-                RETURNING id_evento, nombre_evento, descripcion, fecha, hora, id_club, estado
+                INSERT INTO eventos (nombre_evento, descripcion, fecha, hora, id_club, estado, capacidad_maxima)
+                VALUES (:nombre_evento, :descripcion, :fecha, :hora, :id_club, :estado, :capacidad_maxima)
+                RETURNING id_evento, nombre_evento, descripcion, fecha, hora, id_club, estado, capacidad_maxima
             '''), data.dict())
             db.commit()
             row = result.fetchone()
@@ -60,4 +95,17 @@ class EventoRepository:
             db.commit()
             return result.rowcount > 0
         finally:
-            db.close() 
\ No newline at end of file
+            db.close()
+
+    def list_resumen(self, id_club: Optional[int] = None, desde: Optional[date] = None,
+                     hasta: Optional[date] = None) -> List[EventoResumen]:
+        """Eventos (filtrados por club y rango de fechas, ambos inclusive) con sus reservas por estado"""
+        db: Session = SessionLocal()
+        try:
+            rows = db.execute(_RESUMEN_SQL, {"id_club": id_club, "desde": desde, "hasta": hasta}).fetchall()
+            return [EventoResumen(Evento(*row[:8]), *row[8:]) for row in rows]
+        except Exception as e:
+            logging.error(f"Error en list_resumen: {str(e)}")
+            raise Exception(f"Error al obtener resumen de eventos: {str(e)}")
+        finally:
+            db.close()
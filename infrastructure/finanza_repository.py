@@ -2,9 +2,50 @@ from domain.finanza import MovimientoFinanciero
 from sqlalchemy.orm import Session
 from sqlalchemy import text
 from config import SessionLocal
-from typing import Optional
-from decimal import Decimal
+from typing import Optional, Dict
 import logging
+from infrastructure.row_mapper import crear_mapper, DIRECTO, TEXTO, DECIMAL
+
+_COLUMNAS_MOVIMIENTO = [
+    ("id_movimiento", DIRECTO),
+    ("id_club", DIRECTO),
+    ("tipo_movimiento", DIRECTO),
+    ("descripcion", DIRECTO),
+    ("monto", DECIMAL),
+    ("fecha", TEXTO),
+    ("estado", DIRECTO),
+    ("referencia_relacionada", DIRECTO),
+    ("metodo_pago", DIRECTO),
+]
+
+# RETURNING id_movimiento, ..., metodo_pago
+_mapear_movimiento = crear_mapper(MovimientoFinanciero, _COLUMNAS_MOVIMIENTO)
+# Listado: + nombre_club, categoria, numero_comprobante
+_mapear_movimiento_listado = crear_mapper(MovimientoFinanciero, _COLUMNAS_MOVIMIENTO + [
+    ("nombre_club", DIRECTO),
+    ("categoria", DIRECTO),
+    ("numero_comprobante", DIRECTO),
+])
+# Detalle: + nombre_club, categoria, nombre_socio, nombre_proveedor, numero_comprobante
+_mapear_movimiento_detalle = crear_mapper(MovimientoFinanciero, _COLUMNAS_MOVIMIENTO + [
+    ("nombre_club", DIRECTO),
+    ("categoria", DIRECTO),
+    ("nombre_socio", DIRECTO),
+    ("nombre_proveedor", DIRECTO),
+    ("numero_comprobante", DIRECTO),
+])
+
+
+def _bloquear_movimiento_manual(db: Session, movimiento_id: int) -> Optional[str]:
+    """Bloquea el movimiento; "no_encontrado" o "de_compra" si no se puede modificar"""
+    row = db.execute(text('''
+        SELECT id_compra FROM movimiento_financiero WHERE id_movimiento = :id_movimiento FOR UPDATE
+    '''), {"id_movimiento": movimiento_id}).fetchone()
+    if not row:
+        return "no_encontrado"
+    if row[0] is not None:
+        return "de_compra"
+    return None
 
 class FinanzaRepository:
     def list_movimientos(self):
@@ -40,31 +81,7 @@ class FinanzaRepository:
                 ORDER BY mf.fecha DESC, mf.id_movimiento DESC
             """)).fetchall()
             
-            movimientos = []
-            for row in result:
-                # Convertir tipos de datos
-                monto = float(row[4]) if row[4] else 0.0
-                fecha = str(row[5]) if row[5] else None
-                
-                movimiento = MovimientoFinanciero(
-                    id_movimiento=row[0],
-                    id_club=row[1],
-                    tipo_movimiento=row[2],
-                    descripcion=row[3],
-                    monto=Decimal(str(monto)),
-                    fecha=fecha,
-                    estado=row[6],
-                    referencia_relacionada=row[7],
-                    metodo_pago=row[8]
-                )
-                
-                # Agregar campos adicionales como atributos
-                movimiento.nombre_club = row[9]
-                movimiento.categoria = row[10]
-                movimiento.numero_comprobante = row[11]
-                
-                movimientos.append(movimiento)
-            return movimientos
+            return [_mapear_movimiento_listado(row) for row in result]
         except Exception as e:
             logging.error(f"Error en list_movimientos: {str(e)}")
             raise Exception(f"Error al consultar movimientos financieros: {str(e)}")
@@ -121,30 +138,7 @@ class FinanzaRepository:
             """), {"id_movimiento": movimiento_id}).fetchone()
             
             if result:
-                # Convertir tipos de datos
-                monto = float(result[4]) if result[4] else 0.0
-                fecha = str(result[5]) if result[5] else None
-                
-                movimiento = MovimientoFinanciero(
-                    id_movimiento=result[0],
-                    id_club=result[1],
-                    tipo_movimiento=result[2],
-                    descripcion=result[3],
-                    monto=Decimal(str(monto)),
-                    fecha=fecha,
-                    estado=result[6],
-                    referencia_relacionada=result[7],
-                    metodo_pago=result[8]
-                )
-                
-                # Agregar campos adicionales como atributos
-                movimiento.nombre_club = result[9]
-                movimiento.categoria = result[10]
-                movimiento.nombre_socio = result[11]
-                movimiento.nombre_proveedor = result[12]
-                movimiento.numero_comprobante = result[13]
-                
-                return movimiento
+                return _mapear_movimiento_detalle(result)
             return None
         except Exception as e:
             logging.error(f"Error en get_movimiento: {str(e)}")
@@ -162,49 +156,47 @@ class FinanzaRepository:
             '''), data.dict())
             db.commit()
             row = result.fetchone()
-            
-            # Convertir tipos de datos
-            monto = float(row[4]) if row[4] else 0.0
-            fecha = str(row[5]) if row[5] else None
-            
-            return MovimientoFinanciero(
-                id_movimiento=row[0],
-                id_club=row[1],
-                tipo_movimiento=row[2],
-                descripcion=row[3],
-                monto=Decimal(str(monto)),
-                fecha=fecha,
-                estado=row[6],
-                referencia_relacionada=row[7],
-                metodo_pago=row[8]
-            )
+            return _mapear_movimiento(row)
         except Exception as e:
             logging.error(f"Error en create_movimiento: {str(e)}")
             raise Exception(f"Error al crear movimiento financiero: {str(e)}")
         finally:
             db.close()
 
-    def update_movimiento(self, movimiento_id: int, data):
+    def update_movimiento(self, movimiento_id: int, data) -> Dict:
+        """
+        Devuelve {"resultado": "actualizado" | "no_encontrado" | "de_compra", "movimiento"}.
+        Los movimientos de una compra (id_compra) no se editan aquí: se
+        reescriben al guardar la compra.
+        """
         db: Session = SessionLocal()
         try:
+            resultado = _bloquear_movimiento_manual(db, movimiento_id)
+            if resultado:
+                db.rollback()
+                return {"resultado": resultado, "movimiento": None}
             fields = []
             params = {"id_movimiento": movimiento_id}
             for field, value in data.dict(exclude_unset=True).items():
                 fields.append(f"{field} = :{field}")
                 params[field] = value
-            if not fields:
-                return self.get_movimiento(movimiento_id)
-            db.execute(text(f"UPDATE movimiento_financiero SET {', '.join(fields)} WHERE id_movimiento = :id_movimiento"), params)
+            if fields:
+                db.execute(text(f"UPDATE movimiento_financiero SET {', '.join(fields)} WHERE id_movimiento = :id_movimiento"), params)
             db.commit()
-            return self.get_movimiento(movimiento_id)
+            return {"resultado": "actualizado", "movimiento": self.get_movimiento(movimiento_id)}
         finally:
             db.close()
 
-    def delete_movimiento(self, movimiento_id: int):
+    def delete_movimiento(self, movimiento_id: int) -> str:
+        """Devuelve "eliminado", "no_encontrado" o "de_compra" (ver update_movimiento)"""
         db: Session = SessionLocal()
         try:
-            result = db.execute(text("DELETE FROM movimiento_financiero WHERE id_movimiento = :id_movimiento RETURNING id_movimiento"), {"id_movimiento": movimiento_id})
+            resultado = _bloquear_movimiento_manual(db, movimiento_id)
+            if resultado:
+                db.rollback()
+                return resultado
+            db.execute(text("DELETE FROM movimiento_financiero WHERE id_movimiento = :id_movimiento"), {"id_movimiento": movimiento_id})
             db.commit()
-            return result.rowcount > 0
+            return "eliminado"
         finally:
-            db.close() 
\ No newline at end of file
+            db.close() 
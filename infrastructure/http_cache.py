@@ -0,0 +1,114 @@
+"""
+Middleware de caché HTTP para los endpoints GET de lectura.
+
+El ETag se calcula sin consultar la base de datos: combina la ruta, el token
+del usuario y la versión de las tablas de las que depende el endpoint
+(ver infrastructure/version_tablas.py). Si el cliente envía un If-None-Match
+que coincide, se responde 304 sin ejecutar el endpoint.
+"""
+
+import hashlib
+import re
+from datetime import date
+from typing import List, Tuple
+
+import jwt
+from starlette.middleware.base import BaseHTTPMiddleware
+from starlette.requests import Request
+from starlette.responses import Response
+
+from config import SECRET_KEY, ALGORITHM
+from infrastructure.version_tablas import version_tablas
+
+TABLAS_SOCIOS = ("socio", "accion")
+TABLAS_ACCIONES = ("accion", "pago_accion", "socio", "estado_accion", "modalidad_pago")
+TABLAS_FINANZAS = ("movimiento_financiero",)
+TABLAS_EVENTOS = ("eventos", "reservas", "evento_cupos")
+TABLAS_BI = (
+    "socio", "accion", "pago_accion", "movimiento_financiero", "personal",
+    "asistencia", "compras", "inventario", "eventos", "reservas", "club",
+    "socios_activos", "finanzas_resumen", "acciones_pagos_resumen",
+    "personal_asistencia_resumen", "metricas_club_resumen",
+)
+
+# (patrón de ruta, tablas de las que depende, depende de la fecha actual)
+RUTAS_CACHEABLES: List[Tuple[re.Pattern, Tuple[str, ...], bool]] = [
+    (re.compile(r"^/socios/?$"), TABLAS_SOCIOS, False),
+    (re.compile(r"^/socios/\d+(/acciones)?$"), TABLAS_SOCIOS, False),
+    (re.compile(r"^/socio-profile/me$"), TABLAS_SOCIOS, False),
+    (re.compile(r"^/acciones/?$"), TABLAS_ACCIONES, False),
+    (re.compile(r"^/acciones/\d+(/pagos|/estado-pagos|/estado)?$"), TABLAS_ACCIONES, False),
+    (re.compile(r"^/acciones/estado-pagos-resumen$"), TABLAS_ACCIONES, False),
+    (re.compile(r"^/finanzas/movimientos(/\d+)?$"), TABLAS_FINANZAS, False),
+    (re.compile(r"^/eventos/(resumen|calendario)$"), TABLAS_EVENTOS, False),
+    (re.compile(
+        r"^/bi/(finanzas-resumen|metricas|administrativo/[\w-]+|personal/[\w-]+"
+        r"|dashboard/[\w-]+|drill-down/[\w/-]+"
+        r"|reportes/(balance-mensual|socios-por-club|historial-pagos-socio/\d+))$"
+    ), TABLAS_BI, True),
+]
+
+
+def _resolver_ruta(path: str):
+    for patron, tablas, por_fecha in RUTAS_CACHEABLES:
+        if patron.match(path):
+            return tablas, por_fecha
+    return None
+
+
+def _token_valido(token: str) -> bool:
+    try:
+        jwt.decode(token, SECRET_KEY, algorithms=[ALGORITHM])
+        return True
+    except jwt.PyJWTError:
+        return False
+
+
+def calcular_etag(request: Request, tablas: Tuple[str, ...], por_fecha: bool) -> str:
+    partes = [
+        version_tablas.epoca,
+        request.url.path,
+        request.url.query,
+        request.headers.get("authorization", ""),
+        ",".join(str(v) for v in version_tablas.version(tablas)),
+    ]
+    if por_fecha:
+        # Los dashboards usan el mes/año actual por defecto
+        partes.append(date.today().isoformat())
+    return f'W/"{hashlib.sha1("|".join(partes).encode("utf-8")).hexdigest()[:20]}"'
+
+
+class CacheHTTPMiddleware(BaseHTTPMiddleware):
+    async def __call__(self, scope, receive, send):
+        # Las rutas no cacheables (descargas de archivos, POST) no pasan por
+        # BaseHTTPMiddleware, que reenvía el cuerpo por un stream intermedio
+        if scope["type"] != "http" or scope["method"] != "GET" or _resolver_ruta(scope["path"]) is None:
+            await self.app(scope, receive, send)
+            return
+        await super().__call__(scope, receive, send)
+
+    async def dispatch(self, request: Request, call_next):
+        if request.method != "GET":
+            return await call_next(request)
+
+        ruta = _resolver_ruta(request.url.path)
+        if ruta is None:
+            return await call_next(request)
+
+        tablas, por_fecha = ruta
+        # La versión se toma antes de ejecutar el endpoint: si hay una escritura
+        # concurrente, la respuesta queda con el ETag anterior y se revalida luego
+        etag = calcular_etag(request, tablas, por_fecha)
+        headers = {"ETag": etag, "Cache-Control": "private, no-cache"}
+
+        if_none_match = request.headers.get("if-none-match")
+        if if_none_match:
+            token = request.headers.get("authorization", "").replace("Bearer ", "", 1)
+            etags_cliente = [valor.strip() for valor in if_none_match.split(",")]
+            if etag in etags_cliente and _token_valido(token):
+                return Response(status_code=304, headers=headers)
+
+        response = await call_next(request)
+        if response.status_code == 200 and "etag" not in response.headers:
+            response.headers.update(headers)
+        return response
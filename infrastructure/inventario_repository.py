@@ -1,14 +1,95 @@
-from domain.inventario import ProductoInventario
+from domain.inventario import ProductoInventario, MovimientoInventario
 from sqlalchemy.orm import Session
 from sqlalchemy import text
 from config import SessionLocal
-from typing import Optional
+from typing import Optional, List, Dict, Tuple
+from datetime import date
+import logging
+
+# Stock por movimientos (create_inventario_movimientos.sql): cada cambio es un
+# UPDATE relativo sobre inventario más su fila en inventario_movimiento, en la
+# misma transacción. Las filas de inventario se bloquean en orden de id_producto.
+
+_COLUMNAS_MOVIMIENTO = ("id_movimiento, id_producto, tipo, cantidad, stock_resultante, costo_unitario, "
+                        "referencia, observaciones, id_usuario, fecha")
+
+
+def aplicar_movimientos(db: Session, movimientos: List[Dict], id_usuario: Optional[int] = None) -> Tuple[List[Dict], List[Dict]]:
+    """
+    Aplica los movimientos (id_producto, tipo, cantidad con signo, referencia,
+    observaciones) en el orden recibido, sin confirmar la transacción.
+
+    Todo o nada: si algún producto no existe o su stock quedaría negativo en
+    algún punto del lote no se escribe nada. Devuelve (productos, rechazados):
+    productos con {id_producto, stock_anterior, stock_nuevo} y rechazados con
+    {id_producto, motivo, stock_actual, cantidad}.
+    """
+    ids = sorted({m["id_producto"] for m in movimientos})
+    actuales = dict(db.execute(text('''
+        SELECT id_producto, cantidad_en_stock FROM inventario
+        WHERE id_producto = ANY(CAST(:ids AS BIGINT[])) AND fecha_baja IS NULL
+        ORDER BY id_producto
+        FOR UPDATE
+    '''), {"ids": ids}).fetchall())
+
+    stock = dict(actuales)
+    resultantes = []
+    rechazados = []
+    for m in movimientos:
+        id_producto = m["id_producto"]
+        if id_producto not in stock:
+            rechazados.append({"id_producto": id_producto, "motivo": "Producto no encontrado",
+                               "stock_actual": None, "cantidad": m["cantidad"]})
+            continue
+        if stock[id_producto] + m["cantidad"] < 0:
+            rechazados.append({"id_producto": id_producto, "motivo": "Stock insuficiente",
+                               "stock_actual": stock[id_producto], "cantidad": m["cantidad"]})
+            continue
+        stock[id_producto] += m["cantidad"]
+        resultantes.append(stock[id_producto])
+    if rechazados:
+        return [], rechazados
+
+    deltas = {i: stock[i] - actuales[i] for i in ids if stock[i] != actuales[i]}
+    if deltas:
+        actualizados = db.execute(text('''
+            UPDATE inventario i
+            SET cantidad_en_stock = i.cantidad_en_stock + d.delta
+            FROM unnest(CAST(:ids AS BIGINT[]), CAST(:deltas AS INT[])) AS d(id_producto, delta)
+            WHERE i.id_producto = d.id_producto AND i.cantidad_en_stock + d.delta >= 0
+        '''), {"ids": list(deltas), "deltas": list(deltas.values())}).rowcount
+        if actualizados != len(deltas):
+            # No debería ocurrir con las filas bloqueadas
+            raise Exception("El stock cambió durante el registro de movimientos")
+
+    db.execute(text('''
+        INSERT INTO inventario_movimiento
+            (id_producto, tipo, cantidad, stock_resultante, costo_unitario, referencia, observaciones, id_usuario)
+        SELECT m.id_producto, m.tipo, m.cantidad, m.stock_resultante, i.precio_unitario,
+               m.referencia, m.observaciones, :id_usuario
+        FROM unnest(
+            CAST(:ids AS BIGINT[]), CAST(:tipos AS TEXT[]), CAST(:cantidades AS INT[]),
+            CAST(:resultantes AS INT[]), CAST(:referencias AS TEXT[]), CAST(:observaciones AS TEXT[])
+        ) WITH ORDINALITY AS m(id_producto, tipo, cantidad, stock_resultante, referencia, observaciones, orden)
+        JOIN inventario i ON i.id_producto = m.id_producto
+        ORDER BY m.orden
+    '''), {
+        "ids": [m["id_producto"] for m in movimientos],
+        "tipos": [m["tipo"] for m in movimientos],
+        "cantidades": [m["cantidad"] for m in movimientos],
+        "resultantes": resultantes,
+        "referencias": [m.get("referencia") for m in movimientos],
+        "observaciones": [m.get("observaciones") for m in movimientos],
+        "id_usuario": id_usuario,
+    })
+    productos = [{"id_producto": i, "stock_anterior": actuales[i], "stock_nuevo": stock[i]} for i in ids]
+    return productos, rechazados
 
 class InventarioRepository:
     def list_productos(self):
         db: Session = SessionLocal()
         try:
-            result = db.execute(text("SELECT id_producto, nombre_producto, descripcion, cantidad_en_stock, precio_unitario, id_club FROM inventario")).fetchall()
+            result = db.execute(text("SELECT id_producto, nombre_producto, descripcion, cantidad_en_stock, precio_unitario, id_club FROM inventario WHERE fecha_baja IS NULL")).fetchall()
             return [ProductoInventario(*row) for row in result]
         finally:
             db.close()
@@ -16,7 +97,7 @@ class InventarioRepository:
     def get_producto(self, producto_id: int) -> Optional[ProductoInventario]:
         db: Session = SessionLocal()
         try:
-            result = db.execute(text("SELECT id_producto, nombre_producto, descripcion, cantidad_en_stock, precio_unitario, id_club FROM inventario WHERE id_producto = :id_producto"), {"id_producto": producto_id}).fetchone()
+            result = db.execute(text("SELECT id_producto, nombre_producto, descripcion, cantidad_en_stock, precio_unitario, id_club FROM inventario WHERE id_producto = :id_producto AND fecha_baja IS NULL"), {"id_producto": producto_id}).fetchone()
             if result:
                 return ProductoInventario(*result)
             return None
@@ -31,33 +112,199 @@ class InventarioRepository:
                 VALUES (:nombre_producto, :descripcion, :cantidad_en_stock, :precio_unitario, :id_club)
                 RETURNING id_producto, nombre_producto, descripcion, cantidad_en_stock, precio_unitario, id_club
             '''), data.dict())
-            db.commit()
             row = result.fetchone()
+            db.execute(text('''
+                INSERT INTO inventario_movimiento (id_producto, tipo, cantidad, stock_resultante, costo_unitario)
+                VALUES (:id_producto, 'inicial', :cantidad, :cantidad, :precio_unitario)
+            '''), {"id_producto": row[0], "cantidad": row[3], "precio_unitario": row[4]})
+            db.commit()
             return ProductoInventario(*row)
         finally:
             db.close()
 
-    def update_producto(self, producto_id: int, data):
+    def update_producto(self, producto_id: int, data, id_usuario: Optional[int] = None):
+        """
+        Actualiza los datos del producto. Un cantidad_en_stock absoluto (conteo
+        físico) se registra como un movimiento de 'ajuste' por la diferencia y
+        un cambio de precio como un movimiento de 'precio'.
+        """
         db: Session = SessionLocal()
         try:
+            campos = data.dict(exclude_unset=True)
+            if not campos:
+                return self.get_producto(producto_id)
+            actual = db.execute(text('''
+                SELECT cantidad_en_stock, precio_unitario FROM inventario
+                WHERE id_producto = :id_producto AND fecha_baja IS NULL
+                FOR UPDATE
+            '''), {"id_producto": producto_id}).fetchone()
+            if not actual:
+                db.rollback()
+                return None
+
+            stock = campos.pop("cantidad_en_stock", None)
             fields = []
             params = {"id_producto": producto_id}
-            for field, value in data.dict(exclude_unset=True).items():
+            for field, value in campos.items():
                 fields.append(f"{field} = :{field}")
                 params[field] = value
-            if not fields:
-                return self.get_producto(producto_id)
-            db.execute(text(f"UPDATE inventario SET {', '.join(fields)} WHERE id_producto = :id_producto"), params)
+            if fields:
+                db.execute(text(f"UPDATE inventario SET {', '.join(fields)} WHERE id_producto = :id_producto"), params)
+
+            if campos.get("precio_unitario") is not None and float(campos["precio_unitario"]) != float(actual[1]):
+                db.execute(text('''
+                    INSERT INTO inventario_movimiento
+                        (id_producto, tipo, cantidad, stock_resultante, costo_unitario, id_usuario)
+                    VALUES (:id_producto, 'precio', 0, :stock, :precio_unitario, :id_usuario)
+                '''), {"id_producto": producto_id, "stock": actual[0],
+                       "precio_unitario": campos["precio_unitario"], "id_usuario": id_usuario})
+            if stock is not None and stock != actual[0]:
+                _, rechazados = aplicar_movimientos(db, [{
+                    "id_producto": producto_id, "tipo": "ajuste", "cantidad": stock - actual[0],
+                    "observaciones": "Ajuste de stock desde la edición del producto",
+                }], id_usuario)
+                if rechazados:
+                    raise Exception(rechazados[0]["motivo"])
             db.commit()
             return self.get_producto(producto_id)
+        except Exception as e:
+            logging.error(f"Error en update_producto: {str(e)}")
+            db.rollback()
+            raise Exception(f"Error al actualizar producto: {str(e)}")
         finally:
             db.close()
 
-    def delete_producto(self, producto_id: int):
+    def delete_producto(self, producto_id: int) -> Dict:
+        """
+        Da de baja el producto (fecha_baja); sus movimientos y valoraciones se
+        conservan. Solo con stock en cero: antes hay que registrar la salida o el
+        ajuste. Devuelve {"resultado": "eliminado" | "no_encontrado" | "con_stock", "stock"}.
+        """
         db: Session = SessionLocal()
         try:
-            result = db.execute(text("DELETE FROM inventario WHERE id_producto = :id_producto RETURNING id_producto"), {"id_producto": producto_id})
+            actual = db.execute(text('''
+                SELECT cantidad_en_stock FROM inventario
+                WHERE id_producto = :id_producto AND fecha_baja IS NULL
+                FOR UPDATE
+            '''), {"id_producto": producto_id}).fetchone()
+            if not actual:
+                db.rollback()
+                return {"resultado": "no_encontrado", "stock": None}
+            if actual[0] != 0:
+                db.rollback()
+                return {"resultado": "con_stock", "stock": actual[0]}
+            db.execute(text("UPDATE inventario SET fecha_baja = NOW() WHERE id_producto = :id_producto"),
+                       {"id_producto": producto_id})
             db.commit()
-            return result.rowcount > 0
+            return {"resultado": "eliminado", "stock": 0}
+        except Exception as e:
+            logging.error(f"Error en delete_producto: {str(e)}")
+            db.rollback()
+            raise Exception(f"Error al eliminar producto: {str(e)}")
+        finally:
+            db.close()
+
+    # ---------- Movimientos de stock ----------
+
+    def registrar_movimientos(self, movimientos: List[Dict], id_usuario: Optional[int] = None) -> Dict:
+        """Registra un lote de movimientos en una transacción (todo o nada)"""
+        db: Session = SessionLocal()
+        try:
+            productos, rechazados = aplicar_movimientos(db, movimientos, id_usuario)
+            if rechazados:
+                db.rollback()
+            else:
+                db.commit()
+            return {"productos": productos, "rechazados": rechazados}
+        except Exception as e:
+            logging.error(f"Error en registrar_movimientos: {str(e)}")
+            db.rollback()
+            raise Exception(f"Error al registrar movimientos de inventario: {str(e)}")
         finally:
-            db.close() 
\ No newline at end of file
+            db.close()
+
+    def list_movimientos(self, producto_id: int, desde: Optional[date] = None, hasta: Optional[date] = None,
+                         limite: int = 500) -> List[MovimientoInventario]:
+        """Movimientos del producto, del más reciente al más antiguo ('hasta' inclusive)"""
+        db: Session = SessionLocal()
+        try:
+            result = db.execute(text(f'''
+                SELECT {_COLUMNAS_MOVIMIENTO}
+                FROM inventario_movimiento
+                WHERE id_producto = :id_producto
+                  AND (CAST(:desde AS DATE) IS NULL OR fecha >= CAST(:desde AS DATE))
+                  AND (CAST(:hasta AS DATE) IS NULL OR fecha < CAST(:hasta AS DATE) + 1)
+                ORDER BY fecha DESC, id_movimiento DESC
+                LIMIT :limite
+            '''), {"id_producto": producto_id, "desde": desde, "hasta": hasta, "limite": limite}).fetchall()
+            return [MovimientoInventario(*row[:-1], str(row[-1])) for row in result]
+        except Exception as e:
+            logging.error(f"Error en list_movimientos: {str(e)}")
+            raise Exception(f"Error al consultar movimientos de inventario: {str(e)}")
+        finally:
+            db.close()
+
+    # ---------- Valoración ----------
+
+    def generar_valoracion(self, fecha_corte: date, reemplazar: bool = True) -> Dict:
+        """
+        Guarda la cantidad y el precio de cada producto al final de fecha_corte
+        (un día ya terminado). Se calcula desde la valoración anterior más los
+        movimientos posteriores. Si ya existía se reemplaza, o se conserva con
+        reemplazar=False (job programado, varios workers).
+        """
+        db: Session = SessionLocal()
+        try:
+            if reemplazar:
+                db.execute(text("DELETE FROM inventario_valoracion WHERE fecha_corte = :fecha_corte"),
+                           {"fecha_corte": fecha_corte})
+            fila = db.execute(text('''
+                WITH guardadas AS (
+                    INSERT INTO inventario_valoracion (fecha_corte, id_producto, id_club, cantidad, precio_unitario, valor)
+                    SELECT :fecha_corte, e.id_producto, i.id_club, e.cantidad, e.precio_unitario,
+                           GREATEST(e.cantidad, 0) * e.precio_unitario
+                    FROM inventario_existencias(CAST(:fecha_corte AS DATE) + 1) e
+                    JOIN inventario i ON i.id_producto = e.id_producto
+                    ON CONFLICT (fecha_corte, id_producto) DO NOTHING
+                    RETURNING cantidad, valor
+                )
+                SELECT COUNT(*) FILTER (WHERE cantidad > 0), COALESCE(SUM(valor), 0) FROM guardadas
+            '''), {"fecha_corte": fecha_corte}).fetchone()
+            db.commit()
+            return {"fecha_corte": fecha_corte, "productos_con_stock": fila[0], "valor_total": fila[1]}
+        except Exception as e:
+            logging.error(f"Error en generar_valoracion: {str(e)}")
+            db.rollback()
+            raise Exception(f"Error al generar valoración de inventario: {str(e)}")
+        finally:
+            db.close()
+
+    def get_valoracion(self, fecha_corte: Optional[date] = None) -> Optional[Dict]:
+        """Última valoración guardada en o antes de fecha_corte (o la más reciente), por club"""
+        db: Session = SessionLocal()
+        try:
+            result = db.execute(text('''
+                SELECT fecha_corte, id_club, COUNT(*) FILTER (WHERE cantidad > 0) AS productos_con_stock,
+                       SUM(valor) AS valor
+                FROM inventario_valoracion
+                WHERE fecha_corte = (
+                    SELECT MAX(fecha_corte) FROM inventario_valoracion
+                    WHERE CAST(:fecha_corte AS DATE) IS NULL OR fecha_corte <= CAST(:fecha_corte AS DATE)
+                )
+                GROUP BY fecha_corte, id_club
+                ORDER BY id_club
+            '''), {"fecha_corte": fecha_corte}).fetchall()
+            if not result:
+                return None
+            clubes = [{"id_club": row[1], "productos_con_stock": row[2], "valor": row[3]} for row in result]
+            return {
+                "fecha_corte": result[0][0],
+                "productos_con_stock": sum(c["productos_con_stock"] for c in clubes),
+                "valor_total": sum(c["valor"] for c in clubes),
+                "clubes": clubes,
+            }
+        except Exception as e:
+            logging.error(f"Error en get_valoracion: {str(e)}")
+            raise Exception(f"Error al consultar valoración de inventario: {str(e)}")
+        finally:
+            db.close()
@@ -0,0 +1,35 @@
+"""
+Respuesta JSON serializada con orjson.
+
+Se usa como `default_response_class` de la aplicación y, en los listados
+grandes, para devolver directamente payloads ya construidos sin que FastAPI
+vuelva a validarlos contra el `response_model`.
+"""
+
+from decimal import Decimal
+from typing import Any
+
+import orjson
+from fastapi.responses import JSONResponse
+
+
+def _default(valor: Any):
+    # Tipos que orjson no serializa por sí solo
+    if isinstance(valor, Decimal):
+        return float(valor)
+    if isinstance(valor, (set, frozenset)):
+        return list(valor)
+    if hasattr(valor, "dict"):
+        return valor.dict()
+    raise TypeError
+
+
+class ORJSONResponse(JSONResponse):
+    media_type = "application/json"
+
+    def render(self, content: Any) -> bytes:
+        return orjson.dumps(
+            content,
+            default=_default,
+            option=orjson.OPT_NON_STR_KEYS | orjson.OPT_SERIALIZE_NUMPY,
+        )
@@ -2,13 +2,54 @@ from domain.log import LogSistema
 from sqlalchemy.orm import Session
 from sqlalchemy import text
 from config import SessionLocal
-from typing import Optional
+from contextlib import contextmanager
+from datetime import date, datetime
+from typing import List, Optional
+import gzip
+import logging
+import os
+import re
+
+# Particiones mensuales: logs_sistema_YYYY_MM (ver create_logs_particionado.sql)
+PATRON_PARTICION = re.compile(r"^logs_sistema_(\d{4})_(\d{2})$")
+CLAVE_BLOQUEO_RETENCION = "retencion_logs_sistema"
 
 class LogRepository:
-    def list_logs(self):
+    def list_logs(self, desde: datetime, hasta: Optional[datetime] = None, id_usuario: Optional[int] = None,
+                  modulo: Optional[str] = None, limite: int = 500, antes_de_id: Optional[int] = None):
+        """
+        Logs de un rango de fechas, del más reciente al más antiguo. El filtro por
+        fecha_y_hora hace que PostgreSQL lea solo las particiones del rango
+        (idx_logs_fecha, o idx_logs_usuario / idx_logs_modulo si se filtra por ellos).
+
+        Para paginar se pasa la fecha y el id del último log recibido (hasta,
+        antes_de_id): continúa después de él aunque otros logs tengan la misma fecha.
+        """
         db: Session = SessionLocal()
         try:
-            result = db.execute(text("SELECT id_log, id_usuario, accion_realizada, fecha_y_hora, modulo_o_tabla_afectada, id_afectado, descripcion_detallada, ip_address, user_agent FROM logs_sistema ORDER BY fecha_y_hora DESC")).fetchall()
+            condiciones = ["fecha_y_hora >= :desde"]
+            parametros = {"desde": desde, "limite": limite}
+            if hasta is not None and antes_de_id is not None:
+                # fecha_y_hora <= :hasta para que se sigan descartando particiones
+                condiciones.append("fecha_y_hora <= :hasta AND (fecha_y_hora, id_log) < (:hasta, :antes_de_id)")
+                parametros["hasta"] = hasta
+                parametros["antes_de_id"] = antes_de_id
+            elif hasta is not None:
+                condiciones.append("fecha_y_hora < :hasta")
+                parametros["hasta"] = hasta
+            if id_usuario is not None:
+                condiciones.append("id_usuario = :id_usuario")
+                parametros["id_usuario"] = id_usuario
+            if modulo is not None:
+                condiciones.append("modulo_o_tabla_afectada = :modulo")
+                parametros["modulo"] = modulo
+            result = db.execute(text(f"""
+                SELECT id_log, id_usuario, accion_realizada, fecha_y_hora, modulo_o_tabla_afectada, id_afectado, descripcion_detallada, ip_address, user_agent
+                FROM logs_sistema
+                WHERE {" AND ".join(condiciones)}
+                ORDER BY fecha_y_hora DESC, id_log DESC
+                LIMIT :limite
+            """), parametros).fetchall()
             logs = []
             for row in result:
                 # Convertir datetime a string
@@ -50,4 +91,189 @@ class LogRepository:
             db.rollback()
             raise Exception(f"Error al crear log: {str(e)}")
         finally:
-            db.close() 
\ No newline at end of file
+            db.close()
+
+    def create_logs_lote(self, registros) -> int:
+        """
+        Inserta varios logs en una sola sentencia (unnest de arreglos por columna);
+        cada registro trae su propia fecha_y_hora. Devuelve cuántos se insertaron.
+        """
+        if not registros:
+            return 0
+        db: Session = SessionLocal()
+        try:
+            columnas = ["id_usuario", "accion_realizada", "fecha_y_hora", "modulo_o_tabla_afectada", "id_afectado",
+                        "descripcion_detallada", "ip_address", "user_agent"]
+            db.execute(text('''
+                INSERT INTO logs_sistema (id_usuario, accion_realizada, fecha_y_hora, modulo_o_tabla_afectada,
+                                          id_afectado, descripcion_detallada, ip_address, user_agent)
+                SELECT * FROM unnest(
+                    CAST(:id_usuario AS BIGINT[]), CAST(:accion_realizada AS TEXT[]),
+                    CAST(:fecha_y_hora AS TIMESTAMPTZ[]), CAST(:modulo_o_tabla_afectada AS TEXT[]),
+                    CAST(:id_afectado AS BIGINT[]), CAST(:descripcion_detallada AS TEXT[]),
+                    CAST(:ip_address AS INET[]), CAST(:user_agent AS TEXT[])
+                )
+            '''), {columna: [registro.get(columna) for registro in registros] for columna in columnas})
+            db.commit()
+            return len(registros)
+        except Exception as e:
+            db.rollback()
+            raise Exception(f"Error al crear logs en lote: {str(e)}")
+        finally:
+            db.close()
+
+    # ---------- Particiones ----------
+
+    def crear_particiones(self, desde: date, meses: int) -> List[str]:
+        """
+        Crea (si no existen) las particiones de `meses` meses a partir de `desde`.
+        Cada mes va en su propia transacción: si uno falla se registra el error y
+        se siguen creando los demás.
+        """
+        aseguradas = []
+        db: Session = SessionLocal()
+        try:
+            for i in range(meses + 1):
+                indice = desde.month - 1 + i
+                inicio = date(desde.year + indice // 12, indice % 12 + 1, 1)
+                try:
+                    aseguradas.append(self._crear_particion(db, inicio))
+                    db.commit()
+                except Exception as e:
+                    db.rollback()
+                    logging.error(f"Error al crear la partición de logs de {inicio:%Y-%m}: {str(e)}")
+            return aseguradas
+        finally:
+            db.close()
+
+    def _crear_particion(self, db: Session, inicio: date) -> str:
+        """
+        Crea la partición del mes. Si logs_sistema_default ya tiene filas de ese
+        mes (el job no corrió a tiempo), PostgreSQL no permite crearla con
+        PARTITION OF: se crea aparte, se le mueven esas filas y se anexa.
+        """
+        nombre = f"logs_sistema_{inicio:%Y_%m}"
+        fin = date(inicio.year + inicio.month // 12, inicio.month % 12 + 1, 1)
+        if db.execute(text("SELECT to_regclass(:nombre)"), {"nombre": nombre}).scalar() is not None:
+            return nombre
+
+        # Sin escrituras en la partición por defecto mientras se mueven sus filas
+        db.execute(text("LOCK TABLE logs_sistema_default IN SHARE ROW EXCLUSIVE MODE"))
+        rango = {"inicio": inicio, "fin": fin}
+        desplazadas = db.execute(text("""
+            SELECT COUNT(*) FROM logs_sistema_default WHERE fecha_y_hora >= :inicio AND fecha_y_hora < :fin
+        """), rango).scalar()
+        if not desplazadas:
+            return db.execute(text("SELECT crear_particion_logs(:inicio)"), rango).scalar()
+
+        db.execute(text(f"CREATE TABLE {nombre} (LIKE logs_sistema INCLUDING DEFAULTS INCLUDING CONSTRAINTS)"))
+        db.execute(text(f"""
+            INSERT INTO {nombre} SELECT * FROM logs_sistema_default
+            WHERE fecha_y_hora >= :inicio AND fecha_y_hora < :fin
+        """), rango)
+        db.execute(text("DELETE FROM logs_sistema_default WHERE fecha_y_hora >= :inicio AND fecha_y_hora < :fin"), rango)
+        db.execute(text(
+            f"ALTER TABLE logs_sistema ATTACH PARTITION {nombre} FOR VALUES FROM ('{inicio}') TO ('{fin}')"
+        ))
+        logging.warning(f"{desplazadas} logs movidos de logs_sistema_default a {nombre}")
+        return nombre
+
+    def listar_particiones(self) -> List[dict]:
+        """Particiones mensuales (anexadas o ya desanexadas) con su mes de inicio"""
+        db: Session = SessionLocal()
+        try:
+            result = db.execute(text("""
+                SELECT c.relname, i.inhparent IS NOT NULL AS anexada
+                FROM pg_class c
+                LEFT JOIN pg_inherits i ON i.inhrelid = c.oid AND i.inhparent = 'logs_sistema'::regclass
+                WHERE c.relkind = 'r' AND c.relname ~ '^logs_sistema_[0-9]{4}_[0-9]{2}$'
+                  AND c.relnamespace = 'public'::regnamespace
+                ORDER BY c.relname
+            """)).fetchall()
+            particiones = []
+            for nombre, anexada in result:
+                anio, mes = PATRON_PARTICION.match(nombre).groups()
+                particiones.append({"nombre": nombre, "mes": date(int(anio), int(mes), 1), "anexada": anexada})
+            return particiones
+        finally:
+            db.close()
+
+    def contar_default(self) -> int:
+        """Filas que cayeron en la partición por defecto (fuera de las mensuales)"""
+        db: Session = SessionLocal()
+        try:
+            return db.execute(text("SELECT COUNT(*) FROM logs_sistema_default")).scalar()
+        finally:
+            db.close()
+
+    def _nombre_particion(self, nombre: str) -> str:
+        if not PATRON_PARTICION.match(nombre):
+            raise ValueError(f"Partición de logs inválida: {nombre}")
+        return nombre
+
+    def desanexar_particion(self, nombre: str):
+        db: Session = SessionLocal()
+        try:
+            db.execute(text(f"ALTER TABLE logs_sistema DETACH PARTITION {self._nombre_particion(nombre)}"))
+            db.commit()
+        except Exception as e:
+            logging.error(f"Error en desanexar_particion: {str(e)}")
+            db.rollback()
+            raise Exception(f"Error al desanexar partición {nombre}: {str(e)}")
+        finally:
+            db.close()
+
+    def exportar_particion(self, nombre: str, archivo: str) -> int:
+        """
+        Exporta una partición (ya desanexada) a CSV comprimido con COPY y verifica
+        que se hayan escrito todas sus filas. Devuelve la cantidad de filas.
+        """
+        nombre = self._nombre_particion(nombre)
+        temporal = f"{archivo}.tmp"
+        db: Session = SessionLocal()
+        try:
+            esperadas = db.execute(text(f"SELECT COUNT(*) FROM {nombre}")).scalar()
+            cursor = db.connection().connection.cursor()
+            with gzip.open(temporal, "wb") as salida:
+                cursor.copy_expert(f"COPY {nombre} TO STDOUT WITH (FORMAT csv, HEADER)", salida)
+            if cursor.rowcount != esperadas:
+                raise Exception(f"se exportaron {cursor.rowcount} de {esperadas} filas")
+            os.replace(temporal, archivo)
+            return esperadas
+        except Exception as e:
+            logging.error(f"Error en exportar_particion: {str(e)}")
+            if os.path.exists(temporal):
+                os.remove(temporal)
+            raise Exception(f"Error al exportar partición {nombre}: {str(e)}")
+        finally:
+            db.close()
+
+    def eliminar_particion(self, nombre: str):
+        """Elimina una partición ya desanexada y exportada"""
+        db: Session = SessionLocal()
+        try:
+            db.execute(text(f"DROP TABLE {self._nombre_particion(nombre)}"))
+            db.commit()
+        except Exception as e:
+            logging.error(f"Error en eliminar_particion: {str(e)}")
+            db.rollback()
+            raise Exception(f"Error al eliminar partición {nombre}: {str(e)}")
+        finally:
+            db.close()
+
+    @contextmanager
+    def bloqueo_retencion(self):
+        """True si este proceso obtuvo el turno del mantenimiento de particiones"""
+        db: Session = SessionLocal()
+        obtenido = False
+        try:
+            obtenido = db.execute(
+                text("SELECT pg_try_advisory_lock(hashtext(:clave))"), {"clave": CLAVE_BLOQUEO_RETENCION}
+            ).scalar()
+            yield bool(obtenido)
+        finally:
+            try:
+                if obtenido:
+                    db.execute(text("SELECT pg_advisory_unlock(hashtext(:clave))"), {"clave": CLAVE_BLOQUEO_RETENCION})
+            finally:
+                db.close()
@@ -3,13 +3,53 @@ import json
 import logging
 from datetime import datetime
 from typing import Dict, Any, Optional
+from mercadopago.config import RequestOptions
+from mercadopago.http import HttpClient
 from config import MERCADOPAGO_ACCESS_TOKEN, MERCADOPAGO_PUBLIC_KEY
+from infrastructure.clientes_http import crear_sesion_http, CircuitBreaker, ErrorPasarela, TIMEOUT_PASARELA
+
+circuito_mercadopago = CircuitBreaker("mercadopago", errores=(ErrorPasarela,))
+
+
+class HttpClientPersistente(HttpClient):
+    """
+    HttpClient del SDK con una sesión keep-alive compartida (el original abre
+    una sesión nueva en cada llamada), timeouts (conexión, lectura) y circuit breaker
+    """
+
+    def __init__(self):
+        self.sesion = crear_sesion_http()
+
+    def request(self, method, url, maxretries=None, retry_on=None, backoff_factor=None, **kwargs):
+        # Sin reintentos automáticos: un POST reintentado podría duplicar el cobro
+        kwargs["timeout"] = TIMEOUT_PASARELA
+        return circuito_mercadopago.llamar(self._enviar, method, url, **kwargs)
+
+    def _enviar(self, method, url, **kwargs):
+        try:
+            api_result = self.sesion.request(method, url, **kwargs)
+        except Exception as e:
+            raise ErrorPasarela(f"Error de conexión con MercadoPago: {str(e)}")
+        if api_result.status_code >= 500:
+            raise ErrorPasarela(f"MercadoPago respondió {api_result.status_code}")
+        return {
+            "status": api_result.status_code,
+            "response": api_result.json() if api_result.content else None
+        }
+
+
+# SDK compartido por todo el proceso
+_sdk = mercadopago.SDK(
+    MERCADOPAGO_ACCESS_TOKEN,
+    http_client=HttpClientPersistente(),
+    request_options=RequestOptions(connection_timeout=float(TIMEOUT_PASARELA[1])),
+)
 
 class MercadoPagoService:
     def __init__(self):
         self.access_token = MERCADOPAGO_ACCESS_TOKEN
         self.public_key = MERCADOPAGO_PUBLIC_KEY
-        self.sdk = mercadopago.SDK(self.access_token)
+        self.sdk = _sdk
     
     def crear_pago_qr(self, datos_pago: Dict[str, Any]) -> Dict[str, Any]:
         """
@@ -39,7 +79,9 @@ class MercadoPagoService:
                     "cantidad_acciones": str(datos_pago["cantidad_acciones"]),
                     "precio_unitario": str(datos_pago["precio_unitario"]),
                     "tipo_accion": datos_pago["tipo_accion"],
-                    "referencia_temporal": datos_pago["referencia_temporal"]
+                    "referencia_temporal": datos_pago["referencia_temporal"],
+                    "id_club": str(datos_pago["id_club"]),
+                    "modalidad_pago": str(datos_pago["modalidad_pago"])
                 }
             }
             
@@ -121,6 +163,55 @@ class MercadoPagoService:
             logging.error(f"Error buscando pagos MercadoPago: {str(e)}")
             raise Exception(f"Error buscando pagos MercadoPago: {str(e)}")
     
+    def buscar_pagos_recientes(self, dias: int = 2) -> Dict[str, Dict[str, Any]]:
+        """
+        Lista (paginado) los pagos creados en los últimos `dias` y los indexa por
+        referencia externa, para conciliar muchos pagos temporales con pocas consultas
+        """
+        try:
+            pagos = {}
+            offset = 0
+            while True:
+                search_response = self.sdk.payment().search({
+                    "range": "date_created",
+                    "begin_date": f"NOW-{dias}DAYS",
+                    "end_date": "NOW",
+                    "sort": "date_created",
+                    "criteria": "asc",
+                    "limit": 100,
+                    "offset": offset
+                })
+                
+                if search_response["status"] != 200:
+                    raise Exception(f"Error buscando pagos: {search_response}")
+                
+                results = search_response["response"]["results"]
+                for payment in results:
+                    external_reference = payment.get("external_reference")
+                    if not external_reference:
+                        continue
+                    # Un pago aprobado tiene prioridad sobre otros intentos de la misma referencia
+                    actual = pagos.get(external_reference)
+                    if actual and actual["status"] == "approved":
+                        continue
+                    pagos[external_reference] = {
+                        "payment_id": payment["id"],
+                        "status": payment["status"],
+                        "status_detail": payment.get("status_detail"),
+                        "transaction_amount": payment.get("transaction_amount"),
+                        "metadata": payment.get("metadata", {})
+                    }
+                
+                offset += len(results)
+                if not results or offset >= search_response["response"]["paging"]["total"]:
+                    break
+            
+            return pagos
+            
+        except Exception as e:
+            logging.error(f"Error buscando pagos recientes MercadoPago: {str(e)}")
+            raise Exception(f"Error buscando pagos recientes MercadoPago: {str(e)}")
+    
     def obtener_pago(self, payment_id: str) -> Dict[str, Any]:
         """
         Obtiene detalles de un pago específico
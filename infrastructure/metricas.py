@@ -0,0 +1,263 @@
+"""
+Métricas de peticiones HTTP y consultas SQL.
+
+- `MetricasMiddleware` (ASGI) mide cada petición: latencia, cantidad de
+  sentencias SQL, tiempo total en la base de datos y la sentencia más lenta.
+  Lo devuelve en la cabecera `Server-Timing` (visible en las herramientas del
+  navegador) y lo acumula por ruta en memoria.
+- `registrar_eventos(engine)` engancha before/after_cursor_execute de
+  SQLAlchemy; cada sentencia se atribuye a la petición en curso mediante un
+  contextvar (los endpoints síncronos corren en el threadpool con una copia
+  del contexto, que comparte el mismo objeto de medición).
+- Las sentencias que superan METRICAS_CONSULTA_LENTA_MS y las peticiones que
+  superan METRICAS_PETICION_LENTA_MS (con su sentencia más lenta) se registran
+  en el log con probabilidad METRICAS_MUESTREO_LENTAS (1.0 = todas, 0 = ninguna).
+- `exportar_prometheus()` genera el formato de texto de Prometheus (GET /metrics).
+
+El costo por petición es un par de perf_counter y una actualización de
+contadores bajo un lock; no se guarda nada por petición individual.
+"""
+
+import bisect
+import contextvars
+import logging
+import random
+import threading
+import time
+from typing import Dict, List, Optional, Tuple
+
+from sqlalchemy import event
+
+from config import METRICAS_CONSULTA_LENTA_MS, METRICAS_PETICION_LENTA_MS, METRICAS_MUESTREO_LENTAS
+
+# Límites de los histogramas (segundos)
+BUCKETS_PETICION = (0.005, 0.01, 0.025, 0.05, 0.1, 0.25, 0.5, 1.0, 2.5, 5.0, 10.0)
+BUCKETS_SQL = (0.001, 0.0025, 0.005, 0.01, 0.025, 0.05, 0.1, 0.25, 0.5, 1.0, 5.0)
+LARGO_SENTENCIA_LOG = 500
+limite_peticion_lenta = METRICAS_PETICION_LENTA_MS / 1000
+
+
+class MedicionPeticion:
+    __slots__ = ("scope", "consultas", "tiempo_bd", "mas_lenta", "sentencia_mas_lenta")
+
+    def __init__(self, scope: dict):
+        self.scope = scope
+        self.consultas = 0
+        self.tiempo_bd = 0.0
+        self.mas_lenta = 0.0
+        self.sentencia_mas_lenta: Optional[str] = None
+
+
+def _ruta(scope: dict) -> str:
+    """Plantilla de la ruta (p. ej. /acciones/{accion_id}) para no crear una serie por ID"""
+    return getattr(scope.get("route"), "path", None) or "(sin ruta)"
+
+
+medicion_actual: contextvars.ContextVar[Optional[MedicionPeticion]] = contextvars.ContextVar(
+    "medicion_actual", default=None
+)
+
+
+class Histograma:
+    __slots__ = ("limites", "conteos", "suma", "total")
+
+    def __init__(self, limites: Tuple[float, ...]):
+        self.limites = limites
+        self.conteos = [0] * (len(limites) + 1)
+        self.suma = 0.0
+        self.total = 0
+
+    def observar(self, valor: float):
+        self.conteos[bisect.bisect_left(self.limites, valor)] += 1
+        self.suma += valor
+        self.total += 1
+
+
+class RegistroMetricas:
+    def __init__(self):
+        self._lock = threading.Lock()
+        # (método, ruta, estado) -> cantidad
+        self.peticiones: Dict[Tuple[str, str, int], int] = {}
+        # (método, ruta) -> [histograma de latencia, sentencias SQL, segundos en BD]
+        self.por_ruta: Dict[Tuple[str, str], list] = {}
+        self.en_curso = 0
+        self.sql = Histograma(BUCKETS_SQL)
+        self.sql_fuera_de_peticion = 0
+        self.sql_lentas = 0
+        self.sql_errores = 0
+
+    def registrar_peticion(self, metodo: str, ruta: str, estado: int, duracion: float, medicion: MedicionPeticion):
+        with self._lock:
+            clave = (metodo, ruta, estado)
+            self.peticiones[clave] = self.peticiones.get(clave, 0) + 1
+            datos = self.por_ruta.get((metodo, ruta))
+            if datos is None:
+                datos = self.por_ruta[(metodo, ruta)] = [Histograma(BUCKETS_PETICION), 0, 0.0]
+            datos[0].observar(duracion)
+            datos[1] += medicion.consultas
+            datos[2] += medicion.tiempo_bd
+
+    def registrar_sql(self, duracion: float, en_peticion: bool, lenta: bool):
+        with self._lock:
+            self.sql.observar(duracion)
+            if not en_peticion:
+                self.sql_fuera_de_peticion += 1
+            if lenta:
+                self.sql_lentas += 1
+
+    def registrar_error_sql(self):
+        with self._lock:
+            self.sql_errores += 1
+
+    def cambiar_en_curso(self, delta: int):
+        with self._lock:
+            self.en_curso += delta
+
+    def exportar_prometheus(self) -> str:
+        with self._lock:
+            lineas: List[str] = []
+
+            lineas.append("# HELP ceas_http_requests_total Peticiones HTTP atendidas")
+            lineas.append("# TYPE ceas_http_requests_total counter")
+            for (metodo, ruta, estado), cantidad in sorted(self.peticiones.items()):
+                lineas.append(f'ceas_http_requests_total{{method="{metodo}",route="{_escapar(ruta)}",status="{estado}"}} {cantidad}')
+
+            lineas.append("# HELP ceas_http_requests_in_progress Peticiones HTTP en curso")
+            lineas.append("# TYPE ceas_http_requests_in_progress gauge")
+            lineas.append(f"ceas_http_requests_in_progress {self.en_curso}")
+
+            lineas.append("# HELP ceas_http_request_duration_seconds Latencia de las peticiones HTTP")
+            lineas.append("# TYPE ceas_http_request_duration_seconds histogram")
+            for (metodo, ruta), (histograma, _, _) in sorted(self.por_ruta.items()):
+                etiquetas = f'method="{metodo}",route="{_escapar(ruta)}"'
+                lineas.extend(_lineas_histograma("ceas_http_request_duration_seconds", etiquetas, histograma))
+
+            lineas.append("# HELP ceas_http_request_sql_queries_total Sentencias SQL ejecutadas por las peticiones")
+            lineas.append("# TYPE ceas_http_request_sql_queries_total counter")
+            for (metodo, ruta), (_, consultas, _) in sorted(self.por_ruta.items()):
+                lineas.append(f'ceas_http_request_sql_queries_total{{method="{metodo}",route="{_escapar(ruta)}"}} {consultas}')
+
+            lineas.append("# HELP ceas_http_request_db_seconds_total Tiempo en base de datos de las peticiones")
+            lineas.append("# TYPE ceas_http_request_db_seconds_total counter")
+            for (metodo, ruta), (_, _, tiempo_bd) in sorted(self.por_ruta.items()):
+                lineas.append(f'ceas_http_request_db_seconds_total{{method="{metodo}",route="{_escapar(ruta)}"}} {tiempo_bd:.6f}')
+
+            lineas.append("# HELP ceas_sql_query_duration_seconds Duración de las sentencias SQL (peticiones y workers)")
+            lineas.append("# TYPE ceas_sql_query_duration_seconds histogram")
+            lineas.extend(_lineas_histograma("ceas_sql_query_duration_seconds", "", self.sql))
+
+            for nombre, ayuda, valor in (
+                ("ceas_sql_background_queries_total", "Sentencias SQL fuera de peticiones (workers, tareas)", self.sql_fuera_de_peticion),
+                ("ceas_sql_slow_queries_total", f"Sentencias SQL de más de {METRICAS_CONSULTA_LENTA_MS} ms", self.sql_lentas),
+                ("ceas_sql_errors_total", "Sentencias SQL que fallaron", self.sql_errores),
+            ):
+                lineas.append(f"# HELP {nombre} {ayuda}")
+                lineas.append(f"# TYPE {nombre} counter")
+                lineas.append(f"{nombre} {valor}")
+
+            return "\n".join(lineas) + "\n"
+
+
+def _resumir(sentencia: str) -> str:
+    return " ".join(sentencia.split())[:LARGO_SENTENCIA_LOG]
+
+
+def _escapar(valor: str) -> str:
+    return valor.replace("\\", "\\\\").replace('"', '\\"')
+
+
+def _lineas_histograma(nombre: str, etiquetas: str, histograma: Histograma) -> List[str]:
+    separador = "," if etiquetas else ""
+    lineas = []
+    acumulado = 0
+    for limite, conteo in zip(histograma.limites, histograma.conteos):
+        acumulado += conteo
+        lineas.append(f'{nombre}_bucket{{{etiquetas}{separador}le="{limite}"}} {acumulado}')
+    lineas.append(f'{nombre}_bucket{{{etiquetas}{separador}le="+Inf"}} {histograma.total}')
+    sufijo = f"{{{etiquetas}}}" if etiquetas else ""
+    lineas.append(f"{nombre}_sum{sufijo} {histograma.suma:.6f}")
+    lineas.append(f"{nombre}_count{sufijo} {histograma.total}")
+    return lineas
+
+
+registro_metricas = RegistroMetricas()
+
+
+def registrar_eventos(engine):
+    """Mide cada sentencia SQL y la atribuye a la petición en curso"""
+    limite_lenta = METRICAS_CONSULTA_LENTA_MS / 1000
+
+    @event.listens_for(engine, "before_cursor_execute")
+    def _inicio(conn, cursor, statement, parameters, context, executemany):
+        conn.info.setdefault("metricas_inicio", []).append(time.perf_counter())
+
+    @event.listens_for(engine, "after_cursor_execute")
+    def _fin(conn, cursor, statement, parameters, context, executemany):
+        inicios = conn.info.get("metricas_inicio")
+        if not inicios:
+            return
+        duracion = time.perf_counter() - inicios.pop()
+        medicion = medicion_actual.get()
+        if medicion is not None:
+            medicion.consultas += 1
+            medicion.tiempo_bd += duracion
+            if duracion > medicion.mas_lenta:
+                medicion.mas_lenta = duracion
+                medicion.sentencia_mas_lenta = statement
+        lenta = duracion >= limite_lenta
+        registro_metricas.registrar_sql(duracion, medicion is not None, lenta)
+        if lenta and METRICAS_MUESTREO_LENTAS and random.random() < METRICAS_MUESTREO_LENTAS:
+            ruta = _ruta(medicion.scope) if medicion is not None else "(fuera de petición)"
+            logging.warning(f"Consulta lenta ({duracion * 1000:.1f} ms) en {ruta}: {_resumir(statement)}")
+
+    @event.listens_for(engine, "handle_error")
+    def _error(contexto_excepcion):
+        conexion = contexto_excepcion.connection
+        if conexion is not None and conexion.info.get("metricas_inicio"):
+            conexion.info["metricas_inicio"].pop()
+        registro_metricas.registrar_error_sql()
+
+
+class MetricasMiddleware:
+    """Middleware ASGI: mide la petición y agrega la cabecera Server-Timing"""
+
+    def __init__(self, app, excluir: Tuple[str, ...] = ("/metrics",)):
+        self.app = app
+        self.excluir = excluir
+
+    async def __call__(self, scope, receive, send):
+        if scope["type"] != "http" or scope["path"] in self.excluir:
+            await self.app(scope, receive, send)
+            return
+
+        medicion = MedicionPeticion(scope)
+        token = medicion_actual.set(medicion)
+        inicio = time.perf_counter()
+        estado = {"codigo": 500}
+        registro_metricas.cambiar_en_curso(1)
+
+        async def send_con_timing(mensaje):
+            if mensaje["type"] == "http.response.start":
+                estado["codigo"] = mensaje["status"]
+                total = (time.perf_counter() - inicio) * 1000
+                valor = (f'app;dur={total:.1f}, db;dur={medicion.tiempo_bd * 1000:.1f};'
+                         f'desc="{medicion.consultas} consultas"')
+                if medicion.consultas:
+                    valor += f", db-max;dur={medicion.mas_lenta * 1000:.1f}"
+                mensaje["headers"] = list(mensaje.get("headers", [])) + [(b"server-timing", valor.encode("latin-1"))]
+            await send(mensaje)
+
+        try:
+            await self.app(scope, receive, send_con_timing)
+        finally:
+            duracion = time.perf_counter() - inicio
+            medicion_actual.reset(token)
+            registro_metricas.cambiar_en_curso(-1)
+            ruta = _ruta(scope)
+            registro_metricas.registrar_peticion(scope["method"], ruta, estado["codigo"], duracion, medicion)
+            if (duracion >= limite_peticion_lenta and METRICAS_MUESTREO_LENTAS
+                    and random.random() < METRICAS_MUESTREO_LENTAS):
+                detalle = (f"; sentencia más lenta ({medicion.mas_lenta * 1000:.1f} ms): "
+                           f"{_resumir(medicion.sentencia_mas_lenta)}" if medicion.sentencia_mas_lenta else "")
+                logging.warning(f"Petición lenta {scope['method']} {ruta}: {duracion * 1000:.0f} ms, "
+                                f"{medicion.consultas} consultas SQL, {medicion.tiempo_bd * 1000:.0f} ms en BD{detalle}")
@@ -27,8 +27,8 @@ class PagoRepository:
         db: Session = SessionLocal()
         try:
             result = db.execute(text('''
-                INSERT INTO pago_accion (id_accion, monto, tipo_pago, estado_pago, observaciones)
-                VALUES (:id_accion, :monto, :tipo_pago, :estado_pago, :observaciones)
+                INSERT INTO pago_accion (id_accion, monto, tipo_pago, estado_pago, observaciones, referencia_pasarela)
+                VALUES (:id_accion, :monto, :tipo_pago, :estado_pago, :observaciones, :referencia_pasarela)
                 RETURNING id_pago, id_accion, fecha_de_pago, monto, tipo_pago, estado_pago, observaciones
             '''), data.dict())
             db.commit()
@@ -69,4 +69,64 @@ class PagoRepository:
             db.commit()
             return result.rowcount > 0
         finally:
-            db.close() 
\ No newline at end of file
+            db.close() 
+    def paginar_pendientes_pasarela(self, estado_pendiente: int, tamano_pagina: int = 200):
+        """
+        Recorre por páginas (keyset sobre id_pago) los pagos pendientes que
+        tienen referencia de pasarela ("stripe:pi_...", "mercadopago:123", "paypal:PAY-...")
+        """
+        ultimo_id = 0
+        while True:
+            db: Session = SessionLocal()
+            try:
+                result = db.execute(text('''
+                    SELECT id_pago, id_accion, monto, referencia_pasarela
+                    FROM pago_accion
+                    WHERE estado_pago = :estado_pendiente AND referencia_pasarela IS NOT NULL
+                      AND id_pago > :ultimo_id
+                    ORDER BY id_pago
+                    LIMIT :limite
+                '''), {"estado_pendiente": estado_pendiente, "ultimo_id": ultimo_id, "limite": tamano_pagina}).fetchall()
+            finally:
+                db.close()
+            if not result:
+                return
+            yield [
+                {"id_pago": row[0], "id_accion": row[1], "monto": float(row[2]) if row[2] else 0.0,
+                 "referencia_pasarela": row[3]}
+                for row in result
+            ]
+            ultimo_id = result[-1][0]
+
+    def actualizar_estados_pendientes(self, cambios, estado_pendiente: int) -> int:
+        """
+        Aplica en una sola transacción una lista de {"id_pago", "estado_pago"}.
+        Solo toca pagos que sigan pendientes (no pisa cambios manuales recientes)
+        """
+        if not cambios:
+            return 0
+        db: Session = SessionLocal()
+        try:
+            result = db.execute(text('''
+                UPDATE pago_accion p SET estado_pago = c.estado_pago
+                FROM (
+                    SELECT unnest(CAST(:ids AS BIGINT[])) AS id_pago,
+                           unnest(CAST(:estados AS BIGINT[])) AS estado_pago
+                ) c
+                WHERE p.id_pago = c.id_pago AND p.estado_pago = :estado_pendiente
+                RETURNING p.id_pago
+            '''), {
+                "ids": [cambio["id_pago"] for cambio in cambios],
+                "estados": [cambio["estado_pago"] for cambio in cambios],
+                "estado_pendiente": estado_pendiente,
+            })
+            actualizados = len(result.fetchall())
+            db.commit()
+            return actualizados
+        except Exception as e:
+            import logging
+            logging.error(f"Error en actualizar_estados_pendientes: {str(e)}")
+            db.rollback()
+            raise Exception(f"Error al actualizar estados de pagos: {str(e)}")
+        finally:
+            db.close()
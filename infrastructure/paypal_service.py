@@ -1,17 +1,61 @@
 import paypalrestsdk
 import json
 import logging
+import threading
 from datetime import datetime
 from typing import Dict, Any, Optional
-from config import PAYPAL_CLIENT_ID, PAYPAL_CLIENT_SECRET, PAYPAL_MODE
+from config import PAYPAL_CLIENT_ID, PAYPAL_CLIENT_SECRET, PAYPAL_MODE, PAYPAL_TOKEN_MARGEN_SEGUNDOS
+from infrastructure.clientes_http import crear_sesion_http, CircuitBreaker, ErrorPasarela, TIMEOUT_PASARELA
+
+circuito_paypal = CircuitBreaker("paypal", errores=(ErrorPasarela,))
+
+
+class ApiPayPal(paypalrestsdk.Api):
+    """
+    Api del SDK de PayPal de larga vida: reutiliza una sesión keep-alive, aplica
+    timeouts y circuit breaker, y conserva el token OAuth hasta poco antes de
+    que expire (antes se pedía un token nuevo en cada petición)
+    """
+
+    def __init__(self, options=None, **kwargs):
+        super().__init__(options, **kwargs)
+        self.sesion = crear_sesion_http()
+        self._lock_token = threading.Lock()
+
+    def get_token_hash(self, authorization_code=None, refresh_token=None, headers=None):
+        # Un solo hilo renueva el token; el resto reutiliza el vigente
+        with self._lock_token:
+            return super().get_token_hash(authorization_code, refresh_token, headers=headers)
+
+    def validate_token_hash(self):
+        if self.token_request_at and self.token_hash and self.token_hash.get("expires_in") is not None:
+            vigencia = self.token_hash["expires_in"] - PAYPAL_TOKEN_MARGEN_SEGUNDOS
+            if (datetime.now() - self.token_request_at).total_seconds() > vigencia:
+                self.token_hash = None
+
+    def http_call(self, url, method, **kwargs):
+        return circuito_paypal.llamar(self._enviar, url, method, **kwargs)
+
+    def _enviar(self, url, method, **kwargs):
+        try:
+            response = self.sesion.request(method, url, proxies=self.proxies, timeout=TIMEOUT_PASARELA, **kwargs)
+        except Exception as e:
+            raise ErrorPasarela(f"Error de conexión con PayPal: {str(e)}")
+        if response.status_code >= 500:
+            raise ErrorPasarela(f"PayPal respondió {response.status_code}")
+        return self.handle_response(response, response.content.decode('utf-8'))
+
+
+# Cliente compartido por todo el proceso
+_api = ApiPayPal(
+    mode=PAYPAL_MODE,  # "sandbox" o "live"
+    client_id=PAYPAL_CLIENT_ID,
+    client_secret=PAYPAL_CLIENT_SECRET
+)
 
 class PayPalService:
     def __init__(self):
-        paypalrestsdk.configure({
-            "mode": PAYPAL_MODE,  # "sandbox" o "live"
-            "client_id": PAYPAL_CLIENT_ID,
-            "client_secret": PAYPAL_CLIENT_SECRET
-        })
+        self.api = _api
     
     def crear_pago(self, datos_pago: Dict[str, Any]) -> Dict[str, Any]:
         """
@@ -46,7 +90,7 @@ class PayPalService:
                     "custom": datos_pago["referencia_temporal"],
                     "invoice_number": datos_pago["referencia_temporal"]
                 }]
-            })
+            }, api=self.api)
             
             # Crear el pago
             if payment.create():
@@ -89,7 +133,7 @@ class PayPalService:
         Ejecuta un pago de PayPal
         """
         try:
-            payment = paypalrestsdk.Payment.find(payment_id)
+            payment = paypalrestsdk.Payment.find(payment_id, api=self.api)
             
             if payment.execute({"payer_id": payer_id}):
                 logging.info(f"Pago PayPal ejecutado: {payment.id}")
@@ -122,7 +166,7 @@ class PayPalService:
         Obtiene detalles de un pago de PayPal
         """
         try:
-            payment = paypalrestsdk.Payment.find(payment_id)
+            payment = paypalrestsdk.Payment.find(payment_id, api=self.api)
             
             return {
                 "payment_id": payment.id,
@@ -2,7 +2,9 @@ from domain.personal import Personal
 from sqlalchemy.orm import Session
 from sqlalchemy import text
 from config import SessionLocal
+from infrastructure.catalogo_cache import catalogo_cache
 from typing import Optional
+import logging
 
 class PersonalRepository:
     def list_personal(self):
@@ -151,6 +153,9 @@ class PersonalRepository:
     def _get_nombre_cargo(self, db: Session, id_cargo: int) -> Optional[str]:
         """Obtiene el nombre del cargo basado en el ID"""
         try:
+            cargo = catalogo_cache.obtener("cargos", id_cargo)
+            if cargo:
+                return cargo["nombre_cargo"]
             result = db.execute(text("""
                 SELECT nombre_cargo FROM cargos WHERE id_cargo = :id_cargo
             """), {"id_cargo": id_cargo}).fetchone()
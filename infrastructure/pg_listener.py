@@ -0,0 +1,66 @@
+"""
+Listener de PostgreSQL LISTEN/NOTIFY en un hilo de fondo.
+
+Se usa para que las cachés en memoria de la API (catálogos, versiones de
+tablas) se enteren de los cambios hechos por otros procesos o workers.
+"""
+
+import logging
+import select
+import threading
+from typing import Callable, Optional
+
+from config import DATABASE_URL
+
+
+class PgListener:
+    def __init__(self, canal: str, on_notify: Callable[[str], None],
+                 on_desconexion: Optional[Callable[[], None]] = None):
+        self.canal = canal
+        self.on_notify = on_notify
+        self.on_desconexion = on_desconexion
+        self._hilo: Optional[threading.Thread] = None
+        self._detener = threading.Event()
+
+    def iniciar(self):
+        if self._hilo and self._hilo.is_alive():
+            return
+        self._detener.clear()
+        self._hilo = threading.Thread(
+            target=self._escuchar, name=f"listener-{self.canal}", daemon=True
+        )
+        self._hilo.start()
+
+    def detener(self):
+        self._detener.set()
+        if self._hilo:
+            self._hilo.join(timeout=5)
+            self._hilo = None
+
+    def _escuchar(self):
+        import psycopg2
+        from psycopg2.extensions import ISOLATION_LEVEL_AUTOCOMMIT
+
+        while not self._detener.is_set():
+            conn = None
+            try:
+                conn = psycopg2.connect(DATABASE_URL)
+                conn.set_isolation_level(ISOLATION_LEVEL_AUTOCOMMIT)
+                cursor = conn.cursor()
+                cursor.execute(f"LISTEN {self.canal};")
+                while not self._detener.is_set():
+                    if select.select([conn], [], [], 5) == ([], [], []):
+                        continue
+                    conn.poll()
+                    while conn.notifies:
+                        notify = conn.notifies.pop(0)
+                        self.on_notify(notify.payload)
+            except Exception as e:
+                logging.error(f"Error en listener {self.canal}: {str(e)}")
+                # Mientras no hay conexión se pueden perder notificaciones
+                if self.on_desconexion:
+                    self.on_desconexion()
+                self._detener.wait(10)
+            finally:
+                if conn is not None:
+                    conn.close()
@@ -0,0 +1,149 @@
+"""
+Motor de códigos QR en memoria.
+
+Renderiza PNG o SVG a bytes (sin pasar por disco) y los guarda en una caché
+LRU acotada por cantidad y por bytes. El id es el hash del contenido
+codificado, así que el mismo payload no se renderiza dos veces y su URL
+(/acciones/qr/{id}.png|svg) es inmutable y cacheable por el navegador.
+
+Cada imagen se escribe también una vez en qr_codes/: la caché es de un solo
+proceso, y otro worker (o este mismo tras expulsarla o reiniciarse) la sirve
+desde disco.
+"""
+
+import hashlib
+import os
+import re
+import threading
+from collections import OrderedDict
+from io import BytesIO
+from typing import Optional, Tuple
+
+from config import QR_CACHE_MAX_ENTRADAS, QR_CACHE_MAX_BYTES
+
+FORMATOS = {"png": "image/png", "svg": "image/svg+xml"}
+PATRON_NOMBRE = re.compile(r"^([0-9a-f]{32})\.(png|svg)$")
+DIRECTORIO_QR = "qr_codes"
+
+
+def es_nombre_qr(nombre: str) -> bool:
+    return PATRON_NOMBRE.match(nombre) is not None
+
+
+class MotorQR:
+    """
+    Caché LRU de imágenes QR. Además de las imágenes guarda el contenido de cada
+    QR (texto corto), para poder servir otro formato o volver a renderizar una
+    imagen expulsada sin que el cliente tenga que regenerarla.
+    """
+
+    def __init__(self, max_entradas: int = QR_CACHE_MAX_ENTRADAS, max_bytes: int = QR_CACHE_MAX_BYTES,
+                 directorio: str = DIRECTORIO_QR):
+        self.max_entradas = max_entradas
+        self.max_bytes = max_bytes
+        self.directorio = directorio
+        self._imagenes: "OrderedDict[str, bytes]" = OrderedDict()
+        self._contenidos: "OrderedDict[str, str]" = OrderedDict()
+        self._bytes = 0
+        self._lock = threading.Lock()
+        self.aciertos = 0
+        self.fallos = 0
+
+    @staticmethod
+    def calcular_id(contenido: str) -> str:
+        return hashlib.sha256(contenido.encode("utf-8")).hexdigest()[:32]
+
+    def generar(self, contenido: str, formato: str = "png") -> str:
+        """Renderiza (o reutiliza) el QR del contenido y devuelve su nombre: '<id>.<formato>'"""
+        if formato not in FORMATOS:
+            raise ValueError(f"Formato de QR no soportado: {formato}")
+        qr_id = self.calcular_id(contenido)
+        nombre = f"{qr_id}.{formato}"
+
+        with self._lock:
+            self._contenidos[qr_id] = contenido
+            self._contenidos.move_to_end(qr_id)
+            while len(self._contenidos) > self.max_entradas * 4:
+                self._contenidos.popitem(last=False)
+        self._persistir(nombre, self._imagen(nombre, contenido, formato))
+        return nombre
+
+    def obtener(self, nombre: str) -> Optional[Tuple[bytes, str]]:
+        """
+        Bytes y media type de un QR generado: de memoria, renderizado de nuevo si se
+        conoce su contenido, o leído de disco (generado por otro proceso). None si no existe.
+        """
+        coincidencia = PATRON_NOMBRE.match(nombre)
+        if not coincidencia:
+            return None
+        qr_id, formato = coincidencia.groups()
+
+        with self._lock:
+            contenido = self._contenidos.get(qr_id)
+        if contenido is not None:
+            return self._imagen(nombre, contenido, formato), FORMATOS[formato]
+
+        with self._lock:
+            imagen = self._imagenes.get(nombre)
+        if imagen is None:
+            ruta = os.path.join(self.directorio, nombre)
+            if not os.path.exists(ruta):
+                return None
+            with open(ruta, "rb") as archivo:
+                imagen = archivo.read()
+            self._guardar_en_cache(nombre, imagen)
+        return imagen, FORMATOS[formato]
+
+    def estadisticas(self) -> dict:
+        with self._lock:
+            return {"imagenes": len(self._imagenes), "bytes": self._bytes, "contenidos": len(self._contenidos),
+                    "aciertos": self.aciertos, "fallos": self.fallos}
+
+    def _imagen(self, nombre: str, contenido: str, formato: str) -> bytes:
+        with self._lock:
+            imagen = self._imagenes.get(nombre)
+            if imagen is not None:
+                self._imagenes.move_to_end(nombre)
+                self.aciertos += 1
+                return imagen
+            self.fallos += 1
+        # Se renderiza fuera del lock: dos hilos con el mismo QR pueden renderizarlo a la vez, sin efecto
+        imagen = self._renderizar(contenido, formato)
+        self._guardar_en_cache(nombre, imagen)
+        return imagen
+
+    def _persistir(self, nombre: str, imagen: bytes):
+        ruta = os.path.join(self.directorio, nombre)
+        if os.path.exists(ruta):
+            return
+        os.makedirs(self.directorio, exist_ok=True)
+        # Escritura atómica: otro worker puede estar leyendo o escribiendo el mismo QR
+        temporal = f"{ruta}.{os.getpid()}.{threading.get_ident()}.tmp"
+        with open(temporal, "wb") as archivo:
+            archivo.write(imagen)
+        os.replace(temporal, ruta)
+
+    def _guardar_en_cache(self, nombre: str, imagen: bytes):
+        with self._lock:
+            if nombre in self._imagenes:
+                return
+            self._imagenes[nombre] = imagen
+            self._bytes += len(imagen)
+            while self._imagenes and (len(self._imagenes) > self.max_entradas or self._bytes > self.max_bytes):
+                _, expulsada = self._imagenes.popitem(last=False)
+                self._bytes -= len(expulsada)
+
+    @staticmethod
+    def _renderizar(contenido: str, formato: str) -> bytes:
+        import qrcode
+
+        buffer = BytesIO()
+        if formato == "svg":
+            import qrcode.image.svg
+            qrcode.make(contenido, image_factory=qrcode.image.svg.SvgPathImage).save(buffer)
+        else:
+            qrcode.make(contenido).save(buffer, format="PNG")
+        return buffer.getvalue()
+
+
+motor_qr = MotorQR()
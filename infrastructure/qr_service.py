@@ -1,19 +1,32 @@
-import qrcode
 import json
 import os
 from datetime import datetime, timedelta
 from typing import Dict, Any
 import logging
 
+from infrastructure.qr_engine import motor_qr
+
 class QRService:
     def __init__(self):
         self.qr_codes_dir = "qr_codes"
-        # Asegurar que el directorio existe
-        os.makedirs(self.qr_codes_dir, exist_ok=True)
+
+    def _generar_imagen(self, datos: Dict[str, Any]) -> Dict[str, Any]:
+        """
+        Renderiza el QR (caché en memoria y copia en disco) y devuelve su id y
+        la URL desde la que se sirve
+        """
+        qr_nombre = motor_qr.generar(json.dumps(datos, ensure_ascii=False))
+        return {
+            "qr_id": qr_nombre,
+            "qr_url": f"/acciones/qr/{qr_nombre}",
+            "qr_image": os.path.join(self.qr_codes_dir, qr_nombre),
+        }
     
-    def generar_qr_transferencia(self, id_accion: int, monto: float, concepto: str) -> Dict[str, Any]:
+    def generar_qr_transferencia(self, id_accion: int, monto: float, concepto: str,
+                                 datos_extra: Dict[str, Any] = None) -> Dict[str, Any]:
         """
-        Genera QR con datos de transferencia bancaria
+        Genera QR con datos de transferencia bancaria.
+        `datos_extra` reemplaza campos (p. ej. referencia) antes de codificar el QR.
         """
         datos_transferencia = {
             "banco": "Banco Nacional de Bolivia",
@@ -26,18 +39,16 @@ class QRService:
             "telefono_contacto": "12345678",
             "email_contacto": "contacto@clubceas.com"
         }
+        datos_transferencia.update(datos_extra or {})
         
         try:
-            # Generar QR
-            qr_code = qrcode.make(json.dumps(datos_transferencia, ensure_ascii=False))
-            qr_path = os.path.join(self.qr_codes_dir, f"transferencia_{id_accion}.png")
-            qr_code.save(qr_path)
+            imagen = self._generar_imagen(datos_transferencia)
             
             logging.info(f"QR generado exitosamente para acción {id_accion}")
             
             return {
                 "tipo": "transferencia_bancaria",
-                "qr_image": qr_path,
+                **imagen,
                 "datos_transferencia": datos_transferencia,
                 "instrucciones": [
                     "1. Escanea el código QR con tu app bancaria",
@@ -65,16 +76,13 @@ class QRService:
         }
         
         try:
-            # Generar QR
-            qr_code = qrcode.make(json.dumps(datos_pago, ensure_ascii=False))
-            qr_path = os.path.join(self.qr_codes_dir, f"pago_movil_{id_accion}.png")
-            qr_code.save(qr_path)
+            imagen = self._generar_imagen(datos_pago)
             
             logging.info(f"QR de pago móvil generado para acción {id_accion}")
             
             return {
                 "tipo": "pago_movil",
-                "qr_image": qr_path,
+                **imagen,
                 "datos_pago": datos_pago,
                 "instrucciones": [
                     "1. Escanea el código QR",
@@ -135,15 +143,13 @@ class QRService:
         }
         
         try:
-            # Generar QR
-            qr_code = qrcode.make(json.dumps(datos_transferencia, ensure_ascii=False))
-            qr_path = os.path.join(self.qr_codes_dir, f"temp_{referencia_temporal}.png")
-            qr_code.save(qr_path)
+            imagen = self._generar_imagen(datos_transferencia)
             
             logging.info(f"QR generado exitosamente para referencia {referencia_temporal}")
             
             return {
                 "tipo": "transferencia_bancaria_bolivia",
+                **imagen,
                 "qr_data": datos_transferencia,
                 "instrucciones": [
                     "1. Realiza la transferencia bancaria con los datos mostrados",
@@ -165,8 +171,7 @@ class QRService:
             import time
             
             # Buscar archivos QR antiguos
-            patron = os.path.join(self.qr_codes_dir, "*.png")
-            archivos = glob.glob(patron)
+            archivos = glob.glob(os.path.join(self.qr_codes_dir, "*.png")) + glob.glob(os.path.join(self.qr_codes_dir, "*.svg"))
             
             tiempo_limite = time.time() - (dias_antiguedad * 24 * 60 * 60)
             archivos_eliminados = 0
@@ -12,8 +12,8 @@ matplotlib.use('Agg')
 import matplotlib.pyplot as plt
 from matplotlib.backends.backend_agg import FigureCanvasAgg
 import numpy as np
-import psycopg2
-from config import DATABASE_URL
+import logging
+from infrastructure.contabilidad_repository import snapshots_contables
 
 class ReporteContableService:
     """
@@ -154,106 +154,11 @@ class ReporteContableService:
         return buffer.getvalue()
     
     def _obtener_datos_contables(self, fecha_inicio, fecha_fin):
-        """Obtiene todos los datos contables de la BD"""
+        """Obtiene todos los datos contables de la BD (una consulta, cacheada por período)"""
         try:
-            conn = psycopg2.connect(DATABASE_URL)
-            cursor = conn.cursor()
-            
-            datos = {}
-            
-            # Ingresos (de movimientos financieros)
-            cursor.execute("""
-                SELECT 
-                    COALESCE(SUM(monto), 0) as total_ingresos,
-                    COUNT(*) as cantidad_ingresos
-                FROM movimiento_financiero
-                WHERE tipo_movimiento = 'INGRESO'
-                AND estado = 'confirmado'
-            """)
-            datos['ingresos'] = cursor.fetchone()
-            
-            # Egresos (de movimientos financieros)
-            cursor.execute("""
-                SELECT 
-                    COALESCE(SUM(monto), 0) as total_egresos,
-                    COUNT(*) as cantidad_egresos
-                FROM movimiento_financiero
-                WHERE tipo_movimiento = 'EGRESO'
-                AND estado = 'confirmado'
-            """)
-            datos['egresos'] = cursor.fetchone()
-            
-            # Pagos de acciones (ingresos)
-            cursor.execute("""
-                SELECT 
-                    COALESCE(SUM(monto), 0) as total_pagos_acciones,
-                    COUNT(*) as cantidad_pagos
-                FROM pago_accion
-                WHERE estado_pago = 2
-            """)
-            datos['pagos_acciones'] = cursor.fetchone()
-            
-            # Compras (egresos)
-            cursor.execute("""
-                SELECT 
-                    COALESCE(SUM(monto_total), 0) as total_compras,
-                    COUNT(*) as cantidad_compras
-                FROM compras
-                WHERE estado IN ('completado', 'pagado')
-            """)
-            datos['compras'] = cursor.fetchone()
-            
-            # Salarios (egresos)
-            cursor.execute("""
-                SELECT 
-                    COALESCE(SUM(salario), 0) as total_salarios,
-                    COUNT(*) as cantidad_empleados
-                FROM personal
-                WHERE estado = TRUE
-            """)
-            datos['salarios'] = cursor.fetchone()
-            
-            # Inventario (valor)
-            cursor.execute("""
-                SELECT 
-                    COALESCE(SUM(cantidad_en_stock * precio_unitario), 0) as valor_inventario,
-                    COUNT(*) as cantidad_productos
-                FROM inventario
-                WHERE cantidad_en_stock > 0
-            """)
-            datos['inventario'] = cursor.fetchone()
-            
-            # Cuotas pendientes (pasivos)
-            cursor.execute("""
-                SELECT 
-                    COALESCE(SUM(saldo_pendiente), 0) as total_cuotas_pendientes,
-                    COUNT(*) as cantidad_cuotas
-                FROM accion
-                WHERE saldo_pendiente > 0
-            """)
-            datos['cuotas_pendientes'] = cursor.fetchone()
-            
-            # Movimientos mensuales
-            cursor.execute("""
-                SELECT 
-                    TO_CHAR(fecha, 'YYYY-MM') as mes,
-                    SUM(CASE WHEN tipo_movimiento = 'INGRESO' THEN monto ELSE 0 END) as ingresos,
-                    SUM(CASE WHEN tipo_movimiento = 'EGRESO' THEN monto ELSE 0 END) as egresos
-                FROM movimiento_financiero
-                WHERE estado = 'confirmado'
-                GROUP BY TO_CHAR(fecha, 'YYYY-MM')
-                ORDER BY mes DESC
-                LIMIT 12
-            """)
-            datos['tendencia_mensual'] = cursor.fetchall()
-            
-            cursor.close()
-            conn.close()
-            
-            return datos
-            
+            return snapshots_contables.obtener(fecha_inicio, fecha_fin)
         except Exception as e:
-            print(f"Error obteniendo datos contables: {e}")
+            logging.error(f"Error obteniendo datos contables: {e}")
             return {}
     
     def _generar_estado_resultados(self, datos):
@@ -1,14 +1,160 @@
 from domain.reserva import Reserva
 from sqlalchemy.orm import Session
 from sqlalchemy import text
+from sqlalchemy.exc import IntegrityError
 from config import SessionLocal
 from typing import Optional, List
+import logging
+
+ESTADO_CONFIRMADA = "confirmada"
+ESTADO_EN_ESPERA = "en_espera"
+ESTADO_CANCELADA = "cancelada"
+
+_COLUMNAS = "id_reserva, id_socio, id_evento, fecha_de_reserva, estado, observaciones"
+
+# Reservas y cupos (create_reservas_cupos.sql). Orden de bloqueo en todas las
+# operaciones: primero la fila del evento en evento_cupos, después las reservas.
+
+
+def reservar_cupo(db: Session, id_socio: int, id_evento: int, observaciones: Optional[str] = None,
+                  lista_espera: bool = True) -> dict:
+    """
+    Reserva un cupo en una transacción: UPDATE condicional del contador del
+    evento (ocupados < capacidad) e INSERT de la reserva 'confirmada'. Sin cupo
+    la reserva queda 'en_espera' (o no se crea si lista_espera es False).
+
+    Devuelve {"resultado": ..., "reserva": Reserva | None, "posicion_espera": int | None}
+    con resultado 'confirmada', 'en_espera', 'sin_cupo', 'duplicada',
+    'evento_inexistente' o 'socio_inexistente'.
+    """
+    parametros = {"id_evento": id_evento}
+    try:
+        cupo = db.execute(text("""
+            UPDATE evento_cupos SET ocupados = ocupados + 1
+            WHERE id_evento = :id_evento AND (capacidad IS NULL OR ocupados < capacidad)
+            RETURNING ocupados
+        """), parametros).fetchone()
+        estado = ESTADO_CONFIRMADA
+
+        if not cupo:
+            # Evento lleno (o inexistente). Se bloquea su fila hasta el COMMIT: una
+            # cancelación concurrente espera y después ve esta reserva en espera
+            contador = db.execute(text("""
+                SELECT capacidad, ocupados FROM evento_cupos WHERE id_evento = :id_evento FOR UPDATE
+            """), parametros).fetchone()
+            if not contador:
+                db.rollback()
+                return {"resultado": "evento_inexistente", "reserva": None, "posicion_espera": None}
+            if contador[0] is None or contador[1] < contador[0]:
+                # Se liberó un cupo entre las dos sentencias
+                db.execute(text("UPDATE evento_cupos SET ocupados = ocupados + 1 WHERE id_evento = :id_evento"),
+                           parametros)
+            elif lista_espera:
+                estado = ESTADO_EN_ESPERA
+            else:
+                db.rollback()
+                return {"resultado": "sin_cupo", "reserva": None, "posicion_espera": None}
+
+        row = db.execute(text(f'''
+            INSERT INTO reservas (id_socio, id_evento, estado, observaciones)
+            VALUES (:id_socio, :id_evento, :estado, :observaciones)
+            RETURNING {_COLUMNAS}
+        '''), {"id_socio": id_socio, "id_evento": id_evento, "estado": estado,
+               "observaciones": observaciones}).fetchone()
+
+        posicion = None
+        if estado == ESTADO_EN_ESPERA:
+            posicion = db.execute(text("""
+                SELECT count(*) FROM reservas
+                WHERE id_evento = :id_evento AND estado = 'en_espera'
+                  AND (fecha_de_reserva, id_reserva) <= (:fecha, :id_reserva)
+            """), {"id_evento": id_evento, "fecha": row[3], "id_reserva": row[0]}).scalar()
+
+        db.commit()
+        return {"resultado": estado, "reserva": Reserva(*row), "posicion_espera": posicion}
+    except IntegrityError as e:
+        db.rollback()
+        # 23505: ya tiene una reserva activa en el evento; 23503: socio inexistente
+        codigo = getattr(e.orig, "pgcode", None)
+        resultado = "duplicada" if codigo == "23505" else "socio_inexistente"
+        return {"resultado": resultado, "reserva": None, "posicion_espera": None}
+    except Exception:
+        db.rollback()
+        raise
+
+
+def cancelar_reserva(db: Session, reserva_id: int, eliminar: bool = False) -> Optional[List[int]]:
+    """
+    Cancela (o elimina) una reserva. Si estaba confirmada libera su cupo y
+    confirma las primeras reservas en espera que quepan. Devuelve los ids
+    promovidos, o None si la reserva no existe.
+    """
+    try:
+        anterior = db.execute(text("SELECT id_evento FROM reservas WHERE id_reserva = :id_reserva"),
+                              {"id_reserva": reserva_id}).fetchone()
+        if not anterior:
+            return None
+        id_evento = anterior[0]
+
+        db.execute(text("SELECT 1 FROM evento_cupos WHERE id_evento = :id_evento FOR UPDATE"),
+                   {"id_evento": id_evento})
+        estado = db.execute(text("SELECT estado FROM reservas WHERE id_reserva = :id_reserva FOR UPDATE"),
+                            {"id_reserva": reserva_id}).scalar()
+        if estado is None:
+            db.rollback()
+            return None
+
+        if eliminar:
+            db.execute(text("DELETE FROM reservas WHERE id_reserva = :id_reserva"), {"id_reserva": reserva_id})
+        else:
+            db.execute(text("UPDATE reservas SET estado = :estado WHERE id_reserva = :id_reserva"),
+                       {"estado": ESTADO_CANCELADA, "id_reserva": reserva_id})
+
+        promovidas = []
+        if estado == ESTADO_CONFIRMADA:
+            db.execute(text("""
+                UPDATE evento_cupos SET ocupados = GREATEST(ocupados - 1, 0) WHERE id_evento = :id_evento
+            """), {"id_evento": id_evento})
+            promovidas = _promover_lista_espera(db, id_evento)
+        db.commit()
+        return promovidas
+    except Exception:
+        db.rollback()
+        raise
+
+
+def _promover_lista_espera(db: Session, id_evento: int) -> List[int]:
+    """Confirma, por orden de llegada, las reservas en espera que entren en los cupos libres"""
+    row = db.execute(text("""
+        WITH libres AS (
+            SELECT CASE WHEN capacidad IS NULL THEN NULL ELSE GREATEST(capacidad - ocupados, 0) END AS cupos
+            FROM evento_cupos
+            WHERE id_evento = :id_evento
+        ),
+        promovidas AS (
+            UPDATE reservas SET estado = 'confirmada'
+            WHERE id_reserva IN (
+                SELECT id_reserva FROM reservas
+                WHERE id_evento = :id_evento AND estado = 'en_espera'
+                ORDER BY fecha_de_reserva, id_reserva
+                LIMIT (SELECT cupos FROM libres)
+                FOR UPDATE
+            )
+            RETURNING id_reserva
+        )
+        UPDATE evento_cupos
+        SET ocupados = ocupados + (SELECT count(*) FROM promovidas)
+        WHERE id_evento = :id_evento
+        RETURNING ARRAY(SELECT id_reserva FROM promovidas)
+    """), {"id_evento": id_evento}).fetchone()
+    return list(row[0]) if row and row[0] else []
+
 
 class ReservaRepository:
     def list_reservas(self, id_evento: Optional[int] = None, id_socio: Optional[int] = None) -> List[Reserva]:
         db: Session = SessionLocal()
         try:
-            query = "SELECT id_reserva, id_socio, id_evento, fecha_de_reserva, estado FROM reservas"
+            query = f"SELECT {_COLUMNAS} FROM reservas"
             filters = []
             params = {}
             if id_evento is not None:
@@ -27,33 +173,31 @@ class ReservaRepository:
     def get_reserva(self, reserva_id: int) -> Optional[Reserva]:
         db: Session = SessionLocal()
         try:
-            result = db.execute(text("SELECT id_reserva, id_socio, id_evento, fecha_de_reserva, estado FROM reservas WHERE id_reserva = :id_reserva"), {"id_reserva": reserva_id}).fetchone()
+            result = db.execute(text(f"SELECT {_COLUMNAS} FROM reservas WHERE id_reserva = :id_reserva"), {"id_reserva": reserva_id}).fetchone()
             if result:
                 return Reserva(*result)
             return None
         finally:
             db.close()
 
-    def create_reserva(self, data):
+    def create_reserva(self, id_socio: int, id_evento: int, observaciones: Optional[str] = None,
+                       lista_espera: bool = True) -> dict:
         db: Session = SessionLocal()
         try:
-            result = db.execute(text('''
-                INSERT INTO reservas (id_socio, id_evento, estado)
-                VALUES (:id_socio, :id_evento, :estado)
-                RETURNING id_reserva, id_socio, id_evento, fecha_de_reserva, estado
-            '''), data.dict())
-            db.commit()
-            row = result.fetchone()
-            return Reserva(*row)
+            return reservar_cupo(db, id_socio, id_evento, observaciones, lista_espera)
+        except Exception as e:
+            logging.error(f"Error en create_reserva: {str(e)}")
+            raise Exception(f"Error al crear reserva: {str(e)}")
         finally:
             db.close()
 
-    def update_reserva(self, reserva_id: int, data):
+    def update_reserva(self, reserva_id: int, campos: dict):
+        """Actualiza campos que no afectan los cupos (observaciones, fecha_de_reserva)"""
         db: Session = SessionLocal()
         try:
             fields = []
             params = {"id_reserva": reserva_id}
-            for field, value in data.dict(exclude_unset=True).items():
+            for field, value in campos.items():
                 fields.append(f"{field} = :{field}")
                 params[field] = value
             if not fields:
@@ -64,11 +208,38 @@ class ReservaRepository:
         finally:
             db.close()
 
+    def cancelar_reserva(self, reserva_id: int) -> Optional[List[int]]:
+        db: Session = SessionLocal()
+        try:
+            return cancelar_reserva(db, reserva_id)
+        except Exception as e:
+            logging.error(f"Error en cancelar_reserva: {str(e)}")
+            raise Exception(f"Error al cancelar reserva: {str(e)}")
+        finally:
+            db.close()
+
     def delete_reserva(self, reserva_id: int):
         db: Session = SessionLocal()
         try:
-            result = db.execute(text("DELETE FROM reservas WHERE id_reserva = :id_reserva RETURNING id_reserva"), {"id_reserva": reserva_id})
+            return cancelar_reserva(db, reserva_id, eliminar=True) is not None
+        except Exception as e:
+            logging.error(f"Error en delete_reserva: {str(e)}")
+            raise Exception(f"Error al eliminar reserva: {str(e)}")
+        finally:
+            db.close()
+
+    def promover_lista_espera(self, id_evento: int) -> List[int]:
+        """Tras aumentar la capacidad de un evento, confirma las reservas en espera que entren"""
+        db: Session = SessionLocal()
+        try:
+            db.execute(text("SELECT 1 FROM evento_cupos WHERE id_evento = :id_evento FOR UPDATE"),
+                       {"id_evento": id_evento})
+            promovidas = _promover_lista_espera(db, id_evento)
             db.commit()
-            return result.rowcount > 0
+            return promovidas
+        except Exception as e:
+            logging.error(f"Error en promover_lista_espera: {str(e)}")
+            db.rollback()
+            raise Exception(f"Error al promover lista de espera: {str(e)}")
         finally:
-            db.close() 
\ No newline at end of file
+            db.close()
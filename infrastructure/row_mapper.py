@@ -0,0 +1,68 @@
+"""
+Mapeo de filas SQL a entidades de dominio.
+
+En lugar de convertir columna por columna en cada repositorio
+(`str(row[7]) if row[7] else None`), cada forma de consulta declara una vez
+qué campo corresponde a cada columna y qué conversión aplica. `crear_mapper`
+genera y compila una función específica para esa forma, que se reutiliza en
+todas las filas y en todas las llamadas.
+"""
+
+from dataclasses import fields
+from decimal import Decimal
+from functools import lru_cache
+from typing import Any, Callable, Dict, Optional, Sequence, Tuple
+
+# Conversiones habituales; `{v}` es el valor de la columna
+DIRECTO = None
+TEXTO = "str({v}) if {v} else None"
+OPCIONAL = "{v} if {v} else None"
+FLOAT = "float({v}) if {v} else 0.0"
+DECIMAL = "Decimal(str(float({v}))) if {v} else Decimal('0.0')"
+BOOLEANO = "bool({v}) if {v} is not None else True"
+
+Columna = Tuple[Optional[str], Optional[str]]
+
+
+@lru_cache(maxsize=None)
+def _compilar(clase: type, columnas: Tuple[Columna, ...]) -> Callable[[Any], Any]:
+    variables = [f"c{i}" for i in range(len(columnas))]
+    argumentos = []
+    for variable, (campo, conversion) in zip(variables, columnas):
+        if campo is None:
+            # Columna que el repositorio usa aparte (no es un campo de la entidad)
+            continue
+        expresion = conversion.format(v=variable) if conversion else variable
+        argumentos.append(f"{campo}=({expresion})")
+
+    desempaquetado = f"    {', '.join(variables)}, = row\n" if variables else ""
+    codigo = (
+        "def mapear(row):\n"
+        f"{desempaquetado}"
+        f"    return Clase({', '.join(argumentos)})\n"
+    )
+    espacio = {"Clase": clase, "Decimal": Decimal}
+    exec(compile(codigo, f"<mapper {clase.__name__}>", "exec"), espacio)
+    return espacio["mapear"]
+
+
+def crear_mapper(clase: type, columnas: Sequence[Columna]) -> Callable[[Any], Any]:
+    """
+    Devuelve una función fila -> entidad para la forma de consulta indicada.
+
+    `columnas` enumera, en el orden del SELECT, pares (campo, conversión).
+    Un campo None ignora la columna. Las funciones se cachean por forma.
+    """
+    return _compilar(clase, tuple(columnas))
+
+
+_CAMPOS: Dict[type, Tuple[str, ...]] = {}
+
+
+def como_dict(entidad) -> dict:
+    """Convierte una entidad de dominio (dataclass, con o sin slots) a dict plano"""
+    clase = type(entidad)
+    campos = _CAMPOS.get(clase)
+    if campos is None:
+        campos = _CAMPOS[clase] = tuple(campo.name for campo in fields(clase))
+    return {campo: getattr(entidad, campo) for campo in campos}
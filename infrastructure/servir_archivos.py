@@ -0,0 +1,218 @@
+"""
+Envío de archivos protegidos (certificados y comprobantes).
+
+- `servir_archivo()`: una sola llamada a os.stat por petición, ETag /
+  Last-Modified con respuesta 304 (If-None-Match / If-Modified-Since) y
+  descargas parciales con Range / If-Range (206 / 416).
+- Con ARCHIVOS_X_ACCEL_REDIRECT activo la API solo decide la autorización y
+  responde con la cabecera X-Accel-Redirect: nginx envía el archivo (sendfile,
+  Range incluido) sin ocupar un worker de Python por byte. Ejemplo de nginx:
+
+      location /_archivos_protegidos/ {
+          internal;
+          alias /ruta/de/la/api/;
+      }
+
+- Sin proxy, el cuerpo se envía con la extensión ASGI
+  "http.response.zerocopysend" (sendfile) si el servidor la ofrece, y si no
+  por bloques leídos en un hilo.
+- `cache_acceso`: la decisión de autorización sale de una única consulta por
+  (acción, usuario), cacheada en memoria hasta que cambian las tablas accion o
+  socio (ver infrastructure/version_tablas.py) o vence su TTL.
+"""
+
+import os
+import re
+import stat
+import threading
+import time
+from collections import OrderedDict
+from email.utils import formatdate, parsedate_to_datetime
+from typing import Callable, Dict, Optional, Tuple
+from urllib.parse import quote
+
+import anyio
+from starlette.requests import Request
+from starlette.responses import Response
+
+from config import (
+    ARCHIVOS_X_ACCEL_REDIRECT, ARCHIVOS_X_ACCEL_PREFIJO,
+    ARCHIVOS_TAMANO_BLOQUE, ACCESO_ARCHIVOS_TTL_SEGUNDOS,
+)
+from infrastructure.version_tablas import version_tablas
+
+RAIZ = os.path.realpath(os.getcwd())
+_RANGO_RE = re.compile(r"^bytes=(\d*)-(\d*)$")
+
+
+def _content_disposition(nombre_descarga: str) -> str:
+    nombre_ascii = nombre_descarga.encode("ascii", "ignore").decode("ascii").replace('"', "")
+    return f"attachment; filename=\"{nombre_ascii}\"; filename*=utf-8''{quote(nombre_descarga)}"
+
+
+def _no_modificado(request: Request, etag: str, modificado: float) -> bool:
+    if_none_match = request.headers.get("if-none-match")
+    if if_none_match is not None:
+        return if_none_match.strip() == "*" or etag in [valor.strip() for valor in if_none_match.split(",")]
+    if_modified_since = request.headers.get("if-modified-since")
+    if if_modified_since:
+        try:
+            return int(modificado) <= parsedate_to_datetime(if_modified_since).timestamp()
+        except (TypeError, ValueError):
+            return False
+    return False
+
+
+def _rango(request: Request, etag: str, ultima_modificacion: str, tamano: int) -> Optional[Tuple[int, int]]:
+    """
+    Rango pedido como (inicio, fin) inclusivo; None para enviar el archivo completo.
+    Solo se atiende un rango por petición (varios rangos se responden con 200).
+    Lanza ValueError si el rango no es satisfacible.
+    """
+    cabecera = request.headers.get("range")
+    if not cabecera:
+        return None
+    if_range = request.headers.get("if-range")
+    if if_range and if_range.strip() not in (etag, ultima_modificacion):
+        return None  # el archivo cambió: se envía completo
+    coincidencia = _RANGO_RE.match(cabecera.strip())
+    if not coincidencia:
+        return None
+    inicio, fin = coincidencia.groups()
+    if not inicio and not fin:
+        return None
+    if not inicio:
+        # bytes=-N: los últimos N bytes
+        sufijo = int(fin)
+        if sufijo == 0:
+            raise ValueError("Rango vacío")
+        return max(tamano - sufijo, 0), tamano - 1
+    inicio = int(inicio)
+    fin = min(int(fin), tamano - 1) if fin else tamano - 1
+    if inicio >= tamano or inicio > fin:
+        raise ValueError("Rango fuera del archivo")
+    return inicio, fin
+
+
+class RespuestaArchivo(Response):
+    """Envía [inicio, fin] de un archivo sin cargarlo completo en memoria"""
+
+    def __init__(self, ruta: str, inicio: int, fin: int, status_code: int, headers: Dict[str, str],
+                 media_type: str, enviar_cuerpo: bool = True):
+        super().__init__(status_code=status_code, headers=headers, media_type=media_type)
+        self.ruta = ruta
+        self.inicio = inicio
+        self.fin = fin
+        self.enviar_cuerpo = enviar_cuerpo
+
+    async def __call__(self, scope, receive, send):
+        await send({"type": "http.response.start", "status": self.status_code, "headers": self.raw_headers})
+        longitud = self.fin - self.inicio + 1
+        if not self.enviar_cuerpo or longitud <= 0:
+            await send({"type": "http.response.body", "body": b"", "more_body": False})
+            return
+
+        if "http.response.zerocopysend" in scope.get("extensions", {}):
+            with open(self.ruta, "rb") as archivo:
+                await send({"type": "http.response.zerocopysend", "file": archivo.fileno(),
+                            "offset": self.inicio, "count": longitud, "more_body": False})
+            return
+
+        async with await anyio.open_file(self.ruta, mode="rb") as archivo:
+            await archivo.seek(self.inicio)
+            pendiente = longitud
+            while pendiente > 0:
+                bloque = await archivo.read(min(ARCHIVOS_TAMANO_BLOQUE, pendiente))
+                if not bloque:
+                    break
+                pendiente -= len(bloque)
+                await send({"type": "http.response.body", "body": bloque, "more_body": pendiente > 0})
+        if pendiente > 0:
+            await send({"type": "http.response.body", "body": b"", "more_body": False})
+
+
+def servir_archivo(request: Request, ruta: str, nombre_descarga: str,
+                   media_type: str = "application/pdf") -> Response:
+    """
+    Respuesta para descargar `ruta` (relativa al directorio de la API).
+    Lanza FileNotFoundError si el archivo no existe o está fuera de la API.
+    """
+    ruta_real = os.path.realpath(ruta)
+    if not ruta_real.startswith(RAIZ + os.sep):
+        raise FileNotFoundError(ruta)
+    info = os.stat(ruta_real)
+    if not stat.S_ISREG(info.st_mode):
+        raise FileNotFoundError(ruta)
+
+    etag = f'"{info.st_mtime_ns:x}-{info.st_size:x}"'
+    ultima_modificacion = formatdate(info.st_mtime, usegmt=True)
+    cabeceras = {
+        "ETag": etag,
+        "Last-Modified": ultima_modificacion,
+        "Cache-Control": "private, no-cache",
+        "Accept-Ranges": "bytes",
+        "Content-Disposition": _content_disposition(nombre_descarga),
+    }
+
+    if _no_modificado(request, etag, info.st_mtime):
+        return Response(status_code=304, headers=cabeceras)
+
+    if ARCHIVOS_X_ACCEL_REDIRECT:
+        # nginx resuelve Range / condicionales y envía el archivo con sendfile
+        cabeceras["X-Accel-Redirect"] = ARCHIVOS_X_ACCEL_PREFIJO + quote(os.path.relpath(ruta_real, RAIZ))
+        return Response(status_code=200, headers=cabeceras, media_type=media_type)
+
+    try:
+        rango = _rango(request, etag, ultima_modificacion, info.st_size)
+    except ValueError:
+        return Response(status_code=416, headers={**cabeceras, "Content-Range": f"bytes */{info.st_size}"})
+
+    enviar_cuerpo = request.method != "HEAD"
+    if rango is None:
+        cabeceras["Content-Length"] = str(info.st_size)
+        return RespuestaArchivo(ruta_real, 0, info.st_size - 1, 200, cabeceras, media_type, enviar_cuerpo)
+
+    inicio, fin = rango
+    cabeceras["Content-Range"] = f"bytes {inicio}-{fin}/{info.st_size}"
+    cabeceras["Content-Length"] = str(fin - inicio + 1)
+    return RespuestaArchivo(ruta_real, inicio, fin, 206, cabeceras, media_type, enviar_cuerpo)
+
+
+class CacheAcceso:
+    """
+    Decisiones de acceso a archivos por (clave, usuario). Cada entrada guarda la
+    versión de las tablas de las que depende y se descarta si cambian.
+    """
+
+    TABLAS = ("accion", "socio")
+
+    def __init__(self, ttl_segundos: float = ACCESO_ARCHIVOS_TTL_SEGUNDOS, max_entradas: int = 4096):
+        self.ttl_segundos = ttl_segundos
+        self.max_entradas = max_entradas
+        self._entradas: "OrderedDict[tuple, Tuple[float, tuple, str, Optional[dict]]]" = OrderedDict()
+        self._lock = threading.Lock()
+
+    def obtener(self, clave: tuple, cargar: Callable[[], Optional[dict]]) -> Optional[dict]:
+        version = version_tablas.version(self.TABLAS)
+        epoca = version_tablas.epoca
+        ahora = time.monotonic()
+        with self._lock:
+            entrada = self._entradas.get(clave)
+            if entrada and entrada[0] > ahora and entrada[1] == version and entrada[2] == epoca:
+                self._entradas.move_to_end(clave)
+                return entrada[3]
+
+        valor = cargar()
+        with self._lock:
+            self._entradas[clave] = (ahora + self.ttl_segundos, version, epoca, valor)
+            self._entradas.move_to_end(clave)
+            while len(self._entradas) > self.max_entradas:
+                self._entradas.popitem(last=False)
+        return valor
+
+    def invalidar(self):
+        with self._lock:
+            self._entradas.clear()
+
+
+cache_acceso = CacheAcceso()
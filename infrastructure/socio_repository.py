@@ -5,6 +5,25 @@ from config import SessionLocal
 from typing import Optional
 import logging
 from datetime import datetime
+from infrastructure.row_mapper import crear_mapper, DIRECTO, TEXTO
+
+# SELECT id_socio, id_club, nombres, apellidos, ci_nit, telefono, correo_electronico, direccion,
+#        estado, fecha_de_registro, fecha_nacimiento, tipo_membresia, id_usuario
+_mapear_socio = crear_mapper(Socio, [
+    ("id_socio", DIRECTO),
+    ("id_club", DIRECTO),
+    ("nombres", DIRECTO),
+    ("apellidos", DIRECTO),
+    ("ci_nit", DIRECTO),
+    ("telefono", DIRECTO),
+    ("correo_electronico", DIRECTO),
+    ("direccion", DIRECTO),
+    ("estado", DIRECTO),
+    ("fecha_de_registro", TEXTO),
+    ("fecha_nacimiento", TEXTO),
+    ("tipo_membresia", DIRECTO),
+    ("id_usuario", DIRECTO),
+])
 
 class SocioRepository:
     def list_socios(self):
@@ -12,29 +31,7 @@ class SocioRepository:
         try:
             # Verificar si la tabla existe
             result = db.execute(text("SELECT id_socio, id_club, nombres, apellidos, ci_nit, telefono, correo_electronico, direccion, estado, fecha_de_registro, fecha_nacimiento, tipo_membresia, id_usuario FROM socio")).fetchall()
-            socios = []
-            for row in result:
-                # Convertir datetime a string si es necesario
-                fecha_registro = str(row[9]) if row[9] else None
-                fecha_nacimiento = str(row[10]) if row[10] else None
-                
-                socio = Socio(
-                    id_socio=row[0],
-                    id_club=row[1],
-                    nombres=row[2],
-                    apellidos=row[3],
-                    ci_nit=row[4],
-                    telefono=row[5],
-                    correo_electronico=row[6],
-                    direccion=row[7],
-                    estado=row[8],
-                    fecha_de_registro=fecha_registro,
-                    fecha_nacimiento=fecha_nacimiento,
-                    tipo_membresia=row[11],
-                    id_usuario=row[12]
-                )
-                socios.append(socio)
-            return socios
+            return [_mapear_socio(row) for row in result]
         except Exception as e:
             logging.error(f"Error en list_socios: {str(e)}")
             raise Exception(f"Error al consultar socios: {str(e)}")
@@ -46,25 +43,7 @@ class SocioRepository:
         try:
             result = db.execute(text("SELECT id_socio, id_club, nombres, apellidos, ci_nit, telefono, correo_electronico, direccion, estado, fecha_de_registro, fecha_nacimiento, tipo_membresia, id_usuario FROM socio WHERE id_socio = :id_socio"), {"id_socio": socio_id}).fetchone()
             if result:
-                # Convertir datetime a string si es necesario
-                fecha_registro = str(result[9]) if result[9] else None
-                fecha_nacimiento = str(result[10]) if result[10] else None
-                
-                return Socio(
-                    id_socio=result[0],
-                    id_club=result[1],
-                    nombres=result[2],
-                    apellidos=result[3],
-                    ci_nit=result[4],
-                    telefono=result[5],
-                    correo_electronico=result[6],
-                    direccion=result[7],
-                    estado=result[8],
-                    fecha_de_registro=fecha_registro,
-                    fecha_nacimiento=fecha_nacimiento,
-                    tipo_membresia=result[11],
-                    id_usuario=result[12]
-                )
+                return _mapear_socio(result)
             return None
         except Exception as e:
             logging.error(f"Error en get_socio: {str(e)}")
@@ -82,26 +61,7 @@ class SocioRepository:
             '''), data.dict())
             db.commit()
             row = result.fetchone()
-            
-            # Convertir datetime a string si es necesario
-            fecha_registro = str(row[9]) if row[9] else None
-            fecha_nacimiento = str(row[10]) if row[10] else None
-            
-            return Socio(
-                id_socio=row[0],
-                id_club=row[1],
-                nombres=row[2],
-                apellidos=row[3],
-                ci_nit=row[4],
-                telefono=row[5],
-                correo_electronico=row[6],
-                direccion=row[7],
-                estado=row[8],
-                fecha_de_registro=fecha_registro,
-                fecha_nacimiento=fecha_nacimiento,
-                tipo_membresia=row[11],
-                id_usuario=row[12]
-            )
+            return _mapear_socio(row)
         except Exception as e:
             logging.error(f"Error en create_socio: {str(e)}")
             db.rollback()
@@ -161,24 +121,7 @@ class SocioRepository:
             """), {"usuario_id": usuario_id}).fetchone()
             
             if result:
-                fecha_registro = str(result[9]) if result[9] else None
-                fecha_nacimiento = str(result[10]) if result[10] else None
-                
-                return Socio(
-                    id_socio=result[0],
-                    id_club=result[1],
-                    nombres=result[2],
-                    apellidos=result[3],
-                    ci_nit=result[4],
-                    telefono=result[5],
-                    correo_electronico=result[6],
-                    direccion=result[7],
-                    estado=result[8],
-                    fecha_de_registro=fecha_registro,
-                    fecha_nacimiento=fecha_nacimiento,
-                    tipo_membresia=result[11],
-                    id_usuario=result[12]
-                )
+                return _mapear_socio(result)
             return None
         except Exception as e:
             logging.error(f"Error en get_socio_by_usuario_id: {str(e)}")
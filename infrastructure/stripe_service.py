@@ -2,12 +2,23 @@ import stripe
 import json
 import logging
 from datetime import datetime
-from typing import Dict, Any, Optional
+from typing import Dict, Any, List, Optional
 from config import STRIPE_SECRET_KEY, STRIPE_PUBLISHABLE_KEY, STRIPE_WEBHOOK_SECRET
+from infrastructure.clientes_http import crear_sesion_http, CircuitBreaker, TIMEOUT_PASARELA, FirmaWebhookInvalida
+
+# Cliente HTTP compartido por todo el proceso: conexiones keep-alive y timeouts explícitos
+stripe.api_key = STRIPE_SECRET_KEY
+stripe.max_network_retries = 1
+_RequestsClient = getattr(stripe, "RequestsClient", None) or stripe.http_client.RequestsClient
+stripe.default_http_client = _RequestsClient(timeout=TIMEOUT_PASARELA, session=crear_sesion_http())
+
+# Solo los errores de red / servidor de Stripe abren el circuito (no una tarjeta rechazada)
+circuito_stripe = CircuitBreaker("stripe", errores=(
+    stripe.error.APIConnectionError, stripe.error.APIError, stripe.error.RateLimitError,
+))
 
 class StripeService:
     def __init__(self):
-        stripe.api_key = STRIPE_SECRET_KEY
         self.webhook_secret = STRIPE_WEBHOOK_SECRET
     
     def crear_pago_qr(self, datos_pago: Dict[str, Any]) -> Dict[str, Any]:
@@ -19,7 +30,8 @@ class StripeService:
             amount_cents = int(float(datos_pago["total_pago"]) * 100)
             
             # Crear PaymentIntent con método de pago QR
-            payment_intent = stripe.PaymentIntent.create(
+            payment_intent = circuito_stripe.llamar(
+                stripe.PaymentIntent.create,
                 amount=amount_cents,
                 currency='usd',  # Stripe no soporta BOB directamente, usar USD
                 payment_method_types=['card', 'alipay', 'wechat_pay'],  # Métodos que soportan QR
@@ -65,7 +77,8 @@ class StripeService:
             amount_cents = int(float(datos_pago["total_pago"]) * 100)
             
             # Crear PaymentIntent con estado "requires_payment_method"
-            payment_intent = stripe.PaymentIntent.create(
+            payment_intent = circuito_stripe.llamar(
+                stripe.PaymentIntent.create,
                 amount=amount_cents,
                 currency='usd',
                 payment_method_types=['card'],
@@ -76,6 +89,8 @@ class StripeService:
                     'precio_unitario': str(datos_pago["precio_unitario"]),
                     'referencia_temporal': datos_pago["referencia_temporal"],
                     'tipo_accion': datos_pago["tipo_accion"],
+                    'id_club': str(datos_pago["id_club"]),
+                    'modalidad_pago': str(datos_pago["modalidad_pago"]),
                     'metodo_pago': 'transferencia_bancaria_bolivia',
                     'fecha_creacion': datetime.now().isoformat()
                 },
@@ -122,7 +137,7 @@ class StripeService:
         Verifica el estado de un pago en Stripe
         """
         try:
-            payment_intent = stripe.PaymentIntent.retrieve(payment_intent_id)
+            payment_intent = circuito_stripe.llamar(stripe.PaymentIntent.retrieve, payment_intent_id)
             
             return {
                 "payment_intent_id": payment_intent.id,
@@ -138,12 +153,43 @@ class StripeService:
             logging.error(f"Error verificando pago: {str(e)}")
             raise Exception(f"Error verificando pago: {str(e)}")
     
+    def buscar_pagos_por_referencias(self, referencias: List[str]) -> Dict[str, Dict[str, Any]]:
+        """
+        Busca en lote los PaymentIntent de varios pagos temporales (Search API,
+        hasta 10 referencias por consulta). Devuelve referencia -> pago
+        """
+        # Si hay varios intentos para la misma referencia, gana el más avanzado
+        prioridad = {"succeeded": 3, "processing": 2, "requires_capture": 2, "canceled": 0}
+        encontrados = {}
+        try:
+            for inicio in range(0, len(referencias), 10):
+                grupo = referencias[inicio:inicio + 10]
+                consulta = " OR ".join(f"metadata['referencia_temporal']:'{ref}'" for ref in grupo)
+                resultado = circuito_stripe.llamar(stripe.PaymentIntent.search, query=consulta, limit=100)
+                for payment_intent in resultado.data:
+                    ref = payment_intent.metadata.get("referencia_temporal")
+                    actual = encontrados.get(ref)
+                    if actual and prioridad.get(actual["status"], 1) >= prioridad.get(payment_intent.status, 1):
+                        continue
+                    encontrados[ref] = {
+                        "payment_intent_id": payment_intent.id,
+                        "status": payment_intent.status,
+                        "amount": payment_intent.amount,
+                        "currency": payment_intent.currency,
+                        "metadata": dict(payment_intent.metadata)
+                    }
+            return encontrados
+            
+        except stripe.error.StripeError as e:
+            logging.error(f"Error buscando pagos: {str(e)}")
+            raise Exception(f"Error buscando pagos: {str(e)}")
+    
     def confirmar_pago(self, payment_intent_id: str) -> Dict[str, Any]:
         """
         Confirma un pago en Stripe (para pagos manuales)
         """
         try:
-            payment_intent = stripe.PaymentIntent.confirm(payment_intent_id)
+            payment_intent = circuito_stripe.llamar(stripe.PaymentIntent.confirm, payment_intent_id)
             
             return {
                 "payment_intent_id": payment_intent.id,
@@ -163,7 +209,7 @@ class StripeService:
         Cancela un pago en Stripe
         """
         try:
-            payment_intent = stripe.PaymentIntent.cancel(payment_intent_id)
+            payment_intent = circuito_stripe.llamar(stripe.PaymentIntent.cancel, payment_intent_id)
             
             return {
                 "payment_intent_id": payment_intent.id,
@@ -181,35 +227,45 @@ class StripeService:
         """
         Procesa webhooks de Stripe
         """
+        event = self.verificar_evento(payload, signature)
+        return self.clasificar_evento(event)
+    
+    def verificar_evento(self, payload: str, signature: str) -> Dict[str, Any]:
+        """
+        Verifica la firma del webhook y devuelve el evento (sin procesarlo)
+        """
         try:
-            event = stripe.Webhook.construct_event(
+            return stripe.Webhook.construct_event(
                 payload, signature, self.webhook_secret
             )
-            
-            # Manejar diferentes tipos de eventos
-            if event['type'] == 'payment_intent.succeeded':
-                payment_intent = event['data']['object']
-                return self._procesar_pago_exitoso(payment_intent)
-            elif event['type'] == 'payment_intent.payment_failed':
-                payment_intent = event['data']['object']
-                return self._procesar_pago_fallido(payment_intent)
-            elif event['type'] == 'payment_intent.canceled':
-                payment_intent = event['data']['object']
-                return self._procesar_pago_cancelado(payment_intent)
-            else:
-                return {
-                    "event_type": event['type'],
-                    "status": "unhandled",
-                    "message": f"Evento no manejado: {event['type']}"
-                }
-                
         except stripe.error.SignatureVerificationError as e:
             logging.error(f"Error verificando firma del webhook: {str(e)}")
-            raise Exception(f"Error verificando firma del webhook: {str(e)}")
+            raise FirmaWebhookInvalida(f"Error verificando firma del webhook: {str(e)}")
         except Exception as e:
             logging.error(f"Error procesando webhook: {str(e)}")
             raise Exception(f"Error procesando webhook: {str(e)}")
     
+    def clasificar_evento(self, event: Dict[str, Any]) -> Dict[str, Any]:
+        """
+        Traduce un evento de Stripe ya verificado a la acción a realizar
+        """
+        # Manejar diferentes tipos de eventos
+        if event['type'] == 'payment_intent.succeeded':
+            payment_intent = event['data']['object']
+            return self._procesar_pago_exitoso(payment_intent)
+        elif event['type'] == 'payment_intent.payment_failed':
+            payment_intent = event['data']['object']
+            return self._procesar_pago_fallido(payment_intent)
+        elif event['type'] == 'payment_intent.canceled':
+            payment_intent = event['data']['object']
+            return self._procesar_pago_cancelado(payment_intent)
+        else:
+            return {
+                "event_type": event['type'],
+                "status": "unhandled",
+                "message": f"Evento no manejado: {event['type']}"
+            }
+    
     def _procesar_pago_exitoso(self, payment_intent: Dict[str, Any]) -> Dict[str, Any]:
         """
         Procesa un pago exitoso
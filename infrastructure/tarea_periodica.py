@@ -0,0 +1,40 @@
+"""
+Tarea periódica en un hilo de fondo (jobs programados dentro del proceso de la API).
+
+Si la API corre con varios workers cada uno tendrá su hilo; la propia tarea
+debe coordinarse (p. ej. con un advisory lock) si no puede ejecutarse en paralelo.
+"""
+
+import logging
+import threading
+from typing import Callable, Optional
+
+
+class TareaPeriodica:
+    def __init__(self, nombre: str, funcion: Callable[[], object], intervalo_segundos: float):
+        self.nombre = nombre
+        self.funcion = funcion
+        self.intervalo_segundos = intervalo_segundos
+        self._hilo: Optional[threading.Thread] = None
+        self._detener = threading.Event()
+
+    def iniciar(self):
+        if self._hilo and self._hilo.is_alive():
+            return
+        self._detener.clear()
+        self._hilo = threading.Thread(target=self._ejecutar, name=f"tarea-{self.nombre}", daemon=True)
+        self._hilo.start()
+
+    def detener(self):
+        self._detener.set()
+        if self._hilo:
+            self._hilo.join(timeout=5)
+            self._hilo = None
+
+    def _ejecutar(self):
+        # La primera ejecución espera un intervalo completo para no cargar el arranque
+        while not self._detener.wait(self.intervalo_segundos):
+            try:
+                self.funcion()
+            except Exception as e:
+                logging.error(f"Error en tarea periódica {self.nombre}: {str(e)}")
@@ -93,6 +93,51 @@ class TempPaymentService:
             logging.error(f"Error confirmando pago temporal {temp_ref}: {str(e)}")
             raise Exception(f"Error confirmando pago temporal: {str(e)}")
     
+    def registrar_pasarela(self, temp_ref: str, pasarela: str, id_pasarela: str):
+        """
+        Guarda en el pago temporal el id que le asignó la pasarela (PaymentIntent,
+        preferencia, pago PayPal) para poder conciliarlo después
+        """
+        try:
+            file_path = os.path.join(self.temp_payments_dir, f"{temp_ref}.json")
+            with open(file_path, "r", encoding="utf-8") as f:
+                temp_payment = json.load(f)
+            
+            temp_payment["pasarela"] = pasarela
+            temp_payment["id_pasarela"] = id_pasarela
+            
+            with open(file_path, "w", encoding="utf-8") as f:
+                json.dump(temp_payment, f, indent=2, ensure_ascii=False)
+        except Exception as e:
+            logging.error(f"Error registrando pasarela del pago temporal {temp_ref}: {str(e)}")
+    
+    def paginar_pendientes(self, tamano_pagina: int = 100):
+        """
+        Recorre los pagos temporales pendientes y no expirados en páginas de
+        `tamano_pagina` (sin cargar todos los archivos a la vez)
+        """
+        import glob
+        
+        patron = os.path.join(self.temp_payments_dir, "TEMP_*.json")
+        pagina = []
+        for archivo in sorted(glob.glob(patron)):
+            try:
+                with open(archivo, "r", encoding="utf-8") as f:
+                    temp_payment = json.load(f)
+                if temp_payment.get("estado", "pendiente") != "pendiente":
+                    continue
+                if datetime.now() > datetime.fromisoformat(temp_payment["fecha_limite"]):
+                    continue
+                pagina.append(temp_payment)
+            except Exception as e:
+                logging.error(f"Error leyendo pago temporal {archivo}: {str(e)}")
+                continue
+            if len(pagina) >= tamano_pagina:
+                yield pagina
+                pagina = []
+        if pagina:
+            yield pagina
+    
     def delete_temp_payment(self, temp_ref: str):
         """
         Elimina un pago temporal
@@ -0,0 +1,182 @@
+"""
+Variantes cifradas ("falsas") de los certificados por usuario.
+
+Cuando alguien que no es el propietario pide un certificado se le entrega un
+PDF con el contenido cifrado con su ID de usuario. Generarlo (PBKDF2 + reportlab)
+es caro, así que nunca se hace en la petición:
+  - si la variante ya existe se sirve tal cual
+  - si no, se encola para un worker en segundo plano y la petición recibe un
+    PDF liviano de "en preparación" (202 + Retry-After)
+
+Las variantes en disco están acotadas a CERTIFICADOS_VARIANTES_MAXIMO; al
+superarlo se eliminan las de acceso más antiguo (se registra el acceso en el
+atime del archivo, sin tocar el mtime que usa el ETag de la descarga).
+"""
+
+import logging
+import os
+import queue
+import threading
+import time
+from typing import Dict, List, Optional, Set
+
+from config import CERTIFICADOS_VARIANTES_HILOS, CERTIFICADOS_VARIANTES_MAXIMO
+
+DIRECTORIO_VARIANTES = os.path.join("certificados", "cifrados")
+SUFIJO_VARIANTE = "_cifrado_"
+# Un acceso se vuelve a registrar en disco como mucho una vez por este intervalo
+INTERVALO_REGISTRO_ACCESO = 60
+
+
+def _pdf_en_preparacion() -> bytes:
+    """PDF mínimo de una página, sin reportlab (se sirve mientras se genera la variante)"""
+    texto = [
+        "Certificado cifrado en preparación",
+        "Vuelve a intentar la descarga en unos segundos.",
+    ]
+    contenido = "BT /F1 16 Tf 72 770 Td ({}) Tj 0 -28 Td /F1 11 Tf ({}) Tj ET".format(*texto).encode("cp1252")
+    objetos = [
+        b"<< /Type /Catalog /Pages 2 0 R >>",
+        b"<< /Type /Pages /Kids [3 0 R] /Count 1 >>",
+        b"<< /Type /Page /Parent 2 0 R /MediaBox [0 0 595 842] "
+        b"/Resources << /Font << /F1 4 0 R >> >> /Contents 5 0 R >>",
+        b"<< /Type /Font /Subtype /Type1 /BaseFont /Helvetica /Encoding /WinAnsiEncoding >>",
+        b"<< /Length %d >>\nstream\n%s\nendstream" % (len(contenido), contenido),
+    ]
+    pdf = b"%PDF-1.4\n"
+    posiciones = []
+    for numero, objeto in enumerate(objetos, start=1):
+        posiciones.append(len(pdf))
+        pdf += b"%d 0 obj\n%s\nendobj\n" % (numero, objeto)
+    inicio_xref = len(pdf)
+    pdf += b"xref\n0 %d\n0000000000 65535 f \n" % (len(objetos) + 1)
+    pdf += b"".join(b"%010d 00000 n \n" % posicion for posicion in posiciones)
+    pdf += b"trailer\n<< /Size %d /Root 1 0 R >>\nstartxref\n%d\n%%%%EOF\n" % (len(objetos) + 1, inicio_xref)
+    return pdf
+
+
+PDF_EN_PREPARACION = _pdf_en_preparacion()
+
+
+class GeneradorVariantes:
+    def __init__(self, hilos: int = CERTIFICADOS_VARIANTES_HILOS, maximo: int = CERTIFICADOS_VARIANTES_MAXIMO,
+                 directorio: str = DIRECTORIO_VARIANTES):
+        self.hilos = hilos
+        self.maximo = maximo
+        self.directorio = directorio
+        self._cola: "queue.Queue[Optional[tuple]]" = queue.Queue()
+        self._pendientes: Set[str] = set()
+        # ruta de la variante -> último acceso (time.time); se carga del disco al primer uso
+        self._accesos: Optional[Dict[str, float]] = None
+        self._lock = threading.Lock()
+        self._hilos: List[threading.Thread] = []
+
+    def ruta_variante(self, archivo_original: str, usuario_id: int) -> str:
+        nombre = os.path.splitext(os.path.basename(archivo_original))[0]
+        return os.path.join(self.directorio, f"{nombre}{SUFIJO_VARIANTE}{usuario_id}.pdf")
+
+    def obtener(self, archivo_original: str, usuario_id: int) -> Optional[str]:
+        """
+        Ruta de la variante del usuario si ya existe. Si no, la encola y devuelve
+        None. Lanza FileNotFoundError si no existe el certificado original.
+        """
+        ruta = self.ruta_variante(archivo_original, usuario_id)
+        try:
+            info = os.stat(ruta)
+        except FileNotFoundError:
+            if not os.path.exists(archivo_original):
+                raise
+            self.encolar(archivo_original, usuario_id)
+            return None
+        self._registrar_acceso(ruta, info.st_mtime)
+        return ruta
+
+    def encolar(self, archivo_original: str, usuario_id: int):
+        ruta = self.ruta_variante(archivo_original, usuario_id)
+        with self._lock:
+            if ruta in self._pendientes:
+                return
+            self._pendientes.add(ruta)
+        self.iniciar()
+        self._cola.put((archivo_original, usuario_id, ruta))
+
+    def pendientes(self) -> int:
+        with self._lock:
+            return len(self._pendientes)
+
+    def iniciar(self):
+        with self._lock:
+            if self._hilos:
+                return
+            for i in range(self.hilos):
+                hilo = threading.Thread(target=self._trabajar, name=f"variantes-certificado-{i}", daemon=True)
+                hilo.start()
+                self._hilos.append(hilo)
+
+    def detener(self):
+        with self._lock:
+            hilos, self._hilos = self._hilos, []
+        for _ in hilos:
+            self._cola.put(None)
+        for hilo in hilos:
+            hilo.join(timeout=10)
+
+    def _trabajar(self):
+        while True:
+            tarea = self._cola.get()
+            if tarea is None:
+                return
+            archivo_original, usuario_id, ruta = tarea
+            try:
+                if not os.path.exists(ruta):
+                    from infrastructure.certificate_service import CertificateService
+                    CertificateService().generar_certificado_falso(archivo_original, usuario_id)
+                self._registrar_acceso(ruta, None)
+                self._expulsar()
+            except Exception as e:
+                logging.error(f"Error generando variante cifrada {ruta}: {str(e)}")
+            finally:
+                with self._lock:
+                    self._pendientes.discard(ruta)
+
+    def _cargar_accesos(self) -> Dict[str, float]:
+        if self._accesos is None:
+            accesos = {}
+            if os.path.isdir(self.directorio):
+                for entrada in os.scandir(self.directorio):
+                    if SUFIJO_VARIANTE in entrada.name and entrada.name.endswith(".pdf"):
+                        accesos[entrada.path] = entrada.stat().st_atime
+            self._accesos = accesos
+        return self._accesos
+
+    def _registrar_acceso(self, ruta: str, mtime: Optional[float]):
+        ahora = time.time()
+        with self._lock:
+            accesos = self._cargar_accesos()
+            anterior = accesos.get(ruta, 0)
+            accesos[ruta] = ahora
+        if mtime is not None and ahora - anterior > INTERVALO_REGISTRO_ACCESO:
+            try:
+                # Persistir el acceso para los demás procesos y reinicios (mtime intacto)
+                os.utime(ruta, (ahora, mtime))
+            except OSError:
+                pass
+
+    def _expulsar(self):
+        with self._lock:
+            accesos = self._cargar_accesos()
+            sobrantes = len(accesos) - self.maximo
+            if sobrantes <= 0:
+                return
+            expulsadas = sorted(accesos, key=accesos.get)[:sobrantes]
+            for ruta in expulsadas:
+                del accesos[ruta]
+        for ruta in expulsadas:
+            try:
+                os.remove(ruta)
+            except FileNotFoundError:
+                pass
+        logging.info(f"Se eliminaron {len(expulsadas)} variantes cifradas de certificados (límite {self.maximo})")
+
+
+generador_variantes = GeneradorVariantes()
@@ -0,0 +1,124 @@
+"""
+Contadores de versión por tabla para validar cachés HTTP (ETag) sin consultar
+la base de datos.
+
+Cada escritura confirmada (INSERT / UPDATE / DELETE) sobre una tabla incrementa
+su contador:
+  - en este proceso, mediante eventos del engine de SQLAlchemy que detectan las
+    tablas afectadas por las sentencias de los repositorios (también las
+    escrituras dentro de un WITH y las tablas que cambian por ON DELETE CASCADE).
+    Una escritura cuyo destino no se reconoce invalida todos los contadores.
+    Las tablas escritas por triggers solo se detectan con el NOTIFY
+  - en el resto de workers y ante cambios hechos fuera de la API, mediante el
+    NOTIFY 'tablas_cambio' que emiten los triggers de create_tablas_notify.sql
+"""
+
+import re
+import threading
+import uuid
+from typing import Dict, Iterable, Set, Tuple
+
+from sqlalchemy import event
+
+from infrastructure.pg_listener import PgListener
+
+CANAL_NOTIFY = "tablas_cambio"
+
+_IDENTIFICADOR = r'(?:"[^"]+"|[A-Za-z_][A-Za-z0-9_$]*)'
+# Destino de cada escritura de la sentencia, también dentro de un WITH
+# (WITH x AS (UPDATE ...) INSERT INTO ...), con esquema y comillas opcionales.
+# El grupo 1 es la palabra anterior: "FOR UPDATE", "DO UPDATE", "ON DELETE"... no son escrituras
+_ESCRITURA_RE = re.compile(
+    rf"(\w+\s+)?\b(?:INSERT\s+INTO|UPDATE|DELETE\s+FROM|MERGE\s+INTO|TRUNCATE(?:\s+TABLE)?)"
+    rf"\s+(?:ONLY\s+)?((?:{_IDENTIFICADOR}\s*\.\s*)?{_IDENTIFICADOR})",
+    re.IGNORECASE,
+)
+_NO_ESCRITURA = {"for", "key", "do", "on", "or", "before", "after"}
+_ES_ESCRITURA_RE = re.compile(r"^\s*(?:INSERT|UPDATE|DELETE|MERGE|TRUNCATE)\b", re.IGNORECASE)
+
+# Tablas que cambian sin aparecer en la sentencia (ON DELETE CASCADE / SET NULL)
+_ESCRITURAS_DERIVADAS = {
+    "compras": ("movimiento_financiero",),
+    "eventos": ("evento_cupos",),
+    "accion": ("webhook_inbox",),
+}
+# Marca de "no se pudo determinar la tabla": al confirmar se invalida todo
+TODAS = "*"
+
+
+def tablas_escritas(statement: str) -> Set[str]:
+    """Tablas que escribe la sentencia; {TODAS} si es una escritura sin destino reconocible"""
+    tablas = set()
+    for anterior, tabla in _ESCRITURA_RE.findall(statement):
+        if anterior.strip().lower() in _NO_ESCRITURA:
+            continue
+        # Sin esquema ni comillas: el mismo nombre que TG_TABLE_NAME en el NOTIFY
+        tabla = tabla.split(".")[-1].strip()
+        tabla = tabla[1:-1] if tabla.startswith('"') else tabla.lower()
+        tablas.add(tabla)
+        tablas.update(_ESCRITURAS_DERIVADAS.get(tabla, ()))
+    if not tablas and _ES_ESCRITURA_RE.match(statement):
+        return {TODAS}
+    return tablas
+
+
+class VersionTablas:
+    def __init__(self):
+        self._lock = threading.Lock()
+        self._versiones: Dict[str, int] = {}
+        # Distingue este proceso: tras un reinicio los contadores vuelven a
+        # cero y los ETag anteriores no deben seguir siendo válidos
+        self._epoca = uuid.uuid4().hex[:8]
+        self._listener = PgListener(CANAL_NOTIFY, self._on_notify, self.incrementar_todas)
+
+    @property
+    def epoca(self) -> str:
+        return self._epoca
+
+    def incrementar(self, *tablas: str):
+        with self._lock:
+            for tabla in tablas:
+                self._versiones[tabla] = self._versiones.get(tabla, 0) + 1
+
+    def incrementar_todas(self):
+        """Invalida todo (por ejemplo, si se perdió la conexión del listener)"""
+        with self._lock:
+            self._epoca = uuid.uuid4().hex[:8]
+            self._versiones.clear()
+
+    def version(self, tablas: Iterable[str]) -> Tuple[int, ...]:
+        return tuple(self._versiones.get(tabla, 0) for tabla in tablas)
+
+    def _on_notify(self, tabla: str):
+        if tabla:
+            self.incrementar(tabla)
+
+    def registrar_eventos(self, engine):
+        """Detecta en el engine las tablas escritas y las incrementa al confirmar"""
+
+        @event.listens_for(engine, "before_cursor_execute")
+        def _detectar_escritura(conn, cursor, statement, parameters, context, executemany):
+            tablas = tablas_escritas(statement)
+            if tablas:
+                conn.info.setdefault("tablas_escritas", set()).update(tablas)
+
+        @event.listens_for(engine, "commit")
+        def _confirmar(conn):
+            tablas = conn.info.pop("tablas_escritas", None)
+            if tablas and TODAS in tablas:
+                self.incrementar_todas()
+            elif tablas:
+                self.incrementar(*tablas)
+
+        @event.listens_for(engine, "rollback")
+        def _descartar(conn):
+            conn.info.pop("tablas_escritas", None)
+
+    def iniciar_listener(self):
+        self._listener.iniciar()
+
+    def detener_listener(self):
+        self._listener.detener()
+
+
+version_tablas = VersionTablas()
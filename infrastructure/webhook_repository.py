@@ -0,0 +1,223 @@
+from sqlalchemy.orm import Session
+from sqlalchemy import text
+from sqlalchemy.exc import IntegrityError
+from config import SessionLocal, WEBHOOK_MAX_INTENTOS
+from infrastructure.accion_repository import (AccionRepository, insertar_accion, referencia_duplicada,
+                                              get_accion_por_referencia)
+from contextlib import contextmanager
+from typing import Optional
+import json
+import logging
+
+# Un evento en 'procesando' más tiempo que esto se considera abandonado
+# (worker caído a mitad de proceso) y vuelve a reclamarse
+MINUTOS_PROCESO_ABANDONADO = 15
+
+
+class WebhookRepository:
+    def registrar_evento(self, proveedor: str, id_evento: str, tipo_evento: Optional[str], payload: dict) -> bool:
+        """Guarda el evento en la bandeja; devuelve False si ya estaba registrado"""
+        return self.registrar_eventos([(proveedor, id_evento, tipo_evento, payload)]) == 1
+
+    def registrar_eventos(self, eventos) -> int:
+        """
+        Registra varios eventos (proveedor, id_evento, tipo_evento, payload) en una
+        sola transacción; devuelve cuántos eran nuevos
+        """
+        if not eventos:
+            return 0
+        db: Session = SessionLocal()
+        try:
+            nuevos = 0
+            for proveedor, id_evento, tipo_evento, payload in eventos:
+                result = db.execute(text('''
+                    INSERT INTO webhook_inbox (proveedor, id_evento_proveedor, tipo_evento, payload)
+                    VALUES (:proveedor, :id_evento, :tipo_evento, CAST(:payload AS JSONB))
+                    ON CONFLICT (proveedor, id_evento_proveedor) DO NOTHING
+                    RETURNING id_webhook
+                '''), {
+                    "proveedor": proveedor,
+                    "id_evento": id_evento,
+                    "tipo_evento": tipo_evento,
+                    "payload": json.dumps(payload, default=str),
+                })
+                nuevos += result.fetchone() is not None
+            db.commit()
+            return nuevos
+        except Exception as e:
+            logging.error(f"Error en registrar_eventos: {str(e)}")
+            db.rollback()
+            raise Exception(f"Error al registrar eventos de webhook: {str(e)}")
+        finally:
+            db.close()
+
+    def reclamar_evento(self) -> Optional[dict]:
+        """
+        Toma el siguiente evento listo para procesar y lo marca 'procesando'.
+        SKIP LOCKED permite que varios workers (o procesos) reclamen en paralelo
+        sin tomar el mismo evento.
+        """
+        db: Session = SessionLocal()
+        try:
+            row = db.execute(text(f'''
+                UPDATE webhook_inbox
+                SET estado = 'procesando', intentos = intentos + 1, fecha_inicio_proceso = NOW()
+                WHERE id_webhook = (
+                    SELECT id_webhook FROM webhook_inbox
+                    WHERE (estado = 'pendiente' AND proximo_intento <= NOW())
+                       OR (estado = 'procesando'
+                           AND fecha_inicio_proceso < NOW() - INTERVAL '{MINUTOS_PROCESO_ABANDONADO} minutes')
+                    ORDER BY proximo_intento
+                    FOR UPDATE SKIP LOCKED
+                    LIMIT 1
+                )
+                RETURNING id_webhook, proveedor, id_evento_proveedor, tipo_evento, payload, intentos
+            ''')).fetchone()
+            db.commit()
+            if not row:
+                return None
+            return {
+                "id_webhook": row[0],
+                "proveedor": row[1],
+                "id_evento": row[2],
+                "tipo_evento": row[3],
+                "payload": row[4] if isinstance(row[4], dict) else json.loads(row[4]),
+                "intentos": row[5],
+            }
+        except Exception as e:
+            logging.error(f"Error en reclamar_evento: {str(e)}")
+            db.rollback()
+            raise Exception(f"Error al reclamar evento de webhook: {str(e)}")
+        finally:
+            db.close()
+
+    def marcar_procesado(self, id_webhook: int, resultado: dict):
+        db: Session = SessionLocal()
+        try:
+            db.execute(text('''
+                UPDATE webhook_inbox
+                SET estado = 'procesado', fecha_procesado = NOW(), ultimo_error = NULL,
+                    resultado = CAST(:resultado AS JSONB)
+                WHERE id_webhook = :id_webhook
+            '''), {"id_webhook": id_webhook, "resultado": json.dumps(resultado, default=str)})
+            db.commit()
+        except Exception as e:
+            logging.error(f"Error en marcar_procesado: {str(e)}")
+            db.rollback()
+            raise Exception(f"Error al marcar evento procesado: {str(e)}")
+        finally:
+            db.close()
+
+    def marcar_fallido(self, id_webhook: int, intentos: int, error: str, espera_segundos: float):
+        """Programa un reintento o, agotados los intentos, deja el evento en 'error'"""
+        db: Session = SessionLocal()
+        try:
+            estado = "error" if intentos >= WEBHOOK_MAX_INTENTOS else "pendiente"
+            db.execute(text('''
+                UPDATE webhook_inbox
+                SET estado = :estado, ultimo_error = :error,
+                    proximo_intento = NOW() + make_interval(secs => :espera)
+                WHERE id_webhook = :id_webhook
+            '''), {"id_webhook": id_webhook, "estado": estado, "error": error[:2000], "espera": espera_segundos})
+            db.commit()
+            return estado
+        except Exception as e:
+            logging.error(f"Error en marcar_fallido: {str(e)}")
+            db.rollback()
+            raise Exception(f"Error al marcar evento fallido: {str(e)}")
+        finally:
+            db.close()
+
+    def get_accion_de_pago(self, proveedor: str, referencia_pago: str) -> Optional[int]:
+        """
+        Acción ya creada para este pago por un evento anterior o por el
+        endpoint de confirmación de la pasarela (pago_accion.referencia_pasarela)
+        """
+        db: Session = SessionLocal()
+        try:
+            row = db.execute(text('''
+                SELECT id_accion FROM webhook_inbox
+                WHERE proveedor = :proveedor AND referencia_pago = :referencia_pago AND id_accion IS NOT NULL
+                LIMIT 1
+            '''), {"proveedor": proveedor, "referencia_pago": referencia_pago}).fetchone()
+            if row:
+                return row[0]
+            return get_accion_por_referencia(db, f"{proveedor}:{referencia_pago}")
+        finally:
+            db.close()
+
+    def registrar_accion(self, id_webhook: int, referencia_pago: str, id_accion: int):
+        """Punto de control: la acción del pago ya existe (los reintentos no la recrean)"""
+        db: Session = SessionLocal()
+        try:
+            db.execute(text('''
+                UPDATE webhook_inbox SET referencia_pago = :referencia_pago, id_accion = :id_accion
+                WHERE id_webhook = :id_webhook
+            '''), {"id_webhook": id_webhook, "referencia_pago": referencia_pago, "id_accion": id_accion})
+            db.commit()
+        except Exception as e:
+            logging.error(f"Error en registrar_accion: {str(e)}")
+            db.rollback()
+            raise Exception(f"Error al registrar acción del webhook: {str(e)}")
+        finally:
+            db.close()
+
+    def crear_accion_de_pago(self, id_webhook: int, proveedor: str, referencia_pago: str, data):
+        """
+        Crea la acción del pago y la registra en el evento en la misma
+        transacción: si algo falla no queda una acción sin registrar que un
+        reintento volvería a crear. Si el endpoint de confirmación la creó
+        mientras tanto, se registra y devuelve esa.
+        """
+        db: Session = SessionLocal()
+        try:
+            try:
+                accion = insertar_accion(db, data, f"{proveedor}:{referencia_pago}")
+            except IntegrityError as e:
+                if not referencia_duplicada(e):
+                    raise
+                db.rollback()
+                accion = AccionRepository().get_accion(get_accion_por_referencia(db, f"{proveedor}:{referencia_pago}"))
+            db.execute(text('''
+                UPDATE webhook_inbox SET referencia_pago = :referencia_pago, id_accion = :id_accion
+                WHERE id_webhook = :id_webhook
+            '''), {"id_webhook": id_webhook, "referencia_pago": referencia_pago, "id_accion": accion.id_accion})
+            db.commit()
+            return accion
+        except Exception as e:
+            logging.error(f"Error en crear_accion_de_pago: {str(e)}")
+            db.rollback()
+            raise Exception(f"Error al crear acción del webhook: {str(e)}")
+        finally:
+            db.close()
+
+    @contextmanager
+    def bloqueo_pago(self, proveedor: str, referencia_pago: str):
+        """
+        Serializa el proceso de un mismo pago entre workers y procesos
+        (advisory lock de PostgreSQL, se libera al salir)
+        """
+        db: Session = SessionLocal()
+        clave = f"webhook:{proveedor}:{referencia_pago}"
+        try:
+            db.execute(text("SELECT pg_advisory_lock(hashtext(:clave))"), {"clave": clave})
+            yield
+        finally:
+            try:
+                db.execute(text("SELECT pg_advisory_unlock(hashtext(:clave))"), {"clave": clave})
+            finally:
+                db.close()
+
+    def resumen(self) -> dict:
+        db: Session = SessionLocal()
+        try:
+            result = db.execute(text('''
+                SELECT estado, COUNT(*), MIN(fecha_recepcion)
+                FROM webhook_inbox GROUP BY estado
+            ''')).fetchall()
+            return {
+                row[0]: {"cantidad": row[1], "mas_antiguo": str(row[2]) if row[2] else None}
+                for row in result
+            }
+        finally:
+            db.close()
@@ -0,0 +1,93 @@
+"""
+Pool de workers que procesa la bandeja de webhooks (tabla webhook_inbox).
+
+Los endpoints de webhook solo registran el evento y llaman a `avisar()`; el
+trabajo pesado (crear la acción, generar y cifrar el certificado) se hace aquí,
+fuera de la petición de la pasarela. Si el manejador falla, el evento se
+reprograma con backoff exponencial hasta WEBHOOK_MAX_INTENTOS.
+
+Además del aviso local, cada worker revisa la bandeja periódicamente, de modo
+que retoma reintentos vencidos y eventos recibidos por otros procesos.
+"""
+
+import logging
+import random
+import threading
+from typing import Callable, List, Optional
+
+from config import WEBHOOK_HILOS, WEBHOOK_BACKOFF_SEGUNDOS, WEBHOOK_BACKOFF_MAXIMO_SEGUNDOS
+from infrastructure.webhook_repository import WebhookRepository
+
+INTERVALO_REVISION = 5  # segundos entre revisiones de la bandeja sin avisos
+
+
+def calcular_espera(intentos: int) -> float:
+    """Backoff exponencial con jitter: base * 2^(intentos-1), acotado"""
+    espera = min(WEBHOOK_BACKOFF_SEGUNDOS * (2 ** max(intentos - 1, 0)), WEBHOOK_BACKOFF_MAXIMO_SEGUNDOS)
+    return espera * random.uniform(0.8, 1.2)
+
+
+class ProcesadorWebhooks:
+    def __init__(self, hilos: int = WEBHOOK_HILOS):
+        self.hilos = hilos
+        self.repository = WebhookRepository()
+        self._manejador: Optional[Callable[[dict], dict]] = None
+        self._hilos: List[threading.Thread] = []
+        self._aviso = threading.Event()
+        self._detener = threading.Event()
+
+    def iniciar(self, manejador: Callable[[dict], dict]):
+        """`manejador(evento) -> resultado` procesa un evento; si lanza, se reintenta"""
+        if self._hilos:
+            return
+        self._manejador = manejador
+        self._detener.clear()
+        for i in range(self.hilos):
+            hilo = threading.Thread(target=self._trabajar, name=f"webhook-worker-{i}", daemon=True)
+            hilo.start()
+            self._hilos.append(hilo)
+
+    def detener(self):
+        self._detener.set()
+        self._aviso.set()
+        for hilo in self._hilos:
+            hilo.join(timeout=10)
+        self._hilos = []
+
+    def avisar(self):
+        """Despierta a los workers (hay un evento nuevo en la bandeja)"""
+        self._aviso.set()
+
+    def _trabajar(self):
+        while not self._detener.is_set():
+            try:
+                procesado = self._procesar_siguiente()
+            except Exception as e:
+                logging.error(f"Error en worker de webhooks: {str(e)}")
+                procesado = False
+            if not procesado:
+                # Bandeja vacía (o BD no disponible): esperar aviso o revisión periódica
+                self._aviso.wait(INTERVALO_REVISION)
+                self._aviso.clear()
+
+    def _procesar_siguiente(self) -> bool:
+        evento = self.repository.reclamar_evento()
+        if not evento:
+            return False
+        try:
+            resultado = self._manejador(evento)
+            self.repository.marcar_procesado(evento["id_webhook"], resultado or {})
+            logging.info(f"Webhook {evento['proveedor']} {evento['id_evento']} procesado")
+        except Exception as e:
+            espera = calcular_espera(evento["intentos"])
+            estado = self.repository.marcar_fallido(evento["id_webhook"], evento["intentos"], str(e), espera)
+            if estado == "error":
+                logging.error(f"Webhook {evento['proveedor']} {evento['id_evento']} descartado tras "
+                              f"{evento['intentos']} intentos: {str(e)}")
+            else:
+                logging.warning(f"Webhook {evento['proveedor']} {evento['id_evento']} falló "
+                                f"(intento {evento['intentos']}), reintento en {espera:.0f}s: {str(e)}")
+        return True
+
+
+procesador_webhooks = ProcesadorWebhooks()
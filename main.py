@@ -1,4 +1,7 @@
-from fastapi import FastAPI
+import hmac
+
+from fastapi import FastAPI, Request, HTTPException
+from fastapi.responses import PlainTextResponse
 from fastapi.middleware.cors import CORSMiddleware
 from routers import login
 from routers import usuarios
@@ -21,13 +24,47 @@ from routers import facturacion
 from routers import logs
 from routers import catalogos
 from routers import socio_profile
+from infrastructure.catalogo_cache import catalogo_cache
+from infrastructure.version_tablas import version_tablas
+from infrastructure.http_cache import CacheHTTPMiddleware
+from config import (engine, PRECARGAR_DEPENDENCIAS, CONCILIACION_INTERVALO_MINUTOS, LOGS_MANTENIMIENTO_HORAS, METRICAS_TOKEN,
+                    BI_ETL_INTERVALO_MINUTOS, INVENTARIO_VALORACION_HORAS)
+from infrastructure.carga_perezosa import precargar_en_segundo_plano
+from infrastructure.json_response import ORJSONResponse
+from infrastructure.webhook_repository import WebhookRepository
+from infrastructure.webhook_worker import procesador_webhooks
+from infrastructure.variantes_certificado import generador_variantes
+from infrastructure.comprobantes import procesador_comprobantes
+from infrastructure.auditoria import AuditoriaMiddleware, cola_auditoria
+from infrastructure.metricas import MetricasMiddleware, registro_metricas, registrar_eventos as registrar_metricas_sql
+from use_cases.webhook import WebhookUseCase
+from infrastructure.tarea_periodica import TareaPeriodica
+from infrastructure.conciliacion_repository import ConciliacionRepository
+from infrastructure.pago_repository import PagoRepository
+from use_cases.conciliacion import ConciliacionUseCase
+from infrastructure.log_repository import LogRepository
+from use_cases.retencion_logs import RetencionLogsUseCase
+from infrastructure.etl_bi_repository import EtlBiRepository
+from use_cases.etl_bi import EtlBiUseCase
+from infrastructure.inventario_repository import InventarioRepository
+from use_cases.inventario import InventarioUseCase
+import logging
 
 app = FastAPI(
     title="CEAS ERP API",
     description="API para el sistema ERP del Club de Emprendedores y Accionistas",
-    version="1.0.0"
+    version="1.0.0",
+    default_response_class=ORJSONResponse
 )
 
+# Caché HTTP (ETag / If-None-Match) para los GET de lectura. Se registra antes
+# que CORS para que las respuestas 304 también lleven las cabeceras CORS
+version_tablas.registrar_eventos(engine)
+app.add_middleware(CacheHTTPMiddleware)
+
+# Auditoría automática de escrituras (se encola; la escribe un hilo en lotes)
+app.add_middleware(AuditoriaMiddleware)
+
 # Configuración de CORS - Para desarrollo, permitir cualquier origen local
 app.add_middleware(
     CORSMiddleware,
@@ -47,9 +84,30 @@ app.add_middleware(
         "Access-Control-Allow-Origin",
         "Access-Control-Allow-Headers",
         "Access-Control-Allow-Methods",
+        "If-None-Match",
+        "If-Modified-Since",
+        "Range",
+        "If-Range",
     ],
+    expose_headers=["ETag", "Last-Modified", "Accept-Ranges", "Content-Range", "Content-Length", "Content-Disposition",
+                    "Server-Timing"],
 )
 
+# Métricas por petición (latencia, sentencias SQL, tiempo en BD) y cabecera
+# Server-Timing. Se registra al final para que sea el middleware más externo
+registrar_metricas_sql(engine)
+app.add_middleware(MetricasMiddleware)
+
+
+@app.get("/metrics", include_in_schema=False)
+def metricas(request: Request):
+    """Métricas en formato de texto de Prometheus"""
+    if METRICAS_TOKEN:
+        autorizacion = request.headers.get("authorization", "")
+        if not hmac.compare_digest(autorizacion.encode(), f"Bearer {METRICAS_TOKEN}".encode()):
+            raise HTTPException(status_code=401, detail="Token de métricas inválido")
+    return PlainTextResponse(registro_metricas.exportar_prometheus(), media_type="text/plain; version=0.0.4")
+
 app.include_router(login.router)
 app.include_router(usuarios.router)
 app.include_router(socios.router)
@@ -72,4 +130,72 @@ app.include_router(logs.router)
 app.include_router(catalogos.router)
 app.include_router(socio_profile.router)
 
+# Conciliación programada de pagos pendientes con las pasarelas
+tarea_conciliacion = TareaPeriodica(
+    "conciliacion-pagos",
+    lambda: ConciliacionUseCase(ConciliacionRepository(), PagoRepository(), WebhookRepository()).ejecutar(),
+    CONCILIACION_INTERVALO_MINUTOS * 60,
+)
+
+# Particiones de logs_sistema: crea las próximas y archiva las que superan la retención
+tarea_logs = TareaPeriodica(
+    "mantenimiento-logs",
+    lambda: RetencionLogsUseCase(LogRepository()).ejecutar(),
+    LOGS_MANTENIMIENTO_HORAS * 3600,
+)
+
+# ETL incremental de las tablas consolidadas de BI (solo las filas afectadas desde la última ejecución)
+tarea_etl_bi = TareaPeriodica(
+    "etl-bi",
+    lambda: EtlBiUseCase(EtlBiRepository()).ejecutar(),
+    BI_ETL_INTERVALO_MINUTOS * 60,
+)
+
+# Valoración diaria del stock (la lee el reporte contable)
+tarea_valoracion_inventario = TareaPeriodica(
+    "valoracion-inventario",
+    lambda: InventarioUseCase(InventarioRepository()).valorar_dia_anterior(),
+    INVENTARIO_VALORACION_HORAS * 3600,
+)
+
+@app.on_event("startup")
+def iniciar_servicios():
+    # Los catálogos se sirven desde memoria; si la BD no responde al iniciar
+    # se cargan en el primer acceso
+    try:
+        catalogo_cache.cargar()
+    except Exception as e:
+        logging.error(f"Error al precargar catálogos: {str(e)}")
+    catalogo_cache.iniciar_listener()
+    version_tablas.iniciar_listener()
+    procesador_webhooks.iniciar(WebhookUseCase(WebhookRepository()).procesar_evento)
+    cola_auditoria.iniciar()
+    if CONCILIACION_INTERVALO_MINUTOS:
+        tarea_conciliacion.iniciar()
+    if LOGS_MANTENIMIENTO_HORAS:
+        tarea_logs.iniciar()
+    if BI_ETL_INTERVALO_MINUTOS:
+        tarea_etl_bi.iniciar()
+    if INVENTARIO_VALORACION_HORAS:
+        tarea_valoracion_inventario.iniciar()
+    # Comprobantes recibidos que quedaron sin convertir en la ejecución anterior
+    procesador_comprobantes.reanudar()
+    # Warm-up opcional de reportes y pasarelas; por defecto se cargan en el primer uso
+    if PRECARGAR_DEPENDENCIAS:
+        precargar_en_segundo_plano()
+
+@app.on_event("shutdown")
+def detener_servicios():
+    catalogo_cache.detener_listener()
+    version_tablas.detener_listener()
+    procesador_webhooks.detener()
+    tarea_conciliacion.detener()
+    tarea_logs.detener()
+    tarea_etl_bi.detener()
+    tarea_valoracion_inventario.detener()
+    generador_variantes.detener()
+    procesador_comprobantes.detener()
+    # Al final, para que quede auditado lo que hayan hecho los demás servicios
+    cola_auditoria.detener()
+
 # Aquí se incluirán los routers de la arquitectura limpia 
\ No newline at end of file
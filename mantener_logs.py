@@ -0,0 +1,34 @@
+#!/usr/bin/env python3
+"""
+Mantenimiento de logs_sistema: crea las particiones mensuales próximas y archiva
+(exporta a .csv.gz y elimina) las que superan LOGS_RETENCION_MESES.
+
+Alternativa al job programado de la API (LOGS_MANTENIMIENTO_HORAS = 0),
+por ejemplo desde cron:
+    30 3 * * * cd /ruta/al/backend && python mantener_logs.py
+"""
+
+import logging
+
+from infrastructure.log_repository import LogRepository
+from use_cases.retencion_logs import RetencionLogsUseCase
+
+
+def main():
+    logging.basicConfig(level=logging.INFO)
+    resultado = RetencionLogsUseCase(LogRepository()).ejecutar()
+
+    if resultado.get("estado") == "omitido":
+        print(f"⏭️ {resultado['motivo']}")
+        return
+
+    print(f"📅 Particiones aseguradas: {', '.join(resultado['particiones_aseguradas'])}")
+    for archivada in resultado["archivadas"]:
+        print(f"📦 {archivada['particion']}: {archivada['filas']} filas -> {archivada['archivo']}")
+    if resultado["filas_en_default"]:
+        print(f"⚠️ {resultado['filas_en_default']} filas en logs_sistema_default")
+    print("✅ Mantenimiento de logs completado")
+
+
+if __name__ == "__main__":
+    main()
@@ -1,20 +1,31 @@
 from fastapi import APIRouter, Depends, HTTPException, UploadFile, File, Request
-from fastapi.responses import Response, FileResponse, StreamingResponse
+from fastapi.responses import Response, StreamingResponse
 from schemas.accion import AccionRequest, AccionResponse, AccionUpdateRequest, AccionResponseCompleta, DescifrarCertificadoRequest, StripePaymentRequest, StripePaymentResponse, StripeWebhookResponse, MercadoPagoPaymentRequest, MercadoPagoPaymentResponse, MercadoPagoWebhookResponse, PayPalPaymentRequest, PayPalPaymentResponse, PayPalExecuteRequest, SimularPagoRequest
 from use_cases.accion import AccionUseCase
 from infrastructure.accion_repository import AccionRepository
-from infrastructure.qr_service import QRService
-from infrastructure.certificate_service import CertificateService
 from infrastructure.temp_payment_service import TempPaymentService
-from infrastructure.stripe_service import StripeService
-from infrastructure.mercadopago_service import MercadoPagoService
-from infrastructure.paypal_service import PayPalService
 from infrastructure.socio_repository import SocioRepository
-from infrastructure.reporte_acciones_service import ReporteAccionesService
+from infrastructure.json_response import ORJSONResponse
+from infrastructure.webhook_repository import WebhookRepository
+from infrastructure.webhook_worker import procesador_webhooks
+from infrastructure.clientes_http import FirmaWebhookInvalida
+from use_cases.webhook import WebhookUseCase
+from use_cases.conciliacion import ConciliacionUseCase
+from infrastructure.conciliacion_repository import ConciliacionRepository
+from infrastructure.pago_repository import PagoRepository
+from infrastructure.qr_engine import motor_qr, es_nombre_qr
+from infrastructure.servir_archivos import servir_archivo, cache_acceso
+from infrastructure.variantes_certificado import generador_variantes, PDF_EN_PREPARACION
+from infrastructure.comprobantes import (ReceptorComprobante, ComprobanteRecibido, ComprobanteInvalido,
+                                         ComprobanteDemasiadoGrande, procesador_comprobantes, tipo_contenido,
+                                         TAMANO_MAXIMO as TAMANO_MAXIMO_COMPROBANTE,
+                                         TAMANO_BLOQUE as TAMANO_BLOQUE_COMPROBANTE)
+from fastapi.concurrency import run_in_threadpool
 from fastapi.security import OAuth2PasswordBearer
 from typing import List
 import jwt
-from config import SECRET_KEY, ALGORITHM
+from config import SECRET_KEY, ALGORITHM, QR_CACHE_SEGUNDOS
+from infrastructure.carga_perezosa import clase_perezosa
 import base64
 import json
 import os
@@ -24,6 +35,14 @@ from io import BytesIO
 
 router = APIRouter(prefix="/acciones", tags=["acciones"])
 
+# Servicios con dependencias pesadas (reportlab, matplotlib, qrcode, SDKs de pago): se importan en el primer uso
+QRService = clase_perezosa("infrastructure.qr_service", "QRService")
+CertificateService = clase_perezosa("infrastructure.certificate_service", "CertificateService")
+StripeService = clase_perezosa("infrastructure.stripe_service", "StripeService")
+MercadoPagoService = clase_perezosa("infrastructure.mercadopago_service", "MercadoPagoService")
+PayPalService = clase_perezosa("infrastructure.paypal_service", "PayPalService")
+ReporteAccionesService = clase_perezosa("infrastructure.reporte_acciones_service", "ReporteAccionesService")
+
 oauth2_scheme = OAuth2PasswordBearer(tokenUrl="/login")
 
 def get_current_user(token: str = Depends(oauth2_scheme)):
@@ -37,10 +56,50 @@ def es_admin(current_user: dict) -> bool:
     """Verifica si el usuario es administrador"""
     return current_user.get("rol") == 1  # Rol 1 = administrador
 
+def _acceso_archivos(accion_id: int, current_user: dict):
+    """Datos de autorización para los archivos de una acción (una consulta, cacheada)"""
+    usuario_id = current_user.get("id_usuario")
+    return cache_acceso.obtener(
+        ("accion", accion_id, usuario_id),
+        lambda: AccionRepository().get_acceso_archivos(accion_id, usuario_id)
+    )
+
+def _certificado_de_pago(accion_repository: AccionRepository, certificate_service, accion) -> dict:
+    """
+    Certificado de una acción pagada por pasarela. Si el webhook ya creó la
+    acción del pago y emitió su certificado, se devuelve ese en lugar de otro
+    """
+    if accion.certificado_pdf:
+        return {"certificado_original": accion.certificado_pdf, "fecha_generacion": accion.fecha_emision_certificado}
+
+    socio = SocioRepository().get_socio(accion.id_socio)
+    socio_titular_nombre = f"{socio.nombres} {socio.apellidos}" if socio else f"Socio {accion.id_socio}"
+    certificado_data = {
+        'id_accion': accion.id_accion,
+        'id_socio': accion.id_socio,
+        'tipo_accion': accion.tipo_accion,
+        'cantidad_acciones': accion.cantidad_acciones,
+        'precio_unitario': accion.precio_unitario,
+        'total_pago': accion.total_pago,
+        'metodo_pago': accion.metodo_pago,
+        'socio_titular': socio_titular_nombre,
+        'modalidad_pago_info': f"Modalidad {accion.modalidad_pago}"
+    }
+
+    # Generar certificado completo (original + cifrado)
+    certificado_info = certificate_service.generar_certificado_completo(certificado_data, accion.id_socio)
+    accion_repository.update_accion(accion.id_accion, {
+        "certificado_pdf": certificado_info["certificado_original"],
+        "certificado_cifrado": True,
+        "fecha_emision_certificado": datetime.now().isoformat()
+    })
+    return certificado_info
+
 @router.get("/", response_model=List[AccionResponseCompleta])
 def list_acciones(current_user=Depends(get_current_user)):
     use_case = AccionUseCase(AccionRepository())
-    return use_case.list_acciones()
+    # Los payloads ya vienen construidos: se serializan sin revalidar el response_model
+    return ORJSONResponse(content=use_case.list_acciones())
 
 @router.post("/", response_model=AccionResponse)
 def create_accion(request: AccionRequest, current_user=Depends(get_current_user)):
@@ -176,7 +235,7 @@ def get_pagos(accion_id: int, current_user=Depends(get_current_user)):
 @router.get("/estado-pagos-resumen")
 def list_acciones_con_estado_pagos(current_user=Depends(get_current_user)):
     use_case = AccionUseCase(AccionRepository())
-    return use_case.list_acciones_con_estado_pagos()
+    return ORJSONResponse(content=use_case.list_acciones_con_estado_pagos())
 
 @router.get("/{accion_id}/estado-pagos")
 def get_estado_pagos(accion_id: int, current_user=Depends(get_current_user)):
@@ -227,52 +286,98 @@ def generar_qr_pago(accion_id: int, current_user=Depends(get_current_user)):
     except Exception as e:
         raise HTTPException(status_code=500, detail=f"Error generando QR: {str(e)}")
 
+def _verificar_admite_comprobante(accion_id: int):
+    accion = AccionRepository().get_accion(accion_id)
+    if not accion:
+        raise HTTPException(status_code=404, detail="Acción no encontrada")
+    if accion.estado_accion not in [1, 2]:  # Solo si está pendiente o ya tiene comprobante
+        raise HTTPException(status_code=400, detail="No se puede subir comprobante para esta acción")
+
+def _registrar_comprobante(recibido: ComprobanteRecibido) -> dict:
+    """Deja la acción pendiente de confirmación y encola la conversión del archivo"""
+    repetidas = AccionRepository().registrar_comprobante(recibido.id_accion, recibido.ruta, recibido.sha256)
+    if repetidas is None:
+        os.remove(recibido.ruta)
+        raise HTTPException(status_code=400, detail="No se puede subir comprobante para esta acción")
+    procesador_comprobantes.encolar(recibido)
+    return {
+        "mensaje": "Comprobante recibido exitosamente",
+        "estado": "Pendiente confirmación",
+        "tiempo_estimado": "24-48 horas",
+        "archivo": os.path.basename(recibido.ruta),
+        "tipo": recibido.tipo,
+        "tamano_bytes": recibido.tamano,
+        "sha256": recibido.sha256,
+        # El mismo archivo ya se presentó como comprobante de otra acción
+        "comprobante_repetido": bool(repetidas)
+    }
+
+def _error_comprobante(e: Exception) -> HTTPException:
+    if isinstance(e, ComprobanteDemasiadoGrande):
+        return HTTPException(status_code=413, detail=str(e))
+    return HTTPException(status_code=415, detail=str(e))
+
 @router.post("/{accion_id}/subir-comprobante")
 def subir_comprobante(accion_id: int, comprobante: UploadFile = File(...), current_user=Depends(get_current_user)):
     """
-    Usuario sube comprobante de transferencia
+    Usuario sube comprobante de transferencia (PDF o imagen JPG, PNG o WebP).
+    Las imágenes se reducen y convierten a WebP en segundo plano.
     """
     try:
-        # Verificar que la acción existe
-        accion_repository = AccionRepository()
-        accion = accion_repository.get_accion(accion_id)
-        
-        if not accion:
-            raise HTTPException(status_code=404, detail="Acción no encontrada")
-        
-        if accion.estado_accion not in [1, 2]:  # Solo si está pendiente o ya tiene comprobante
-            raise HTTPException(status_code=400, detail="No se puede subir comprobante para esta acción")
-        
-        # Crear directorio de comprobantes si no existe
-        comprobantes_dir = "comprobantes"
-        os.makedirs(comprobantes_dir, exist_ok=True)
+        _verificar_admite_comprobante(accion_id)
         
-        # Generar nombre único para el archivo
-        from datetime import datetime
-        timestamp = datetime.now().strftime("%Y%m%d_%H%M%S")
-        filename = f"comprobante_accion_{accion_id}_{timestamp}.pdf"
-        filepath = os.path.join(comprobantes_dir, filename)
+        receptor = ReceptorComprobante(accion_id)
+        try:
+            receptor.copiar_desde(comprobante.file)
+            recibido = receptor.finalizar()
+        except Exception:
+            receptor.descartar()
+            raise
         
-        # Guardar el archivo
-        with open(filepath, "wb") as f:
-            content = comprobante.file.read()
-            f.write(content)
+        return _registrar_comprobante(recibido)
         
-        # Actualizar acción con comprobante
-        from datetime import datetime
-        accion_repository.update_accion(accion_id, {
-            "estado_accion": 2,  # Pendiente confirmación
-            "comprobante_path": filepath,
-            "fecha_comprobante": datetime.now().isoformat()
-        })
+    except HTTPException:
+        raise
+    except (ComprobanteInvalido, ComprobanteDemasiadoGrande) as e:
+        raise _error_comprobante(e)
+    except Exception as e:
+        raise HTTPException(status_code=500, detail=f"Error subiendo comprobante: {str(e)}")
+
+@router.put("/{accion_id}/comprobante")
+async def subir_comprobante_binario(accion_id: int, request: Request, current_user=Depends(get_current_user)):
+    """
+    Igual que subir-comprobante, con el archivo como cuerpo de la petición (sin
+    multipart): se escribe a disco a medida que llega y se rechaza en cuanto
+    supera COMPROBANTES_TAMANO_MAXIMO_MB, sin esperar a recibirlo completo.
+    """
+    longitud = request.headers.get("content-length")
+    if longitud and longitud.isdigit() and int(longitud) > TAMANO_MAXIMO_COMPROBANTE:
+        raise HTTPException(status_code=413, detail="El comprobante supera el tamaño máximo permitido")
+    
+    try:
+        await run_in_threadpool(_verificar_admite_comprobante, accion_id)
         
-        return {
-            "mensaje": "Comprobante recibido exitosamente",
-            "estado": "Pendiente confirmación",
-            "tiempo_estimado": "24-48 horas",
-            "archivo": filename
-        }
+        receptor = ReceptorComprobante(accion_id)
+        pendiente = bytearray()
+        try:
+            # Se acumula hasta un bloque antes de escribir, fuera del event loop
+            async for bloque in request.stream():
+                pendiente += bloque
+                if len(pendiente) >= TAMANO_BLOQUE_COMPROBANTE:
+                    await run_in_threadpool(receptor.agregar, bytes(pendiente))
+                    pendiente.clear()
+            await run_in_threadpool(receptor.agregar, bytes(pendiente))
+            recibido = await run_in_threadpool(receptor.finalizar)
+        except Exception:
+            receptor.descartar()
+            raise
+        
+        return await run_in_threadpool(_registrar_comprobante, recibido)
         
+    except HTTPException:
+        raise
+    except (ComprobanteInvalido, ComprobanteDemasiadoGrande) as e:
+        raise _error_comprobante(e)
     except Exception as e:
         raise HTTPException(status_code=500, detail=f"Error subiendo comprobante: {str(e)}")
 
@@ -340,61 +445,47 @@ def aprobar_pago_admin(accion_id: int, current_user=Depends(get_current_user)):
         raise HTTPException(status_code=500, detail=f"Error aprobando pago: {str(e)}")
 
 @router.get("/{accion_id}/descargar-certificado")
-def descargar_certificado(accion_id: int, current_user=Depends(get_current_user)):
+def descargar_certificado(accion_id: int, request: Request, current_user=Depends(get_current_user)):
     """
     Descarga certificado - original si es el usuario correcto, cifrado si no
     """
     try:
-        # Obtener la acción
-        accion_repository = AccionRepository()
-        accion = accion_repository.get_accion(accion_id)
+        # Acción y socio del usuario en una sola consulta cacheada
+        acceso = _acceso_archivos(accion_id, current_user)
         
-        if not accion:
+        if not acceso:
             raise HTTPException(status_code=404, detail="Acción no encontrada")
         
-        if accion.estado_accion != 4:  # Solo si está completado
+        if acceso["estado_accion"] != 4:  # Solo si está completado
             raise HTTPException(status_code=400, detail="La acción no está completada")
         
-        if not accion.certificado_pdf:
+        if not acceso["certificado_pdf"]:
             raise HTTPException(status_code=404, detail="Certificado no disponible")
         
         # Verificar si el usuario es el propietario o admin
-        usuario_id = current_user.get("id_usuario")
-        es_admin_user = es_admin(current_user)
-        
-        if accion.id_socio == usuario_id or es_admin_user:
+        if acceso["es_propietario"] or es_admin(current_user):
             # Usuario correcto o admin - descargar original
-            if os.path.exists(accion.certificado_pdf):
-                return FileResponse(
-                    path=accion.certificado_pdf,
-                    filename=f"certificado_accion_{accion_id}_original.pdf",
-                    media_type="application/pdf"
-                )
-            else:
+            try:
+                return servir_archivo(request, acceso["certificado_pdf"],
+                                      f"certificado_accion_{accion_id}_original.pdf")
+            except FileNotFoundError:
                 raise HTTPException(status_code=404, detail="Archivo de certificado no encontrado")
         else:
             # Usuario incorrecto - descargar cifrado
-            certificate_service = CertificateService()
-            certificado_cifrado_path = os.path.join(
-                certificate_service.cifrados_dir,
-                f"certificado_accion_{accion_id}_{accion.id_socio}_*_cifrado_{accion.id_socio}.bin"
-            )
-            
-            # Buscar archivo cifrado
             import glob
-            archivos_cifrados = glob.glob(certificado_cifrado_path)
+            archivos_cifrados = glob.glob(os.path.join(
+                "certificados", "cifrados",
+                f"certificado_accion_{accion_id}_{acceso['id_socio']}_*_cifrado_{acceso['id_socio']}.bin"
+            ))
             
             if not archivos_cifrados:
                 raise HTTPException(status_code=404, detail="Certificado cifrado no encontrado")
             
-            archivo_cifrado = archivos_cifrados[0]
-            
-            return FileResponse(
-                path=archivo_cifrado,
-                filename=f"certificado_accion_{accion_id}_cifrado.bin",
-                media_type="application/octet-stream"
-            )
+            return servir_archivo(request, archivos_cifrados[0], f"certificado_accion_{accion_id}_cifrado.bin",
+                                  media_type="application/octet-stream")
         
+    except HTTPException:
+        raise
     except Exception as e:
         raise HTTPException(status_code=500, detail=f"Error descargando certificado: {str(e)}")
 
@@ -481,27 +572,22 @@ def generar_qr_pago_sin_crear_accion(current_user=Depends(get_current_user)):
         import hashlib
         temp_id = int(hashlib.md5(temp_ref.encode()).hexdigest()[:8], 16) % 1000000
         
+        # El QR se codifica ya con la referencia temporal (una sola imagen, en memoria)
         qr_result = qr_service.generar_qr_transferencia(
             temp_id,  # Usar ID numérico temporal
             payment_data["total_pago"],
-            f"{payment_data['cantidad_acciones']} acciones"
+            f"{payment_data['cantidad_acciones']} acciones",
+            datos_extra={
+                "referencia": temp_ref,
+                "concepto": f"Compra de {payment_data['cantidad_acciones']} acciones - {temp_ref}",
+            }
         )
         
-        # Actualizar QR con referencia temporal
-        qr_result["datos_transferencia"]["referencia"] = temp_ref
-        qr_result["datos_transferencia"]["concepto"] = f"Compra de {payment_data['cantidad_acciones']} acciones - {temp_ref}"
-        
-        # Guardar QR temporal
-        qr_filename = f"temp_{temp_ref}.png"
-        qr_temp_path = f"qr_codes/{qr_filename}"
-        import shutil
-        shutil.copy2(qr_result["qr_image"], qr_temp_path)
-        
         return {
             "qr": {
                 "tipo": qr_result["tipo"],
-                "qr_image": qr_temp_path,
-                "qr_url": f"/acciones/qr/{qr_filename}",
+                "qr_id": qr_result["qr_id"],
+                "qr_url": qr_result["qr_url"],
                 "datos_transferencia": qr_result["datos_transferencia"],
                 "instrucciones": qr_result["instrucciones"]
             },
@@ -675,49 +761,92 @@ def limpiar_pagos_temporales_expirados(current_user=Depends(get_current_user)):
     except Exception as e:
         raise HTTPException(status_code=500, detail=f"Error limpiando pagos temporales: {str(e)}")
 
+@router.get("/webhooks/resumen")
+def get_webhooks_resumen(current_user=Depends(get_current_user)):
+    """
+    Estado de la bandeja de webhooks de pasarelas por estado (solo para administradores)
+    """
+    if not es_admin(current_user):
+        raise HTTPException(status_code=403, detail="Solo administradores pueden ver la bandeja de webhooks")
+    try:
+        return WebhookUseCase(WebhookRepository()).resumen_bandeja()
+    except Exception as e:
+        raise HTTPException(status_code=500, detail=f"Error obteniendo bandeja de webhooks: {str(e)}")
+
+@router.post("/conciliacion/ejecutar")
+def ejecutar_conciliacion(current_user=Depends(get_current_user)):
+    """
+    Ejecuta ahora la conciliación de pagos pendientes con las pasarelas (solo para administradores).
+    Normalmente corre de forma programada (CONCILIACION_INTERVALO_MINUTOS)
+    """
+    if not es_admin(current_user):
+        raise HTTPException(status_code=403, detail="Solo administradores pueden ejecutar la conciliación")
+    try:
+        return ConciliacionUseCase(ConciliacionRepository(), PagoRepository(), WebhookRepository()).ejecutar(origen="manual")
+    except Exception as e:
+        raise HTTPException(status_code=500, detail=f"Error ejecutando conciliación: {str(e)}")
+
+@router.get("/conciliacion/ultimo-reporte")
+def get_ultimo_reporte_conciliacion(current_user=Depends(get_current_user)):
+    """
+    Último reporte de conciliación de pagos (solo para administradores)
+    """
+    if not es_admin(current_user):
+        raise HTTPException(status_code=403, detail="Solo administradores pueden ver la conciliación")
+    try:
+        reporte = ConciliacionUseCase(ConciliacionRepository(), PagoRepository(), WebhookRepository()).ultimo_reporte()
+    except Exception as e:
+        raise HTTPException(status_code=500, detail=f"Error obteniendo reporte de conciliación: {str(e)}")
+    if not reporte:
+        raise HTTPException(status_code=404, detail="Aún no hay reportes de conciliación")
+    return reporte
+
 # ==================== ENDPOINTS PARA SERVIR ARCHIVOS ====================
 
 @router.get("/qr/{filename}")
-def servir_qr(filename: str):
+def servir_qr(filename: str, request: Request):
     """
-    Sirve archivos QR para que puedan ser accedidos desde el frontend
+    Sirve archivos QR para que puedan ser accedidos desde el frontend.
+    Los QR generados ('<id>.png' / '<id>.svg') salen de la caché en memoria o de disco; su
+    contenido no cambia nunca para un id, así que se cachean como inmutables.
     """
     try:
         import os
         
-        # Validar que el archivo es un QR
+        qr = motor_qr.obtener(filename)
+        if qr is not None:
+            imagen, media_type = qr
+            etag = f'"{filename}"'
+            cabeceras = {"ETag": etag, "Cache-Control": f"public, max-age={QR_CACHE_SEGUNDOS}, immutable"}
+            if request.headers.get("if-none-match") == etag:
+                return Response(status_code=304, headers=cabeceras)
+            return Response(content=imagen, media_type=media_type, headers=cabeceras)
+        if es_nombre_qr(filename):
+            raise HTTPException(status_code=404, detail="Archivo QR no encontrado")
+        
+        # QR antiguos guardados en disco con nombre por acción / referencia
         if not filename.startswith(('transferencia_', 'temp_TEMP_', 'pago_movil_')):
             raise HTTPException(status_code=403, detail="Archivo no autorizado")
         
-        # Construir ruta del archivo
-        qr_path = os.path.join("qr_codes", filename)
-        
-        # Verificar que el archivo existe
-        if not os.path.exists(qr_path):
+        try:
+            return servir_archivo(request, os.path.join("qr_codes", filename), filename, media_type="image/png")
+        except FileNotFoundError:
             raise HTTPException(status_code=404, detail="Archivo QR no encontrado")
         
-        # Retornar el archivo
-        return FileResponse(
-            path=qr_path,
-            filename=filename,
-            media_type="image/png"
-        )
-        
+    except HTTPException:
+        raise
     except Exception as e:
         raise HTTPException(status_code=500, detail=f"Error sirviendo QR: {str(e)}")
 
 @router.get("/certificados/{filename}")
-def servir_certificado(filename: str, current_user=Depends(get_current_user)):
+def servir_certificado(filename: str, request: Request, current_user=Depends(get_current_user)):
     """
     Sirve certificados para descarga con validación de autorización.
     Si el usuario es el socio propietario, retorna PDF original.
     Si no es el propietario, retorna PDF cifrado.
+    Soporta Range y GET condicional (ver infrastructure/servir_archivos.py).
     """
     try:
-        import os
-        from infrastructure.accion_repository import AccionRepository
-        from infrastructure.certificate_service import CertificateService
-        
         # Validar que el archivo es un certificado
         if not filename.startswith('certificado_accion_'):
             raise HTTPException(status_code=403, detail="Archivo no autorizado")
@@ -734,62 +863,39 @@ def servir_certificado(filename: str, current_user=Depends(get_current_user)):
         except (ValueError, IndexError):
             raise HTTPException(status_code=400, detail="No se pudo extraer ID de acción del archivo")
         
-        # Verificar que la acción existe
-        accion_repository = AccionRepository()
-        accion = accion_repository.get_accion(id_accion)
-        
-        if not accion:
+        # Acción y socio del usuario en una sola consulta cacheada
+        acceso = _acceso_archivos(id_accion, current_user)
+        if not acceso:
             raise HTTPException(status_code=404, detail="Acción no encontrada")
         
         # Verificar autorización - SOLO el socio propietario puede ver el certificado original
-        es_propietario = False
-        
-        # Solo si el usuario es socio, verificar si es el propietario
-        if current_user["rol"] == 4:  # Socio
-            # Obtener el socio del usuario actual
-            from infrastructure.socio_repository import SocioRepository
-            socio_repository = SocioRepository()
-            socio = socio_repository.get_socio_by_usuario_id(current_user["id_usuario"])
-            
-            if socio and socio.id_socio == id_socio_propietario:
-                es_propietario = True
+        es_propietario = current_user["rol"] == 4 and acceso["id_socio_usuario"] == id_socio_propietario
+        archivo_original = os.path.join("certificados", "originales", filename)
         
-        # Determinar qué archivo servir
         if es_propietario:
             # Usuario autorizado: servir PDF original
-            archivo_path = os.path.join("certificados", "originales", filename)
-            media_type = "application/pdf"
-            
-            if not os.path.exists(archivo_path):
+            try:
+                return servir_archivo(request, archivo_original, filename)
+            except FileNotFoundError:
                 raise HTTPException(status_code=404, detail="Certificado original no encontrado")
-                
-        else:
-            # Usuario no autorizado: servir PDF falso con contenido cifrado
-            # Buscar archivo cifrado falso
-            base_name = filename.replace('.pdf', '')
-            archivo_falso = f"{base_name}_cifrado_{current_user['id_usuario']}.pdf"
-            archivo_path = os.path.join("certificados", "cifrados", archivo_falso)
-            
-            if not os.path.exists(archivo_path):
-                # Si no existe el archivo falso específico, generar uno
-                certificate_service = CertificateService()
-                
-                # Generar archivo falso para este usuario
-                archivo_original = os.path.join("certificados", "originales", filename)
-                if os.path.exists(archivo_original):
-                    archivo_path = certificate_service.generar_certificado_falso(
-                        archivo_original, current_user["id_usuario"]
-                    )
-                else:
-                    raise HTTPException(status_code=404, detail="Certificado original no encontrado")
-            
-            media_type = "application/pdf"
-            filename = archivo_falso
         
-        return FileResponse(
-            path=archivo_path,
-            filename=filename,
-            media_type=media_type
+        # Usuario no autorizado: servir PDF falso con contenido cifrado. Se genera en
+        # segundo plano; mientras tanto se responde con un PDF de "en preparación"
+        try:
+            archivo_path = generador_variantes.obtener(archivo_original, current_user["id_usuario"])
+        except FileNotFoundError:
+            raise HTTPException(status_code=404, detail="Certificado original no encontrado")
+        if archivo_path is not None:
+            try:
+                return servir_archivo(request, archivo_path, os.path.basename(archivo_path))
+            except FileNotFoundError:
+                # Expulsada justo ahora por el límite de variantes: se vuelve a generar
+                generador_variantes.encolar(archivo_original, current_user["id_usuario"])
+        return Response(
+            content=PDF_EN_PREPARACION,
+            status_code=202,
+            media_type="application/pdf",
+            headers={"Retry-After": "3", "Cache-Control": "no-store"}
         )
         
     except HTTPException:
@@ -797,6 +903,34 @@ def servir_certificado(filename: str, current_user=Depends(get_current_user)):
     except Exception as e:
         raise HTTPException(status_code=500, detail=f"Error sirviendo certificado: {str(e)}")
 
+@router.get("/{accion_id}/comprobante")
+def descargar_comprobante(accion_id: int, request: Request, current_user=Depends(get_current_user)):
+    """
+    Descarga el comprobante de pago subido para la acción (socio propietario o admin)
+    """
+    try:
+        acceso = _acceso_archivos(accion_id, current_user)
+        if not acceso:
+            raise HTTPException(status_code=404, detail="Acción no encontrada")
+        
+        if not (acceso["es_propietario"] or es_admin(current_user)):
+            raise HTTPException(status_code=403, detail="No autorizado para ver este comprobante")
+        
+        if not acceso["comprobante_path"]:
+            raise HTTPException(status_code=404, detail="La acción no tiene comprobante")
+        
+        try:
+            ruta = acceso["comprobante_path"]
+            nombre = f"comprobante_accion_{accion_id}{os.path.splitext(ruta)[1]}"
+            return servir_archivo(request, ruta, nombre, media_type=tipo_contenido(ruta))
+        except FileNotFoundError:
+            raise HTTPException(status_code=404, detail="Archivo de comprobante no encontrado")
+        
+    except HTTPException:
+        raise
+    except Exception as e:
+        raise HTTPException(status_code=500, detail=f"Error descargando comprobante: {str(e)}")
+
 # ==================== ENDPOINTS PARA STRIPE ====================
 
 @router.post("/stripe/crear-pago", response_model=StripePaymentResponse)
@@ -829,6 +963,7 @@ def crear_pago_stripe(request: StripePaymentRequest, current_user=Depends(get_cu
         # Crear pago en Stripe
         stripe_service = StripeService()
         stripe_result = stripe_service.crear_pago_qr_boliviano(payment_data)
+        temp_payment_service.registrar_pasarela(temp_ref, "stripe", stripe_result["payment_intent_id"])
         
         return StripePaymentResponse(
             payment_intent_id=stripe_result["payment_intent_id"],
@@ -900,34 +1035,10 @@ def confirmar_pago_stripe(payment_intent_id: str, current_user=Depends(get_curre
                 metodo_pago="stripe"
             )
             
-            accion_creada = accion_repository.create_accion(accion_request_data)
+            accion_creada = accion_repository.create_accion(accion_request_data, f"stripe:{payment_intent_id}")
             
-            # Generar certificado
-            socio_repository = SocioRepository()
-            socio = socio_repository.get_socio(accion_creada.id_socio)
-            socio_titular_nombre = f"{socio.nombres} {socio.apellidos}" if socio else f"Socio {accion_creada.id_socio}"
-
-            certificado_data = {
-                'id_accion': accion_creada.id_accion,
-                'id_socio': accion_creada.id_socio,
-                'tipo_accion': accion_creada.tipo_accion,
-                'cantidad_acciones': accion_creada.cantidad_acciones,
-                'precio_unitario': accion_creada.precio_unitario,
-                'total_pago': accion_creada.total_pago,
-                'metodo_pago': accion_creada.metodo_pago,
-                'socio_titular': socio_titular_nombre,
-                'modalidad_pago_info': f"Modalidad {accion_creada.modalidad_pago}"
-            }
-            
-            # Generar certificado completo (original + cifrado)
-            certificado_info = certificate_service.generar_certificado_completo(certificado_data, accion_creada.id_socio)
-            
-            # Actualizar acción con certificado
-            accion_repository.update_accion(accion_creada.id_accion, {
-                "certificado_pdf": certificado_info["certificado_original"],
-                "certificado_cifrado": True,
-                "fecha_emision_certificado": datetime.now().isoformat()
-            })
+            # Generar certificado (si el pago ya tenía acción, se conserva el suyo)
+            certificado_info = _certificado_de_pago(accion_repository, certificate_service, accion_creada)
             
             # Limpiar pago temporal si existe
             temp_ref = metadata.get("referencia_temporal")
@@ -1005,98 +1116,27 @@ def obtener_configuracion_stripe():
 # ==================== WEBHOOKS DE STRIPE ====================
 
 @router.post("/stripe/webhook", response_model=StripeWebhookResponse)
-def webhook_stripe(request: Request):
+async def webhook_stripe(request: Request):
     """
-    Webhook para recibir eventos de Stripe
+    Webhook para recibir eventos de Stripe.
+    Verifica la firma, guarda el evento en webhook_inbox y responde de inmediato;
+    la acción y el certificado los crea el pool de workers de webhooks.
     """
+    payload = await request.body()
+    signature = request.headers.get('stripe-signature')
     try:
-        payload = request.body
-        signature = request.headers.get('stripe-signature')
-        
-        stripe_service = StripeService()
-        webhook_result = stripe_service.procesar_webhook(payload.decode('utf-8'), signature)
-        
-        # Procesar el resultado del webhook
-        if webhook_result.get("action") == "crear_accion":
-            # Crear acción automáticamente cuando el pago es exitoso
-            metadata = webhook_result.get("metadata", {})
-            
-            try:
-                # Crear acción en la BD
-                accion_repository = AccionRepository()
-                certificate_service = CertificateService()
-                
-                from schemas.accion import AccionRequest
-                
-                accion_request_data = AccionRequest(
-                    id_club=1,  # Por defecto
-                    id_socio=int(metadata["socio_id"]),
-                    modalidad_pago=1,  # Por defecto
-                    estado_accion=4,  # Completado
-                    certificado_pdf=None,
-                    certificado_cifrado=False,
-                    tipo_accion=metadata["tipo_accion"],
-                    cantidad_acciones=int(metadata["cantidad_acciones"]),
-                    precio_unitario=float(metadata["precio_unitario"]),
-                    total_pago=float(webhook_result["amount"]) / 100,  # Convertir de centavos
-                    metodo_pago="stripe"
-                )
-                
-                accion_creada = accion_repository.create_accion(accion_request_data)
-                
-                # Generar certificado
-                socio_repository = SocioRepository()
-                socio = socio_repository.get_socio(accion_creada.id_socio)
-                socio_titular_nombre = f"{socio.nombres} {socio.apellidos}" if socio else f"Socio {accion_creada.id_socio}"
-
-                certificado_data = {
-                    'id_accion': accion_creada.id_accion,
-                    'id_socio': accion_creada.id_socio,
-                    'tipo_accion': accion_creada.tipo_accion,
-                    'cantidad_acciones': accion_creada.cantidad_acciones,
-                    'precio_unitario': accion_creada.precio_unitario,
-                    'total_pago': accion_creada.total_pago,
-                    'metodo_pago': accion_creada.metodo_pago,
-                    'socio_titular': socio_titular_nombre,
-                    'modalidad_pago_info': f"Modalidad {accion_creada.modalidad_pago}"
-                }
-                
-                # Generar certificado completo (original + cifrado)
-                certificado_info = certificate_service.generar_certificado_completo(certificado_data, accion_creada.id_socio)
-                
-                # Actualizar acción con certificado
-                accion_repository.update_accion(accion_creada.id_accion, {
-                    "certificado_pdf": certificado_info["certificado_original"],
-                    "certificado_cifrado": True,
-                    "fecha_emision_certificado": datetime.now().isoformat()
-                })
-                
-                # Limpiar pago temporal si existe
-                temp_ref = metadata.get("referencia_temporal")
-                if temp_ref:
-                    temp_payment_service = TempPaymentService()
-                    temp_payment_service.delete_temp_payment(temp_ref)
-                
-                logging.info(f"Acción creada automáticamente vía webhook: {accion_creada.id_accion}")
-                
-            except Exception as e:
-                logging.error(f"Error creando acción vía webhook: {str(e)}")
-        
-        elif webhook_result.get("action") == "limpiar_pago_temporal":
-            # Limpiar pago temporal cuando se cancela
-            metadata = webhook_result.get("metadata", {})
-            temp_ref = metadata.get("referencia_temporal")
-            if temp_ref:
-                temp_payment_service = TempPaymentService()
-                temp_payment_service.delete_temp_payment(temp_ref)
-                logging.info(f"Pago temporal limpiado vía webhook: {temp_ref}")
-        
-        return StripeWebhookResponse(**webhook_result)
-        
+        webhook_result = await run_in_threadpool(
+            WebhookUseCase(WebhookRepository()).registrar_stripe, payload, signature
+        )
+    except FirmaWebhookInvalida as e:
+        raise HTTPException(status_code=400, detail=f"Firma de webhook inválida: {str(e)}")
     except Exception as e:
         logging.error(f"Error procesando webhook de Stripe: {str(e)}")
         raise HTTPException(status_code=500, detail=f"Error procesando webhook: {str(e)}")
 
+    procesador_webhooks.avisar()
+    return StripeWebhookResponse(**webhook_result)
+
 # ==================== ENDPOINTS PARA MERCADOPAGO (MÁS FÁCIL) ====================
 
 @router.post("/mercadopago/crear-pago", response_model=MercadoPagoPaymentResponse)
@@ -1129,6 +1169,7 @@ def crear_pago_mercadopago(request: MercadoPagoPaymentRequest, current_user=Depe
         # Crear pago en MercadoPago
         mercadopago_service = MercadoPagoService()
         mp_result = mercadopago_service.crear_pago_qr(payment_data)
+        temp_payment_service.registrar_pasarela(temp_ref, "mercadopago", mp_result["preference_id"])
         
         # Generar QR para transferencia bancaria
         qr_info = mercadopago_service.generar_qr_transferencia_bolivia(payment_data)
@@ -1240,34 +1281,10 @@ def confirmar_pago_mercadopago(external_reference: str, current_user=Depends(get
             metodo_pago="mercadopago"
         )
         
-        accion_creada = accion_repository.create_accion(accion_request_data)
+        accion_creada = accion_repository.create_accion(accion_request_data, f"mercadopago:{pago_aprobado['id']}")
         
-        # Generar certificado
-        socio_repository = SocioRepository()
-        socio = socio_repository.get_socio(accion_creada.id_socio)
-        socio_titular_nombre = f"{socio.nombres} {socio.apellidos}" if socio else f"Socio {accion_creada.id_socio}"
-
-        certificado_data = {
-            'id_accion': accion_creada.id_accion,
-            'id_socio': accion_creada.id_socio,
-            'tipo_accion': accion_creada.tipo_accion,
-            'cantidad_acciones': accion_creada.cantidad_acciones,
-            'precio_unitario': accion_creada.precio_unitario,
-            'total_pago': accion_creada.total_pago,
-            'metodo_pago': accion_creada.metodo_pago,
-            'socio_titular': socio_titular_nombre,
-            'modalidad_pago_info': f"Modalidad {accion_creada.modalidad_pago}"
-        }
-        
-        # Generar certificado completo (original + cifrado)
-        certificado_info = certificate_service.generar_certificado_completo(certificado_data, accion_creada.id_socio)
-        
-        # Actualizar acción con certificado
-        accion_repository.update_accion(accion_creada.id_accion, {
-            "certificado_pdf": certificado_info["certificado_original"],
-            "certificado_cifrado": True,
-            "fecha_emision_certificado": datetime.now().isoformat()
-        })
+        # Generar certificado (si el pago ya tenía acción, se conserva el suyo)
+        certificado_info = _certificado_de_pago(accion_repository, certificate_service, accion_creada)
         
         # Limpiar pago temporal
         temp_payment_service = TempPaymentService()
@@ -1312,88 +1329,24 @@ def obtener_configuracion_mercadopago():
         raise HTTPException(status_code=500, detail=f"Error obteniendo configuración: {str(e)}")
 
 @router.post("/mercadopago/webhook", response_model=MercadoPagoWebhookResponse)
-def webhook_mercadopago(request: Request):
+async def webhook_mercadopago(request: Request):
     """
-    Webhook para recibir eventos de MercadoPago
+    Webhook para recibir eventos de MercadoPago.
+    Guarda el evento en webhook_inbox y responde de inmediato; la consulta del
+    pago, la acción y el certificado los procesa el pool de workers de webhooks.
     """
     try:
-        webhook_data = request.json()
-        
-        mercadopago_service = MercadoPagoService()
-        webhook_result = mercadopago_service.procesar_webhook(webhook_data)
-        
-        # Procesar el resultado del webhook
-        if webhook_result.get("action") == "crear_accion":
-            # Crear acción automáticamente cuando el pago es exitoso
-            metadata = webhook_result.get("metadata", {})
-            
-            try:
-                # Crear acción en la BD
-                accion_repository = AccionRepository()
-                certificate_service = CertificateService()
-                
-                from schemas.accion import AccionRequest
-                
-                accion_request_data = AccionRequest(
-                    id_club=1,  # Por defecto
-                    id_socio=int(metadata["socio_id"]),
-                    modalidad_pago=1,  # Por defecto
-                    estado_accion=4,  # Completado
-                    certificado_pdf=None,
-                    certificado_cifrado=False,
-                    tipo_accion=metadata["tipo_accion"],
-                    cantidad_acciones=int(metadata["cantidad_acciones"]),
-                    precio_unitario=float(metadata["precio_unitario"]),
-                    total_pago=0.00,  # Se actualizará con el monto real
-                    metodo_pago="mercadopago"
-                )
-                
-                accion_creada = accion_repository.create_accion(accion_request_data)
-                
-                # Generar certificado
-                socio_repository = SocioRepository()
-                socio = socio_repository.get_socio(accion_creada.id_socio)
-                socio_titular_nombre = f"{socio.nombres} {socio.apellidos}" if socio else f"Socio {accion_creada.id_socio}"
-
-                certificado_data = {
-                    'id_accion': accion_creada.id_accion,
-                    'id_socio': accion_creada.id_socio,
-                    'tipo_accion': accion_creada.tipo_accion,
-                    'cantidad_acciones': accion_creada.cantidad_acciones,
-                    'precio_unitario': accion_creada.precio_unitario,
-                    'total_pago': accion_creada.total_pago,
-                    'metodo_pago': accion_creada.metodo_pago,
-                    'socio_titular': socio_titular_nombre,
-                    'modalidad_pago_info': f"Modalidad {accion_creada.modalidad_pago}"
-                }
-                
-                # Generar certificado completo (original + cifrado)
-                certificado_info = certificate_service.generar_certificado_completo(certificado_data, accion_creada.id_socio)
-                
-                # Actualizar acción con certificado
-                accion_repository.update_accion(accion_creada.id_accion, {
-                    "certificado_pdf": certificado_info["certificado_original"],
-                    "certificado_cifrado": True,
-                    "fecha_emision_certificado": datetime.now().isoformat()
-                })
-                
-                # Limpiar pago temporal si existe
-                temp_ref = metadata.get("referencia_temporal")
-                if temp_ref:
-                    temp_payment_service = TempPaymentService()
-                    temp_payment_service.delete_temp_payment(temp_ref)
-                
-                logging.info(f"Acción creada automáticamente vía webhook MercadoPago: {accion_creada.id_accion}")
-                
-            except Exception as e:
-                logging.error(f"Error creando acción vía webhook MercadoPago: {str(e)}")
-        
-        return MercadoPagoWebhookResponse(**webhook_result)
-        
+        webhook_data = await request.json()
+        webhook_result = await run_in_threadpool(
+            WebhookUseCase(WebhookRepository()).registrar_mercadopago, webhook_data
+        )
     except Exception as e:
         logging.error(f"Error procesando webhook de MercadoPago: {str(e)}")
         raise HTTPException(status_code=500, detail=f"Error procesando webhook: {str(e)}")
 
+    procesador_webhooks.avisar()
+    return MercadoPagoWebhookResponse(**webhook_result)
+
 # ==================== ENDPOINTS PARA PAYPAL (MÁS FÁCIL) ====================
 
 @router.post("/paypal/crear-pago", response_model=PayPalPaymentResponse)
@@ -1426,6 +1379,7 @@ def crear_pago_paypal(request: PayPalPaymentRequest, current_user=Depends(get_cu
         # Crear pago en PayPal
         paypal_service = PayPalService()
         paypal_result = paypal_service.crear_pago(payment_data)
+        temp_payment_service.registrar_pasarela(temp_ref, "paypal", paypal_result["payment_id"])
         
         return PayPalPaymentResponse(
             payment_id=paypal_result["payment_id"],
@@ -1473,34 +1427,10 @@ def ejecutar_pago_paypal(request: PayPalExecuteRequest, current_user=Depends(get
                 metodo_pago="paypal"
             )
             
-            accion_creada = accion_repository.create_accion(accion_request_data)
+            accion_creada = accion_repository.create_accion(accion_request_data, f"paypal:{request.payment_id}")
             
-            # Generar certificado
-            socio_repository = SocioRepository()
-            socio = socio_repository.get_socio(accion_creada.id_socio)
-            socio_titular_nombre = f"{socio.nombres} {socio.apellidos}" if socio else f"Socio {accion_creada.id_socio}"
-
-            certificado_data = {
-                'id_accion': accion_creada.id_accion,
-                'id_socio': accion_creada.id_socio,
-                'tipo_accion': accion_creada.tipo_accion,
-                'cantidad_acciones': accion_creada.cantidad_acciones,
-                'precio_unitario': accion_creada.precio_unitario,
-                'total_pago': accion_creada.total_pago,
-                'metodo_pago': accion_creada.metodo_pago,
-                'socio_titular': socio_titular_nombre,
-                'modalidad_pago_info': f"Modalidad {accion_creada.modalidad_pago}"
-            }
-            
-            # Generar certificado completo (original + cifrado)
-            certificado_info = certificate_service.generar_certificado_completo(certificado_data, accion_creada.id_socio)
-            
-            # Actualizar acción con certificado
-            accion_repository.update_accion(accion_creada.id_accion, {
-                "certificado_pdf": certificado_info["certificado_original"],
-                "certificado_cifrado": True,
-                "fecha_emision_certificado": datetime.now().isoformat()
-            })
+            # Generar certificado (si el pago ya tenía acción, se conserva el suyo)
+            certificado_info = _certificado_de_pago(accion_repository, certificate_service, accion_creada)
             
             # Limpiar pago temporal
             temp_ref = pago_ejecutado["external_reference"]
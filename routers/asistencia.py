@@ -1,5 +1,6 @@
-from fastapi import APIRouter, Depends, HTTPException
-from schemas.asistencia import AsistenciaRequest, AsistenciaResponse, AsistenciaUpdateRequest
+from fastapi import APIRouter, Depends, HTTPException, UploadFile, File
+from schemas.asistencia import (AsistenciaRequest, AsistenciaResponse, AsistenciaUpdateRequest,
+                                MarcacionRequest, AsistenciaLoteResponse)
 from use_cases.asistencia import AsistenciaUseCase
 from infrastructure.asistencia_repository import AsistenciaRepository
 from fastapi.security import OAuth2PasswordBearer
@@ -28,6 +29,22 @@ def create_asistencia(request: AsistenciaRequest, current_user=Depends(get_curre
     use_case = AsistenciaUseCase(AsistenciaRepository())
     return use_case.create_asistencia(request)
 
+@router.post("/lote", response_model=AsistenciaLoteResponse)
+def registrar_asistencia_lote(marcaciones: List[MarcacionRequest], current_user=Depends(get_current_user)):
+    """
+    Carga masiva de marcaciones de un reloj marcador. Por empleado y día la
+    primera marcación es el ingreso y la última la salida; se guardan con un
+    único upsert sobre (id_personal, fecha).
+    """
+    use_case = AsistenciaUseCase(AsistenciaRepository())
+    return use_case.registrar_lote(marcaciones)
+
+@router.post("/lote/archivo", response_model=AsistenciaLoteResponse)
+def registrar_asistencia_lote_archivo(archivo: UploadFile = File(...), current_user=Depends(get_current_user)):
+    """Igual que POST /asistencia/lote, con el CSV exportado por el reloj"""
+    use_case = AsistenciaUseCase(AsistenciaRepository())
+    return use_case.registrar_lote_archivo(archivo.file.read())
+
 @router.get("/{id_personal}", response_model=List[AsistenciaResponse])
 def get_asistencia_personal(id_personal: int, current_user=Depends(get_current_user)):
     use_case = AsistenciaUseCase(AsistenciaRepository())
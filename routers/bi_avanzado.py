@@ -10,7 +10,6 @@ import json
 import io
 import csv
 from datetime import datetime, timedelta
-import pandas as pd
 
 router = APIRouter(prefix="/bi", tags=["bi-avanzado"])
 
@@ -1,9 +1,9 @@
-from fastapi import APIRouter, Depends, HTTPException
+from fastapi import APIRouter, Depends, HTTPException, Request, Response
+from fastapi.responses import JSONResponse
 from fastapi.security import OAuth2PasswordBearer
 from config import SECRET_KEY, ALGORITHM
 import jwt
-from sqlalchemy import text
-from config import SessionLocal
+from infrastructure.catalogo_cache import catalogo_cache
 
 router = APIRouter(prefix="/catalogos", tags=["catalogos"])
 
@@ -16,34 +16,35 @@ def get_current_user(token: str = Depends(oauth2_scheme)):
     except jwt.PyJWTError:
         raise HTTPException(status_code=401, detail="Token inválido o expirado")
 
-def fetch_catalog(query):
-    db = SessionLocal()
-    try:
-        result = db.execute(text(query)).fetchall()
-        return [dict(row) for row in result]
-    finally:
-        db.close()
+def fetch_catalog(nombre: str, request: Request):
+    """Sirve el catálogo desde la caché en memoria con ETag (304 si el cliente ya lo tiene)"""
+    etag = catalogo_cache.etag(nombre)
+    headers = {"ETag": etag, "Cache-Control": "private, no-cache"}
+    if_none_match = request.headers.get("if-none-match", "")
+    if etag in [valor.strip() for valor in if_none_match.split(",")]:
+        return Response(status_code=304, headers=headers)
+    return JSONResponse(content=catalogo_cache.listar(nombre), headers=headers)
 
 @router.get("/estados-pago")
-def get_estados_pago(current_user=Depends(get_current_user)):
-    return fetch_catalog("SELECT id_estado_pago, descripcion FROM estado_pago")
+def get_estados_pago(request: Request, current_user=Depends(get_current_user)):
+    return fetch_catalog("estado_pago", request)
 
 @router.get("/modalidades-pago")
-def get_modalidades_pago(current_user=Depends(get_current_user)):
-    return fetch_catalog("SELECT id_modalidad_pago, descripcion, meses_de_gracia, porcentaje_renovacion_inicial, porcentaje_renovacion_mensual, costo_renovacion_estandar FROM modalidadpago")
+def get_modalidades_pago(request: Request, current_user=Depends(get_current_user)):
+    return fetch_catalog("modalidad_pago", request)
 
 @router.get("/estados-accion")
-def get_estados_accion(current_user=Depends(get_current_user)):
-    return fetch_catalog("SELECT id_estado_accion, nombre_estado_accion FROM estado_accion")
+def get_estados_accion(request: Request, current_user=Depends(get_current_user)):
+    return fetch_catalog("estado_accion", request)
 
 @router.get("/roles")
-def get_roles(current_user=Depends(get_current_user)):
-    return fetch_catalog("SELECT id_rol, nombre_rol FROM roles")
+def get_roles(request: Request, current_user=Depends(get_current_user)):
+    return fetch_catalog("roles", request)
 
 @router.get("/cargos")
-def get_cargos(current_user=Depends(get_current_user)):
-    return fetch_catalog("SELECT id_cargo, nombre_cargo FROM cargos")
+def get_cargos(request: Request, current_user=Depends(get_current_user)):
+    return fetch_catalog("cargos", request)
 
 @router.get("/clubes")
-def get_clubes(current_user=Depends(get_current_user)):
-    return fetch_catalog("SELECT id_club, nombre_club FROM club") 
\ No newline at end of file
+def get_clubes(request: Request, current_user=Depends(get_current_user)):
+    return fetch_catalog("club", request)
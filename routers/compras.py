@@ -3,18 +3,21 @@ from fastapi.responses import StreamingResponse
 from schemas.compra import CompraRequest, CompraResponse, CompraUpdateRequest
 from use_cases.compra import CompraUseCase
 from infrastructure.compra_repository import CompraRepository
-from infrastructure.reporte_compras_service import ReporteComprasService
 from infrastructure.proveedor_repository import ProveedorRepository
 from use_cases.proveedor import ProveedorUseCase
 from fastapi.security import OAuth2PasswordBearer
 from typing import List
 import jwt
 from config import SECRET_KEY, ALGORITHM
+from infrastructure.carga_perezosa import clase_perezosa
 from datetime import datetime
 from io import BytesIO
 
 router = APIRouter(prefix="/compras", tags=["compras"])
 
+# Servicios de reportes (reportlab, matplotlib, numpy): se importan en el primer uso
+ReporteComprasService = clase_perezosa("infrastructure.reporte_compras_service", "ReporteComprasService")
+
 oauth2_scheme = OAuth2PasswordBearer(tokenUrl="/login")
 
 def get_current_user(token: str = Depends(oauth2_scheme)):
@@ -1,9 +1,12 @@
-from fastapi import APIRouter, Depends, HTTPException
-from schemas.evento import EventoRequest, EventoResponse, EventoUpdateRequest
+from fastapi import APIRouter, Depends, HTTPException, Query
+from schemas.evento import (EventoRequest, EventoResponse, EventoUpdateRequest, EventoResumenResponse,
+                            CalendarioEventosResponse)
 from use_cases.evento import EventoUseCase
 from infrastructure.evento_repository import EventoRepository
+from infrastructure.reserva_repository import ReservaRepository
 from fastapi.security import OAuth2PasswordBearer
-from typing import List
+from typing import List, Optional
+from datetime import date
 import jwt
 from config import SECRET_KEY, ALGORITHM
 
@@ -28,6 +31,28 @@ def create_evento(request: EventoRequest, current_user=Depends(get_current_user)
     use_case = EventoUseCase(EventoRepository())
     return use_case.create_evento(request)
 
+@router.get("/resumen", response_model=List[EventoResumenResponse])
+def resumen_eventos(
+    id_club: Optional[int] = Query(None),
+    desde: Optional[date] = Query(None, description="Fecha inicial (inclusive)"),
+    hasta: Optional[date] = Query(None, description="Fecha final (inclusive)"),
+    current_user=Depends(get_current_user)
+):
+    """Eventos con reservas confirmadas, en espera, canceladas y cupos disponibles"""
+    use_case = EventoUseCase(EventoRepository())
+    return use_case.resumen_eventos(id_club=id_club, desde=desde, hasta=hasta)
+
+@router.get("/calendario", response_model=CalendarioEventosResponse)
+def calendario_eventos(
+    anio: int = Query(..., ge=2000, le=2100),
+    mes: int = Query(..., description="Mes (1-12)", ge=1, le=12),
+    id_club: Optional[int] = Query(None),
+    current_user=Depends(get_current_user)
+):
+    """Eventos del mes, agrupados por día, con sus reservas en una sola llamada"""
+    use_case = EventoUseCase(EventoRepository())
+    return use_case.calendario(anio, mes, id_club=id_club)
+
 @router.get("/{evento_id}", response_model=EventoResponse)
 def get_evento(evento_id: int, current_user=Depends(get_current_user)):
     use_case = EventoUseCase(EventoRepository())
@@ -35,7 +60,7 @@ def get_evento(evento_id: int, current_user=Depends(get_current_user)):
 
 @router.put("/{evento_id}", response_model=EventoResponse)
 def update_evento(evento_id: int, request: EventoUpdateRequest, current_user=Depends(get_current_user)):
-    use_case = EventoUseCase(EventoRepository())
+    use_case = EventoUseCase(EventoRepository(), ReservaRepository())
     return use_case.update_evento(evento_id, request)
 
 @router.delete("/{evento_id}")
@@ -1,19 +1,26 @@
-from fastapi import APIRouter, Depends, HTTPException
+from fastapi import APIRouter, Depends, HTTPException, Query
 from fastapi.responses import StreamingResponse
-from schemas.finanza import MovimientoFinancieroRequest, MovimientoFinancieroResponse, MovimientoFinancieroUpdateRequest
+from schemas.finanza import (MovimientoFinancieroRequest, MovimientoFinancieroResponse, MovimientoFinancieroUpdateRequest,
+                             CierreContableResponse, VerificacionCierreResponse)
 from use_cases.finanza import FinanzaUseCase
 from infrastructure.finanza_repository import FinanzaRepository
-from infrastructure.reporte_finanzas_service import ReporteFinanzasService
-from infrastructure.reporte_contable_service import ReporteContableService
+from use_cases.cierre_contable import CierreContableUseCase
+from infrastructure.contabilidad_repository import ContabilidadRepository
+from infrastructure.json_response import ORJSONResponse
 from fastapi.security import OAuth2PasswordBearer
-from typing import List
+from typing import List, Optional
 import jwt
 from config import SECRET_KEY, ALGORITHM
-from datetime import datetime
+from infrastructure.carga_perezosa import clase_perezosa
+from datetime import datetime, date
 from io import BytesIO
 
 router = APIRouter(prefix="/finanzas", tags=["finanzas"])
 
+# Servicios de reportes (reportlab, matplotlib, numpy): se importan en el primer uso
+ReporteFinanzasService = clase_perezosa("infrastructure.reporte_finanzas_service", "ReporteFinanzasService")
+ReporteContableService = clase_perezosa("infrastructure.reporte_contable_service", "ReporteContableService")
+
 oauth2_scheme = OAuth2PasswordBearer(tokenUrl="/login")
 
 def get_current_user(token: str = Depends(oauth2_scheme)):
@@ -26,7 +33,8 @@ def get_current_user(token: str = Depends(oauth2_scheme)):
 @router.get("/movimientos", response_model=List[MovimientoFinancieroResponse])
 def list_movimientos(current_user=Depends(get_current_user)):
     use_case = FinanzaUseCase(FinanzaRepository())
-    return use_case.list_movimientos()
+    # Los MovimientoFinancieroResponse ya están validados: se serializan sin revalidar el response_model
+    return ORJSONResponse(content=[m.dict() for m in use_case.list_movimientos()])
 
 @router.post("/movimientos", response_model=MovimientoFinancieroResponse)
 def create_movimiento(request: MovimientoFinancieroRequest, current_user=Depends(get_current_user)):
@@ -97,7 +105,11 @@ def descargar_reporte_finanzas(current_user=Depends(get_current_user)):
         raise HTTPException(status_code=500, detail=f"Error al generar reporte: {str(e)}")
 
 @router.get("/reporte/contable")
-def descargar_reporte_contable(current_user=Depends(get_current_user)):
+def descargar_reporte_contable(
+    fecha_inicio: Optional[date] = Query(None, description="Inicio del período (por defecto, desde el inicio)"),
+    fecha_fin: Optional[date] = Query(None, description="Fin del período, inclusive (por defecto, hasta hoy)"),
+    current_user=Depends(get_current_user)
+):
     """
     Genera y descarga un reporte contable formal en formato PDF
     Incluye Estado de Resultados, Balance General, Flujo de Efectivo y análisis financiero
@@ -105,7 +117,7 @@ def descargar_reporte_contable(current_user=Depends(get_current_user)):
     try:
         # Generar PDF contable
         reporte_service = ReporteContableService()
-        pdf_data = reporte_service.generar_pdf_contable()
+        pdf_data = reporte_service.generar_pdf_contable(fecha_inicio, fecha_fin)
         
         fecha_str = datetime.now().strftime('%Y%m%d_%H%M%S')
         filename = f"reporte_contable_{fecha_str}.pdf"
@@ -124,4 +136,33 @@ def descargar_reporte_contable(current_user=Depends(get_current_user)):
         import logging
         logging.error(f"Error al generar reporte contable: {str(e)}")
         logging.error(traceback.format_exc())
-        raise HTTPException(status_code=500, detail=f"Error al generar reporte contable: {str(e)}") 
\ No newline at end of file
+        raise HTTPException(status_code=500, detail=f"Error al generar reporte contable: {str(e)}") 
+
+# ---------- Cierres contables mensuales ----------
+
+def _solo_administradores(current_user: dict):
+    if current_user.get("rol") != 1:
+        raise HTTPException(status_code=403, detail="Solo administradores pueden gestionar cierres contables")
+
+@router.get("/cierres", response_model=List[CierreContableResponse])
+def listar_cierres(current_user=Depends(get_current_user)):
+    """Meses cerrados: sus cifras se leen congeladas en los reportes contables"""
+    return CierreContableUseCase(ContabilidadRepository()).listar()
+
+@router.get("/cierres/verificar", response_model=List[VerificacionCierreResponse])
+def verificar_cierres(current_user=Depends(get_current_user)):
+    """Recalcula el checksum de las filas de origen de cada mes cerrado (integro = False si se editaron)"""
+    _solo_administradores(current_user)
+    return CierreContableUseCase(ContabilidadRepository()).verificar()
+
+@router.post("/cierres/{anio}/{mes}", response_model=CierreContableResponse, status_code=201)
+def cerrar_periodo(anio: int, mes: int, current_user=Depends(get_current_user)):
+    """Congela las cifras contables del mes"""
+    _solo_administradores(current_user)
+    return CierreContableUseCase(ContabilidadRepository()).cerrar(anio, mes, current_user.get("id_usuario"))
+
+@router.delete("/cierres/{anio}/{mes}")
+def reabrir_periodo(anio: int, mes: int, current_user=Depends(get_current_user)):
+    """Reabre un mes cerrado: vuelve a calcularse en vivo hasta que se cierre de nuevo"""
+    _solo_administradores(current_user)
+    return CierreContableUseCase(ContabilidadRepository()).reabrir(anio, mes)
@@ -1,9 +1,12 @@
-from fastapi import APIRouter, Depends, HTTPException
-from schemas.inventario import ProductoInventarioRequest, ProductoInventarioResponse, ProductoInventarioUpdateRequest
+from fastapi import APIRouter, Depends, HTTPException, Query
+from schemas.inventario import (ProductoInventarioRequest, ProductoInventarioResponse, ProductoInventarioUpdateRequest,
+                                MovimientoInventarioRequest, MovimientoLoteItemRequest, MovimientoInventarioResponse,
+                                MovimientoLoteResponse, ValoracionInventarioResponse)
 from use_cases.inventario import InventarioUseCase
 from infrastructure.inventario_repository import InventarioRepository
 from fastapi.security import OAuth2PasswordBearer
-from typing import List
+from typing import List, Optional
+from datetime import date
 import jwt
 from config import SECRET_KEY, ALGORITHM
 
@@ -28,6 +31,27 @@ def create_producto(request: ProductoInventarioRequest, current_user=Depends(get
     use_case = InventarioUseCase(InventarioRepository())
     return use_case.create_producto(request)
 
+@router.post("/movimientos", response_model=MovimientoLoteResponse)
+def registrar_movimientos(request: List[MovimientoLoteItemRequest], current_user=Depends(get_current_user)):
+    """Lote de entradas, salidas y ajustes de varios productos; se aplican todos o ninguno (409)"""
+    use_case = InventarioUseCase(InventarioRepository())
+    return use_case.registrar_lote(request, current_user.get("id_usuario"))
+
+@router.get("/valoracion", response_model=ValoracionInventarioResponse)
+def get_valoracion(fecha_corte: Optional[date] = Query(None, description="Última valoración en o antes de esta fecha"),
+                   current_user=Depends(get_current_user)):
+    use_case = InventarioUseCase(InventarioRepository())
+    return use_case.get_valoracion(fecha_corte)
+
+@router.post("/valoracion", response_model=ValoracionInventarioResponse)
+def generar_valoracion(fecha_corte: Optional[date] = Query(None, description="Día ya terminado (por defecto, ayer)"),
+                       current_user=Depends(get_current_user)):
+    """Recalcula la valoración del stock al cierre del día (la genera también un job diario)"""
+    if current_user.get("rol") != 1:
+        raise HTTPException(status_code=403, detail="Solo administradores pueden generar valoraciones de inventario")
+    use_case = InventarioUseCase(InventarioRepository())
+    return use_case.generar_valoracion(fecha_corte)
+
 @router.get("/{producto_id}", response_model=ProductoInventarioResponse)
 def get_producto(producto_id: int, current_user=Depends(get_current_user)):
     use_case = InventarioUseCase(InventarioRepository())
@@ -36,9 +60,26 @@ def get_producto(producto_id: int, current_user=Depends(get_current_user)):
 @router.put("/{producto_id}", response_model=ProductoInventarioResponse)
 def update_producto(producto_id: int, request: ProductoInventarioUpdateRequest, current_user=Depends(get_current_user)):
     use_case = InventarioUseCase(InventarioRepository())
-    return use_case.update_producto(producto_id, request)
+    return use_case.update_producto(producto_id, request, current_user.get("id_usuario"))
 
 @router.delete("/{producto_id}")
 def delete_producto(producto_id: int, current_user=Depends(get_current_user)):
     use_case = InventarioUseCase(InventarioRepository())
-    return use_case.delete_producto(producto_id) 
\ No newline at end of file
+    return use_case.delete_producto(producto_id)
+
+@router.post("/{producto_id}/movimientos", response_model=MovimientoLoteResponse)
+def registrar_movimiento(producto_id: int, request: MovimientoInventarioRequest, current_user=Depends(get_current_user)):
+    """Entrada, salida o ajuste relativo del stock (409 si el stock quedaría negativo)"""
+    use_case = InventarioUseCase(InventarioRepository())
+    return use_case.registrar_movimiento(producto_id, request, current_user.get("id_usuario"))
+
+@router.get("/{producto_id}/movimientos", response_model=List[MovimientoInventarioResponse])
+def list_movimientos(
+    producto_id: int,
+    desde: Optional[date] = Query(None),
+    hasta: Optional[date] = Query(None),
+    limite: int = Query(500, ge=1, le=5000),
+    current_user=Depends(get_current_user)
+):
+    use_case = InventarioUseCase(InventarioRepository())
+    return use_case.list_movimientos(producto_id, desde, hasta, limite)
@@ -1,9 +1,10 @@
-from fastapi import APIRouter, Depends, HTTPException, Request
-from schemas.log import LogSistemaRequest, LogSistemaResponse
+from fastapi import APIRouter, Depends, HTTPException, Query
+from schemas.log import LogSistemaRequest, LogSistemaResponse, LogSistemaEncoladoResponse
 from use_cases.log import LogUseCase
 from infrastructure.log_repository import LogRepository
 from fastapi.security import OAuth2PasswordBearer
-from typing import List
+from typing import List, Optional
+from datetime import datetime
 import jwt
 from config import SECRET_KEY, ALGORITHM
 
@@ -19,27 +20,30 @@ def get_current_user(token: str = Depends(oauth2_scheme)):
         raise HTTPException(status_code=401, detail="Token inválido o expirado")
 
 @router.get("/", response_model=List[LogSistemaResponse])
-def list_logs(current_user=Depends(get_current_user)):
+def list_logs(
+    desde: Optional[datetime] = Query(None, description="Desde (por defecto, los últimos 7 días)"),
+    hasta: Optional[datetime] = Query(None, description="Hasta (exclusivo); para paginar, la fecha del último log recibido"),
+    antes_de_id: Optional[int] = Query(None, description="Para paginar, el id_log del último log recibido (junto con hasta)"),
+    id_usuario: Optional[int] = Query(None, description="Filtrar por usuario"),
+    modulo: Optional[str] = Query(None, description="Filtrar por módulo o tabla afectada"),
+    limite: int = Query(500, ge=1, le=5000, description="Cantidad máxima de logs"),
+    current_user=Depends(get_current_user)
+):
     use_case = LogUseCase(LogRepository())
-    return use_case.list_logs()
+    return use_case.list_logs(desde, hasta, id_usuario, modulo, limite, antes_de_id)
 
-@router.post("/", response_model=LogSistemaResponse)
-def create_log(request: LogSistemaRequest, http_request: Request, current_user=Depends(get_current_user)):
+@router.post("/", response_model=LogSistemaEncoladoResponse, status_code=202)
+def create_log(request: LogSistemaRequest, current_user=Depends(get_current_user)):
     """
     Registra un nuevo log de actividad en el sistema.
-    Automáticamente captura la IP y User-Agent del cliente.
+    La IP y el User-Agent del cliente los captura AuditoriaMiddleware.
+    El log se escribe en segundo plano junto con otros (ver infrastructure/auditoria.py).
     """
     try:
-        # Obtener IP y User-Agent del request
-        client_ip = http_request.client.host if http_request.client else None
-        user_agent = http_request.headers.get("user-agent")
-        
-        # Agregar información del cliente al request
-        request.ip_address = client_ip
-        request.user_agent = user_agent
-        
         use_case = LogUseCase(LogRepository())
-        return use_case.create_log(request)
+        return use_case.registrar_log(request)
+    except HTTPException:
+        raise
     except Exception as e:
         raise HTTPException(status_code=500, detail=f"Error al crear log: {str(e)}")
 
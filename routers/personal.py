@@ -5,16 +5,19 @@ from use_cases.personal import PersonalUseCase
 from infrastructure.personal_repository import PersonalRepository
 from use_cases.asistencia import AsistenciaUseCase
 from infrastructure.asistencia_repository import AsistenciaRepository
-from infrastructure.reporte_rrhh_service import ReporteRRHHService
 from fastapi.security import OAuth2PasswordBearer
 from typing import List
 import jwt
 from config import SECRET_KEY, ALGORITHM
+from infrastructure.carga_perezosa import clase_perezosa
 from datetime import datetime
 from io import BytesIO
 
 router = APIRouter(prefix="/personal", tags=["personal"])
 
+# Servicios de reportes (reportlab, matplotlib, numpy): se importan en el primer uso
+ReporteRRHHService = clase_perezosa("infrastructure.reporte_rrhh_service", "ReporteRRHHService")
+
 oauth2_scheme = OAuth2PasswordBearer(tokenUrl="/login")
 
 def get_current_user(token: str = Depends(oauth2_scheme)):
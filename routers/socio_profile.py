@@ -1,6 +1,7 @@
 from fastapi import APIRouter, Depends, HTTPException
 from schemas.socio import SocioResponse
 from infrastructure.socio_repository import SocioRepository
+from infrastructure.row_mapper import como_dict
 from fastapi.security import OAuth2PasswordBearer
 from typing import Optional
 import jwt
@@ -36,7 +37,7 @@ def get_my_socio_profile(current_user=Depends(get_current_user)):
             detail="No se encontró un perfil de socio asociado a este usuario. Solo los usuarios con perfil de socio pueden acceder a este endpoint."
         )
     
-    return SocioResponse(**socio.__dict__)
+    return SocioResponse(**como_dict(socio))
 
 @router.get("/check")
 def check_socio_profile(current_user=Depends(get_current_user)):
@@ -3,16 +3,20 @@ from fastapi.responses import StreamingResponse
 from schemas.socio import SocioRequest, SocioResponse, SocioUpdateRequest
 from use_cases.socio import SocioUseCase
 from infrastructure.socio_repository import SocioRepository
-from infrastructure.reporte_socios_service import ReporteSociosService
+from infrastructure.json_response import ORJSONResponse
 from fastapi.security import OAuth2PasswordBearer
 from typing import List
 import jwt
 from config import SECRET_KEY, ALGORITHM
+from infrastructure.carga_perezosa import clase_perezosa
 from io import BytesIO
 from datetime import datetime
 
 router = APIRouter(prefix="/socios", tags=["socios"])
 
+# Servicios de reportes (reportlab, matplotlib, numpy): se importan en el primer uso
+ReporteSociosService = clase_perezosa("infrastructure.reporte_socios_service", "ReporteSociosService")
+
 oauth2_scheme = OAuth2PasswordBearer(tokenUrl="/login")
 
 def get_current_user(token: str = Depends(oauth2_scheme)):
@@ -25,7 +29,8 @@ def get_current_user(token: str = Depends(oauth2_scheme)):
 @router.get("/", response_model=List[SocioResponse])
 def list_socios(current_user=Depends(get_current_user)):
     use_case = SocioUseCase(SocioRepository())
-    return use_case.list_socios()
+    # Los SocioResponse ya están validados: se serializan sin revalidar el response_model
+    return ORJSONResponse(content=[socio.dict() for socio in use_case.list_socios()])
 
 @router.post("/", response_model=SocioResponse)
 def create_socio(request: SocioRequest, current_user=Depends(get_current_user)):
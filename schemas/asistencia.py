@@ -1,5 +1,6 @@
 from pydantic import BaseModel
-from typing import Optional
+from typing import Optional, List
+from datetime import datetime
 
 class AsistenciaRequest(BaseModel):
     id_personal: int
@@ -22,4 +23,23 @@ class AsistenciaResponse(BaseModel):
 class AsistenciaUpdateRequest(BaseModel):
     hora_salida: Optional[str]
     observaciones: Optional[str]
-    estado: Optional[str] 
\ No newline at end of file
+    estado: Optional[str] 
+
+class MarcacionRequest(BaseModel):
+    """Una marcación del reloj: fecha y hora tal como las registra el equipo"""
+    id_personal: int
+    fecha_hora: datetime
+
+class MarcacionRechazada(BaseModel):
+    fila: Optional[int] = None  # línea del archivo (solo en la carga por archivo)
+    id_personal: Optional[int] = None
+    motivo: str
+
+class AsistenciaLoteResponse(BaseModel):
+    recibidas: int  # marcaciones recibidas
+    dias: int  # días distintos (empleado + fecha) con marcaciones válidas
+    insertadas: int
+    actualizadas: int
+    sin_cambios: int
+    rechazadas: int  # marcaciones descartadas
+    errores: List[MarcacionRechazada] = []  # detalle de las primeras rechazadas
@@ -7,6 +7,7 @@ class CompraRequest(BaseModel):
     estado: str
     numero_factura: Optional[str] = None
     observaciones: Optional[str] = None
+    id_club: Optional[int] = None  # None = club por defecto de la contabilización
 
 class CompraResponse(BaseModel):
     id_compra: int
@@ -18,10 +19,12 @@ class CompraResponse(BaseModel):
     observaciones: Optional[str] = None
     proveedor: Optional[str] = None
     categoria_proveedor: Optional[str] = None
+    id_club: Optional[int] = None
 
 class CompraUpdateRequest(BaseModel):
     id_proveedor: Optional[int]
     monto_total: Optional[float]
     estado: Optional[str]
     numero_factura: Optional[str]
-    observaciones: Optional[str] 
\ No newline at end of file
+    observaciones: Optional[str]
+    id_club: Optional[int]
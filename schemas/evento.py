@@ -1,5 +1,5 @@
 from pydantic import BaseModel
-from typing import Optional
+from typing import Optional, List
 
 class EventoRequest(BaseModel):
     nombre_evento: str
@@ -8,6 +8,7 @@ class EventoRequest(BaseModel):
     hora: str
     id_club: int
     estado: str
+    capacidad_maxima: Optional[int] = None  # None = sin límite
 
 class EventoResponse(BaseModel):
     id_evento: int
@@ -17,6 +18,7 @@ class EventoResponse(BaseModel):
     hora: str
     id_club: int
     estado: str
+    capacidad_maxima: Optional[int] = None
 
 class EventoUpdateRequest(BaseModel):
     nombre_evento: Optional[str]
@@ -24,4 +26,21 @@ class EventoUpdateRequest(BaseModel):
     fecha: Optional[str]
     hora: Optional[str]
     id_club: Optional[int]
-    estado: Optional[str] 
\ No newline at end of file
+    estado: Optional[str]
+    capacidad_maxima: Optional[int]
+
+class EventoResumenResponse(EventoResponse):
+    confirmadas: int = 0
+    en_espera: int = 0
+    canceladas: int = 0
+    cupos_disponibles: Optional[int] = None  # None = sin límite
+
+class CalendarioDiaResponse(BaseModel):
+    fecha: str
+    eventos: List[EventoResumenResponse]
+
+class CalendarioEventosResponse(BaseModel):
+    anio: int
+    mes: int
+    total_eventos: int
+    dias: List[CalendarioDiaResponse]  # solo los días con eventos, en orden
@@ -1,6 +1,7 @@
 from pydantic import BaseModel
 from typing import Optional
 from decimal import Decimal
+from datetime import date, datetime
 
 class MovimientoFinancieroRequest(BaseModel):
     id_club: int
@@ -34,4 +35,19 @@ class MovimientoFinancieroUpdateRequest(BaseModel):
     monto: Optional[Decimal]
     estado: Optional[str]
     referencia_relacionada: Optional[str]
-    metodo_pago: Optional[str] 
\ No newline at end of file
+    metodo_pago: Optional[str]
+
+class CierreContableResponse(BaseModel):
+    periodo: date
+    checksum: str
+    filas_origen: int
+    fecha_cierre: datetime
+    id_usuario: Optional[int] = None
+
+class VerificacionCierreResponse(BaseModel):
+    periodo: date
+    checksum: str
+    checksum_actual: str
+    filas_origen: int
+    filas_actuales: int
+    integro: bool
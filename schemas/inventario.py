@@ -1,5 +1,6 @@
 from pydantic import BaseModel
-from typing import Optional
+from typing import Optional, List
+from datetime import date
 
 class ProductoInventarioRequest(BaseModel):
     nombre_producto: str
@@ -21,4 +22,51 @@ class ProductoInventarioUpdateRequest(BaseModel):
     descripcion: Optional[str]
     cantidad_en_stock: Optional[int]
     precio_unitario: Optional[float]
-    id_club: Optional[int] 
\ No newline at end of file
+    id_club: Optional[int]
+
+class MovimientoInventarioRequest(BaseModel):
+    tipo: str  # entrada, salida o ajuste
+    cantidad: int  # entrada/salida: positiva; ajuste: con signo
+    referencia: Optional[str] = None  # p. ej. número de compra o de venta
+    observaciones: Optional[str] = None
+
+class MovimientoLoteItemRequest(MovimientoInventarioRequest):
+    id_producto: int
+
+class MovimientoInventarioResponse(BaseModel):
+    id_movimiento: int
+    id_producto: int
+    tipo: str
+    cantidad: int
+    stock_resultante: int
+    costo_unitario: float
+    referencia: Optional[str] = None
+    observaciones: Optional[str] = None
+    id_usuario: Optional[int] = None
+    fecha: str
+
+class StockProductoResponse(BaseModel):
+    id_producto: int
+    stock_anterior: int
+    stock_nuevo: int
+
+class MovimientoRechazado(BaseModel):
+    id_producto: int
+    motivo: str
+    stock_actual: Optional[int] = None
+    cantidad: int
+
+class MovimientoLoteResponse(BaseModel):
+    movimientos: int
+    productos: List[StockProductoResponse]
+
+class ValoracionClubResponse(BaseModel):
+    id_club: int
+    productos_con_stock: int
+    valor: float
+
+class ValoracionInventarioResponse(BaseModel):
+    fecha_corte: date
+    productos_con_stock: int
+    valor_total: float
+    clubes: List[ValoracionClubResponse] = []
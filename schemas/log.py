@@ -19,4 +19,8 @@ class LogSistemaResponse(BaseModel):
     id_afectado: Optional[int] = None
     descripcion_detallada: Optional[str] = None
     ip_address: Optional[str] = None
-    user_agent: Optional[str] = None 
\ No newline at end of file
+    user_agent: Optional[str] = None
+
+class LogSistemaEncoladoResponse(BaseModel):
+    encolado: bool
+    fecha_y_hora: str
@@ -7,6 +7,9 @@ class PagoRequest(BaseModel):
     tipo_pago: int
     estado_pago: int
     observaciones: Optional[str] = None
+    # Pago hecho en una pasarela, "<pasarela>:<id>" (p. ej. "mercadopago:123456789").
+    # Si queda pendiente, el job de conciliación lo confirma o anula
+    referencia_pasarela: Optional[str] = None
 
 class PagoResponse(BaseModel):
     id_pago: int
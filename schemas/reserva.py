@@ -5,9 +5,10 @@ from datetime import datetime
 class ReservaRequest(BaseModel):
     id_evento: int
     id_socio: int
-    fecha_reserva: datetime
-    estado: str
+    fecha_reserva: Optional[datetime] = None  # la asigna el servidor
+    estado: Optional[str] = None  # lo decide la disponibilidad de cupos
     notas: Optional[str] = None
+    lista_espera: bool = True  # sin cupo: quedar en espera (True) o rechazar con 409 (False)
 
 class ReservaResponse(BaseModel):
     id_reserva: int
@@ -17,6 +18,7 @@ class ReservaResponse(BaseModel):
     estado: str
     notas: Optional[str] = None
     fecha_creacion: str
+    posicion_espera: Optional[int] = None  # solo al crear una reserva en espera
 
 class ReservaUpdateRequest(BaseModel):
     id_evento: Optional[int] = None
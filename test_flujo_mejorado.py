@@ -46,7 +46,7 @@ def generar_qr_pago(token):
         print(f"   Referencia temporal: {qr_data['datos_pago']['referencia_temporal']}")
         print(f"   Monto: Bs. {qr_data['datos_pago']['total_pago']}")
         print(f"   Fecha límite: {qr_data['datos_pago']['fecha_limite']}")
-        print(f"   Archivo QR: {qr_data['qr']['qr_image']}")
+        print(f"   URL QR: {qr_data['qr']['qr_url']}")
         print("   Instrucciones:")
         for i, instruccion in enumerate(qr_data['qr']['instrucciones'], 1):
             print(f"   {i}. {instruccion}")
@@ -1,4 +1,5 @@
 from infrastructure.accion_repository import AccionRepository
+from infrastructure.row_mapper import como_dict
 from schemas.accion import AccionRequest, AccionResponse, AccionUpdateRequest
 from fastapi import HTTPException
 from typing import List
@@ -7,45 +8,51 @@ class AccionUseCase:
     def __init__(self, accion_repository: AccionRepository):
         self.accion_repository = accion_repository
 
-    def list_acciones(self) -> List[AccionResponse]:
+    def list_acciones(self) -> List[dict]:
+        """
+        Lista las acciones con su estado de pagos.
+        Devuelve los payloads ya construidos (campos de AccionResponse más los de
+        AccionResponseCompleta) para que el router los serialice directamente,
+        sin una segunda validación.
+        """
         acciones = self.accion_repository.list_acciones()
+        # Una sola consulta de pagos para todas las acciones
+        pagos_por_accion = self.accion_repository.get_pagos_por_accion()
         acciones_con_estado = []
         
         for accion in acciones:
             try:
-                # Obtener modalidad de pago
+                # Modalidad y estado vienen de la caché de catálogos
                 modalidad = self.accion_repository.get_modalidad_pago(accion.modalidad_pago)
-                # Obtener estado de acción
                 estado_accion = self.accion_repository.get_estado_accion(accion.estado_accion)
-                # Obtener pagos realizados
-                pagos_realizados = self.accion_repository.get_pagos(accion.id_accion)
+                pagos_realizados = pagos_por_accion.get(accion.id_accion, [])
+                
+                estado_accion_info = {
+                    "id": estado_accion["id_estado_accion"],
+                    "nombre": estado_accion["nombre_estado_accion"]
+                } if estado_accion else {
+                    "id": accion.estado_accion,
+                    "nombre": "Desconocido"
+                }
                 
                 if modalidad:
                     # Calcular estado completo de pagos
                     estado_pagos = self.accion_repository.calcular_estado_pagos(accion, modalidad, pagos_realizados)
-                    
-                    # Crear respuesta con toda la información
-                    accion_response = AccionResponse(**accion.__dict__).dict()
-                    accion_response.update({
-                        "estado_accion_info": {
-                            "id": estado_accion["id_estado_accion"] if estado_accion else accion.estado_accion,
-                            "nombre": estado_accion["nombre_estado_accion"] if estado_accion else "Desconocido"
-                        } if estado_accion else {
-                            "id": accion.estado_accion,
-                            "nombre": "Desconocido"
-                        },
-                        "estado_pagos": {
+                    accion_response = self._accion_payload(
+                        accion,
+                        estado_accion_info,
+                        {
                             "estado_pago": estado_pagos["estado_pago"],
-                            "porcentaje_pagado": estado_pagos["porcentaje_pagado"],
-                            "saldo_pendiente": estado_pagos["saldo_pendiente"],
+                            "porcentaje_pagado": float(estado_pagos["porcentaje_pagado"]),
+                            "saldo_pendiente": float(estado_pagos["saldo_pendiente"]),
                             "pagos_restantes": estado_pagos["pagos_restantes"],
-                            "precio_inicial": estado_pagos["precio_inicial"],
-                            "costo_renovacion_mensual": estado_pagos["costo_renovacion_mensual"],
-                            "total_pagado": estado_pagos["total_pagado"],
+                            "precio_inicial": float(estado_pagos["precio_inicial"]),
+                            "costo_renovacion_mensual": float(estado_pagos["costo_renovacion_mensual"]),
+                            "total_pagado": float(estado_pagos["total_pagado"]),
                             "pagos_realizados": estado_pagos["pagos_realizados"],
                             "renovar": estado_pagos["renovar"]
                         },
-                        "modalidad_pago_info": {
+                        {
                             "descripcion": modalidad["descripcion"],
                             "meses_de_gracia": modalidad["meses_de_gracia"],
                             "porcentaje_renovacion_inicial": modalidad["porcentaje_renovacion_inicial"],
@@ -53,88 +60,99 @@ class AccionUseCase:
                             "costo_renovacion_estandar": modalidad["costo_renovacion_estandar"],
                             "cantidad_cuotas": modalidad["cantidad_cuotas"]
                         }
-                    })
-                    acciones_con_estado.append(accion_response)
+                    )
                 else:
                     # Si no hay modalidad, agregar con valores por defecto
-                    accion_response = AccionResponse(**accion.__dict__).dict()
-                    accion_response.update({
-                        "estado_accion_info": {
-                            "id": estado_accion["id_estado_accion"] if estado_accion else accion.estado_accion,
-                            "nombre": estado_accion["nombre_estado_accion"] if estado_accion else "Desconocido"
-                        } if estado_accion else {
-                            "id": accion.estado_accion,
-                            "nombre": "Desconocido"
-                        },
-                        "estado_pagos": {
-                            "estado_pago": "MODALIDAD_NO_ENCONTRADA",
-                            "porcentaje_pagado": 0,
-                            "saldo_pendiente": 0,
-                            "pagos_restantes": 0,
-                            "precio_inicial": 0,
-                            "costo_renovacion_mensual": 0,
-                            "total_pagado": 0,
-                            "pagos_realizados": 0,
-                            "renovar": False
-                        },
-                        "modalidad_pago_info": {
-                            "descripcion": "No encontrada",
-                            "meses_de_gracia": 0,
-                            "porcentaje_renovacion_inicial": 0,
-                            "porcentaje_renovacion_mensual": 0,
-                            "costo_renovacion_estandar": 0,
-                            "cantidad_cuotas": 1
-                        }
-                    })
-                    acciones_con_estado.append(accion_response)
+                    accion_response = self._accion_payload(
+                        accion,
+                        estado_accion_info,
+                        self._estado_pagos_vacio("MODALIDAD_NO_ENCONTRADA"),
+                        self._modalidad_vacia("No encontrada")
+                    )
                     
             except Exception as e:
                 # Si hay error, agregar con estado de error
-                accion_response = AccionResponse(**accion.__dict__).dict()
-                accion_response.update({
-                    "estado_accion_info": {
-                        "id": accion.estado_accion,
-                        "nombre": "Error"
-                    },
-                    "estado_pagos": {
-                        "estado_pago": "ERROR_CALCULO",
-                        "porcentaje_pagado": 0,
-                        "saldo_pendiente": 0,
-                        "pagos_restantes": 0,
-                        "precio_inicial": 0,
-                        "costo_renovacion_mensual": 0,
-                        "total_pagado": 0,
-                        "pagos_realizados": 0,
-                        "renovar": False
-                    },
-                    "modalidad_pago_info": {
-                        "descripcion": "Error",
-                        "meses_de_gracia": 0,
-                        "porcentaje_renovacion_inicial": 0,
-                        "porcentaje_renovacion_mensual": 0,
-                        "costo_renovacion_estandar": 0,
-                        "cantidad_cuotas": 1
-                    }
-                })
-                acciones_con_estado.append(accion_response)
+                accion_response = self._accion_payload(
+                    accion,
+                    {"id": accion.estado_accion, "nombre": "Error"},
+                    self._estado_pagos_vacio("ERROR_CALCULO"),
+                    self._modalidad_vacia("Error")
+                )
+            acciones_con_estado.append(accion_response)
         
         return acciones_con_estado
 
+    @staticmethod
+    def _accion_base(accion) -> dict:
+        """Campos de AccionResponse tomados directamente de la entidad"""
+        return {
+            "id_accion": accion.id_accion,
+            "id_club": accion.id_club,
+            "id_socio": accion.id_socio,
+            "modalidad_pago": accion.modalidad_pago,
+            "estado_accion": accion.estado_accion,
+            "certificado_pdf": accion.certificado_pdf,
+            "certificado_cifrado": bool(accion.certificado_cifrado),
+            "fecha_emision_certificado": accion.fecha_emision_certificado,
+            "tipo_accion": accion.tipo_accion,
+            "socio_titular": accion.socio_titular,
+            "cantidad_acciones": accion.cantidad_acciones,
+            "precio_unitario": accion.precio_unitario,
+            "total_pago": accion.total_pago,
+            "metodo_pago": accion.metodo_pago,
+            "qr_data": accion.qr_data,
+            "fecha_venta": accion.fecha_venta,
+            "comprobante_path": accion.comprobante_path,
+            "fecha_comprobante": accion.fecha_comprobante
+        }
+
+    def _accion_payload(self, accion, estado_accion_info: dict, estado_pagos: dict, modalidad_pago_info: dict) -> dict:
+        payload = self._accion_base(accion)
+        payload["estado_accion_info"] = estado_accion_info
+        payload["estado_pagos"] = estado_pagos
+        payload["modalidad_pago_info"] = modalidad_pago_info
+        return payload
+
+    @staticmethod
+    def _estado_pagos_vacio(estado_pago: str) -> dict:
+        return {
+            "estado_pago": estado_pago,
+            "porcentaje_pagado": 0.0,
+            "saldo_pendiente": 0.0,
+            "pagos_restantes": 0,
+            "precio_inicial": 0.0,
+            "costo_renovacion_mensual": 0.0,
+            "total_pagado": 0.0,
+            "pagos_realizados": 0,
+            "renovar": False
+        }
+
+    @staticmethod
+    def _modalidad_vacia(descripcion: str) -> dict:
+        return {
+            "descripcion": descripcion,
+            "meses_de_gracia": 0,
+            "porcentaje_renovacion_inicial": 0.0,
+            "porcentaje_renovacion_mensual": 0.0,
+            "costo_renovacion_estandar": 0.0,
+            "cantidad_cuotas": 1
+        }
+
     def get_accion(self, accion_id: int) -> AccionResponse:
         accion = self.accion_repository.get_accion(accion_id)
         if not accion:
             raise HTTPException(status_code=404, detail="Acción no encontrada")
-        return AccionResponse(**accion.__dict__)
+        return AccionResponse(**como_dict(accion))
 
     def create_accion(self, data: AccionRequest) -> AccionResponse:
         accion = self.accion_repository.create_accion(data)
-        return AccionResponse(**accion.__dict__)
+        return AccionResponse(**como_dict(accion))
 
     def update_accion(self, accion_id: int, data: AccionUpdateRequest) -> AccionResponse:
         accion = self.accion_repository.update_accion(accion_id, data)
         if not accion:
             raise HTTPException(status_code=404, detail="Acción no encontrada")
-        return AccionResponse(**accion.__dict__)
+        return AccionResponse(**como_dict(accion))
 
     def delete_accion(self, accion_id: int) -> dict:
         success = self.accion_repository.delete_accion(accion_id)
@@ -290,17 +308,18 @@ class AccionUseCase:
     def list_acciones_con_estado_pagos(self):
         """Lista todas las acciones con estado de pagos resumido"""
         acciones = self.accion_repository.list_acciones()
+        pagos_por_accion = self.accion_repository.get_pagos_por_accion()
         acciones_con_estado = []
         
         for accion in acciones:
             try:
                 modalidad = self.accion_repository.get_modalidad_pago(accion.modalidad_pago)
-                pagos_realizados = self.accion_repository.get_pagos(accion.id_accion)
+                pagos_realizados = pagos_por_accion.get(accion.id_accion, [])
                 
                 if modalidad:
                     estado_pagos = self.accion_repository.calcular_estado_pagos(accion, modalidad, pagos_realizados)
                     acciones_con_estado.append({
-                        **AccionResponse(**accion.__dict__).dict(),
+                        **self._accion_base(accion),
                         "estado_pagos": {
                             "estado_pago": estado_pagos["estado_pago"],
                             "porcentaje_pagado": estado_pagos["porcentaje_pagado"],
@@ -310,7 +329,7 @@ class AccionUseCase:
                     })
                 else:
                     acciones_con_estado.append({
-                        **AccionResponse(**accion.__dict__).dict(),
+                        **self._accion_base(accion),
                         "estado_pagos": {
                             "estado_pago": "MODALIDAD_NO_ENCONTRADA",
                             "porcentaje_pagado": 0,
@@ -321,7 +340,7 @@ class AccionUseCase:
             except Exception as e:
                 # Si hay error, agregar con estado de error
                 acciones_con_estado.append({
-                    **AccionResponse(**accion.__dict__).dict(),
+                    **self._accion_base(accion),
                     "estado_pagos": {
                         "estado_pago": "ERROR_CALCULO",
                         "porcentaje_pagado": 0,
@@ -1,7 +1,16 @@
 from infrastructure.asistencia_repository import AsistenciaRepository
-from schemas.asistencia import AsistenciaRequest, AsistenciaResponse, AsistenciaUpdateRequest
+from schemas.asistencia import (AsistenciaRequest, AsistenciaResponse, AsistenciaUpdateRequest,
+                                MarcacionRequest, MarcacionRechazada, AsistenciaLoteResponse)
 from fastapi import HTTPException
-from typing import List
+from datetime import datetime
+from typing import List, Optional, Tuple
+from config import ASISTENCIA_LOTE_MAXIMO
+import csv
+import io
+
+# Detalle de rechazos que se devuelve en la respuesta de una carga masiva
+_MAXIMO_ERRORES = 100
+_FORMATOS_FECHA_HORA = ("%d/%m/%Y %H:%M:%S", "%d/%m/%Y %H:%M", "%Y/%m/%d %H:%M:%S", "%Y/%m/%d %H:%M")
 
 class AsistenciaUseCase:
     def __init__(self, asistencia_repository: AsistenciaRepository):
@@ -25,6 +34,117 @@ class AsistenciaUseCase:
             raise HTTPException(status_code=404, detail="Asistencia no encontrada")
         return self._transform_to_response(a)
     
+    def registrar_lote(self, marcaciones: List[MarcacionRequest]) -> AsistenciaLoteResponse:
+        """Carga masiva de marcaciones recibidas como arreglo JSON"""
+        return self._guardar_lote([(None, m.id_personal, m.fecha_hora) for m in marcaciones], [])
+
+    def registrar_lote_archivo(self, contenido: bytes) -> AsistenciaLoteResponse:
+        """
+        Carga masiva desde el archivo exportado por el reloj (CSV con encabezado,
+        separado por coma, punto y coma o tabulador). Columnas: id_personal y
+        fecha_hora, o id_personal, fecha y hora. Las filas inválidas se rechazan
+        sin detener la carga.
+        """
+        try:
+            texto = contenido.decode("utf-8-sig")
+        except UnicodeDecodeError:
+            texto = contenido.decode("latin-1")
+        if not texto.strip():
+            raise HTTPException(status_code=400, detail="El archivo está vacío")
+
+        try:
+            dialecto = csv.Sniffer().sniff(texto[:4096], delimiters=",;\t")
+        except csv.Error:
+            dialecto = csv.excel
+        lector = csv.DictReader(io.StringIO(texto), dialect=dialecto)
+        lector.fieldnames = [(c or "").strip().lower() for c in (lector.fieldnames or [])]
+        if "id_personal" not in lector.fieldnames or not (
+                "fecha_hora" in lector.fieldnames or {"fecha", "hora"} <= set(lector.fieldnames)):
+            raise HTTPException(status_code=400,
+                                detail="El archivo debe tener las columnas id_personal y fecha_hora (o fecha y hora)")
+
+        marcaciones, rechazadas = [], []
+        for fila in lector:
+            numero = lector.line_num
+            if len(marcaciones) + len(rechazadas) >= ASISTENCIA_LOTE_MAXIMO:
+                raise HTTPException(status_code=413,
+                                    detail=f"Máximo {ASISTENCIA_LOTE_MAXIMO} marcaciones por carga")
+            try:
+                id_personal = int((fila.get("id_personal") or "").strip())
+            except ValueError:
+                rechazadas.append(MarcacionRechazada(fila=numero, motivo="id_personal inválido"))
+                continue
+            valor = fila.get("fecha_hora") or f"{fila.get('fecha') or ''} {fila.get('hora') or ''}"
+            fecha_hora = self._parsear_fecha_hora(valor)
+            if not fecha_hora:
+                rechazadas.append(MarcacionRechazada(fila=numero, id_personal=id_personal,
+                                                     motivo=f"Fecha y hora inválidas: '{valor.strip()}'"))
+                continue
+            marcaciones.append((numero, id_personal, fecha_hora))
+        return self._guardar_lote(marcaciones, rechazadas)
+
+    def _guardar_lote(self, marcaciones: List[Tuple[Optional[int], int, datetime]],
+                      rechazadas: List[MarcacionRechazada]) -> AsistenciaLoteResponse:
+        """
+        Agrupa las marcaciones por empleado y día (primera = ingreso, última =
+        salida) y las guarda con un único upsert.
+        """
+        recibidas = len(marcaciones) + len(rechazadas)
+        if recibidas > ASISTENCIA_LOTE_MAXIMO:
+            raise HTTPException(status_code=413, detail=f"Máximo {ASISTENCIA_LOTE_MAXIMO} marcaciones por carga")
+
+        dias = {}
+        for _, id_personal, fecha_hora in marcaciones:
+            clave = (id_personal, fecha_hora.date())
+            hora = fecha_hora.time().replace(microsecond=0)
+            if clave in dias:
+                primera, ultima = dias[clave]
+                dias[clave] = (min(primera, hora), max(ultima, hora))
+            else:
+                dias[clave] = (hora, hora)
+
+        registros = [
+            {"id_personal": id_personal, "fecha": fecha, "hora_ingreso": primera,
+             "hora_salida": ultima if ultima != primera else None}
+            for (id_personal, fecha), (primera, ultima) in dias.items()
+        ]
+        resultado = self.asistencia_repository.upsert_asistencias_lote(registros)
+
+        # Las marcaciones de empleados que no existen se descartan en la base
+        inexistentes = set(resultado["personal_inexistente"])
+        if inexistentes:
+            for fila, id_personal, _ in marcaciones:
+                if id_personal in inexistentes:
+                    rechazadas.append(MarcacionRechazada(fila=fila, id_personal=id_personal,
+                                                         motivo="Empleado inexistente"))
+        dias_validos = sum(1 for id_personal, _ in dias if id_personal not in inexistentes)
+
+        return AsistenciaLoteResponse(
+            recibidas=recibidas,
+            dias=dias_validos,
+            insertadas=resultado["insertadas"],
+            actualizadas=resultado["actualizadas"],
+            sin_cambios=dias_validos - resultado["insertadas"] - resultado["actualizadas"],
+            rechazadas=len(rechazadas),
+            errores=rechazadas[:_MAXIMO_ERRORES],
+        )
+
+    @staticmethod
+    def _parsear_fecha_hora(valor: str) -> Optional[datetime]:
+        valor = valor.strip()
+        if not valor:
+            return None
+        try:
+            return datetime.fromisoformat(valor).replace(tzinfo=None)
+        except ValueError:
+            pass
+        for formato in _FORMATOS_FECHA_HORA:
+            try:
+                return datetime.strptime(valor, formato)
+            except ValueError:
+                continue
+        return None
+
     def _transform_to_response(self, asistencia) -> AsistenciaResponse:
         """Transforma los datos de asistencia al formato requerido"""
         # Obtener el nombre del empleado
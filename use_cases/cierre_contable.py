@@ -0,0 +1,43 @@
+from infrastructure.contabilidad_repository import ContabilidadRepository, snapshots_contables
+from schemas.finanza import CierreContableResponse, VerificacionCierreResponse
+from fastapi import HTTPException
+from datetime import date
+from typing import List, Optional
+
+
+class CierreContableUseCase:
+    """
+    Cierre mensual de las cifras contables. Un mes solo puede cerrarse cuando
+    ya terminó; para corregir un mes cerrado hay que reabrirlo y volver a cerrarlo.
+    """
+
+    def __init__(self, contabilidad_repository: ContabilidadRepository):
+        self.contabilidad_repository = contabilidad_repository
+
+    def listar(self) -> List[CierreContableResponse]:
+        return [CierreContableResponse(**c) for c in self.contabilidad_repository.listar_cierres()]
+
+    def cerrar(self, anio: int, mes: int, id_usuario: Optional[int]) -> CierreContableResponse:
+        periodo = self._periodo(anio, mes)
+        hoy = date.today()
+        if (periodo.year, periodo.month) >= (hoy.year, hoy.month):
+            raise HTTPException(status_code=400, detail="Solo se pueden cerrar meses ya terminados")
+        cierre = self.contabilidad_repository.cerrar_periodo(periodo, id_usuario)
+        if not cierre:
+            raise HTTPException(status_code=409, detail=f"El período {anio:04d}-{mes:02d} ya está cerrado")
+        snapshots_contables.invalidar()
+        return CierreContableResponse(**cierre)
+
+    def reabrir(self, anio: int, mes: int):
+        if not self.contabilidad_repository.reabrir_periodo(self._periodo(anio, mes)):
+            raise HTTPException(status_code=404, detail="El período no está cerrado")
+        snapshots_contables.invalidar()
+        return {"detail": f"Período {anio:04d}-{mes:02d} reabierto"}
+
+    def verificar(self) -> List[VerificacionCierreResponse]:
+        return [VerificacionCierreResponse(**v) for v in self.contabilidad_repository.verificar_cierres()]
+
+    def _periodo(self, anio: int, mes: int) -> date:
+        if not 1 <= mes <= 12:
+            raise HTTPException(status_code=400, detail="Mes inválido")
+        return date(anio, mes, 1)
@@ -1,4 +1,5 @@
 from infrastructure.compra_repository import CompraRepository
+from infrastructure.row_mapper import como_dict
 from schemas.compra import CompraRequest, CompraResponse, CompraUpdateRequest
 from fastapi import HTTPException
 from typing import List
@@ -9,23 +10,23 @@ class CompraUseCase:
 
     def list_compras(self) -> List[CompraResponse]:
         compras = self.compra_repository.list_compras()
-        return [CompraResponse(**c.__dict__) for c in compras]
+        return [CompraResponse(**como_dict(c)) for c in compras]
 
     def get_compra(self, compra_id: int) -> CompraResponse:
         c = self.compra_repository.get_compra(compra_id)
         if not c:
             raise HTTPException(status_code=404, detail="Compra no encontrada")
-        return CompraResponse(**c.__dict__)
+        return CompraResponse(**como_dict(c))
 
     def create_compra(self, data: CompraRequest) -> CompraResponse:
         c = self.compra_repository.create_compra(data)
-        return CompraResponse(**c.__dict__)
+        return CompraResponse(**como_dict(c))
 
     def update_compra(self, compra_id: int, data: CompraUpdateRequest) -> CompraResponse:
         c = self.compra_repository.update_compra(compra_id, data)
         if not c:
             raise HTTPException(status_code=404, detail="Compra no encontrada")
-        return CompraResponse(**c.__dict__)
+        return CompraResponse(**como_dict(c))
 
     def delete_compra(self, compra_id: int) -> dict:
         success = self.compra_repository.delete_compra(compra_id)
@@ -0,0 +1,258 @@
+from infrastructure.conciliacion_repository import ConciliacionRepository
+from infrastructure.pago_repository import PagoRepository
+from infrastructure.webhook_repository import WebhookRepository
+from infrastructure.webhook_worker import procesador_webhooks
+from infrastructure.temp_payment_service import TempPaymentService
+from config import CONCILIACION_CONCURRENCIA, CONCILIACION_TAMANO_PAGINA
+from concurrent.futures import ThreadPoolExecutor
+from datetime import datetime
+from typing import Any, Dict, List
+import logging
+
+# Catálogo estado_pago
+ESTADO_PAGO_PENDIENTE = 1
+ESTADO_PAGO_PAGADO = 2
+ESTADO_PAGO_ANULADO = 3
+
+CONFIRMADO = "confirmado"
+CANCELADO = "cancelado"
+PENDIENTE = "pendiente"
+
+# Estado de cada pasarela -> resultado de la conciliación (lo no listado sigue pendiente)
+ESTADOS_PASARELA = {
+    "stripe": {"succeeded": CONFIRMADO, "canceled": CANCELADO},
+    "mercadopago": {"approved": CONFIRMADO, "rejected": CANCELADO, "cancelled": CANCELADO,
+                    "refunded": CANCELADO, "charged_back": CANCELADO},
+    "paypal": {"approved": CONFIRMADO, "completed": CONFIRMADO, "failed": CANCELADO,
+               "canceled": CANCELADO, "expired": CANCELADO},
+}
+
+# Detalle acotado en el reporte (el resumen siempre cuenta todo)
+MAXIMO_DETALLE = 500
+
+
+class ConciliacionUseCase:
+    """
+    Job de conciliación: recorre por páginas los pagos temporales pendientes y
+    las filas pendientes de pago_accion con referencia de pasarela, consulta las
+    pasarelas en lote con concurrencia acotada y aplica los cambios por página.
+
+    - Pago temporal confirmado (Stripe / MercadoPago): se encola en webhook_inbox
+      el mismo evento que habría enviado la pasarela; el worker de webhooks crea
+      la acción de forma idempotente (no se duplica si el webhook llega después).
+    - Pago temporal confirmado en PayPal: se marca confirmado y queda para revisión
+      (la acción se crea al ejecutar el pago, que requiere el payer_id).
+    - Pago temporal cancelado: se elimina, igual que con el webhook de cancelación.
+    - pago_accion: pasa a pagado / anulado en una transacción por página.
+    """
+
+    def __init__(self, conciliacion_repository: ConciliacionRepository, pago_repository: PagoRepository,
+                 webhook_repository: WebhookRepository):
+        self.conciliacion_repository = conciliacion_repository
+        self.pago_repository = pago_repository
+        self.webhook_repository = webhook_repository
+        self.temp_payment_service = TempPaymentService()
+
+    def ejecutar(self, origen: str = "programado") -> Dict[str, Any]:
+        with self.conciliacion_repository.bloqueo_exclusivo() as turno:
+            if not turno:
+                return {"estado": "omitido", "motivo": "Otra conciliación está en curso"}
+
+            inicio = datetime.now()
+            self._reporte = {
+                "resumen": {
+                    "pagos_temporales": {"revisados": 0, "confirmados": 0, "cancelados": 0,
+                                         "pendientes": 0, "sin_pasarela": 0, "errores": 0},
+                    "pagos_accion": {"revisados": 0, "pagados": 0, "anulados": 0,
+                                     "pendientes": 0, "errores": 0},
+                    "consultas_pasarela": 0,
+                },
+                "detalle": [],
+            }
+            self._pagos_mercadopago = None
+
+            with ThreadPoolExecutor(max_workers=CONCILIACION_CONCURRENCIA,
+                                    thread_name_prefix="conciliacion") as pool:
+                for pagina in self.temp_payment_service.paginar_pendientes(CONCILIACION_TAMANO_PAGINA):
+                    self._conciliar_temporales(pool, pagina)
+                for pagina in self.pago_repository.paginar_pendientes_pasarela(
+                        ESTADO_PAGO_PENDIENTE, CONCILIACION_TAMANO_PAGINA):
+                    self._conciliar_pagos_accion(pool, pagina)
+
+            fin = datetime.now()
+            reporte = self._reporte
+            reporte["resumen"]["duracion_segundos"] = round((fin - inicio).total_seconds(), 2)
+            reporte["fecha_inicio"] = inicio
+            reporte["fecha_fin"] = fin
+            reporte["id_reporte"] = self.conciliacion_repository.guardar_reporte(reporte, origen)
+            logging.info(f"Conciliación de pagos terminada: {reporte['resumen']}")
+            return reporte
+
+    def ultimo_reporte(self):
+        return self.conciliacion_repository.get_ultimo_reporte()
+
+    # ---------- Pagos temporales ----------
+
+    def _conciliar_temporales(self, pool: ThreadPoolExecutor, pagina: List[Dict[str, Any]]):
+        resumen = self._reporte["resumen"]["pagos_temporales"]
+        resumen["revisados"] += len(pagina)
+
+        por_pasarela: Dict[str, List[Dict[str, Any]]] = {}
+        for temp_payment in pagina:
+            pasarela = temp_payment.get("pasarela")
+            if pasarela in ESTADOS_PASARELA:
+                por_pasarela.setdefault(pasarela, []).append(temp_payment)
+            else:
+                resumen["sin_pasarela"] += 1
+
+        # Consultas a las pasarelas (en paralelo, acotadas por el pool)
+        estados: Dict[str, Dict[str, Any]] = {}
+        tareas = []
+        stripe_refs = [p["referencia_temporal"] for p in por_pasarela.get("stripe", [])]
+        if stripe_refs:
+            from infrastructure.stripe_service import StripeService
+            stripe_service = StripeService()
+            for inicio in range(0, len(stripe_refs), 10):
+                tareas.append(("stripe", stripe_refs[inicio:inicio + 10],
+                               pool.submit(stripe_service.buscar_pagos_por_referencias, stripe_refs[inicio:inicio + 10])))
+        if por_pasarela.get("paypal"):
+            from infrastructure.paypal_service import PayPalService
+            paypal_service = PayPalService()
+            for temp_payment in por_pasarela["paypal"]:
+                tareas.append(("paypal", [temp_payment["referencia_temporal"]],
+                               pool.submit(paypal_service.obtener_pago, temp_payment["id_pasarela"])))
+        if por_pasarela.get("mercadopago") and self._pagos_mercadopago is None:
+            # Un solo listado paginado de pagos recientes sirve para todas las páginas
+            from infrastructure.mercadopago_service import MercadoPagoService
+            tareas.append(("mercadopago", [p["referencia_temporal"] for p in por_pasarela["mercadopago"]],
+                           pool.submit(MercadoPagoService().buscar_pagos_recientes)))
+
+        for pasarela, referencias, futuro in tareas:
+            self._reporte["resumen"]["consultas_pasarela"] += 1
+            try:
+                resultado = futuro.result()
+            except Exception as e:
+                resumen["errores"] += len(referencias)
+                for ref in referencias:
+                    self._detalle({"origen": "temporal", "referencia": ref, "pasarela": pasarela,
+                                   "resultado": "error", "error": str(e)})
+                if pasarela == "mercadopago":
+                    self._pagos_mercadopago = {}
+                continue
+            if pasarela == "stripe":
+                for ref in referencias:
+                    if ref in resultado:
+                        estados[ref] = resultado[ref]
+            elif pasarela == "paypal":
+                estados[referencias[0]] = {"status": resultado["state"], "payment_id": resultado["payment_id"]}
+            else:
+                self._pagos_mercadopago = resultado
+
+        if self._pagos_mercadopago:
+            for temp_payment in por_pasarela.get("mercadopago", []):
+                ref = temp_payment["referencia_temporal"]
+                if ref in self._pagos_mercadopago:
+                    estados[ref] = self._pagos_mercadopago[ref]
+
+        self._aplicar_temporales(por_pasarela, estados)
+
+    def _aplicar_temporales(self, por_pasarela: Dict[str, List[Dict[str, Any]]], estados: Dict[str, Dict[str, Any]]):
+        resumen = self._reporte["resumen"]["pagos_temporales"]
+        eventos = []
+        for pasarela, pagos in por_pasarela.items():
+            for temp_payment in pagos:
+                ref = temp_payment["referencia_temporal"]
+                info = estados.get(ref)
+                resultado = ESTADOS_PASARELA[pasarela].get(info["status"], PENDIENTE) if info else PENDIENTE
+
+                if resultado == PENDIENTE:
+                    resumen["pendientes"] += 1
+                    continue
+
+                if resultado == CANCELADO:
+                    self.temp_payment_service.delete_temp_payment(ref)
+                    resumen["cancelados"] += 1
+                elif pasarela == "stripe":
+                    eventos.append(("stripe", f"conciliacion:{info['payment_intent_id']}", "payment_intent.succeeded", {
+                        "id": f"conciliacion:{info['payment_intent_id']}",
+                        "type": "payment_intent.succeeded",
+                        "data": {"object": {
+                            "id": info["payment_intent_id"],
+                            "amount": info["amount"],
+                            "currency": info["currency"],
+                            "metadata": info["metadata"],
+                        }},
+                    }))
+                    resumen["confirmados"] += 1
+                elif pasarela == "mercadopago":
+                    eventos.append(("mercadopago", f"conciliacion:{info['payment_id']}", "payment.updated", {
+                        "action": "payment.updated",
+                        "data": {"id": info["payment_id"]},
+                    }))
+                    resumen["confirmados"] += 1
+                else:
+                    self.temp_payment_service.confirm_temp_payment(ref)
+                    resumen["confirmados"] += 1
+                    resultado = "confirmado_requiere_revision"
+
+                self._detalle({"origen": "temporal", "referencia": ref, "pasarela": pasarela,
+                               "estado_pasarela": info["status"], "resultado": resultado})
+
+        # Los eventos de la página se encolan en una sola transacción
+        if eventos:
+            self.webhook_repository.registrar_eventos(eventos)
+            procesador_webhooks.avisar()
+
+    # ---------- pago_accion ----------
+
+    def _conciliar_pagos_accion(self, pool: ThreadPoolExecutor, pagina: List[Dict[str, Any]]):
+        resumen = self._reporte["resumen"]["pagos_accion"]
+        resumen["revisados"] += len(pagina)
+
+        tareas = []
+        for pago in pagina:
+            pasarela, _, id_pasarela = pago["referencia_pasarela"].partition(":")
+            if pasarela not in ESTADOS_PASARELA or not id_pasarela:
+                resumen["errores"] += 1
+                self._detalle({"origen": "pago_accion", "id_pago": pago["id_pago"], "resultado": "error",
+                               "error": f"Referencia de pasarela inválida: {pago['referencia_pasarela']}"})
+                continue
+            tareas.append((pago, pasarela, pool.submit(self._consultar_pago, pasarela, id_pasarela)))
+
+        cambios = []
+        for pago, pasarela, futuro in tareas:
+            self._reporte["resumen"]["consultas_pasarela"] += 1
+            try:
+                estado_pasarela = futuro.result()
+            except Exception as e:
+                resumen["errores"] += 1
+                self._detalle({"origen": "pago_accion", "id_pago": pago["id_pago"], "pasarela": pasarela,
+                               "resultado": "error", "error": str(e)})
+                continue
+
+            resultado = ESTADOS_PASARELA[pasarela].get(estado_pasarela, PENDIENTE)
+            if resultado == PENDIENTE:
+                resumen["pendientes"] += 1
+                continue
+            estado_pago = ESTADO_PAGO_PAGADO if resultado == CONFIRMADO else ESTADO_PAGO_ANULADO
+            cambios.append({"id_pago": pago["id_pago"], "estado_pago": estado_pago})
+            resumen["pagados" if estado_pago == ESTADO_PAGO_PAGADO else "anulados"] += 1
+            self._detalle({"origen": "pago_accion", "id_pago": pago["id_pago"], "id_accion": pago["id_accion"],
+                           "pasarela": pasarela, "estado_pasarela": estado_pasarela, "resultado": resultado})
+
+        # Todos los cambios de la página en una transacción
+        self.pago_repository.actualizar_estados_pendientes(cambios, ESTADO_PAGO_PENDIENTE)
+
+    def _consultar_pago(self, pasarela: str, id_pasarela: str) -> str:
+        if pasarela == "stripe":
+            from infrastructure.stripe_service import StripeService
+            return StripeService().verificar_pago(id_pasarela)["status"]
+        if pasarela == "mercadopago":
+            from infrastructure.mercadopago_service import MercadoPagoService
+            return MercadoPagoService().obtener_pago(id_pasarela)["status"]
+        from infrastructure.paypal_service import PayPalService
+        return PayPalService().obtener_pago(id_pasarela)["state"]
+
+    def _detalle(self, entrada: Dict[str, Any]):
+        if len(self._reporte["detalle"]) < MAXIMO_DETALLE:
+            self._reporte["detalle"].append(entrada)
@@ -0,0 +1,65 @@
+from infrastructure.etl_bi_repository import EtlBiRepository, TABLAS_BI
+from config import BI_ETL_COMPLETA_CADA_HORAS, BI_ETL_SOLAPE_SEGUNDOS, BI_ETL_HISTORIAL_DIAS
+from datetime import datetime, timedelta, timezone
+from typing import Any, Dict, List, Optional
+import logging
+import time
+
+
+class EtlBiUseCase:
+    """
+    Actualiza las tablas consolidadas de BI de forma incremental:
+      - cada tabla avanza su propia marca de agua (fecha_actualizacion e id)
+        y solo recalcula las claves afectadas desde la ejecución anterior,
+        incluidas las de filas borradas o movidas (etl_bi_cambio)
+      - cada BI_ETL_COMPLETA_CADA_HORAS se recalcula todo (antigüedades que
+        dependen de la fecha y cambios en tablas sin fecha_actualizacion)
+      - cada ejecución queda registrada con su duración y conteos en etl_bi_ejecucion
+
+    Un error en una tabla no detiene las demás; su marca de agua no avanza y se
+    reintenta en la siguiente ejecución.
+    """
+
+    def __init__(self, etl_repository: EtlBiRepository):
+        self.etl_repository = etl_repository
+
+    def ejecutar(self, completa: bool = False, tablas: Optional[List[str]] = None) -> Dict[str, Any]:
+        with self.etl_repository.bloqueo_exclusivo() as turno:
+            if not turno:
+                return {"estado": "omitido", "motivo": "Otro ETL de BI está en curso"}
+
+            estados = self.etl_repository.get_estados()
+            resultados = {}
+            for tabla in tablas or list(TABLAS_BI):
+                resultados[tabla] = self._actualizar(tabla, completa or self._toca_completa(estados.get(tabla)))
+
+            self.etl_repository.podar_cambios(BI_ETL_SOLAPE_SEGUNDOS)
+            errores = [tabla for tabla, resultado in resultados.items() if resultado.get("error")]
+            logging.info(
+                f"ETL de BI: {sum(r.get('filas_actualizadas') or 0 for r in resultados.values())} filas actualizadas"
+                f" en {len(resultados) - len(errores)} tablas" + (f", errores en {', '.join(errores)}" if errores else "")
+            )
+            return {"estado": "con_errores" if errores else "completado", "tablas": resultados}
+
+    def _toca_completa(self, estado: Optional[dict]) -> bool:
+        if not estado or not estado.get("ultima_completa"):
+            return True
+        if not BI_ETL_COMPLETA_CADA_HORAS:
+            return False
+        return datetime.now(timezone.utc) - estado["ultima_completa"] >= timedelta(hours=BI_ETL_COMPLETA_CADA_HORAS)
+
+    def _actualizar(self, tabla: str, completa: bool) -> Dict[str, Any]:
+        inicio = datetime.now(timezone.utc)
+        reloj = time.perf_counter()
+        try:
+            resultado = self.etl_repository.actualizar_tabla(tabla, completa, BI_ETL_SOLAPE_SEGUNDOS)
+            error = None
+        except Exception as e:
+            resultado = {"modo": "completa" if completa else "incremental"}
+            error = str(e)
+        duracion_ms = int((time.perf_counter() - reloj) * 1000)
+        self.etl_repository.registrar_ejecucion(tabla, inicio, duracion_ms, resultado, error, BI_ETL_HISTORIAL_DIAS)
+        resultado["duracion_ms"] = duracion_ms
+        if error:
+            resultado["error"] = error
+        return resultado
@@ -1,11 +1,17 @@
 from infrastructure.evento_repository import EventoRepository
-from schemas.evento import EventoRequest, EventoResponse, EventoUpdateRequest
+from infrastructure.reserva_repository import ReservaRepository
+from schemas.evento import (EventoRequest, EventoResponse, EventoUpdateRequest, EventoResumenResponse,
+                            CalendarioDiaResponse, CalendarioEventosResponse)
 from fastapi import HTTPException
-from typing import List
+from typing import List, Optional
+from datetime import date
+import calendar
 
 class EventoUseCase:
-    def __init__(self, evento_repository: EventoRepository):
+    def __init__(self, evento_repository: EventoRepository,
+                 reserva_repository: Optional[ReservaRepository] = None):
         self.evento_repository = evento_repository
+        self.reserva_repository = reserva_repository
 
     def list_eventos(self) -> List[EventoResponse]:
         eventos = self.evento_repository.list_eventos()
@@ -25,10 +31,49 @@ class EventoUseCase:
         e = self.evento_repository.update_evento(evento_id, data)
         if not e:
             raise HTTPException(status_code=404, detail="Evento no encontrado")
+        if self.reserva_repository and "capacidad_maxima" in data.dict(exclude_unset=True):
+            # Si aumentó la capacidad se confirman las reservas en espera que entren
+            self.reserva_repository.promover_lista_espera(evento_id)
         return EventoResponse(**e.__dict__)
 
     def delete_evento(self, evento_id: int) -> dict:
         success = self.evento_repository.delete_evento(evento_id)
         if not success:
             raise HTTPException(status_code=404, detail="Evento no encontrado")
-        return {"detail": "Evento eliminado correctamente"} 
\ No newline at end of file
+        return {"detail": "Evento eliminado correctamente"}
+
+    def resumen_eventos(self, id_club: Optional[int] = None, desde: Optional[date] = None,
+                        hasta: Optional[date] = None) -> List[EventoResumenResponse]:
+        if desde and hasta and desde > hasta:
+            raise HTTPException(status_code=400, detail="La fecha 'desde' no puede ser posterior a 'hasta'")
+        return [self._to_resumen(r) for r in self.evento_repository.list_resumen(id_club, desde, hasta)]
+
+    def calendario(self, anio: int, mes: int, id_club: Optional[int] = None) -> CalendarioEventosResponse:
+        """Eventos del mes con sus reservas, agrupados por día"""
+        desde = date(anio, mes, 1)
+        hasta = date(anio, mes, calendar.monthrange(anio, mes)[1])
+        eventos = self.resumen_eventos(id_club, desde, hasta)
+
+        dias: List[CalendarioDiaResponse] = []
+        for evento in eventos:
+            if not dias or dias[-1].fecha != evento.fecha:
+                dias.append(CalendarioDiaResponse(fecha=evento.fecha, eventos=[]))
+            dias[-1].eventos.append(evento)
+        return CalendarioEventosResponse(anio=anio, mes=mes, total_eventos=len(eventos), dias=dias)
+
+    def _to_resumen(self, r) -> EventoResumenResponse:
+        e = r.evento
+        return EventoResumenResponse(
+            id_evento=e.id_evento,
+            nombre_evento=e.nombre_evento,
+            descripcion=e.descripcion,
+            fecha=str(e.fecha),
+            hora=str(e.hora),
+            id_club=e.id_club,
+            estado=e.estado,
+            capacidad_maxima=e.capacidad_maxima,
+            confirmadas=r.confirmadas,
+            en_espera=r.en_espera,
+            canceladas=r.canceladas,
+            cupos_disponibles=r.cupos_disponibles,
+        )
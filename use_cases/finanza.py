@@ -1,4 +1,5 @@
 from infrastructure.finanza_repository import FinanzaRepository
+from infrastructure.row_mapper import como_dict
 from schemas.finanza import MovimientoFinancieroRequest, MovimientoFinancieroResponse, MovimientoFinancieroUpdateRequest
 from fastapi import HTTPException
 from typing import List
@@ -9,30 +10,34 @@ class FinanzaUseCase:
 
     def list_movimientos(self) -> List[MovimientoFinancieroResponse]:
         movimientos = self.finanza_repository.list_movimientos()
-        return [MovimientoFinancieroResponse(**m.__dict__) for m in movimientos]
+        return [MovimientoFinancieroResponse(**como_dict(m)) for m in movimientos]
 
     def get_movimiento(self, movimiento_id: int) -> MovimientoFinancieroResponse:
         m = self.finanza_repository.get_movimiento(movimiento_id)
         if not m:
             raise HTTPException(status_code=404, detail="Movimiento no encontrado")
-        return MovimientoFinancieroResponse(**m.__dict__)
+        return MovimientoFinancieroResponse(**como_dict(m))
 
     def create_movimiento(self, data: MovimientoFinancieroRequest) -> MovimientoFinancieroResponse:
         m = self.finanza_repository.create_movimiento(data)
-        return MovimientoFinancieroResponse(**m.__dict__)
+        return MovimientoFinancieroResponse(**como_dict(m))
 
     def update_movimiento(self, movimiento_id: int, data: MovimientoFinancieroUpdateRequest) -> MovimientoFinancieroResponse:
-        m = self.finanza_repository.update_movimiento(movimiento_id, data)
-        if not m:
-            raise HTTPException(status_code=404, detail="Movimiento no encontrado")
-        return MovimientoFinancieroResponse(**m.__dict__)
+        resultado = self.finanza_repository.update_movimiento(movimiento_id, data)
+        self._verificar_modificable(resultado["resultado"])
+        return MovimientoFinancieroResponse(**como_dict(resultado["movimiento"]))
 
     def delete_movimiento(self, movimiento_id: int) -> dict:
-        success = self.finanza_repository.delete_movimiento(movimiento_id)
-        if not success:
-            raise HTTPException(status_code=404, detail="Movimiento no encontrado")
+        self._verificar_modificable(self.finanza_repository.delete_movimiento(movimiento_id))
         return {"detail": "Movimiento eliminado correctamente"}
 
+    def _verificar_modificable(self, resultado: str):
+        if resultado == "no_encontrado":
+            raise HTTPException(status_code=404, detail="Movimiento no encontrado")
+        if resultado == "de_compra":
+            raise HTTPException(status_code=409, detail=(
+                "El movimiento corresponde a una compra; modifique o elimine la compra en su lugar"))
+
     def get_reportes(self):
         # Placeholder para reportes financieros
         return {"detail": "Reportes financieros (placeholder)"} 
\ No newline at end of file
@@ -1,7 +1,14 @@
 from infrastructure.inventario_repository import InventarioRepository
-from schemas.inventario import ProductoInventarioRequest, ProductoInventarioResponse, ProductoInventarioUpdateRequest
+from schemas.inventario import (ProductoInventarioRequest, ProductoInventarioResponse, ProductoInventarioUpdateRequest,
+                                MovimientoInventarioRequest, MovimientoLoteItemRequest, MovimientoInventarioResponse,
+                                MovimientoLoteResponse, MovimientoRechazado, ValoracionInventarioResponse)
 from fastapi import HTTPException
-from typing import List
+from datetime import date, timedelta
+from typing import List, Optional
+from config import INVENTARIO_LOTE_MAXIMO
+
+# Signo de cada tipo de movimiento; ajuste admite cantidades con signo
+_SIGNOS = {"entrada": 1, "salida": -1, "ajuste": 1}
 
 class InventarioUseCase:
     def __init__(self, inventario_repository: InventarioRepository):
@@ -18,17 +25,90 @@ class InventarioUseCase:
         return ProductoInventarioResponse(**p.__dict__)
 
     def create_producto(self, data: ProductoInventarioRequest) -> ProductoInventarioResponse:
+        if data.cantidad_en_stock < 0:
+            raise HTTPException(status_code=400, detail="El stock no puede ser negativo")
         p = self.inventario_repository.create_producto(data)
         return ProductoInventarioResponse(**p.__dict__)
 
-    def update_producto(self, producto_id: int, data: ProductoInventarioUpdateRequest) -> ProductoInventarioResponse:
-        p = self.inventario_repository.update_producto(producto_id, data)
+    def update_producto(self, producto_id: int, data: ProductoInventarioUpdateRequest,
+                        id_usuario: Optional[int] = None) -> ProductoInventarioResponse:
+        # Un stock absoluto se registra como ajuste; para ventas y reposiciones usar movimientos
+        if data.cantidad_en_stock is not None and data.cantidad_en_stock < 0:
+            raise HTTPException(status_code=400, detail="El stock no puede ser negativo")
+        p = self.inventario_repository.update_producto(producto_id, data, id_usuario)
         if not p:
             raise HTTPException(status_code=404, detail="Producto no encontrado")
         return ProductoInventarioResponse(**p.__dict__)
 
     def delete_producto(self, producto_id: int) -> dict:
-        success = self.inventario_repository.delete_producto(producto_id)
-        if not success:
+        resultado = self.inventario_repository.delete_producto(producto_id)
+        if resultado["resultado"] == "no_encontrado":
             raise HTTPException(status_code=404, detail="Producto no encontrado")
-        return {"detail": "Producto eliminado correctamente"} 
\ No newline at end of file
+        if resultado["resultado"] == "con_stock":
+            raise HTTPException(status_code=409, detail=(
+                f"El producto tiene {resultado['stock']} unidades en stock; "
+                "registre la salida o el ajuste antes de eliminarlo"))
+        return {"detail": "Producto eliminado correctamente"}
+
+    def registrar_movimiento(self, producto_id: int, data: MovimientoInventarioRequest,
+                             id_usuario: Optional[int] = None) -> MovimientoLoteResponse:
+        item = MovimientoLoteItemRequest(id_producto=producto_id, **data.dict())
+        return self._registrar([item], id_usuario, un_producto=True)
+
+    def registrar_lote(self, items: List[MovimientoLoteItemRequest],
+                       id_usuario: Optional[int] = None) -> MovimientoLoteResponse:
+        """Todos los movimientos del lote se aplican juntos o ninguno"""
+        if not items:
+            raise HTTPException(status_code=400, detail="El lote no tiene movimientos")
+        if len(items) > INVENTARIO_LOTE_MAXIMO:
+            raise HTTPException(status_code=413, detail=f"Máximo {INVENTARIO_LOTE_MAXIMO} movimientos por lote")
+        return self._registrar(items, id_usuario)
+
+    def list_movimientos(self, producto_id: int, desde: Optional[date] = None, hasta: Optional[date] = None,
+                         limite: int = 500) -> List[MovimientoInventarioResponse]:
+        movimientos = self.inventario_repository.list_movimientos(producto_id, desde, hasta, limite)
+        return [MovimientoInventarioResponse(**m.__dict__) for m in movimientos]
+
+    def generar_valoracion(self, fecha_corte: Optional[date] = None) -> ValoracionInventarioResponse:
+        """Valoración al cierre de fecha_corte (por defecto, ayer)"""
+        fecha_corte = fecha_corte or date.today() - timedelta(days=1)
+        if fecha_corte >= date.today():
+            raise HTTPException(status_code=400, detail="Solo se pueden valorar días ya terminados")
+        self.inventario_repository.generar_valoracion(fecha_corte)
+        return self.get_valoracion(fecha_corte)
+
+    def valorar_dia_anterior(self) -> dict:
+        """Job programado: valoración de ayer si todavía no existe"""
+        return self.inventario_repository.generar_valoracion(date.today() - timedelta(days=1), reemplazar=False)
+
+    def get_valoracion(self, fecha_corte: Optional[date] = None) -> ValoracionInventarioResponse:
+        valoracion = self.inventario_repository.get_valoracion(fecha_corte)
+        if not valoracion:
+            raise HTTPException(status_code=404, detail="No hay valoraciones de inventario para esa fecha")
+        return ValoracionInventarioResponse(**valoracion)
+
+    def _registrar(self, items: List[MovimientoLoteItemRequest], id_usuario: Optional[int],
+                   un_producto: bool = False) -> MovimientoLoteResponse:
+        movimientos = []
+        for item in items:
+            tipo = item.tipo.lower()
+            if tipo not in _SIGNOS:
+                raise HTTPException(status_code=400, detail=f"Tipo de movimiento inválido: {item.tipo}")
+            if item.cantidad == 0 or (tipo != "ajuste" and item.cantidad < 0):
+                raise HTTPException(status_code=400,
+                                    detail="La cantidad debe ser positiva (distinta de cero en un ajuste)")
+            movimientos.append({
+                "id_producto": item.id_producto, "tipo": tipo, "cantidad": _SIGNOS[tipo] * item.cantidad,
+                "referencia": item.referencia, "observaciones": item.observaciones,
+            })
+
+        resultado = self.inventario_repository.registrar_movimientos(movimientos, id_usuario)
+        rechazados = resultado["rechazados"]
+        if rechazados:
+            if un_producto and rechazados[0]["stock_actual"] is None:
+                raise HTTPException(status_code=404, detail="Producto no encontrado")
+            raise HTTPException(status_code=409, detail={
+                "mensaje": "No se registró ningún movimiento",
+                "rechazados": [MovimientoRechazado(**r).dict() for r in rechazados],
+            })
+        return MovimientoLoteResponse(movimientos=len(movimientos), productos=resultado["productos"])
@@ -1,14 +1,23 @@
 from infrastructure.log_repository import LogRepository
-from schemas.log import LogSistemaRequest, LogSistemaResponse
+from infrastructure.auditoria import cola_auditoria
+from schemas.log import LogSistemaRequest, LogSistemaResponse, LogSistemaEncoladoResponse
+from datetime import datetime, timedelta, timezone
+from config import LOGS_DIAS_POR_DEFECTO
 from fastapi import HTTPException
-from typing import List
+from typing import List, Optional
 
 class LogUseCase:
     def __init__(self, log_repository: LogRepository):
         self.log_repository = log_repository
 
-    def list_logs(self) -> List[LogSistemaResponse]:
-        logs = self.log_repository.list_logs()
+    def list_logs(self, desde: Optional[datetime] = None, hasta: Optional[datetime] = None,
+                  id_usuario: Optional[int] = None, modulo: Optional[str] = None,
+                  limite: int = 500, antes_de_id: Optional[int] = None) -> List[LogSistemaResponse]:
+        if antes_de_id is not None and hasta is None:
+            raise HTTPException(status_code=400, detail="antes_de_id requiere hasta (fecha del último log recibido)")
+        if desde is None:
+            desde = (hasta or datetime.now()) - timedelta(days=LOGS_DIAS_POR_DEFECTO)
+        logs = self.log_repository.list_logs(desde, hasta, id_usuario, modulo, limite, antes_de_id)
         return [LogSistemaResponse(**l.__dict__) for l in logs]
 
     def get_log(self, log_id: int) -> LogSistemaResponse:
@@ -22,4 +31,15 @@ class LogUseCase:
             log = self.log_repository.create_log(data)
             return LogSistemaResponse(**log.__dict__)
         except Exception as e:
-            raise HTTPException(status_code=500, detail=str(e)) 
\ No newline at end of file
+            raise HTTPException(status_code=500, detail=str(e))
+
+    def registrar_log(self, data: LogSistemaRequest) -> LogSistemaEncoladoResponse:
+        """
+        Encola el log para la escritura en lote (no espera a la base de datos).
+        La IP y el User-Agent son los de la petición, no los que envía el cliente
+        """
+        fecha_y_hora = datetime.now(timezone.utc)
+        encolado = cola_auditoria.registrar(**data.dict(exclude={"ip_address", "user_agent"}), fecha_y_hora=fecha_y_hora)
+        if not encolado:
+            raise HTTPException(status_code=503, detail="Cola de auditoría llena, reintente más tarde")
+        return LogSistemaEncoladoResponse(encolado=True, fecha_y_hora=fecha_y_hora.isoformat())
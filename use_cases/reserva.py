@@ -1,4 +1,4 @@
-from infrastructure.reserva_repository import ReservaRepository
+from infrastructure.reserva_repository import ReservaRepository, ESTADO_CANCELADA
 from schemas.reserva import ReservaRequest, ReservaResponse, ReservaUpdateRequest
 from fastapi import HTTPException
 from typing import List, Optional
@@ -9,26 +9,64 @@ class ReservaUseCase:
 
     def list_reservas(self, id_evento: Optional[int] = None, id_socio: Optional[int] = None) -> List[ReservaResponse]:
         reservas = self.reserva_repository.list_reservas(id_evento=id_evento, id_socio=id_socio)
-        return [ReservaResponse(**r.__dict__) for r in reservas]
+        return [self._to_response(r) for r in reservas]
 
     def get_reserva(self, reserva_id: int) -> ReservaResponse:
         r = self.reserva_repository.get_reserva(reserva_id)
         if not r:
             raise HTTPException(status_code=404, detail="Reserva no encontrada")
-        return ReservaResponse(**r.__dict__)
+        return self._to_response(r)
 
     def create_reserva(self, data: ReservaRequest) -> ReservaResponse:
-        r = self.reserva_repository.create_reserva(data)
-        return ReservaResponse(**r.__dict__)
+        """Confirma la reserva si hay cupo; si no, la deja en lista de espera"""
+        resultado = self.reserva_repository.create_reserva(data.id_socio, data.id_evento, data.notas,
+                                                           data.lista_espera)
+        if resultado["resultado"] == "evento_inexistente":
+            raise HTTPException(status_code=404, detail="Evento no encontrado")
+        if resultado["resultado"] == "socio_inexistente":
+            raise HTTPException(status_code=404, detail="Socio no encontrado")
+        if resultado["resultado"] == "duplicada":
+            raise HTTPException(status_code=409, detail="El socio ya tiene una reserva activa en este evento")
+        if resultado["resultado"] == "sin_cupo":
+            raise HTTPException(status_code=409, detail="El evento no tiene cupos disponibles")
+        return self._to_response(resultado["reserva"], resultado["posicion_espera"])
 
     def update_reserva(self, reserva_id: int, data: ReservaUpdateRequest) -> ReservaResponse:
-        r = self.reserva_repository.update_reserva(reserva_id, data)
+        campos = data.dict(exclude_unset=True)
+        # El estado y el evento los maneja el control de cupos; la fecha ordena la lista de espera
+        if "id_evento" in campos or "id_socio" in campos:
+            raise HTTPException(status_code=400, detail="No se puede cambiar el evento ni el socio de una reserva")
+        if "fecha_reserva" in campos:
+            raise HTTPException(status_code=400,
+                                detail="No se puede cambiar la fecha de una reserva; define su turno en la lista de espera")
+        estado = campos.pop("estado", None)
+        if estado is not None and estado != ESTADO_CANCELADA:
+            raise HTTPException(status_code=400,
+                                detail="El estado solo puede cambiarse a 'cancelada'; la confirmación depende de los cupos")
+        if estado == ESTADO_CANCELADA and self.reserva_repository.cancelar_reserva(reserva_id) is None:
+            raise HTTPException(status_code=404, detail="Reserva no encontrada")
+
+        columnas = {"notas": "observaciones"}
+        r = self.reserva_repository.update_reserva(reserva_id, {columnas[k]: v for k, v in campos.items()})
         if not r:
             raise HTTPException(status_code=404, detail="Reserva no encontrada")
-        return ReservaResponse(**r.__dict__)
+        return self._to_response(r)
 
     def delete_reserva(self, reserva_id: int) -> dict:
         success = self.reserva_repository.delete_reserva(reserva_id)
         if not success:
             raise HTTPException(status_code=404, detail="Reserva no encontrada")
-        return {"detail": "Reserva eliminada correctamente"} 
\ No newline at end of file
+        return {"detail": "Reserva eliminada correctamente"}
+
+    def _to_response(self, r, posicion_espera: Optional[int] = None) -> ReservaResponse:
+        fecha = str(r.fecha_de_reserva) if r.fecha_de_reserva else ""
+        return ReservaResponse(
+            id_reserva=r.id_reserva,
+            id_evento=r.id_evento,
+            id_socio=r.id_socio,
+            fecha_reserva=fecha,
+            estado=r.estado,
+            notas=r.observaciones,
+            fecha_creacion=fecha,
+            posicion_espera=posicion_espera,
+        )
@@ -0,0 +1,63 @@
+from infrastructure.log_repository import LogRepository
+from config import LOGS_RETENCION_MESES, LOGS_MESES_ADELANTE, LOGS_DIRECTORIO_ARCHIVO
+from datetime import date
+from typing import Any, Dict, Optional
+import logging
+import os
+
+
+def _inicio_de_mes(fecha: date, meses_atras: int = 0) -> date:
+    total = fecha.year * 12 + fecha.month - 1 - meses_atras
+    return date(total // 12, total % 12 + 1, 1)
+
+
+class RetencionLogsUseCase:
+    """
+    Mantenimiento de logs_sistema particionada por mes:
+      - crea las particiones del mes actual y de los LOGS_MESES_ADELANTE siguientes
+      - las particiones anteriores a LOGS_RETENCION_MESES se desanexan, se exportan
+        a LOGS_DIRECTORIO_ARCHIVO/<particion>.csv.gz y se eliminan
+
+    Cada paso es reanudable: si el proceso se corta, una partición ya desanexada
+    se retoma en la siguiente ejecución (se vuelve a exportar antes de eliminarla).
+    """
+
+    def __init__(self, log_repository: LogRepository):
+        self.log_repository = log_repository
+
+    def ejecutar(self, hoy: Optional[date] = None) -> Dict[str, Any]:
+        hoy = hoy or date.today()
+        with self.log_repository.bloqueo_retencion() as turno:
+            if not turno:
+                return {"estado": "omitido", "motivo": "Otro mantenimiento de logs está en curso"}
+
+            aseguradas = self.log_repository.crear_particiones(_inicio_de_mes(hoy), LOGS_MESES_ADELANTE)
+            archivadas = []
+            if LOGS_RETENCION_MESES:
+                limite = _inicio_de_mes(hoy, LOGS_RETENCION_MESES)
+                os.makedirs(LOGS_DIRECTORIO_ARCHIVO, exist_ok=True)
+                for particion in self.log_repository.listar_particiones():
+                    if particion["mes"] >= limite:
+                        continue
+                    archivadas.append(self._archivar(particion))
+
+            resultado = {
+                "estado": "completado",
+                "particiones_aseguradas": aseguradas,
+                "archivadas": archivadas,
+                "filas_en_default": self.log_repository.contar_default(),
+            }
+            if resultado["filas_en_default"]:
+                logging.warning(f"logs_sistema_default tiene {resultado['filas_en_default']} filas fuera de las particiones mensuales")
+            logging.info(f"Mantenimiento de logs_sistema: {len(archivadas)} particiones archivadas")
+            return resultado
+
+    def _archivar(self, particion: Dict[str, Any]) -> Dict[str, Any]:
+        nombre = particion["nombre"]
+        if particion["anexada"]:
+            self.log_repository.desanexar_particion(nombre)
+        archivo = os.path.join(LOGS_DIRECTORIO_ARCHIVO, f"{nombre}.csv.gz")
+        filas = self.log_repository.exportar_particion(nombre, archivo)
+        self.log_repository.eliminar_particion(nombre)
+        logging.info(f"Partición {nombre} archivada en {archivo} ({filas} filas)")
+        return {"particion": nombre, "archivo": archivo, "filas": filas}
@@ -1,4 +1,5 @@
 from infrastructure.socio_repository import SocioRepository
+from infrastructure.row_mapper import como_dict
 from infrastructure.user_repository import UserRepository
 from infrastructure.security import hash_password
 from schemas.socio import SocioRequest, SocioResponse, SocioUpdateRequest
@@ -13,13 +14,13 @@ class SocioUseCase:
 
     def list_socios(self) -> List[SocioResponse]:
         socios = self.socio_repository.list_socios()
-        return [SocioResponse(**socio.__dict__) for socio in socios]
+        return [SocioResponse(**como_dict(socio)) for socio in socios]
 
     def get_socio(self, socio_id: int) -> SocioResponse:
         socio = self.socio_repository.get_socio(socio_id)
         if not socio:
             raise HTTPException(status_code=404, detail="Socio no encontrado")
-        return SocioResponse(**socio.__dict__)
+        return SocioResponse(**como_dict(socio))
 
     def create_socio(self, data: SocioRequest) -> SocioResponse:
         """
@@ -89,7 +90,7 @@ class SocioUseCase:
             
             logging.info(f"Socio {socio.id_socio} asociado con usuario {user.id_usuario}")
             
-            return SocioResponse(**socio_actualizado.__dict__)
+            return SocioResponse(**como_dict(socio_actualizado))
             
         except Exception as e:
             logging.error(f"Error creando socio con usuario: {str(e)}")
@@ -129,7 +130,7 @@ class SocioUseCase:
         socio = self.socio_repository.update_socio(socio_id, data)
         if not socio:
             raise HTTPException(status_code=404, detail="Socio no encontrado")
-        return SocioResponse(**socio.__dict__)
+        return SocioResponse(**como_dict(socio))
 
     def delete_socio(self, socio_id: int) -> dict:
         success = self.socio_repository.delete_socio(socio_id)
@@ -0,0 +1,195 @@
+from infrastructure.webhook_repository import WebhookRepository
+from infrastructure.accion_repository import AccionRepository
+from infrastructure.socio_repository import SocioRepository
+from infrastructure.temp_payment_service import TempPaymentService
+from schemas.accion import AccionRequest
+from datetime import datetime
+from typing import Any, Dict, Tuple
+import json
+import logging
+
+STRIPE = "stripe"
+MERCADOPAGO = "mercadopago"
+# Estado (estado_accion.nombre_estado_accion) de una acción pagada por pasarela
+ESTADO_ACCION_PAGADA = "aprobada"
+
+
+class WebhookUseCase:
+    """
+    Webhooks de pasarelas en dos fases: `registrar_*` se ejecuta dentro de la
+    petición de la pasarela (verifica y guarda el evento, tiempo constante) y
+    `procesar_evento` lo ejecuta el pool de workers (infrastructure/webhook_worker.py).
+    """
+
+    def __init__(self, webhook_repository: WebhookRepository):
+        self.webhook_repository = webhook_repository
+
+    # ---------- Recepción ----------
+
+    def registrar_stripe(self, payload: bytes, signature: str) -> Dict[str, Any]:
+        from infrastructure.stripe_service import StripeService
+
+        # La firma se verifica al recibir para no encolar eventos falsos
+        StripeService().verificar_evento(payload.decode('utf-8'), signature)
+        evento = json.loads(payload)
+        objeto = evento.get("data", {}).get("object", {})
+        nuevo = self.webhook_repository.registrar_evento(STRIPE, evento["id"], evento.get("type"), evento)
+        return {
+            "event_type": evento.get("type"),
+            "payment_intent_id": objeto.get("id", ""),
+            "status": "received" if nuevo else "duplicate",
+            "amount": objeto.get("amount"),
+            "currency": objeto.get("currency"),
+            "metadata": objeto.get("metadata"),
+            "action": "encolado",
+        }
+
+    def registrar_mercadopago(self, webhook_data: Dict[str, Any]) -> Dict[str, Any]:
+        accion = webhook_data.get("action") or webhook_data.get("type") or "desconocido"
+        payment_id = webhook_data.get("data", {}).get("id")
+        # MercadoPago envía un id de notificación; si falta, se usa acción + pago
+        id_evento = str(webhook_data.get("id") or f"{accion}:{payment_id}")
+        nuevo = self.webhook_repository.registrar_evento(MERCADOPAGO, id_evento, accion, webhook_data)
+        return {
+            "event_type": accion,
+            "payment_id": str(payment_id) if payment_id is not None else None,
+            "status": "received" if nuevo else "duplicate",
+            "action": "encolado",
+        }
+
+    # ---------- Proceso (workers) ----------
+
+    def procesar_evento(self, evento: Dict[str, Any]) -> Dict[str, Any]:
+        if evento["proveedor"] == STRIPE:
+            return self._procesar_stripe(evento)
+        if evento["proveedor"] == MERCADOPAGO:
+            return self._procesar_mercadopago(evento)
+        raise Exception(f"Proveedor de webhook desconocido: {evento['proveedor']}")
+
+    def _procesar_stripe(self, evento: Dict[str, Any]) -> Dict[str, Any]:
+        from infrastructure.stripe_service import StripeService
+
+        webhook_result = StripeService().clasificar_evento(evento["payload"])
+        metadata = webhook_result.get("metadata") or {}
+
+        if webhook_result.get("action") == "crear_accion":
+            id_accion = self._crear_accion_pagada(
+                evento, webhook_result["payment_intent_id"], metadata,
+                total_pago=float(webhook_result["amount"]) / 100,  # Convertir de centavos
+                metodo_pago="stripe",
+            )
+            webhook_result["id_accion"] = id_accion
+
+        elif webhook_result.get("action") == "limpiar_pago_temporal":
+            # Limpiar pago temporal cuando se cancela
+            temp_ref = metadata.get("referencia_temporal")
+            if temp_ref:
+                TempPaymentService().delete_temp_payment(temp_ref)
+                logging.info(f"Pago temporal limpiado vía webhook: {temp_ref}")
+
+        return webhook_result
+
+    def _procesar_mercadopago(self, evento: Dict[str, Any]) -> Dict[str, Any]:
+        from infrastructure.mercadopago_service import MercadoPagoService
+
+        webhook_result = MercadoPagoService().procesar_webhook(evento["payload"])
+
+        if webhook_result.get("action") == "crear_accion":
+            id_accion = self._crear_accion_pagada(
+                evento, str(webhook_result["payment_id"]), webhook_result.get("metadata") or {},
+                total_pago=0.00,  # Se actualizará con el monto real
+                metodo_pago="mercadopago",
+            )
+            webhook_result["id_accion"] = id_accion
+
+        return webhook_result
+
+    def _crear_accion_pagada(self, evento: Dict[str, Any], referencia_pago: str,
+                             metadata: Dict[str, Any], total_pago: float, metodo_pago: str) -> int:
+        """
+        Crea la acción y su certificado para un pago confirmado. Es idempotente:
+        un pago produce una sola acción aunque el evento se reintente o la
+        pasarela envíe varios eventos para el mismo pago.
+        """
+        from infrastructure.certificate_service import CertificateService
+
+        proveedor = evento["proveedor"]
+        accion_repository = AccionRepository()
+
+        with self.webhook_repository.bloqueo_pago(proveedor, referencia_pago):
+            id_accion = self.webhook_repository.get_accion_de_pago(proveedor, referencia_pago)
+            accion = accion_repository.get_accion(id_accion) if id_accion else None
+
+            if accion is None:
+                id_club, modalidad_pago = self._club_y_modalidad(metadata)
+                estado_accion = accion_repository.get_id_estado_accion(ESTADO_ACCION_PAGADA)
+                if estado_accion is None:
+                    raise Exception(f"No existe el estado de acción '{ESTADO_ACCION_PAGADA}'")
+                accion = self.webhook_repository.crear_accion_de_pago(evento["id_webhook"], proveedor, referencia_pago, AccionRequest(
+                    id_club=id_club,
+                    id_socio=int(metadata["socio_id"]),
+                    modalidad_pago=modalidad_pago,
+                    estado_accion=estado_accion,
+                    certificado_pdf=None,
+                    certificado_cifrado=False,
+                    tipo_accion=metadata["tipo_accion"],
+                    cantidad_acciones=int(metadata["cantidad_acciones"]),
+                    precio_unitario=float(metadata["precio_unitario"]),
+                    total_pago=total_pago,
+                    metodo_pago=metodo_pago
+                ))
+                logging.info(f"Acción creada vía webhook {proveedor}: {accion.id_accion}")
+            else:
+                self.webhook_repository.registrar_accion(evento["id_webhook"], referencia_pago, accion.id_accion)
+
+            # Si un intento anterior ya generó el certificado no se repite
+            if not accion.certificado_pdf:
+                socio = SocioRepository().get_socio(accion.id_socio)
+                socio_titular_nombre = f"{socio.nombres} {socio.apellidos}" if socio else f"Socio {accion.id_socio}"
+
+                certificado_data = {
+                    'id_accion': accion.id_accion,
+                    'id_socio': accion.id_socio,
+                    'tipo_accion': accion.tipo_accion,
+                    'cantidad_acciones': accion.cantidad_acciones,
+                    'precio_unitario': accion.precio_unitario,
+                    'total_pago': accion.total_pago,
+                    'metodo_pago': accion.metodo_pago,
+                    'socio_titular': socio_titular_nombre,
+                    'modalidad_pago_info': f"Modalidad {accion.modalidad_pago}"
+                }
+
+                # Generar certificado completo (original + cifrado)
+                certificado_info = CertificateService().generar_certificado_completo(certificado_data, accion.id_socio)
+
+                accion_repository.update_accion(accion.id_accion, {
+                    "certificado_pdf": certificado_info["certificado_original"],
+                    "certificado_cifrado": True,
+                    "fecha_emision_certificado": datetime.now().isoformat()
+                })
+
+        # Limpiar pago temporal si existe
+        temp_ref = metadata.get("referencia_temporal")
+        if temp_ref:
+            TempPaymentService().delete_temp_payment(temp_ref)
+
+        return accion.id_accion
+
+    def _club_y_modalidad(self, metadata: Dict[str, Any]) -> Tuple[int, int]:
+        """
+        Club y modalidad de pago de la compra: de la metadata del pago o, en
+        pagos creados antes de incluirlos, del pago temporal
+        """
+        datos_pago = {}
+        temp_ref = metadata.get("referencia_temporal")
+        if temp_ref:
+            pago_temporal = TempPaymentService().get_temp_payment(temp_ref)
+            datos_pago = (pago_temporal or {}).get("datos_pago") or {}
+        id_club = metadata.get("id_club") or datos_pago.get("id_club")
+        modalidad_pago = metadata.get("modalidad_pago") or datos_pago.get("modalidad_pago")
+        if id_club is None or modalidad_pago is None:
+            raise Exception(f"El pago no indica club ni modalidad de pago (referencia temporal {temp_ref})")
+        return int(id_club), int(modalidad_pago)
+
+    def resumen_bandeja(self) -> Dict[str, Any]:
+        return self.webhook_repository.resumen()